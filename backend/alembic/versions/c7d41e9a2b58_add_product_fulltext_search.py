@@ -0,0 +1,87 @@
+"""add_product_fulltext_search
+
+Revision ID: c7d41e9a2b58
+Revises: a0f6dd1333af
+Create Date: 2025-10-18 10:12:37.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d41e9a2b58'
+down_revision = 'a0f6dd1333af'
+branch_labels = None
+depends_on = None
+
+SEARCH_COLUMNS = ['name', 'description', 'sku', 'category', 'brand']
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _upgrade_sqlite()
+    elif dialect == 'postgresql':
+        _upgrade_postgresql()
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('products_fts_insert', 'products_fts_delete', 'products_fts_update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS products_fts")
+    elif dialect == 'postgresql':
+        op.drop_index('ix_products_search_vector', table_name='products')
+        op.drop_column('products', 'search_vector')
+        for name in SEARCH_COLUMNS:
+            op.drop_index(f'ix_products_{name}_trgm', table_name='products')
+
+
+def _upgrade_sqlite() -> None:
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{name}' for name in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{name}' for name in SEARCH_COLUMNS)
+
+    # External-content FTS5 table over products; the trigram tokenizer matches substrings like ILIKE '%...%'
+    op.execute(
+        f"CREATE VIRTUAL TABLE products_fts USING fts5({columns}, "
+        f"content='products', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(f"""
+        CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER products_fts_update AFTER UPDATE OF {columns} ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO products_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """)
+    # Index the existing catalog
+    op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def _upgrade_postgresql() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Serve the ILIKE '%...%' filters from trigram indexes
+    for name in SEARCH_COLUMNS:
+        op.create_index(
+            f'ix_products_{name}_trgm', 'products', [name],
+            postgresql_using='gin', postgresql_ops={name: 'gin_trgm_ops'}
+        )
+
+    document = " || ' ' || ".join(f"coalesce({name}, '')" for name in SEARCH_COLUMNS)
+    op.add_column('products', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(f"to_tsvector('simple', {document})", persisted=True)
+    ))
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'], postgresql_using='gin')
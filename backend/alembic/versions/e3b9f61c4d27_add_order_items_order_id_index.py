@@ -0,0 +1,24 @@
+"""add_order_items_order_id_index
+
+Revision ID: e3b9f61c4d27
+Revises: c7d41e9a2b58
+Create Date: 2025-10-24 09:41:18.603927
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b9f61c4d27'
+down_revision = 'c7d41e9a2b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Co-purchase catch-up reads the lines of orders placed since a given order id
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
@@ -5,13 +5,13 @@ Meta (Facebook Messenger & Instagram) Channel Adapter
 """
 from typing import Any, Dict, Optional, List
 from fastapi import APIRouter, Request, HTTPException, Header
+import asyncio
 import hmac
 import hashlib
 import os
 import httpx
 
-from app.services.nlu_service import nlu_service
-from app.services.dialogue_manager import dialogue_manager
+from app.channels.pipeline import PipelineTurn, default_pipeline
 from app.core.config import settings
 
 router = APIRouter()
@@ -105,115 +105,51 @@ def _extract_events(body: Dict[str, Any]) -> List[Dict[str, Any]]:
     return events
 
 
-@router.post("/webhook")
-async def webhook_receive(request: Request, x_hub_signature_256: Optional[str] = Header(default=None)):
-    from app.db.base import get_db
-    from app.db.models import Conversation, Turn, ConversationStatus, TurnSpeaker
-    import uuid
+async def _send_reply(turn: PipelineTurn) -> Dict[str, Any]:
+    if turn.channel == "messenger":
+        return await _send_messenger(turn.customer_id, turn.reply)
+    if turn.channel == "instagram":
+        return await _send_instagram(turn.customer_id, turn.reply)
+    return {"status": "skipped", "reason": f"unknown_platform_{turn.channel}"}
 
-    raw = await request.body()
-    if not verify_signature(x_hub_signature_256, raw):
-        raise HTTPException(status_code=403, detail="Invalid signature")
-    body = await request.json()
 
-    events = _extract_events(body)
-    processed_count = 0
+pipeline = default_pipeline(send=_send_reply)
 
+
+async def _process_event(evt: Dict[str, Any]) -> bool:
+    """NLU, dialogue decision, reply and conversation turns for one message"""
+    if not evt.get("text") or not evt.get("from"):
+        return False
+    turn = PipelineTurn(
+        channel=evt.get("platform"),
+        customer_id=evt.get("from"),
+        text=evt.get("text", ""),
+        context={"from": evt.get("from")}
+    )
+    turn = await pipeline.run(turn)
+    return turn.error is None and not turn.halted
+
+
+async def _process_sender_events(events: List[Dict[str, Any]]) -> int:
+    # One sender's messages stay in order: each turn reads the state the previous one saved
+    processed_count = 0
     for evt in events:
-        text = evt.get("text", "")
-        platform = evt.get("platform")
-        user_id = evt.get("from")
-
-        if not text or not user_id:
-            continue
-
-        # NLU resolution with language detection
-        nlu_res = await nlu_service.resolve(text)
-        detected_language = nlu_res.get("language", "bn")
-
-        # Get database session
-        db = next(get_db())
-
-        try:
-            # Find or create conversation
-            conversation = db.query(Conversation).filter(
-                Conversation.customer_id == user_id,
-                Conversation.channel == platform,
-                Conversation.status == ConversationStatus.active
-            ).first()
-
-            if not conversation:
-                conversation_id = str(uuid.uuid4())[:8]
-                conversation = Conversation(
-                    conversation_id=conversation_id,
-                    channel=platform,
-                    customer_id=user_id,
-                    customer_language=detected_language,
-                    status=ConversationStatus.active
-                )
-                db.add(conversation)
-                db.commit()
-                db.refresh(conversation)
-
-            # Create user turn
-            turn_index = len(conversation.turns) if conversation.turns else 0
-            user_turn = Turn(
-                conversation_id=conversation.id,
-                turn_index=turn_index,
-                speaker=TurnSpeaker.user,
-                text=text,
-                text_language=detected_language,
-                intent=nlu_res["intent"],
-                entities=nlu_res["entities"],
-                nlu_confidence=nlu_res["confidence"]
-            )
-            db.add(user_turn)
-
-            # Dialogue decision with enhanced context
-            dm_res = dialogue_manager.decide(
-                intent=nlu_res["intent"],
-                entities=nlu_res["entities"],
-                context={
-                    "channel": platform,
-                    "customer_id": user_id,
-                    "message": text,
-                    "language": detected_language,
-                    "from": user_id
-                }
-            )
-
-            # Create bot turn
-            bot_turn = Turn(
-                conversation_id=conversation.id,
-                turn_index=turn_index + 1,
-                speaker=TurnSpeaker.bot,
-                text=dm_res["response_text"],
-                text_language=detected_language,
-                intent=nlu_res["intent"],
-                entities=nlu_res["entities"],
-                turn_data={"action": dm_res["action"], "metadata": dm_res["metadata"]}
-            )
-            db.add(bot_turn)
-
-            # Update conversation
-            conversation.last_message_at = user_turn.timestamp
-            conversation.unread_count += 1
-            db.commit()
-
-            reply = dm_res["response_text"]
+        if await _process_event(evt):
             processed_count += 1
+    return processed_count
+
 
-        except Exception as e:
-            print(f"Error processing {platform} message: {e}")
-            db.rollback()
-            reply = "দুঃখিত, একটি ত্রুটি হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।"
-        finally:
-            db.close()
+@router.post("/webhook")
+async def webhook_receive(request: Request, x_hub_signature_256: Optional[str] = Header(default=None)):
+    raw = await request.body()
+    if not verify_signature(x_hub_signature_256, raw):
+        raise HTTPException(status_code=403, detail="Invalid signature")
+    body = await request.json()
 
-        # Send response
-        if platform == "messenger":
-            await _send_messenger(user_id, reply)
-        elif platform == "instagram":
-            await _send_instagram(user_id, reply)
+    # Batched deliveries carry several senders; their conversations are independent, so they run concurrently
+    by_sender: Dict[tuple, List[Dict[str, Any]]] = {}
+    for evt in _extract_events(body):
+        by_sender.setdefault((evt.get("platform"), evt.get("from")), []).append(evt)
+    counts = await asyncio.gather(*(_process_sender_events(sender_events) for sender_events in by_sender.values()))
 
-    return {"status": "ok", "processed": processed_count}
+    return {"status": "ok", "processed": sum(counts)}
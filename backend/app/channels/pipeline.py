@@ -0,0 +1,225 @@
+"""
+Message processing pipeline shared by the channel adapters
+A customer message runs through named stages: normalize -> nlu -> dm -> send
+-> persist. Channels start from default_pipeline() and swap, insert or drop
+stages (webchat keeps no Conversation rows, voice "sends" by synthesizing
+speech, VoIP transcribes audio first). Every stage's duration is observed in
+the channel_stage_duration histogram per channel and tenant, and the bot
+Turn's turn_data["timings_ms"] keeps the breakdown of the stages before it.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import time
+import uuid
+
+from app.core.tenant import TenantContext
+from app.routers.metrics import channel_stage_duration, messages_received, messages_sent
+from app.services.nlu_service import nlu_service
+from app.services.dialogue_manager import dialogue_manager
+from app.services.dialogue_state_store import dialogue_state_store
+
+ERROR_REPLY = "দুঃখিত, একটি ত্রুটি হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।"
+
+
+class PipelineTurn:
+    """One customer message and everything the stages derive from it"""
+
+    def __init__(
+        self,
+        channel: str,
+        customer_id: str,
+        text: str,
+        tenant_id: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None
+    ):
+        self.channel = channel
+        self.customer_id = customer_id
+        self.text = text
+        self.tenant_id = tenant_id if tenant_id is not None else TenantContext.get_tenant_id()
+        # Channel-specific dialogue context (session_id, from, ...)
+        self.context: Dict[str, Any] = dict(context or {})
+        self.nlu: Dict[str, Any] = {}
+        self.language = "bn"
+        self.dm: Dict[str, Any] = {}
+        self.reply: Optional[str] = None
+        self.sent: Any = None
+        self.delivered = False  # set once the send stage has delivered turn.reply
+        self.timings: Dict[str, float] = {}  # stage -> milliseconds
+        self.error: Optional[Exception] = None
+        self.halted = False  # set by a stage when there is nothing to answer
+
+
+StageFunc = Callable[[PipelineTurn], Awaitable[None]]
+
+
+class Stage:
+    """A named pipeline step; `always` steps also run after an earlier step failed"""
+
+    def __init__(self, name: str, func: StageFunc, always: bool = False):
+        self.name = name
+        self.func = func
+        self.always = always
+
+
+class MessagePipeline:
+    def __init__(self, stages: List[Stage]):
+        self.stages = list(stages)
+
+    def with_stage(self, stage: Stage, before: Optional[str] = None) -> "MessagePipeline":
+        """Copy with `stage` replacing the stage of the same name, or inserted before `before` (default: appended)"""
+        if before is None and any(s.name == stage.name for s in self.stages):
+            return MessagePipeline([stage if s.name == stage.name else s for s in self.stages])
+        stages = [s for s in self.stages if s.name != stage.name]
+        names = [s.name for s in stages]
+        index = names.index(before) if before in names else len(stages)
+        return MessagePipeline(stages[:index] + [stage] + stages[index:])
+
+    def without(self, *names: str) -> "MessagePipeline":
+        return MessagePipeline([s for s in self.stages if s.name not in names])
+
+    async def run(self, turn: PipelineTurn) -> PipelineTurn:
+        messages_received.labels(channel=turn.channel).inc()
+        tenant_label = turn.tenant_id or "_"
+        for stage in self.stages:
+            if turn.halted or (turn.error is not None and not stage.always):
+                continue
+            start = time.perf_counter()
+            try:
+                await stage.func(turn)
+            except Exception as e:
+                print(f"Error in {turn.channel} pipeline stage {stage.name}: {e}")
+                if turn.error is None:
+                    turn.error = e
+                    # A failure after send (e.g. persist) keeps the reply the customer already got
+                    if not turn.delivered:
+                        turn.reply = ERROR_REPLY
+            finally:
+                elapsed = time.perf_counter() - start
+                turn.timings[stage.name] = round(elapsed * 1000, 3)
+                channel_stage_duration.labels(channel=turn.channel, stage=stage.name, tenant=tenant_label).observe(elapsed)
+        return turn
+
+
+# Default stages
+
+async def normalize_stage(turn: PipelineTurn):
+    turn.text = " ".join((turn.text or "").split())
+    if not turn.text:
+        turn.halted = True
+
+
+async def nlu_stage(turn: PipelineTurn):
+    turn.nlu = await nlu_service.resolve(turn.text, {"tenant_id": turn.tenant_id, "channel": turn.channel})
+    turn.language = turn.nlu.get("language", "bn")
+
+
+async def dm_stage(turn: PipelineTurn):
+    # Slots carry over between turns
+    state = await dialogue_state_store.load(turn.tenant_id, turn.channel, turn.customer_id)
+    turn.dm = await dialogue_manager.decide_async(
+        intent=turn.nlu["intent"],
+        entities=turn.nlu["entities"],
+        context={
+            "channel": turn.channel,
+            "customer_id": turn.customer_id,
+            "message": turn.text,
+            "language": turn.language,
+            "tenant_id": turn.tenant_id,
+            **turn.context
+        },
+        state=state
+    )
+    turn.reply = turn.dm["response_text"]
+    state.add_turn("user", turn.text, turn.nlu["intent"])
+    state.add_turn("bot", turn.reply)
+    await dialogue_state_store.save(turn.tenant_id, turn.channel, turn.customer_id, state)
+
+
+def send_stage(send: Callable[[PipelineTurn], Awaitable[Any]]) -> Stage:
+    """Stage delivering turn.reply (the error reply too) through the channel's `send`"""
+    async def run_send(turn: PipelineTurn):
+        if turn.reply is None:
+            return
+        turn.sent = await send(turn)
+        turn.delivered = True
+        messages_sent.labels(channel=turn.channel).inc()
+    return Stage("send", run_send, always=True)
+
+
+def _persist_turn(turn: PipelineTurn):
+    from app.db.base import get_db
+    from app.db.models import Conversation, Turn, ConversationStatus, TurnSpeaker
+
+    db = next(get_db())
+    try:
+        # Find or create conversation
+        conversation = db.query(Conversation).filter(
+            Conversation.customer_id == turn.customer_id,
+            Conversation.channel == turn.channel,
+            Conversation.status == ConversationStatus.active
+        ).first()
+
+        if not conversation:
+            conversation = Conversation(
+                tenant_id=turn.tenant_id,
+                conversation_id=str(uuid.uuid4())[:8],
+                channel=turn.channel,
+                customer_id=turn.customer_id,
+                customer_language=turn.language,
+                status=ConversationStatus.active
+            )
+            db.add(conversation)
+            db.flush()
+
+        turn_index = len(conversation.turns) if conversation.turns else 0
+        user_turn = Turn(
+            tenant_id=conversation.tenant_id,
+            conversation_id=conversation.id,
+            turn_index=turn_index,
+            speaker=TurnSpeaker.user,
+            text=turn.text,
+            text_language=turn.language,
+            intent=turn.nlu["intent"],
+            entities=turn.nlu["entities"],
+            nlu_confidence=turn.nlu["confidence"]
+        )
+        bot_turn = Turn(
+            tenant_id=conversation.tenant_id,
+            conversation_id=conversation.id,
+            turn_index=turn_index + 1,
+            speaker=TurnSpeaker.bot,
+            text=turn.reply,
+            text_language=turn.language,
+            intent=turn.nlu["intent"],
+            entities=turn.nlu["entities"],
+            turn_data={
+                "action": turn.dm["action"],
+                "metadata": turn.dm.get("metadata", {}),
+                "timings_ms": dict(turn.timings)
+            }
+        )
+        db.add_all([user_turn, bot_turn])
+
+        conversation.last_message_at = user_turn.timestamp
+        conversation.unread_count = (conversation.unread_count or 0) + 1
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def persist_stage(turn: PipelineTurn):
+    # Runs after send so the customer is not kept waiting on the write
+    await asyncio.to_thread(_persist_turn, turn)
+
+
+def default_pipeline(send: Callable[[PipelineTurn], Awaitable[Any]]) -> MessagePipeline:
+    return MessagePipeline([
+        Stage("normalize", normalize_stage),
+        Stage("nlu", nlu_stage),
+        Stage("dm", dm_stage),
+        send_stage(send),
+        Stage("persist", persist_stage),
+    ])
@@ -4,8 +4,7 @@ Supports SIP/VoIP connections for voice calls with AI agent
 """
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import Response, StreamingResponse
-from app.services.nlu_service import nlu_service
-from app.services.dialogue_manager import dialogue_manager
+from app.channels.pipeline import PipelineTurn, Stage, default_pipeline
 from app.services.tts_service import tts_service
 from app.services.asr_service import asr_service
 import json
@@ -16,6 +15,23 @@ from typing import Optional
 router = APIRouter()
 
 
+async def _transcribe(turn: PipelineTurn):
+    # Transcribe speech to Bangla text
+    audio_array = turn.context.pop("audio")
+    asr_result = asr_service.transcribe(audio_array, language="bn")
+    turn.text = asr_result.get("text", "").strip()
+
+
+async def _synthesize_reply(turn: PipelineTurn):
+    # Generate TTS response
+    return await tts_service.synthesize_async(turn.reply, language="bn-BD")
+
+
+pipeline = default_pipeline(send=_synthesize_reply).without("persist").with_stage(
+    Stage("asr", _transcribe), before="normalize"
+)
+
+
 @router.post("/asterisk/inbound")
 async def asterisk_inbound_call(request: Request) -> Response:
     """
@@ -76,11 +92,11 @@ async def asterisk_audio_processing(request: Request) -> Response:
         # This is a simplified conversion - in production, proper audio format handling needed
         audio_array = np.frombuffer(audio_bytes, dtype=np.float32)
 
-        # Transcribe speech to Bangla text
-        asr_result = asr_service.transcribe(audio_array, language="bn")
-        user_text = asr_result.get("text", "").strip()
+        # ASR -> NLU -> DM -> TTS; the call is the conversation
+        turn = PipelineTurn(channel="voip", customer_id=call_id or "asterisk", text="", context={"audio": audio_array})
+        turn = await pipeline.run(turn)
 
-        if not user_text:
+        if turn.halted:
             response = {
                 "action": "speak",
                 "text": "দুঃখিত, আপনার কথা বুঝতে পারলাম না। অনুগ্রহ করে আবার বলুন।",
@@ -89,14 +105,8 @@ async def asterisk_audio_processing(request: Request) -> Response:
             }
             return Response(content=json.dumps(response), media_type="application/json")
 
-        # Process through NLU and Dialogue Manager
-        nlu_res = await nlu_service.resolve(user_text)
-        dm_res = dialogue_manager.decide(nlu_res["intent"], nlu_res["entities"], {"channel": "voice"})
-
-        reply_text = dm_res["response_text_bn"]
-
-        # Generate TTS response
-        tts_result = tts_service.synthesize(reply_text, language="bn-BD")
+        reply_text = turn.reply
+        tts_result = turn.sent or {}
 
         if tts_result.get("audio_content"):
             # Return audio response
@@ -179,7 +189,7 @@ async def generate_tts_audio(text: str, voice: Optional[str] = None) -> Streamin
     Generate TTS audio for Bangla text (for direct VoIP integration)
     """
     try:
-        tts_result = tts_service.synthesize(text, language="bn-BD", voice=voice)
+        tts_result = await tts_service.synthesize_async(text, language="bn-BD", voice=voice)
         if tts_result.get("audio_content"):
             audio_data = io.BytesIO(tts_result["audio_content"])
             return StreamingResponse(audio_data, media_type="audio/mpeg")
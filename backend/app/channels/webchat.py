@@ -7,45 +7,60 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import json
 import uuid
 
-from app.services.nlu_service import nlu_service
-from app.services.dialogue_manager import dialogue_manager, DialogueState
+from app.channels.pipeline import PipelineTurn, default_pipeline
+from app.core.tenant import TenantContext
+from app.services.dialogue_state_store import dialogue_state_store
 
 router = APIRouter()
 
 
 class ConnectionManager:
+    """
+    Open WebSocket connections. Dialogue state lives in the shared state store,
+    keyed by the server-issued session id: the socket is unauthenticated, so a
+    customer_id sent by the client cannot be trusted to pick whose state is used.
+    """
+
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
-        self.sessions: Dict[str, DialogueState] = {}
     
     async def connect(self, websocket: WebSocket) -> str:
         """Accept new WebSocket connection"""
         await websocket.accept()
         session_id = str(uuid.uuid4())
         self.active_connections[session_id] = websocket
-        self.sessions[session_id] = DialogueState()
         return session_id
     
-    def disconnect(self, session_id: str):
-        """Remove connection"""
+    async def disconnect(self, session_id: str):
+        """Remove connection and the session's state"""
         if session_id in self.active_connections:
             del self.active_connections[session_id]
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        await dialogue_state_store.delete(TenantContext.get_tenant_id(), "webchat", session_id)
     
     async def send_message(self, session_id: str, message: Dict[str, Any]):
         """Send message to specific session"""
         if session_id in self.active_connections:
             await self.active_connections[session_id].send_text(json.dumps(message))
-    
-    def get_session(self, session_id: str) -> DialogueState:
-        """Get dialogue state for session"""
-        return self.sessions.get(session_id, DialogueState())
 
 
 manager = ConnectionManager()
 
 
+async def _send_reply(turn: PipelineTurn):
+    """Send bot response"""
+    await manager.send_message(turn.context["session_id"], {
+        "type": "bot",
+        "text": turn.reply,
+        "intent": turn.nlu.get("intent"),
+        "confidence": turn.nlu.get("confidence"),
+        "action": turn.dm.get("action"),
+        "timestamp": turn.context.get("timestamp")
+    })
+
+
+pipeline = default_pipeline(send=_send_reply).without("persist")
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for web chat"""
@@ -74,33 +89,18 @@ async def websocket_endpoint(websocket: WebSocket):
                     "timestamp": message_data.get("timestamp")
                 })
                 
-                # Process through NLU
-                nlu_result = nlu_service.resolve(text)
-                
-                # Get dialogue state
-                state = manager.get_session(session_id)
-                
-                # Process through DM
-                dm_result = dialogue_manager.decide(
-                    intent=nlu_result["intent"],
-                    entities=nlu_result["entities"],
-                    context={"channel": "webchat", "session_id": session_id},
-                    state=state
+                # NLU, DM and the bot response; webchat keeps no Conversation rows
+                turn = PipelineTurn(
+                    channel="webchat",
+                    customer_id=session_id,
+                    text=text,
+                    context={"session_id": session_id, "timestamp": message_data.get("timestamp")}
                 )
-                
-                # Send bot response
-                await manager.send_message(session_id, {
-                    "type": "bot",
-                    "text": dm_result["response_text_bn"],
-                    "intent": nlu_result["intent"],
-                    "confidence": nlu_result["confidence"],
-                    "action": dm_result["action"],
-                    "timestamp": message_data.get("timestamp")
-                })
+                await pipeline.run(turn)
                 
     except WebSocketDisconnect:
-        manager.disconnect(session_id)
+        await manager.disconnect(session_id)
     except Exception as e:
         print(f"WebSocket error: {e}")
-        manager.disconnect(session_id)
+        await manager.disconnect(session_id)
 
@@ -7,8 +7,7 @@ from fastapi import APIRouter, Request, HTTPException
 import hmac
 import hashlib
 
-from app.services.nlu_service import nlu_service
-from app.services.dialogue_manager import dialogue_manager
+from app.channels.pipeline import PipelineTurn, default_pipeline
 from app.core.config import settings
 
 router = APIRouter()
@@ -26,6 +25,7 @@ class WhatsAppAdapter:
         self.access_token = access_token
         self.verify_token = verify_token
         self.base_url = f"https://graph.facebook.com/v18.0/{phone_number_id}/messages"
+        self.pipeline = default_pipeline(send=self._send_reply)
     
     def verify_webhook(self, mode: str, token: str, challenge: str) -> Optional[str]:
         """Verify webhook subscription"""
@@ -75,97 +75,18 @@ class WhatsAppAdapter:
             response = await client.post(self.base_url, json=payload, headers=headers)
             return response.json()
     
-    async def process_message(self, message_data: Dict[str, Any]) -> str:
-        """Process incoming message through NLU and DM"""
-        from app.db.base import get_db
-        from app.db.models import Conversation, Turn, ConversationStatus, TurnSpeaker
-        from sqlalchemy.orm import Session
-        import uuid
-
-        text = message_data.get("text", "")
-        customer_id = message_data.get("from", "unknown")
-
-        # NLU resolution with language detection
-        nlu_result = await nlu_service.resolve(text)
-        detected_language = nlu_result.get("language", "bn")
-
-        # Get database session
-        db = next(get_db())
+    async def process_message(self, message_data: Dict[str, Any]) -> PipelineTurn:
+        """Run an incoming message through the pipeline: NLU, DM, reply, conversation turns"""
+        turn = PipelineTurn(
+            channel="whatsapp",
+            customer_id=message_data.get("from", "unknown"),
+            text=message_data.get("text", ""),
+            context={"from": message_data.get("from")}
+        )
+        return await self.pipeline.run(turn)
 
-        try:
-            # Find or create conversation
-            conversation = db.query(Conversation).filter(
-                Conversation.customer_id == customer_id,
-                Conversation.channel == "whatsapp",
-                Conversation.status == ConversationStatus.active
-            ).first()
-
-            if not conversation:
-                conversation_id = str(uuid.uuid4())[:8]
-                conversation = Conversation(
-                    conversation_id=conversation_id,
-                    channel="whatsapp",
-                    customer_id=customer_id,
-                    customer_language=detected_language,
-                    status=ConversationStatus.active
-                )
-                db.add(conversation)
-                db.commit()
-                db.refresh(conversation)
-
-            # Create user turn
-            turn_index = len(conversation.turns) if conversation.turns else 0
-            user_turn = Turn(
-                conversation_id=conversation.id,
-                turn_index=turn_index,
-                speaker=TurnSpeaker.user,
-                text=text,
-                text_language=detected_language,
-                intent=nlu_result["intent"],
-                entities=nlu_result["entities"],
-                nlu_confidence=nlu_result["confidence"]
-            )
-            db.add(user_turn)
-
-            # Dialogue decision with enhanced context
-            dm_result = dialogue_manager.decide(
-                intent=nlu_result["intent"],
-                entities=nlu_result["entities"],
-                context={
-                    "channel": "whatsapp",
-                    "customer_id": customer_id,
-                    "message": text,
-                    "language": detected_language,
-                    "from": message_data.get("from")
-                }
-            )
-
-            # Create bot turn
-            bot_turn = Turn(
-                conversation_id=conversation.id,
-                turn_index=turn_index + 1,
-                speaker=TurnSpeaker.bot,
-                text=dm_result["response_text"],
-                text_language=detected_language,
-                intent=nlu_result["intent"],
-                entities=nlu_result["entities"],
-                turn_data={"action": dm_result["action"], "metadata": dm_result["metadata"]}
-            )
-            db.add(bot_turn)
-
-            # Update conversation
-            conversation.last_message_at = user_turn.timestamp
-            conversation.unread_count += 1
-            db.commit()
-
-            return dm_result["response_text"]
-
-        except Exception as e:
-            print(f"Error processing WhatsApp message: {e}")
-            db.rollback()
-            return "দুঃখিত, একটি ত্রুটি হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।"
-        finally:
-            db.close()
+    async def _send_reply(self, turn: PipelineTurn) -> Dict[str, Any]:
+        return await self.send_message(turn.customer_id, turn.reply)
 
 
 # Webhook endpoints
@@ -200,8 +121,7 @@ async def whatsapp_webhook_receive(request: Request):
         message_data = adapter.parse_message(payload)
 
         if message_data:
-            response_text = await adapter.process_message(message_data)
-            await adapter.send_message(message_data["from"], response_text)
+            await adapter.process_message(message_data)
     else:
         print("WhatsApp not configured - skipping message processing")
 
@@ -1,6 +1,7 @@
 from pydantic import Field
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
+from functools import cached_property
 import json
 
 
@@ -31,8 +32,93 @@ class Settings(BaseSettings):
 
     # External API keys
     openai_api_key: str = Field(default="", description="OpenAI API key for GPT models and TTS")
-    openai_model: str = Field(default="gpt-4", description="OpenAI model to use")
+    openai_model: str = Field(default="gpt-4o", description="OpenAI model to use (combined NLU mode needs one with JSON-schema structured outputs)")
     openai_max_tokens: int = Field(default=1000, description="Max tokens for OpenAI responses")
+    openai_base_url: str = Field(default="", description="Override the OpenAI API base URL (e.g. a local stub or proxy)")
+
+    # Shared async LLM client (connection pool, concurrency, retries, circuit breaker)
+    llm_max_connections: int = Field(default=200, description="Max pooled HTTP connections to the LLM API")
+    llm_max_keepalive_connections: int = Field(default=50, description="Max idle keep-alive connections")
+    llm_max_concurrency: int = Field(default=256, description="Max LLM calls in flight per worker")
+    llm_timeout_seconds: float = Field(default=30.0, description="Per-call LLM timeout")
+    llm_connect_timeout_seconds: float = Field(default=5.0, description="LLM connect timeout")
+    llm_max_retries: int = Field(default=2, description="Retries for timeouts, connection errors, 429s and 5xx")
+    llm_retry_base_delay_seconds: float = Field(default=0.25, description="Base delay for jittered exponential backoff")
+    llm_circuit_failure_threshold: int = Field(default=5, description="Consecutive failures that open the circuit breaker")
+    llm_circuit_reset_seconds: float = Field(default=30.0, description="Seconds before a half-open trial call")
+
+    # NLU backend (per-tenant override via Client.ai_model_config["nlu_backend"])
+    nlu_backend: str = Field(default="openai", description="Default NLU backend: openai, local, cascade")
+    local_intent_min_similarity: float = Field(default=0.15, description="Minimum centroid similarity for the local intent classifier")
+    nlu_cascade_default_threshold: float = Field(default=0.7, description="Local confidence needed to skip the LLM in cascade mode")
+    nlu_llm_mode: str = Field(default="combined", description="LLM NLU calls: combined (one structured call) or two_call")
+    nlu_cascade_thresholds: str = Field(default='{}', description="JSON map of per-intent cascade thresholds")
+
+    # Local NLU model training: pending TrainingJob(job_type="nlu") rows are trained in a process pool
+    training_runner_enabled: bool = Field(default=True, description="Claim and run pending NLU training jobs in this worker")
+    training_poll_seconds: float = Field(default=5.0, description="How often pending jobs and newly published models are checked")
+    training_max_workers: int = Field(default=1, description="Training processes per worker")
+    training_job_timeout_seconds: float = Field(default=3600.0, description="Running NLU jobs started longer ago than this are failed (their worker died mid-fit)")
+    model_artifact_dir: str = Field(default="models/nlu", description="Directory for trained NLU model artifacts (shared by all workers)")
+
+    # Few-shot selection: only retrieved candidate intents and similar examples go into LLM prompts
+    nlu_few_shot_enabled: bool = Field(default=True, description="Shortlist intents and examples in LLM prompts")
+    nlu_few_shot_examples: int = Field(default=6, description="Labelled examples included per prompt")
+    nlu_few_shot_candidates: int = Field(default=5, description="Candidate intents included per prompt (plus fallback)")
+
+    # Entities: "rules" (deterministic extractor; no separate LLM extraction call) or "llm"
+    nlu_entity_mode: str = Field(default="rules", description="Entity extraction: rules or llm")
+    entity_version_check_seconds: int = Field(default=30, description="How often a worker re-checks a tenant's Entity version")
+    template_version_check_seconds: int = Field(default=30, description="How often a worker re-checks a tenant's Template rows for reply localization")
+
+    # Banglish -> Bangla script canonical form for cache keys, keyword/local matching and product lookup
+    nlu_transliteration_enabled: bool = Field(default=True, description="Transliterate romanized Bangla before NLU")
+
+    # Micro-batching of concurrent LLM NLU calls
+    nlu_batching_enabled: bool = Field(default=False, description="Batch concurrent LLM NLU requests into one call")
+    nlu_batch_max_size: int = Field(default=16, description="Max messages per batched call")
+    nlu_batch_max_wait_ms: float = Field(default=10.0, description="Max time to wait for a batch to fill")
+
+    # Language detection: optional naive Bayes (English vs Banglish) trained from stored Turn.text
+    language_nb_enabled: bool = Field(default=False, description="Refine Latin-script language detection with a model trained on stored turns")
+    language_nb_max_turns: int = Field(default=20000, description="Most recent user turns used to train the Banglish model")
+
+    # NLU result cache (in-process LRU, optional Redis tier on redis_url)
+    nlu_cache_enabled: bool = Field(default=True, description="Cache resolve() results on normalized text")
+    nlu_cache_ttl_seconds: int = Field(default=3600, description="NLU cache entry lifetime")
+    nlu_cache_max_entries: int = Field(default=10000, description="Max entries in the in-process LRU tier")
+    nlu_cache_redis_enabled: bool = Field(default=False, description="Share NLU cache entries across workers via Redis")
+
+    # Dialogue state per (tenant, channel, customer): in-process LRU plus optional Redis tier on redis_url
+    dialogue_state_ttl_seconds: int = Field(default=1800, description="Idle time after which a conversation's state is dropped")
+    dialogue_slot_ttl_seconds: int = Field(default=900, description="Lifetime of a filled slot (0 = until the state expires)")
+    dialogue_history_max_turns: int = Field(default=10, description="Turns kept in DialogueState.history")
+    dialogue_state_max_entries: int = Field(default=50000, description="Max states in the in-process tier")
+    dialogue_state_redis_enabled: bool = Field(default=False, description="Share dialogue state across workers and nodes via Redis")
+    dialogue_lookup_workers: int = Field(default=8, description="Threads running product lookups for the async dialogue path")
+
+    # Reply cache: rendered stateless replies keyed by SimHash of the message, per tenant, intent and language
+    reply_cache_enabled: bool = Field(default=True, description="Reuse replies for near-duplicate messages")
+    reply_cache_ttl_seconds: int = Field(default=120, description="Reply cache entry lifetime")
+    reply_cache_max_entries: int = Field(default=20000, description="Max cached replies per worker")
+    reply_cache_max_distance: int = Field(default=3, description="Max SimHash Hamming distance for a near-duplicate")
+
+    # Product search: per-tenant in-memory token/trigram index instead of ILIKE scans and full-catalog fuzzy matching
+    product_search_index_enabled: bool = Field(default=True, description="Answer product lookups from the in-memory search index")
+    product_index_check_seconds: int = Field(default=30, description="How often a worker re-checks a tenant's catalog version")
+    # Database full-text search (FTS5 on SQLite, pg_trgm + tsvector on PostgreSQL) for ILIKE product filters
+    product_fulltext_backend: str = Field(default="auto", description="auto (follow database_url) or off (plain ILIKE)")
+    # Read-only catalog snapshots product inquiries answer from (LRU over tenants, and over product records per tenant)
+    catalog_snapshot_max_tenants: int = Field(default=256, description="Tenants whose catalog snapshot is kept per worker")
+    catalog_snapshot_max_products: int = Field(default=5000, description="Product records kept per tenant snapshot")
+    # Product reply cards (price/availability/info answers) rendered from "product_card.*" templates
+    reply_card_max_cards: int = Field(default=20000, description="Rendered reply cards kept per tenant")
+    # Co-purchase recommendations: per-tenant item-item matrix from OrderItem history (built by scripts/build_copurchase.py)
+    copurchase_enabled: bool = Field(default=True, description="Personalize recommendations from co-purchase history")
+    copurchase_artifact_dir: str = Field(default="models/copurchase", description="Directory for co-purchase matrix artifacts (shared by all workers)")
+    copurchase_check_seconds: int = Field(default=30, description="How often a worker checks a tenant's orders for new purchases")
+    copurchase_recent_items: int = Field(default=10, description="Recent purchases kept per customer as recommendation seeds")
+    copurchase_compact_after: int = Field(default=20000, description="Pairs from new orders held in per-row counters before merging into the matrix")
 
     # Social Media API Keys
     facebook_app_id: str = Field(default="", description="Facebook App ID")
@@ -59,6 +145,13 @@ class Settings(BaseSettings):
         except:
             return ["http://localhost:5173"]
 
+    @cached_property
+    def nlu_cascade_thresholds_map(self) -> Dict[str, float]:
+        try:
+            return {k: float(v) for k, v in json.loads(self.nlu_cascade_thresholds).items()}
+        except:
+            return {}
+
     class Config:
         env_prefix = "BANG_"
         env_file = ".env"
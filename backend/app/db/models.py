@@ -485,7 +485,7 @@ class OrderItem(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     tenant_id = Column(String(36), nullable=False, index=True)  # Multi-tenant support
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
 
     # Item details
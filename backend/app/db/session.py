@@ -1,7 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
-from typing import Generator
+from typing import Generator, Optional
 
 from app.core.config import settings
 from app.core.tenant import TenantContext
@@ -20,18 +20,20 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 class TenantSession(Session):
     """Session that automatically filters by tenant_id"""
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, tenant_id: Optional[str] = None, **kwargs):
         super().__init__(*args, **kwargs)
+        # Pinned tenant; None follows TenantContext at query time
+        self.tenant_id = tenant_id
 
     def query(self, *entities, **kwargs):
         """Override query to automatically filter by tenant_id for tenant-aware models"""
         query = super().query(*entities, **kwargs)
 
         # If we have a tenant context, filter by tenant_id
-        tenant_id = TenantContext.get_tenant_id()
+        tenant_id = self.tenant_id or TenantContext.get_tenant_id()
         if tenant_id and entities:
-            # Check if the first entity has a tenant_id column
-            first_entity = entities[0]
+            # Check if the first entity has a tenant_id column (for query(Product.id, ...), the column's model)
+            first_entity = getattr(entities[0], 'class_', entities[0])
             if hasattr(first_entity, 'tenant_id'):
                 query = query.filter(first_entity.tenant_id == tenant_id)
 
@@ -61,6 +63,20 @@ def get_db_context():
         db.close()
 
 
+@contextmanager
+def get_read_db_context(tenant_id: Optional[str] = None):
+    """
+    Short-lived read session pinned to tenant_id (default: the current
+    TenantContext), for work that may run on another thread or outlive the
+    request that set TenantContext. Never commits.
+    """
+    db = TenantSession(bind=engine, tenant_id=tenant_id or TenantContext.get_tenant_id())
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def get_admin_db() -> Generator[Session, None, None]:
     """Admin database session that bypasses tenant filtering"""
     db = SessionLocal()
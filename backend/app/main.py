@@ -15,6 +15,10 @@ from app.channels import whatsapp, webchat
 from app.channels import meta as meta_channel
 from app.channels import voice_twilio, voice_voip
 from app.routers import metrics as metrics_router
+from app.services.llm_client import llm_client
+from app.services.nlu_cache import nlu_cache
+from app.services.dialogue_state_store import dialogue_state_store
+from app.services.training_runner import training_runner
 
 
 @asynccontextmanager
@@ -23,9 +27,14 @@ async def lifespan(app: FastAPI):
     print(f"🚀 Starting {settings.app_name} v{settings.api_version}")
     print(f"📊 Dashboard: http://localhost:5173")
     print(f"📚 API Docs: http://localhost:8000/docs")
+    training_runner.start()
     yield
     # Shutdown
     print("👋 Shutting down...")
+    await training_runner.stop()
+    await llm_client.aclose()
+    await nlu_cache.aclose()
+    await dialogue_state_store.aclose()
 
 
 def create_app() -> FastAPI:
@@ -1,5 +1,4 @@
 from typing import Dict, Any, Optional
-import re
 import base64
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, Form, File
 from pydantic import BaseModel
@@ -7,55 +6,16 @@ from sqlalchemy.orm import Session
 
 from app.core.tenant import get_current_tenant, TenantContext
 from app.db.session import get_db
-from app.db.models import Client
+from app.db.models import Client, TrainingJob
 from app.services.openai_service import openai_service
 # from app.services.asr_service import asr_service
 from app.services.tts_service import tts_service
 from app.services.dialogue_manager import dialogue_manager
+from app.services.language_detector import detect_language
 
 router = APIRouter()
 
 
-def detect_language(text: str) -> str:
-    """
-    Simple language detection based on character patterns
-    Returns: 'en' for English, 'bn' for Bengali, 'banglish' for mixed, 'other' for others
-    """
-    text = text.lower().strip()
-
-    # Bengali characters (অ-ঌ, এ-ঐ, ও-ঔ, ক-হ, া-ৈ, ড়-ঢ়, য়)
-    bengali_pattern = re.compile(r'[\u0985-\u09B9\u09BE-\u09CC\u09D7\u09DC-\u09E3\u09F0-\u09F1]')
-    bengali_chars = len(bengali_pattern.findall(text))
-
-    # English letters
-    english_pattern = re.compile(r'[a-zA-Z]')
-    english_chars = len(english_pattern.findall(text))
-
-    # Numbers and symbols
-    total_chars = len(re.findall(r'\w', text))
-
-    if total_chars == 0:
-        return 'en'  # Default to English
-
-    # Calculate ratios
-    bengali_ratio = bengali_chars / total_chars
-    english_ratio = english_chars / total_chars
-
-    # Language detection logic
-    if bengali_ratio > 0.3 and english_ratio < 0.3:
-        return 'bn'  # Mostly Bengali
-    elif english_ratio > 0.7 and bengali_ratio < 0.1:
-        return 'en'  # Mostly English
-    elif bengali_ratio > 0.1 and english_ratio > 0.1:
-        return 'banglish'  # Mixed language
-    else:
-        # Check for common Bengali words/phrases
-        bengali_words = ['আমি', 'আপনি', 'কি', 'কেমন', 'কোথায়', 'কখন', 'কত', 'কেন', 'কি', 'এবং', 'অথবা', 'না', 'হ্যাঁ', 'ধন্যবাদ']
-        if any(word in text for word in bengali_words):
-            return 'bn'
-        return 'en'  # Default to English
-
-
 def get_language_instructions(language: str) -> str:
     """Get language-specific instructions for the AI assistant"""
     if language == 'bn':
@@ -321,7 +281,7 @@ Context: {context if context != '{}' else 'General business inquiry'}"""
         audio_response_url = None
         if generate_voice_response and ai_response:
             try:
-                tts_result = tts_service.synthesize(
+                tts_result = await tts_service.synthesize_async(
                     text=ai_response,
                     language=detected_language,
                     voice=None  # Use default voice
@@ -388,19 +348,57 @@ async def train_agent(
     db: Session = Depends(get_db)
 ):
     """
-    Train the AI agent with tenant-specific data.
-    This is a placeholder for future implementation.
+    Queue a retrain of the tenant's local NLU model from its Utterance data.
+    The job runs in the background training pool; the new model is swapped in
+    without a restart. Optional training_data keys: min_similarity,
+    min_dev_accuracy, include_base_examples.
     """
     client_id = TenantContext.get_client_id()
     if not client_id:
         raise HTTPException(status_code=401, detail="Client not authenticated")
 
-    # Placeholder for training functionality
-    # In the future, this could update tenant-specific models
+    job = TrainingJob(
+        tenant_id=tenant_id,
+        job_type="nlu",
+        status="pending",
+        config=training_data
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
 
     return {
         "message": "Training initiated",
         "tenant_id": tenant_id,
+        "job_id": job.id,
         "training_data": training_data,
-        "status": "processing"
+        "status": job.status
+    }
+
+
+@router.get("/train/{job_id}")
+async def get_training_job(
+    job_id: int,
+    tenant_id: str = Depends(get_current_tenant),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the status, model version and metrics of a training job.
+    """
+    job = db.query(TrainingJob).filter(
+        TrainingJob.id == job_id,
+        TrainingJob.tenant_id == tenant_id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Training job not found")
+
+    return {
+        "job_id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "model_version": job.model_version,
+        "metrics": job.metrics,
+        "error_message": job.error_message,
+        "started_at": job.started_at,
+        "completed_at": job.completed_at
     }
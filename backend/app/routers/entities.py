@@ -1,10 +1,13 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from app.core.tenant import get_current_tenant
 from app.db.base import get_db
 from app.db.models import Entity
+from app.services.entity_extractor import tenant_entity_extractors
 
 router = APIRouter()
 
@@ -35,50 +38,69 @@ class EntityResponse(BaseModel):
         from_attributes = True
 
 
+def next_entity_version(db: Session, tenant_id: str) -> int:
+    """Every change raises the tenant's max(Entity.version), which keys its compiled extractor"""
+    return (db.query(func.max(Entity.version)).filter(Entity.tenant_id == tenant_id).scalar() or 0) + 1
+
+
 @router.get("/", response_model=List[EntityResponse])
-def list_entities(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    entities = db.query(Entity).offset(skip).limit(limit).all()
+def list_entities(
+    skip: int = 0,
+    limit: int = 100,
+    tenant_id: str = Depends(get_current_tenant),
+    db: Session = Depends(get_db)
+):
+    entities = db.query(Entity).filter(Entity.tenant_id == tenant_id).offset(skip).limit(limit).all()
     return entities
 
 
 @router.post("/", response_model=EntityResponse)
-def create_entity(entity: EntityCreate, db: Session = Depends(get_db)):
-    db_entity = Entity(**entity.dict())
+def create_entity(entity: EntityCreate, tenant_id: str = Depends(get_current_tenant), db: Session = Depends(get_db)):
+    db_entity = Entity(**entity.dict(), tenant_id=tenant_id, version=next_entity_version(db, tenant_id))
     db.add(db_entity)
     db.commit()
     db.refresh(db_entity)
+    tenant_entity_extractors.invalidate(tenant_id)
     return db_entity
 
 
 @router.get("/{entity_id}", response_model=EntityResponse)
-def get_entity(entity_id: int, db: Session = Depends(get_db)):
-    entity = db.query(Entity).filter(Entity.id == entity_id).first()
+def get_entity(entity_id: int, tenant_id: str = Depends(get_current_tenant), db: Session = Depends(get_db)):
+    entity = db.query(Entity).filter(Entity.id == entity_id, Entity.tenant_id == tenant_id).first()
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
     return entity
 
 
 @router.put("/{entity_id}", response_model=EntityResponse)
-def update_entity(entity_id: int, entity_update: EntityUpdate, db: Session = Depends(get_db)):
-    entity = db.query(Entity).filter(Entity.id == entity_id).first()
+def update_entity(
+    entity_id: int,
+    entity_update: EntityUpdate,
+    tenant_id: str = Depends(get_current_tenant),
+    db: Session = Depends(get_db)
+):
+    entity = db.query(Entity).filter(Entity.id == entity_id, Entity.tenant_id == tenant_id).first()
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
     
     for key, value in entity_update.dict(exclude_unset=True).items():
         setattr(entity, key, value)
+    entity.version = next_entity_version(db, tenant_id)
     
     db.commit()
     db.refresh(entity)
+    tenant_entity_extractors.invalidate(tenant_id)
     return entity
 
 
 @router.delete("/{entity_id}")
-def delete_entity(entity_id: int, db: Session = Depends(get_db)):
-    entity = db.query(Entity).filter(Entity.id == entity_id).first()
+def delete_entity(entity_id: int, tenant_id: str = Depends(get_current_tenant), db: Session = Depends(get_db)):
+    entity = db.query(Entity).filter(Entity.id == entity_id, Entity.tenant_id == tenant_id).first()
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
     
     db.delete(entity)
     db.commit()
+    tenant_entity_extractors.invalidate(tenant_id)
     return {"message": "Entity deleted successfully"}
 
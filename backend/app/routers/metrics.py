@@ -12,11 +12,26 @@ request_duration = Histogram('bangla_request_duration_seconds', 'Request duratio
 
 # AI metrics
 nlu_requests = Counter('bangla_nlu_requests_total', 'NLU processing requests', ['intent', 'confidence'])
+nlu_stage_results = Counter('bangla_nlu_stage_results_total', 'NLU results by backend and answering stage', ['backend', 'stage'])
+nlu_escalations = Counter('bangla_nlu_escalations_total', 'Cascade escalations from the local stage to the LLM', ['local_intent'])
+nlu_cache_requests = Counter('bangla_nlu_cache_requests_total', 'NLU result cache lookups by tier and result', ['tier', 'result'])
+nlu_batch_size = Histogram('bangla_nlu_batch_size', 'Messages per micro-batched NLU call', buckets=(1, 2, 4, 8, 16, 32, 64))
+nlu_batch_fallbacks = Counter('bangla_nlu_batch_fallbacks_total', 'Batched NLU items re-resolved individually')
+nlu_training_jobs = Counter('bangla_nlu_training_jobs_total', 'NLU training jobs by final status', ['status'])
+nlu_training_duration = Histogram('bangla_nlu_training_duration_seconds', 'NLU model training time per job')
+nlu_model_swaps = Counter('bangla_nlu_model_swaps_total', 'Local NLU models hot-swapped in this worker')
+llm_tokens = Counter('bangla_llm_tokens_total', 'LLM tokens used by kind', ['kind'])
+reply_cache_requests = Counter('bangla_reply_cache_requests_total', 'Near-duplicate reply cache lookups by result', ['result'])
+dialogue_state_requests = Counter('bangla_dialogue_state_requests_total', 'Dialogue state loads by tier and result', ['tier', 'result'])
 dm_decisions = Counter('bangla_dm_decisions_total', 'Dialogue manager decisions', ['intent', 'action'])
 
 # Channel metrics
 messages_received = Counter('bangla_messages_received_total', 'Messages received by channel', ['channel'])
 messages_sent = Counter('bangla_messages_sent_total', 'Messages sent by channel', ['channel'])
+channel_stage_duration = Histogram(
+    'bangla_channel_stage_duration_seconds', 'Message pipeline stage duration', ['channel', 'stage', 'tenant'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
 
 # System health metrics
 db_connections = Gauge('bangla_db_connections_active', 'Active database connections')
@@ -21,6 +21,8 @@ class NLUResolveResponse(BaseModel):
     confidence: float
     language: str
     model_used: Optional[str] = None
+    stage: Optional[str] = None
+    cached: bool = False
 
 
 class ChatRequest(BaseModel):
@@ -48,7 +50,9 @@ async def resolve(req: NLUResolveRequest) -> NLUResolveResponse:
         entities=result["entities"],
         confidence=result["confidence"],
         language=result.get("language", "unknown"),
-        model_used=result.get("model_used")
+        model_used=result.get("model_used"),
+        stage=result.get("stage"),
+        cached=result.get("cached", False)
     )
 
 
@@ -8,6 +8,7 @@ import uuid
 
 from app.db.base import get_db
 from app.db.models import Order, OrderItem, Customer, Product, Transaction, OrderStatus, PaymentStatus
+from app.services.copurchase import copurchase_models
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
@@ -132,6 +133,7 @@ def create_order(order_data: OrderCreate, db: Session = Depends(get_db)):
 
     # Create order
     db_order = Order(
+        tenant_id=customer.tenant_id,
         order_number=order_number,
         customer_id=order_data.customer_id,
         conversation_id=order_data.conversation_id,
@@ -157,6 +159,7 @@ def create_order(order_data: OrderCreate, db: Session = Depends(get_db)):
         total_price = unit_price * item.quantity
 
         db_item = OrderItem(
+            tenant_id=customer.tenant_id,
             order_id=db_order.id,
             product_id=item.product_id,
             product_name=product.name,
@@ -171,6 +174,9 @@ def create_order(order_data: OrderCreate, db: Session = Depends(get_db)):
 
     db.commit()
     db.refresh(db_order)
+    copurchase_models.record_order(
+        db_order.tenant_id, db_order.id, customer.id, customer.customer_id, [item.product_id for item in order_data.items]
+    )
 
     # Load items for response
     db_order = db.query(Order).options(
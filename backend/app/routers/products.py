@@ -1,13 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import List, Optional
+from sqlalchemy import and_
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
 
 from app.db.base import get_db
 from app.db.models import Product, OrderItem
 from app.core.config import settings
+from app.core.tenant import TenantContext
+from app.services.catalog_facets import catalog_facets
+from app.services.catalog_snapshot import catalog_snapshots
+from app.services.copurchase import copurchase_models
+from app.services.product_fulltext import product_fulltext
+from app.services.product_search_index import product_search_indexes
+from app.services.reply_cache import reply_cache
 
 router = APIRouter(prefix="/products", tags=["products"])
 
@@ -64,6 +71,13 @@ class ProductResponse(ProductBase):
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 
+class ProductFacetsResponse(BaseModel):
+    categories: Dict[str, int]
+    brands: Dict[str, int]
+    featured_count: int
+    low_stock_count: int
+
+
 @router.post("/", response_model=ProductResponse)
 def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     """Create a new product"""
@@ -76,6 +90,10 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    product_search_indexes.upsert(db_product)
+    catalog_facets.upsert(db_product)
+    catalog_snapshots.invalidate(db_product.tenant_id)
+    reply_cache.invalidate_tenant(db_product.tenant_id)
     return db_product
 
 
@@ -97,16 +115,7 @@ def list_products(
 
     # Apply filters
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Product.name.ilike(search_term),
-                Product.description.ilike(search_term),
-                Product.sku.ilike(search_term),
-                Product.category.ilike(search_term),
-                Product.brand.ilike(search_term)
-            )
-        )
+        query = query.filter(product_fulltext.search_filter(search))
 
     if category:
         query = query.filter(Product.category == category)
@@ -133,6 +142,63 @@ def list_products(
     return products
 
 
+# Facet routes come before /{product_id}, which would otherwise match them
+@router.get("/facets", response_model=ProductFacetsResponse)
+def get_product_facets():
+    """Active product counts per category and brand, and the featured and low-stock set sizes"""
+    facets = catalog_facets.get(TenantContext.get_tenant_id())
+    return ProductFacetsResponse(
+        categories=facets.counts("category"),
+        brands=facets.counts("brand"),
+        featured_count=len(facets.featured_ids()),
+        low_stock_count=len(facets.low_stock())
+    )
+
+
+@router.get("/inventory/low-stock", response_model=List[ProductResponse])
+def get_low_stock_products():
+    """Get products with low stock (below minimum stock level)"""
+    return catalog_facets.get(TenantContext.get_tenant_id()).low_stock()
+
+
+@router.get("/categories", response_model=List[str])
+def get_product_categories():
+    """Get all unique product categories"""
+    return catalog_facets.get(TenantContext.get_tenant_id()).values("category", active_only=False)
+
+
+@router.get("/brands", response_model=List[str])
+def get_product_brands():
+    """Get all unique product brands"""
+    return catalog_facets.get(TenantContext.get_tenant_id()).values("brand", active_only=False)
+
+
+@router.get("/recommendations", response_model=List[ProductResponse])
+def get_product_recommendations(
+    customer_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """
+    "Customers also bought": active products most often ordered together with
+    product_id and/or the customer's recent purchases (which are left out)
+    """
+    if customer_id is None and product_id is None:
+        raise HTTPException(status_code=400, detail="customer_id or product_id is required")
+
+    model = copurchase_models.get(TenantContext.get_tenant_id())
+    seeds = [(product_id, 1.0)] if product_id is not None else []
+    # Extra candidates make up for products that have since been deactivated
+    product_ids = model.recommend(seeds + model.customer_seeds(customer_id), limit * 2)
+
+    products = {
+        product.id: product
+        for product in db.query(Product).filter(and_(Product.id.in_(product_ids), Product.is_active == True)).all()
+    }
+    return [products[pid] for pid in product_ids if pid in products][:limit]
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
 def get_product(product_id: int, db: Session = Depends(get_db)):
     """Get a specific product by ID"""
@@ -164,6 +230,10 @@ def update_product(product_id: int, product_update: ProductUpdate, db: Session =
     product.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(product)
+    product_search_indexes.upsert(product)
+    catalog_facets.upsert(product)
+    catalog_snapshots.invalidate(product.tenant_id)
+    reply_cache.invalidate_tenant(product.tenant_id)
     return product
 
 
@@ -182,36 +252,11 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
             detail=f"Cannot delete product that has {order_count} order(s). Deactivate it instead."
         )
 
+    tenant_id = product.tenant_id
     db.delete(product)
     db.commit()
+    product_search_indexes.remove(tenant_id, product_id)
+    catalog_facets.remove(tenant_id, product_id)
+    catalog_snapshots.invalidate(tenant_id)
+    reply_cache.invalidate_tenant(tenant_id)
     return {"message": "Product deleted successfully"}
-
-
-@router.get("/inventory/low-stock", response_model=List[ProductResponse])
-def get_low_stock_products(db: Session = Depends(get_db)):
-    """Get products with low stock (below minimum stock level)"""
-    products = db.query(Product).filter(
-        and_(
-            Product.is_active == True,
-            Product.stock_quantity <= Product.min_stock_level
-        )
-    ).all()
-    return products
-
-
-@router.get("/categories", response_model=List[str])
-def get_product_categories(db: Session = Depends(get_db)):
-    """Get all unique product categories"""
-    result = db.query(Product.category).filter(
-        and_(Product.category.isnot(None), Product.category != "")
-    ).distinct().all()
-    return [category[0] for category in result]
-
-
-@router.get("/brands", response_model=List[str])
-def get_product_brands(db: Session = Depends(get_db)):
-    """Get all unique product brands"""
-    result = db.query(Product.brand).filter(
-        and_(Product.brand.isnot(None), Product.brand != "")
-    ).distinct().all()
-    return [brand[0] for brand in result]
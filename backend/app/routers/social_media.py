@@ -22,6 +22,7 @@ from app.db.session import get_db
 from app.db.models import Client, SocialMediaAccount, SocialMediaPost, SocialMediaAnalytics
 from app.services.nlu_service import nlu_service
 from app.services.dialogue_manager import dialogue_manager
+from app.services.language_detector import detect_language
 
 
 router = APIRouter()
@@ -277,13 +278,13 @@ async def process_voice_social_media_command(
     try:
         # Detect language if not provided
         if not command_data.language:
-            command_data.language = detect_voice_language(command_data.command_text)
+            command_data.language = detect_language(command_data.command_text, default="bn")
 
         # NLU processing for voice command
         nlu_result = await nlu_service.resolve(command_data.command_text)
 
         # Enhanced dialogue manager with social media context
-        dm_result = dialogue_manager.decide(
+        dm_result = await dialogue_manager.decide_async(
             intent=nlu_result["intent"],
             entities=nlu_result["entities"],
             context={
@@ -411,34 +412,6 @@ async def post_to_instagram(account: SocialMediaAccount, post: SocialMediaPost):
         response.raise_for_status()
 
 
-def detect_voice_language(text: str) -> str:
-    """
-    Enhanced language detection for voice commands
-    """
-    # Bengali characters
-    bengali_chars = sum(1 for char in text if '\u0980' <= char <= '\u09FF')
-
-    # Arabic characters (for Urdu/Hindi)
-    arabic_chars = sum(1 for char in text if '\u0600' <= char <= '\u06FF')
-
-    # Devanagari characters (for Hindi)
-    devanagari_chars = sum(1 for char in text if '\u0900' <= char <= '\u097F')
-
-    total_chars = len(text.replace(' ', ''))
-
-    if total_chars == 0:
-        return "bn"
-
-    if bengali_chars / total_chars > 0.3:
-        return "bn"
-    elif arabic_chars / total_chars > 0.3:
-        return "ur"
-    elif devanagari_chars / total_chars > 0.3:
-        return "hi"
-    else:
-        return "en"
-
-
 async def execute_social_media_command(
     command_text: str,
     nlu_result: Dict[str, Any],
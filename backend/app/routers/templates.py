@@ -5,6 +5,9 @@ from sqlalchemy.orm import Session
 
 from app.db.base import get_db
 from app.db.models import Template
+from app.services.reply_cache import reply_cache
+from app.services.reply_cards import tenant_reply_cards
+from app.services.response_localizer import tenant_response_localizers
 
 router = APIRouter()
 
@@ -50,6 +53,9 @@ def create_template(template: TemplateCreate, db: Session = Depends(get_db)):
     db.add(db_template)
     db.commit()
     db.refresh(db_template)
+    reply_cache.invalidate_tenant(db_template.tenant_id)
+    tenant_response_localizers.invalidate(db_template.tenant_id)
+    tenant_reply_cards.invalidate(db_template.tenant_id)
     return db_template
 
 
@@ -69,9 +75,14 @@ def update_template(template_id: int, template_update: TemplateUpdate, db: Sessi
     
     for key, value in template_update.dict(exclude_unset=True).items():
         setattr(template, key, value)
+    # Other workers compare version sums to notice edits
+    template.version = (template.version or 1) + 1
     
     db.commit()
     db.refresh(template)
+    reply_cache.invalidate_tenant(template.tenant_id)
+    tenant_response_localizers.invalidate(template.tenant_id)
+    tenant_reply_cards.invalidate(template.tenant_id)
     return template
 
 
@@ -81,7 +92,11 @@ def delete_template(template_id: int, db: Session = Depends(get_db)):
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
     
+    tenant_id = template.tenant_id
     db.delete(template)
     db.commit()
+    reply_cache.invalidate_tenant(tenant_id)
+    tenant_response_localizers.invalidate(tenant_id)
+    tenant_reply_cards.invalidate(tenant_id)
     return {"message": "Template deleted successfully"}
 
@@ -0,0 +1,240 @@
+"""
+Catalog facets
+Per-tenant category and brand counts, the featured set and the low-stock set,
+served from memory instead of a DISTINCT or full-filter query on every chat
+message and dashboard poll. Built once from the catalog; after that every
+product write moves counts by its own delta: the products router applies its
+writes directly, and rows another worker wrote are picked up incrementally
+when the tenant's catalog version changes (deletions, which a delta cannot
+see, rebuild).
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from collections import Counter
+import threading
+import time
+
+from sqlalchemy import or_
+
+from app.core.config import settings
+from app.db.models import Product
+from app.services.product_search_index import load_catalog_version
+
+FACETS = ("category", "brand")
+
+
+class FacetRow(NamedTuple):
+    """What one product contributes to its tenant's facets"""
+    category: Optional[str]
+    brand: Optional[str]
+    is_active: bool
+    is_featured: bool
+    low_stock: bool
+
+
+FACET_COLUMNS = [
+    Product.id, Product.category, Product.brand, Product.is_active,
+    Product.is_featured, Product.stock_quantity, Product.min_stock_level
+]
+
+
+def facet_row(product: Any) -> FacetRow:
+    """FacetRow of a Product (or a FACET_COLUMNS row)"""
+    is_active = bool(product.is_active)
+    return FacetRow(
+        category=product.category or None,
+        brand=product.brand or None,
+        is_active=is_active,
+        is_featured=is_active and bool(product.is_featured),
+        low_stock=is_active and (product.stock_quantity or 0) <= (product.min_stock_level or 0)
+    )
+
+
+def product_columns(product: Product) -> Dict[str, Any]:
+    return {column.key: getattr(product, column.key) for column in Product.__table__.columns}
+
+
+class CatalogFacets:
+    """One tenant's facets; counts per value over all products and over active ones"""
+
+    def __init__(self, tenant_id: Optional[str], version: Any = None):
+        self.tenant_id = tenant_id
+        self.version = version
+        self._rows: Dict[int, FacetRow] = {}
+        self._counts: Dict[str, Counter] = {facet: Counter() for facet in FACETS}
+        self._active_counts: Dict[str, Counter] = {facet: Counter() for facet in FACETS}
+        self._featured: Dict[int, None] = {}
+        # Low-stock products as column dicts, so the dashboard list needs no query either
+        self._low_stock: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, product_id: int, row: Optional[FacetRow], columns: Optional[Dict[str, Any]] = None):
+        """Move the counts from the product's previous row to `row` (None: deleted)"""
+        with self._lock:
+            old = self._rows.pop(product_id, None)
+            if old is not None:
+                self._count(old, -1)
+            self._featured.pop(product_id, None)
+            self._low_stock.pop(product_id, None)
+            if row is None:
+                return
+            self._rows[product_id] = row
+            self._count(row, 1)
+            if row.is_featured:
+                self._featured[product_id] = None
+            if row.low_stock and columns is not None:
+                self._low_stock[product_id] = columns
+
+    def _count(self, row: FacetRow, delta: int):
+        for facet in FACETS:
+            value = getattr(row, facet)
+            if value is None:
+                continue
+            for counts in (self._counts[facet], self._active_counts[facet]) if row.is_active else (self._counts[facet],):
+                counts[value] += delta
+                if counts[value] <= 0:
+                    del counts[value]
+
+    def counts(self, facet: str, active_only: bool = True) -> Dict[str, int]:
+        """Products per category/brand value, most common first"""
+        counts = (self._active_counts if active_only else self._counts)[facet]
+        with self._lock:
+            return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+    def values(self, facet: str, active_only: bool = True) -> List[str]:
+        return list(self.counts(facet, active_only))
+
+    def featured_ids(self, limit: Optional[int] = None) -> List[int]:
+        with self._lock:
+            ids = sorted(self._featured)
+        return ids[:limit] if limit is not None else ids
+
+    def low_stock(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._low_stock[product_id] for product_id in sorted(self._low_stock)]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class CatalogFacetCache:
+    """
+    Facets per tenant ("" = every tenant), re-checked against the catalog
+    version every settings.product_index_check_seconds
+    """
+
+    def __init__(self):
+        self._facets: Dict[str, Tuple[CatalogFacets, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: Optional[str] = None) -> CatalogFacets:
+        key = tenant_id or ""
+        now = time.monotonic()
+        entry = self._facets.get(key)
+        if entry is not None and now - entry[1] < settings.product_index_check_seconds:
+            return entry[0]
+
+        with self._lock:
+            entry = self._facets.get(key)
+            if entry is not None and now - entry[1] < settings.product_index_check_seconds:
+                return entry[0]
+
+            version = load_catalog_version(tenant_id)
+            facets = entry[0] if entry is not None else None
+            if facets is None or (version is not None and facets.version != version and not self._refresh(facets, version)):
+                facets = load_facets(tenant_id, version)
+            if version is not None:
+                facets.version = version
+            self._facets[key] = (facets, now)
+        return facets
+
+    def upsert(self, product: Product):
+        """Apply a created or updated product to the loaded facets that cover it"""
+        self._apply(product.tenant_id, product.id, facet_row(product), product_columns(product))
+
+    def remove(self, tenant_id: Optional[str], product_id: int):
+        self._apply(tenant_id, product_id, None, None)
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        """Drop a tenant's facets so they are rebuilt on next use"""
+        self._facets.pop(tenant_id or "", None)
+
+    def _apply(self, tenant_id: Optional[str], product_id: int, row: Optional[FacetRow], columns: Optional[Dict[str, Any]]):
+        """
+        Apply a local write right away, leaving facets.version as it was: the
+        current version would also cover other workers' changes not seen here,
+        so the next check's delta picks them up (re-applying this write is idempotent)
+        """
+        for key in {tenant_id or "", ""}:
+            entry = self._facets.get(key)
+            if entry is not None:
+                entry[0].apply(product_id, row, columns)
+
+    def _refresh(self, facets: CatalogFacets, version: Tuple[int, int, Any]) -> bool:
+        """Apply rows created or updated since facets.version; False when rows were deleted"""
+        old = facets.version
+        if old is None:
+            return False
+        changes = load_facet_changes(facets.tenant_id, old[1], old[2])
+        if changes is None or version[0] - old[0] != sum(1 for product_id, _, _ in changes if product_id > old[1]):
+            return False
+        for product_id, row, columns in changes:
+            facets.apply(product_id, row, columns)
+        return True
+
+
+def _tenant_query(db, tenant_id: Optional[str], *entities):
+    query = db.query(*entities)
+    if tenant_id:
+        query = query.filter(Product.tenant_id == tenant_id)
+    return query
+
+
+def load_facets(tenant_id: Optional[str], version: Any = None) -> CatalogFacets:
+    """Build a tenant's facets from the catalog (empty if the database is unavailable)"""
+    # Imported lazily to keep this module usable without a configured database
+    from app.db.session import SessionLocal
+
+    facets = CatalogFacets(tenant_id, version)
+    db = SessionLocal()
+    try:
+        for row in _tenant_query(db, tenant_id, *FACET_COLUMNS).yield_per(10000):
+            facets.apply(row.id, facet_row(row))
+        low_stock = _tenant_query(db, tenant_id, Product).filter(
+            Product.is_active == True,
+            Product.stock_quantity <= Product.min_stock_level
+        ).all()
+        for product in low_stock:
+            facets.apply(product.id, facet_row(product), product_columns(product))
+    except Exception as e:
+        print(f"Failed to load catalog facets for tenant {tenant_id}: {e}")
+    finally:
+        db.close()
+    return facets
+
+
+def load_facet_changes(
+    tenant_id: Optional[str],
+    since_id: int,
+    since_updated_at: Any
+) -> Optional[List[Tuple[int, FacetRow, Dict[str, Any]]]]:
+    """Products created after `since_id` or updated at/after `since_updated_at`, as (id, FacetRow, columns)"""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        changed = Product.id > since_id
+        if since_updated_at is not None:
+            changed = or_(changed, Product.updated_at >= since_updated_at)
+        return [
+            (product.id, facet_row(product), product_columns(product))
+            for product in _tenant_query(db, tenant_id, Product).filter(changed).all()
+        ]
+    except Exception as e:
+        print(f"Failed to load catalog facet changes for tenant {tenant_id}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+# Singleton instance
+catalog_facets = CatalogFacetCache()
@@ -0,0 +1,151 @@
+"""
+Catalog snapshot cache
+Read-only, per-tenant view of the catalog the product inquiry handlers answer
+from: immutable ProductRecord tuples instead of Session-bound Product rows,
+so no Session (and no identity map) outlives a lookup. Each snapshot holds
+a bounded LRU of product records loaded by primary key and the tenant's
+active-product listing (category and brand lists and the featured set are
+catalog_facets'), and is replaced as a whole when the tenant's
+catalog version changes (re-checked every settings.product_index_check_seconds)
+or the products router invalidates it. Tenants are kept in an LRU too, so
+memory stays bounded however many tenants and products are queried.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from collections import OrderedDict
+import threading
+import time
+
+from sqlalchemy import and_
+
+from app.core.config import settings
+from app.db.models import Product
+from app.services.product_search_index import load_catalog_version
+
+
+class ProductRecord(NamedTuple):
+    id: int
+    tenant_id: str
+    name: str
+    description: Optional[str]
+    sku: str
+    price: float
+    currency: Optional[str]
+    category: Optional[str]
+    brand: Optional[str]
+    stock_quantity: int
+    min_stock_level: int
+    is_active: bool
+    is_featured: bool
+    tags: Optional[Tuple[str, ...]]
+
+
+RECORD_COLUMNS = [getattr(Product, name) for name in ProductRecord._fields]
+
+
+def _record(row: Any) -> ProductRecord:
+    return ProductRecord(*row)._replace(
+        stock_quantity=row.stock_quantity or 0,
+        min_stock_level=row.min_stock_level or 0,
+        is_active=bool(row.is_active),
+        is_featured=bool(row.is_featured),
+        tags=tuple(row.tags) if row.tags else None
+    )
+
+
+class CatalogSnapshot:
+    """One tenant's active catalog at one version"""
+
+    def __init__(self, tenant_id: Optional[str], version: Any, max_products: int):
+        self.tenant_id = tenant_id
+        self.version = version
+        self.max_products = max_products
+        self._products: "OrderedDict[int, ProductRecord]" = OrderedDict()
+        self._active: Dict[int, List[ProductRecord]] = {}
+        self._lock = threading.Lock()
+
+    def products(self, product_ids: Sequence[int]) -> List[ProductRecord]:
+        """Active products by id, in the order given; unknown or inactive ids are skipped"""
+        found: Dict[int, ProductRecord] = {}
+        with self._lock:
+            for product_id in product_ids:
+                record = self._products.get(product_id)
+                if record is not None:
+                    self._products.move_to_end(product_id)
+                    found[product_id] = record
+
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        if missing:
+            loaded = self._query(lambda db: db.query(*RECORD_COLUMNS).filter(
+                and_(Product.id.in_(missing), Product.is_active == True)
+            ).all())
+            with self._lock:
+                for record in loaded:
+                    found[record.id] = record
+                    self._products[record.id] = record
+                while len(self._products) > self.max_products:
+                    self._products.popitem(last=False)
+        return [found[product_id] for product_id in product_ids if product_id in found]
+
+    def active(self, limit: int) -> List[ProductRecord]:
+        """The first `limit` active products"""
+        listing = self._active.get(limit)
+        if listing is None:
+            listing = self._active[limit] = self._query(
+                lambda db: db.query(*RECORD_COLUMNS).filter(Product.is_active == True).limit(limit).all()
+            )
+        return listing
+
+    def _query(self, run) -> List[ProductRecord]:
+        # Imported lazily to keep this module usable without a configured database
+        from app.db.session import get_read_db_context
+
+        with get_read_db_context(self.tenant_id) as db:
+            rows = run(db)
+        return [_record(row) for row in rows]
+
+
+class CatalogSnapshotCache:
+    def __init__(self, max_tenants: int = 256, max_products: int = 5000):
+        self.max_tenants = max_tenants
+        self.max_products = max_products
+        self._snapshots: "OrderedDict[str, Tuple[CatalogSnapshot, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: Optional[str] = None) -> CatalogSnapshot:
+        key = tenant_id or ""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._snapshots.get(key)
+            if entry is not None:
+                self._snapshots.move_to_end(key)
+                if now - entry[1] < settings.product_index_check_seconds:
+                    return entry[0]
+
+        version = load_catalog_version(tenant_id)
+        if entry is not None and version is not None and entry[0].version == version:
+            snapshot = entry[0]
+        else:
+            snapshot = CatalogSnapshot(tenant_id, version, self.max_products)
+
+        with self._lock:
+            self._snapshots[key] = (snapshot, now)
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_tenants:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        """Drop a tenant's snapshot (and the all-tenants one) so the next lookup reads fresh rows"""
+        with self._lock:
+            self._snapshots.pop(tenant_id or "", None)
+            self._snapshots.pop("", None)
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+
+# Singleton instance
+catalog_snapshots = CatalogSnapshotCache(
+    max_tenants=settings.catalog_snapshot_max_tenants,
+    max_products=settings.catalog_snapshot_max_products
+)
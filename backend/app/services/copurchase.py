@@ -0,0 +1,459 @@
+"""
+Co-purchase recommendations
+Per-tenant item-item co-occurrence counts ("customers who bought X also
+bought Y") from OrderItem history, kept as a CSR matrix in NumPy arrays. Each
+row is sorted by count, so a product's top-k is a slice. Each customer's
+recent purchases (from Order) are kept as well, so a personalized top-k sums
+a few rows instead of aggregating order history in SQL on every request.
+
+scripts/build_copurchase.py is the offline job. It builds a tenant's matrix
+and saves it as an .npz artifact that workers load on first use. A worker
+without an artifact builds the matrix itself. After that, new orders are
+added incrementally:
+- the orders router records its own orders directly;
+- orders another worker took are picked up when the tenant's order version
+  changes (deletions, which a delta cannot see, rebuild).
+Pairs added since the last build live in small per-row counters. They are
+merged into the CSR arrays once settings.copurchase_compact_after pairs have
+accumulated.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+from collections import Counter
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.models import Customer, Order, OrderItem
+
+# Products paired per order; a bulk order would otherwise add size² pairs of noise
+MAX_BASKET_ITEMS = 50
+# Neighbours of each seed product considered for a personalized top-k
+NEIGHBORS_PER_SEED = 50
+# Weight of a customer's n-th most recent purchase is RECENCY_DECAY ** n
+RECENCY_DECAY = 0.8
+
+
+class OrderLine(NamedTuple):
+    """One ordered product, with the customer who ordered it"""
+    order_id: int
+    customer_id: Optional[int]
+    external_customer_id: Optional[str]
+    product_id: int
+
+
+def basket_pairs(order_keys: np.ndarray, items: np.ndarray, n_items: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (row, col) item index pairs for every two distinct products ordered
+    together, both ways round. Orders are grouped by size, so each size is
+    a single broadcast over an (orders, size) array.
+    """
+    keys = np.unique(order_keys.astype(np.int64) * n_items + items)  # one entry per product per order
+    orders, items = keys // n_items, keys % n_items
+    if len(orders) == 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    starts = np.flatnonzero(np.r_[True, orders[1:] != orders[:-1]])
+    sizes = np.minimum(np.diff(np.r_[starts, len(orders)]), MAX_BASKET_ITEMS)
+
+    rows: List[np.ndarray] = [np.empty(0, np.int64)]
+    cols: List[np.ndarray] = [np.empty(0, np.int64)]
+    for size in np.unique(sizes[sizes > 1]).tolist():
+        baskets = items[starts[sizes == size][:, None] + np.arange(size)]
+        first, second = np.nonzero(~np.eye(size, dtype=bool))
+        rows.append(baskets[:, first].ravel())
+        cols.append(baskets[:, second].ravel())
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+def sum_pairs(rows: np.ndarray, cols: np.ndarray, weights: np.ndarray, n_items: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Duplicate (row, col) pairs merged, their weights summed"""
+    keys, inverse = np.unique(rows.astype(np.int64) * n_items + cols, return_inverse=True)
+    return keys // n_items, keys % n_items, np.bincount(inverse, weights=weights, minlength=len(keys))
+
+
+def csr_rows(rows: np.ndarray, cols: np.ndarray, counts: np.ndarray, n_items: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(indptr, indices, data) with each row's entries sorted by count, highest first"""
+    order = np.lexsort((cols, -counts, rows))
+    indptr = np.searchsorted(rows[order], np.arange(n_items + 1)).astype(np.int64)
+    return indptr, cols[order].astype(np.int32), counts[order].astype(np.float32)
+
+
+class CoPurchaseModel:
+    """One tenant's co-purchase matrix and customers' recent purchases, at one order version"""
+
+    def __init__(
+        self,
+        tenant_id: Optional[str],
+        product_ids: Sequence[int],
+        csr: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        version: Any = None
+    ):
+        self.tenant_id = tenant_id
+        # (order count, max order id) the model covers
+        self.version = version
+        self.product_ids: List[int] = list(product_ids)
+        self.index: Dict[int, int] = {product_id: i for i, product_id in enumerate(self.product_ids)}
+        self._csr = csr
+        # Pairs added since the CSR arrays were built: row -> Counter(col -> count)
+        self._delta: Dict[int, Counter] = {}
+        self._delta_pairs = 0
+        # Customer.id -> product ids, most recent first; Customer.customer_id (channel id) -> Customer.id
+        self.recent: Dict[int, List[int]] = {}
+        self.customer_keys: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, tenant_id: Optional[str], lines: List[OrderLine], version: Any = None) -> "CoPurchaseModel":
+        """Build from order lines (oldest order first)"""
+        product_ids = sorted({line.product_id for line in lines})
+        index = {product_id: i for i, product_id in enumerate(product_ids)}
+        n_items = len(product_ids)
+
+        order_keys = np.fromiter((line.order_id for line in lines), dtype=np.int64, count=len(lines))
+        items = np.fromiter((index[line.product_id] for line in lines), dtype=np.int64, count=len(lines))
+        rows, cols = basket_pairs(order_keys, items, max(n_items, 1))
+        model = cls(tenant_id, product_ids, csr_rows(*sum_pairs(rows, cols, np.ones(len(rows)), max(n_items, 1)), n_items), version)
+
+        # Newest order first, each order's lines in order (as add_order puts them)
+        for line in sorted(lines, key=lambda line: -line.order_id):
+            if line.customer_id is None:
+                continue
+            recent = model.recent.setdefault(line.customer_id, [])
+            if len(recent) < settings.copurchase_recent_items and line.product_id not in recent:
+                recent.append(line.product_id)
+            if line.external_customer_id:
+                model.customer_keys.setdefault(line.external_customer_id, line.customer_id)
+        return model
+
+    def add_order(self, customer_id: Optional[int], external_customer_id: Optional[str], product_ids: Sequence[int]):
+        """Count a new order's pairs and put its products first in the customer's recent purchases"""
+        product_ids = list(dict.fromkeys(product_ids))
+        with self._lock:
+            for product_id in product_ids:
+                if product_id not in self.index:
+                    self.index[product_id] = len(self.product_ids)
+                    self.product_ids.append(product_id)
+            basket = [self.index[product_id] for product_id in product_ids[:MAX_BASKET_ITEMS]]
+            for row in basket:
+                counts = self._delta.setdefault(row, Counter())
+                for col in basket:
+                    if col != row:
+                        counts[col] += 1
+                        self._delta_pairs += 1
+
+            if customer_id is not None:
+                recent = product_ids + [p for p in self.recent.get(customer_id, []) if p not in product_ids]
+                self.recent[customer_id] = recent[:settings.copurchase_recent_items]
+                if external_customer_id:
+                    self.customer_keys[external_customer_id] = customer_id
+
+            if self._delta_pairs >= settings.copurchase_compact_after:
+                self._compact()
+
+    def also_bought(self, product_id: int, k: int = 10) -> List[int]:
+        """Products most often ordered together with product_id"""
+        return self.recommend([(product_id, 1.0)], k)
+
+    def for_customer(self, customer: Union[int, str], k: int = 10) -> List[int]:
+        """
+        Products bought together with the customer's recent purchases, which
+        are excluded. `customer` is a Customer.id or a channel customer id.
+        """
+        return self.recommend(self.customer_seeds(customer), k)
+
+    def customer_seeds(self, customer: Union[int, str, None]) -> List[Tuple[int, float]]:
+        """The customer's recent purchases as (product id, weight), most recent weighing most"""
+        customer_id = self.customer_keys.get(customer) if isinstance(customer, str) else customer
+        recent = self.recent.get(customer_id, []) if customer_id is not None else []
+        return [(product_id, RECENCY_DECAY ** n) for n, product_id in enumerate(recent)]
+
+    def recommend(self, seeds: Sequence[Tuple[int, float]], k: int = 10, exclude: Sequence[int] = ()) -> List[int]:
+        """Top-k products by co-purchase count with the (product id, weight) seeds summed; seeds are excluded"""
+        excluded = {product_id for product_id, _ in seeds} | set(exclude)
+        indptr, indices, data = self._csr
+        cols: List[np.ndarray] = []
+        weights: List[np.ndarray] = []
+        with self._lock:
+            for product_id, weight in seeds:
+                row = self.index.get(product_id)
+                if row is None:
+                    continue
+                if row + 1 < len(indptr):
+                    start = indptr[row]
+                    end = indptr[row + 1] if len(seeds) == 1 else min(indptr[row + 1], start + NEIGHBORS_PER_SEED)
+                    cols.append(indices[start:end])
+                    weights.append(data[start:end] * weight)
+                delta = self._delta.get(row)
+                if delta:
+                    cols.append(np.fromiter(delta.keys(), dtype=np.int32, count=len(delta)))
+                    weights.append(np.fromiter(delta.values(), dtype=np.float32, count=len(delta)) * weight)
+            product_ids = self.product_ids
+            # One CSR row is already sorted by count
+            presorted = len(cols) == 1 and len(seeds) == 1 and not self._delta.get(self.index.get(seeds[0][0]))
+
+        if not cols:
+            return []
+        if presorted:
+            candidates = cols[0]
+        else:
+            columns, inverse = np.unique(np.concatenate(cols), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(weights))
+            candidates = columns[np.argsort(-scores, kind="stable")]
+
+        recommended: List[int] = []
+        for column in candidates[:k + len(excluded)].tolist():
+            product_id = product_ids[column]
+            if product_id not in excluded:
+                recommended.append(product_id)
+                if len(recommended) == k:
+                    break
+        return recommended
+
+    def _compact(self):
+        """Merge the pending pairs into the CSR arrays (caller holds the lock)"""
+        indptr, indices, data = self._csr
+        n_items = len(self.product_ids)
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        delta_rows = [row for row, counts in self._delta.items() for _ in counts]
+        delta_cols = [col for counts in self._delta.values() for col in counts]
+        delta_counts = [count for counts in self._delta.values() for count in counts.values()]
+        merged = sum_pairs(
+            np.concatenate([rows, np.array(delta_rows, dtype=np.int64)]),
+            np.concatenate([indices.astype(np.int64), np.array(delta_cols, dtype=np.int64)]),
+            np.concatenate([data.astype(np.float64), np.array(delta_counts, dtype=np.float64)]),
+            max(n_items, 1)
+        )
+        self._csr = csr_rows(*merged, n_items)
+        self._delta = {}
+        self._delta_pairs = 0
+
+    @property
+    def pairs(self) -> int:
+        return len(self._csr[1]) + self._delta_pairs
+
+    def save(self, path: str):
+        """
+        Write the model as a compressed .npz: product ids, the CSR arrays and
+        the customers' recent purchases in CSR layout. Written next to the
+        target and renamed into place, so readers never see a partial artifact.
+        """
+        with self._lock:
+            if self._delta:
+                self._compact()
+            indptr, indices, data = self._csr
+            customers = sorted(self.recent)
+            recent = [self.recent[customer_id] for customer_id in customers]
+            external = {customer_id: key for key, customer_id in self.customer_keys.items()}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    product_ids=np.array(self.product_ids, dtype=np.int64),
+                    indptr=indptr,
+                    indices=indices,
+                    data=data,
+                    customers=np.array(customers, dtype=np.int64),
+                    external_ids=np.array([external.get(customer_id, "") for customer_id in customers], dtype=str),
+                    recent_indptr=np.cumsum([0] + [len(items) for items in recent]).astype(np.int64),
+                    recent_items=np.array([p for items in recent for p in items], dtype=np.int64),
+                    version=np.array(self.version or (0, 0), dtype=np.int64)
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, tenant_id: Optional[str], path: str) -> "CoPurchaseModel":
+        """Read a model written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            model = cls(
+                tenant_id,
+                data["product_ids"].tolist(),
+                (data["indptr"], data["indices"], data["data"]),
+                tuple(data["version"].tolist())
+            )
+            recent_indptr = data["recent_indptr"].tolist()
+            recent_items = data["recent_items"].tolist()
+            for n, (customer_id, external_id) in enumerate(zip(data["customers"].tolist(), data["external_ids"].tolist())):
+                model.recent[customer_id] = recent_items[recent_indptr[n]:recent_indptr[n + 1]]
+                if external_id:
+                    model.customer_keys[external_id] = customer_id
+        return model
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+
+class CoPurchaseRegistry:
+    """
+    Co-purchase models per tenant ("" = every tenant), re-checked against the
+    tenant's order version every settings.copurchase_check_seconds
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Tuple[CoPurchaseModel, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: Optional[str] = None) -> CoPurchaseModel:
+        key = tenant_id or ""
+        now = time.monotonic()
+        entry = self._models.get(key)
+        if entry is not None and now - entry[1] < settings.copurchase_check_seconds:
+            return entry[0]
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and now - entry[1] < settings.copurchase_check_seconds:
+                return entry[0]
+
+            version = load_order_version(tenant_id)
+            model = entry[0] if entry is not None else load_model_artifact(tenant_id)
+            if model is None or (version is not None and model.version != version and not self._refresh(model, version)):
+                model = build_model(tenant_id, version)
+            if version is not None:
+                model.version = version
+            self._models[key] = (model, now)
+        return model
+
+    def record_order(
+        self,
+        tenant_id: Optional[str],
+        order_id: int,
+        customer_id: Optional[int],
+        external_customer_id: Optional[str],
+        product_ids: Sequence[int]
+    ):
+        """
+        Add a new order to the loaded models that cover it. Only an order that
+        directly follows the model's version is added here: otherwise orders
+        other workers placed in between would be marked as counted, so the
+        model is left to catch up with all of them on its next use.
+        """
+        for key in {tenant_id or "", ""}:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is None:
+                    continue
+                model, old = entry[0], entry[0].version
+                version = load_order_version(key or None)
+                if old is not None and version == (old[0] + 1, order_id) and order_id > old[1]:
+                    model.add_order(customer_id, external_customer_id, product_ids)
+                    model.version = version
+                else:
+                    self._models[key] = (model, 0.0)
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        """Drop a tenant's model so it is reloaded on next use"""
+        self._models.pop(tenant_id or "", None)
+
+    def _refresh(self, model: CoPurchaseModel, version: Tuple[int, int]) -> bool:
+        """Add orders placed since model.version; False when orders were deleted"""
+        old = model.version
+        if old is None:
+            return False
+        changes = load_order_changes(model.tenant_id, old[1], version[1])
+        if changes is None or version[0] - old[0] != changes[0]:
+            return False
+        orders: Dict[int, List[OrderLine]] = {}
+        for line in changes[1]:
+            orders.setdefault(line.order_id, []).append(line)
+        for lines in orders.values():
+            model.add_order(lines[0].customer_id, lines[0].external_customer_id, [line.product_id for line in lines])
+        return True
+
+
+def model_artifact_path(tenant_id: Optional[str]) -> str:
+    return os.path.join(settings.copurchase_artifact_dir, f"{tenant_id or '_all'}.npz")
+
+
+def load_model_artifact(tenant_id: Optional[str]) -> Optional[CoPurchaseModel]:
+    """A tenant's model saved by the offline job, or None if there is none"""
+    path = model_artifact_path(tenant_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        return CoPurchaseModel.load(tenant_id, path)
+    except Exception as e:
+        print(f"Failed to load co-purchase model for tenant {tenant_id}: {e}")
+        return None
+
+
+def build_model(tenant_id: Optional[str], version: Any = None) -> CoPurchaseModel:
+    """
+    Build a tenant's model from its order history (empty if the database is
+    unavailable), up to the orders `version` covers so later ones are left to
+    the first delta refresh rather than counted twice
+    """
+    changes = load_order_changes(tenant_id, 0, version[1] if version else None)
+    return CoPurchaseModel.build(tenant_id, changes[1] if changes else [], version)
+
+
+def _tenant_query(db, tenant_id: Optional[str], model, *entities):
+    query = db.query(*entities)
+    if tenant_id:
+        query = query.filter(model.tenant_id == tenant_id)
+    return query
+
+
+def load_order_version(tenant_id: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(order count, max order id) for a tenant, None if the database is unavailable"""
+    # Imported lazily to keep this module usable without a configured database
+    from sqlalchemy import func
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count, max_id = _tenant_query(db, tenant_id, Order, func.count(Order.id), func.max(Order.id)).one()
+        return (count, max_id or 0)
+    except Exception as e:
+        print(f"Failed to load order version for tenant {tenant_id}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+def load_order_changes(
+    tenant_id: Optional[str],
+    since_order_id: int,
+    until_order_id: Optional[int] = None
+) -> Optional[Tuple[int, List[OrderLine]]]:
+    """
+    (orders placed after since_order_id, their lines oldest first), None if the
+    database is unavailable. `until_order_id` (the max id of the version being
+    caught up to) leaves out orders placed after that version was read.
+    """
+    from sqlalchemy import func
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        orders = _tenant_query(db, tenant_id, Order, func.count(Order.id)).filter(Order.id > since_order_id)
+        # Driven from order_items (by tenant), joining each line's order by primary key
+        rows = _tenant_query(db, tenant_id, OrderItem, OrderItem.order_id, Order.customer_id, Customer.customer_id, OrderItem.product_id) \
+            .join(Order, Order.id == OrderItem.order_id) \
+            .outerjoin(Customer, Customer.id == Order.customer_id) \
+            .filter(OrderItem.order_id > since_order_id)
+        if until_order_id is not None:
+            orders = orders.filter(Order.id <= until_order_id)
+            rows = rows.filter(OrderItem.order_id <= until_order_id)
+        count = orders.scalar()
+        rows = rows.order_by(OrderItem.order_id, OrderItem.id).yield_per(10000)
+        return count, [OrderLine(*row) for row in rows]
+    except Exception as e:
+        print(f"Failed to load orders for tenant {tenant_id}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+# Singleton instance
+copurchase_models = CoPurchaseRegistry()
@@ -2,10 +2,18 @@
 Dialogue Manager for conversation flow and decision making
 Handles state tracking, slot filling, and action decisions
 """
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from enum import Enum
+import time
 
+from app.core.config import settings
 from app.services.product_inquiry_service import product_inquiry_service
+from app.services.reply_cache import ReplyKey, reply_cache
+from app.services.response_localizer import tenant_response_localizers
+
+
+# Product replies that ask for or quote the customer's own wording, or are personalized, are never shared
+UNCACHEABLE_REPLY_METADATA = ("missing", "product_not_found", "personalized")
 
 
 class ActionType(str, Enum):
@@ -17,19 +25,70 @@ class ActionType(str, Enum):
 
 
 class DialogueState:
-    def __init__(self):
+    """
+    Slots, context and recent turns of one conversation. Slots expire
+    slot_ttl_seconds after they were last set, history keeps the last
+    max_history turns, and to_dict()/from_dict() give a compact form for the
+    dialogue state store.
+    """
+
+    def __init__(self, slot_ttl_seconds: Optional[float] = None, max_history: Optional[int] = None):
         self.slots: Dict[str, Any] = {}
+        self.slot_expires_at: Dict[str, float] = {}
         self.context: Dict[str, Any] = {}
         self.history: List[Dict[str, Any]] = []
-        
+        self.slot_ttl_seconds = settings.dialogue_slot_ttl_seconds if slot_ttl_seconds is None else slot_ttl_seconds
+        self.max_history = settings.dialogue_history_max_turns if max_history is None else max_history
+
     def update_slot(self, key: str, value: Any):
         self.slots[key] = value
-        
+        if self.slot_ttl_seconds:
+            self.slot_expires_at[key] = time.time() + self.slot_ttl_seconds
+
     def get_slot(self, key: str) -> Optional[Any]:
+        expires_at = self.slot_expires_at.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self.slots.pop(key, None)
+            self.slot_expires_at.pop(key, None)
+            return None
         return self.slots.get(key)
-    
+
     def has_required_slots(self, required: List[str]) -> bool:
-        return all(self.slots.get(slot) is not None for slot in required)
+        return all(self.get_slot(slot) is not None for slot in required)
+
+    def add_turn(self, speaker: str, text: str, intent: Optional[str] = None):
+        """Append a turn, keeping only the last max_history"""
+        self.history.append({"speaker": speaker, "text": text, "intent": intent, "ts": int(time.time())})
+        if len(self.history) > self.max_history:
+            del self.history[:-self.max_history]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact form (short keys, turns as lists, expired slots dropped)"""
+        now = time.time()
+        expired = [key for key, expires_at in self.slot_expires_at.items() if expires_at <= now]
+        for key in expired:
+            self.slots.pop(key, None)
+            self.slot_expires_at.pop(key, None)
+        data: Dict[str, Any] = {"s": self.slots}
+        if self.slot_expires_at:
+            data["e"] = {key: round(expires_at, 1) for key, expires_at in self.slot_expires_at.items()}
+        if self.context:
+            data["c"] = self.context
+        if self.history:
+            data["h"] = [[turn["speaker"], turn["text"], turn.get("intent"), turn.get("ts")] for turn in self.history]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DialogueState":
+        state = cls()
+        state.slots = dict(data.get("s") or {})
+        state.slot_expires_at = dict(data.get("e") or {})
+        state.context = dict(data.get("c") or {})
+        state.history = [
+            {"speaker": speaker, "text": text, "intent": intent, "ts": ts}
+            for speaker, text, intent, ts in (data.get("h") or [])[-state.max_history:]
+        ]
+        return state
 
 
 class DialogueManager:
@@ -49,6 +108,18 @@ class DialogueManager:
             "complaint": self._handle_complaint,
             "fallback": self._handle_fallback
         }
+        # Handlers that block on catalog queries and fuzzy matching
+        self.lookup_intents = {
+            "product_inquiry", "price_inquiry", "availability_inquiry", "product_info",
+            "recommendation", "purchase_intent", "category_browse"
+        }
+        # Handlers whose reply depends only on the message, entities and catalog
+        # (not on dialogue state), so near-duplicate messages can share it.
+        # Co-purchase recommendations depend on the customer, and the reply key
+        # has no customer in it, so even the featured fallback is not shared
+        self.cacheable_intents = set(self.lookup_intents)
+        if settings.copurchase_enabled:
+            self.cacheable_intents.discard("recommendation")
         
     def decide(
         self,
@@ -65,7 +136,52 @@ class DialogueManager:
         """
         if state is None:
             state = DialogueState()
+        detected_language, reply_key, cached = self._prepare(intent, entities, context, state)
+        if cached is not None:
+            return cached
+
+        result = self._respond(intent, entities, context, state, detected_language)
+        self._remember_reply(reply_key, result)
+        return result
+
+    async def decide_async(
+        self,
+        intent: str,
+        entities: Dict[str, Any],
+        context: Dict[str, Any],
+        state: Optional[DialogueState] = None
+    ) -> Dict[str, Any]:
+        """
+        decide() for callers on the event loop: handlers that query the catalog
+        run on the product lookup pool, so one slow lookup does not stall every
+        other conversation the process is serving
+        """
+        if state is None:
+            state = DialogueState()
+        detected_language, reply_key, cached = self._prepare(intent, entities, context, state)
+        if cached is not None:
+            return cached
+
+        if intent in self.lookup_intents:
+            result = await product_inquiry_service.run_lookup(
+                self._respond, intent, entities, context, state, detected_language
+            )
+        else:
+            # The tenant's template version check queries the database, so it runs on the pool too
+            if tenant_response_localizers.due(context.get("tenant_id")):
+                await product_inquiry_service.run_lookup(tenant_response_localizers.get, context.get("tenant_id"))
+            result = self._respond(intent, entities, context, state, detected_language)
+        self._remember_reply(reply_key, result)
+        return result
 
+    def _prepare(
+        self,
+        intent: str,
+        entities: Dict[str, Any],
+        context: Dict[str, Any],
+        state: DialogueState
+    ) -> Tuple[str, Optional[ReplyKey], Optional[Dict[str, Any]]]:
+        """Fill slots and check the reply cache: (language, reply cache key, cached reply)"""
         # Update state with entities
         for key, value in entities.items():
             state.update_slot(key, value)
@@ -73,6 +189,25 @@ class DialogueManager:
         # Detect language from context or entities
         detected_language = context.get('language', 'bn')
 
+        # Near-duplicate of a recent message: skip the handler, product lookups and localization
+        reply_key = None
+        if settings.reply_cache_enabled and intent in self.cacheable_intents and context.get("message"):
+            reply_key = reply_cache.make_key(
+                context["message"], context.get("tenant_id"), intent, detected_language, entities
+            )
+            cached = reply_cache.get(reply_key)
+            if cached is not None:
+                return detected_language, reply_key, cached
+        return detected_language, reply_key, None
+
+    def _respond(
+        self,
+        intent: str,
+        entities: Dict[str, Any],
+        context: Dict[str, Any],
+        state: DialogueState,
+        detected_language: str
+    ) -> Dict[str, Any]:
         # Get handler for intent
         handler = self.intent_handlers.get(intent, self._handle_fallback)
 
@@ -81,81 +216,24 @@ class DialogueManager:
 
         # Convert response to appropriate language if needed
         if 'response_text' in result:
-            result['response_text'] = self._localize_response(result['response_text'], detected_language)
-
+            result['response_text'] = self._localize_response(
+                result['response_text'], detected_language, context.get("tenant_id")
+            )
         return result
 
-    def _localize_response(self, text: str, language: str) -> str:
+    def _remember_reply(self, reply_key: Optional[ReplyKey], result: Dict[str, Any]):
+        if (
+            reply_key is not None
+            and result.get('action') == ActionType.RESPOND
+            and not any(key in result.get('metadata', {}) for key in UNCACHEABLE_REPLY_METADATA)
+        ):
+            reply_cache.set(reply_key, result)
+
+    def _localize_response(self, text: str, language: str, tenant_id: Optional[str] = None) -> str:
         """
         Localize response text based on detected language
         """
-        # Response templates for different languages
-        templates = {
-            "order_status_missing": {
-                "bn": "আপনার অর্ডার স্ট্যাটাস জানার জন্য অনুগ্রহ করে অর্ডার নম্বর প্রদান করুন।",
-                "en": "Please provide your order number to check the status.",
-                "hi": "अपना ऑर्डर नंबर प्रदान करें ताकि स्थिति जांच सके।",
-                "ur": "اپنی آرڈر کی حیثیت چیک کرنے کے لیے آرڈر نمبر فراہم کریں۔",
-                "ar": "يرجى تقديم رقم الطلب للتحقق من الحالة."
-            },
-            "order_status_checking": {
-                "bn": "আপনার অর্ডার স্ট্যাটাস চেক করছি, অনুগ্রহ করে অপেক্ষা করুন...",
-                "en": "Checking your order status, please wait...",
-                "hi": "आपका ऑर्डर स्टेटस चेक कर रहा हूं, कृपया प्रतीक्षा करें...",
-                "ur": "آپ کی آرڈر کی حیثیت چیک کر رہا ہوں، براہ مہربانی انتظار کریں...",
-                "ar": "جاري فحص حالة الطلب، يرجى الانتظار..."
-            },
-            "return_request_missing": {
-                "bn": "রিটার্নের জন্য অনুগ্রহ করে অর্ডার নম্বর প্রদান করুন।",
-                "en": "Please provide your order number for return request.",
-                "hi": "वापसी के लिए कृपया अपना ऑर्डर नंबर प्रदान करें।",
-                "ur": "واپسی کے لیے براہ مہربانی اپنا آرڈر نمبر فراہم کریں۔",
-                "ar": "يرجى تقديم رقم الطلب للإرجاع."
-            },
-            "return_processing": {
-                "bn": "আপনার রিটার্ন রিকোয়েস্ট প্রসেস করছি...",
-                "en": "Processing your return request...",
-                "hi": "आपका वापसी अनुरोध संसाधित कर रहा हूं...",
-                "ur": "آپ کی واپسی کی درخواست پر عمل کر رہا ہوں...",
-                "ar": "جاري معالجة طلب الإرجاع..."
-            },
-            "payment_issue_handoff": {
-                "bn": "পেমেন্ট সমস্যার জন্য আমি আপনাকে আমাদের পেমেন্ট টিমের সাথে কানেক্ট করছি। অনুগ্রহ করে অপেক্ষা করুন।",
-                "en": "For payment issues, I'm connecting you with our payment team. Please wait.",
-                "hi": "भुगतान समस्याओं के लिए, मैं आपको हमारी भुगतान टीम से कनेक्ट कर रहा हूं। कृपया प्रतीक्षा करें।",
-                "ur": "ادائیگی کے مسائل کے لیے، میں آپ کو ہماری ادائیگی ٹیم سے جوڑ رہا ہوں۔ براہ مہربانی انتظار کریں۔",
-                "ar": "للمشاكل المتعلقة بالدفع، أنا أتصل بك مع فريق الدفع لدينا. يرجى الانتظار."
-            },
-            "delivery_missing_order": {
-                "bn": "ডেলিভারি ট্র্যাক করার জন্য অর্ডার নম্বর লাগবে। অনুগ্রহ করে বলুন।",
-                "en": "Order number is required to track delivery. Please provide it.",
-                "hi": "डिलीवरी ट्रैक करने के लिए ऑर्डर नंबर की आवश्यकता है। कृपया प्रदान करें।",
-                "ur": "ڈیلیوری کو ٹریک کرنے کے لیے آرڈر نمبر درکار ہے۔ براہ مہربانی فراہم کریں۔",
-                "ar": "رقم الطلب مطلوبة لتتبع التسليم. يرجى تقديمها."
-            },
-            "complaint_handoff": {
-                "bn": "আপনার অভিযোগের জন্য আমি আপনাকে আমাদের কাস্টমার সার্ভিস এজেন্টের সাথে কানেক্ট করছি। অনুগ্রহ করে অপেক্ষা করুন।",
-                "en": "For your complaint, I'm connecting you with our customer service agent. Please wait.",
-                "hi": "आपकी शिकायत के लिए, मैं आपको हमारे ग्राहक सेवा एजेंट से कनेक्ट कर रहा हूं। कृपया प्रतीक्षा करें।",
-                "ur": "آپ کی شکایت کے لیے، میں آپ کو ہمارے کسٹمر سروس ایجنٹ سے جوڑ رہا ہوں۔ براہ مہربانی انتظار کریں۔",
-                "ar": "لشكواك، أنا أتصل بك مع وكيل خدمة العملاء لدينا. يرجى الانتظار."
-            },
-            "fallback_handoff": {
-                "bn": "আমি আপনার প্রশ্নটি ঠিক বুঝতে পারছি না। আমি আপনাকে আমাদের এজেন্টের সাথে কানেক্ট করছি।",
-                "en": "I cannot understand your question clearly. I'm connecting you with our agent.",
-                "hi": "मैं आपका प्रश्न सही ढंग से समझ नहीं पा रहा हूं। मैं आपको हमारे एजेंट से कनेक्ट कर रहा हूं।",
-                "ur": "میں آپ کا سوال صحیح طور پر سمجھ نہیں پا رہا۔ میں آپ کو ہمارے ایجنٹ سے جوڑ رہا ہوں۔",
-                "ar": "لا أستطيع فهم سؤالك بوضوح. أنا أتصل بك مع وكيلنا."
-            }
-        }
-
-        # Check if text matches any template key
-        for key, translations in templates.items():
-            if text in translations.values():
-                return translations.get(language, translations.get('en', text))
-
-        # If no template match, return original text
-        return text
+        return tenant_response_localizers.get(tenant_id).localize(text, language)
 
     def _handle_order_status(
         self,
@@ -221,7 +299,8 @@ class DialogueManager:
 
         # Use the product inquiry service for instant responses
         result = product_inquiry_service.handle_product_query(
-            customer_message, entities, customer_id
+            customer_message, entities, customer_id,
+            tenant_id=context.get("tenant_id"), language=context.get("language", "bn")
         )
 
         return {
@@ -245,7 +324,8 @@ class DialogueManager:
         customer_id = context.get("customer_id")
 
         result = product_inquiry_service.handle_product_query(
-            customer_message, entities, customer_id
+            customer_message, entities, customer_id,
+            tenant_id=context.get("tenant_id"), language=context.get("language", "bn")
         )
 
         return {
@@ -269,7 +349,8 @@ class DialogueManager:
         customer_id = context.get("customer_id")
 
         result = product_inquiry_service.handle_product_query(
-            customer_message, entities, customer_id
+            customer_message, entities, customer_id,
+            tenant_id=context.get("tenant_id"), language=context.get("language", "bn")
         )
 
         return {
@@ -293,7 +374,8 @@ class DialogueManager:
         customer_id = context.get("customer_id")
 
         result = product_inquiry_service.handle_product_query(
-            customer_message, entities, customer_id
+            customer_message, entities, customer_id,
+            tenant_id=context.get("tenant_id"), language=context.get("language", "bn")
         )
 
         return {
@@ -317,7 +399,8 @@ class DialogueManager:
         customer_id = context.get("customer_id")
 
         result = product_inquiry_service.handle_product_query(
-            customer_message, entities, customer_id
+            customer_message, entities, customer_id,
+            tenant_id=context.get("tenant_id"), language=context.get("language", "bn")
         )
 
         return {
@@ -341,7 +424,8 @@ class DialogueManager:
         customer_id = context.get("customer_id")
 
         result = product_inquiry_service.handle_product_query(
-            customer_message, entities, customer_id
+            customer_message, entities, customer_id,
+            tenant_id=context.get("tenant_id"), language=context.get("language", "bn")
         )
 
         return {
@@ -366,7 +450,8 @@ class DialogueManager:
         customer_id = context.get("customer_id")
 
         result = product_inquiry_service.handle_product_query(
-            customer_message, entities, customer_id
+            customer_message, entities, customer_id,
+            tenant_id=context.get("tenant_id"), language=context.get("language", "bn")
         )
 
         return {
@@ -0,0 +1,179 @@
+"""
+Dialogue state store
+Keeps each conversation's DialogueState keyed by (tenant_id, channel,
+customer_id) so multi-turn slot filling survives between messages. States are
+stored as compact JSON in an in-process LRU tier and, when enabled, in Redis,
+so any worker or node can continue a conversation. Redis is authoritative when
+reachable; the local tier serves single-process deployments and Redis outages.
+"""
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+import json
+import threading
+import time
+
+from app.core.config import settings
+from app.routers.metrics import dialogue_state_requests
+from app.services.dialogue_manager import DialogueState
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - redis is optional at runtime
+    aioredis = None
+
+# Redis must never stall a turn; give up quickly and back off
+REDIS_TIMEOUT_SECONDS = 0.2
+REDIS_RETRY_AFTER_SECONDS = 30
+KEY_PREFIX = "dm:v1"
+
+
+def serialize_state(state: DialogueState) -> str:
+    return json.dumps(state.to_dict(), ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def deserialize_state(raw: str) -> DialogueState:
+    return DialogueState.from_dict(json.loads(raw))
+
+
+class DialogueStateStore:
+    def __init__(self, max_entries: int = 50000, ttl_seconds: int = 1800):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (serialized state, expires_at); serialized so callers never share a mutable state
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_down_until = 0.0
+
+    def make_key(self, tenant_id: Optional[str], channel: str, customer_id: str) -> str:
+        return f"{KEY_PREFIX}:{tenant_id or '_'}:{channel}:{customer_id}"
+
+    async def load(self, tenant_id: Optional[str], channel: str, customer_id: str) -> DialogueState:
+        """The conversation's state, or a fresh one"""
+        key = self.make_key(tenant_id, channel, customer_id)
+
+        raw = None
+        redis_answered = False
+        if self._redis_available():
+            raw = await self._get_redis(key)
+            # A failed call marks Redis down; otherwise a miss means another worker
+            # deleted the state or it expired, so this worker's copy is stale too
+            redis_answered = raw is not None or self._redis_available()
+            if redis_answered:
+                dialogue_state_requests.labels(tier="redis", result="hit" if raw else "miss").inc()
+                if raw is not None:
+                    self._set_local(key, raw)
+                else:
+                    with self._lock:
+                        self._entries.pop(key, None)
+        if not redis_answered:
+            raw = self._get_local(key)
+            dialogue_state_requests.labels(tier="memory", result="hit" if raw else "miss").inc()
+
+        if raw is None:
+            return DialogueState()
+        try:
+            return deserialize_state(raw)
+        except (ValueError, TypeError) as e:
+            print(f"Discarding unreadable dialogue state {key}: {e}")
+            return DialogueState()
+
+    async def save(self, tenant_id: Optional[str], channel: str, customer_id: str, state: DialogueState):
+        key = self.make_key(tenant_id, channel, customer_id)
+        raw = serialize_state(state)
+        self._set_local(key, raw)
+        if self._redis_available():
+            await self._set_redis(key, raw)
+
+    async def delete(self, tenant_id: Optional[str], channel: str, customer_id: str):
+        """Forget a conversation (e.g. when it is closed)"""
+        key = self.make_key(tenant_id, channel, customer_id)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self._redis_available():
+            try:
+                await self._get_redis_client().delete(key)
+            except Exception as e:
+                self._mark_redis_down(e)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "redis_enabled": settings.dialogue_state_redis_enabled,
+            "redis_available": self._redis_available(),
+        }
+
+    # In-process LRU tier
+
+    def _get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            raw, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    def _set_local(self, key: str, raw: str):
+        with self._lock:
+            self._entries[key] = (raw, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Redis tier
+
+    def _redis_available(self) -> bool:
+        return (
+            settings.dialogue_state_redis_enabled
+            and aioredis is not None
+            and time.monotonic() >= self._redis_down_until
+        )
+
+    def _get_redis_client(self):
+        if self._redis is None:
+            self._redis = aioredis.from_url(
+                settings.redis_url,
+                decode_responses=True,
+                socket_timeout=REDIS_TIMEOUT_SECONDS,
+                socket_connect_timeout=REDIS_TIMEOUT_SECONDS
+            )
+        return self._redis
+
+    def _mark_redis_down(self, error: Exception):
+        print(f"Dialogue state Redis tier unavailable, retrying in {REDIS_RETRY_AFTER_SECONDS}s: {error}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER_SECONDS
+
+    async def _get_redis(self, key: str) -> Optional[str]:
+        try:
+            return await self._get_redis_client().get(key)
+        except Exception as e:
+            self._mark_redis_down(e)
+            return None
+
+    async def _set_redis(self, key: str, raw: str):
+        try:
+            await self._get_redis_client().set(key, raw, ex=self.ttl_seconds)
+        except Exception as e:
+            self._mark_redis_down(e)
+
+    async def aclose(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+# Singleton instance
+dialogue_state_store = DialogueStateStore(
+    max_entries=settings.dialogue_state_max_entries,
+    ttl_seconds=settings.dialogue_state_ttl_seconds
+)
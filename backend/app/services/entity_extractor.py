@@ -0,0 +1,451 @@
+"""
+Deterministic entity extraction for Bangla / English / Banglish messages
+All entity patterns are compiled into one alternation and applied in a single
+scan over the message after Bangla, Devanagari and Arabic digits are folded to
+ASCII (once per message). Every match is returned with its span in the
+original text; values are normalized (ORD-XXXXXXXX ids, +8801XXXXXXXXX phones,
+float amounts, ISO dates, int quantities, canonical payment methods).
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import json
+import re
+import threading
+import time
+
+from app.core.config import settings
+from app.db.models import Entity
+
+# Bangla, Devanagari and Arabic-Indic digits folded to ASCII; a 1:1 character
+# mapping, so spans in the folded text are spans in the original
+DIGIT_FOLD = str.maketrans({
+    **{chr(0x09E6 + i): str(i) for i in range(10)},
+    **{chr(0x0966 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+})
+
+# Word boundaries that also hold next to Bangla vowel signs (which \w does not cover)
+_B = r"(?<![\wঀ-৿])"
+_E = r"(?![\wঀ-৿])"
+# Bangla case endings on a matched word ("বিকাশে", "বিকাশের")
+_BN_SUFFIX = r"(?:ের|ে|র|এ)?"
+_NUMBER = r"\d+(?:,\d{2,3})*(?:\.\d+)?"
+
+MONTHS = {
+    "jan": 1, "january": 1, "জানুয়ারি": 1, "জানুয়ারী": 1,
+    "feb": 2, "february": 2, "ফেব্রুয়ারি": 2, "ফেব্রুয়ারী": 2,
+    "mar": 3, "march": 3, "মার্চ": 3,
+    "apr": 4, "april": 4, "এপ্রিল": 4,
+    "may": 5, "মে": 5,
+    "jun": 6, "june": 6, "জুন": 6,
+    "jul": 7, "july": 7, "জুলাই": 7,
+    "aug": 8, "august": 8, "আগস্ট": 8,
+    "sep": 9, "sept": 9, "september": 9, "সেপ্টেম্বর": 9,
+    "oct": 10, "october": 10, "অক্টোবর": 10,
+    "nov": 11, "november": 11, "নভেম্বর": 11,
+    "dec": 12, "december": 12, "ডিসেম্বর": 12,
+}
+
+RELATIVE_DATES = {
+    "today": "today", "ajke": "today", "aaj": "today", "আজ": "today", "আজকে": "today",
+    "tomorrow": "tomorrow", "agamikal": "tomorrow", "আগামীকাল": "tomorrow",
+    "yesterday": "yesterday", "gotokal": "yesterday", "গতকাল": "yesterday",
+}
+
+PAYMENT_METHODS = {
+    "bkash": "bkash", "বিকাশ": "bkash",
+    "nagad": "nagad", "নগদ": "nagad",
+    "rocket": "rocket", "রকেট": "rocket",
+    "upay": "upay",
+    "cash on delivery": "cash_on_delivery", "cod": "cash_on_delivery", "ক্যাশ অন ডেলিভারি": "cash_on_delivery",
+    "card": "card", "visa": "card", "mastercard": "card", "কার্ড": "card",
+    "bank transfer": "bank_transfer", "ব্যাংক ট্রান্সফার": "bank_transfer",
+}
+
+
+def _alternation(words) -> str:
+    # Longest first so "cash on delivery" wins over shorter prefixes
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+class EntityMatch(NamedTuple):
+    field: str
+    value: Any
+    start: int
+    end: int
+    text: str
+
+
+# (name, field, pattern) in priority order: at any position the first
+# alternative that matches wins, and matches never overlap
+ENTITY_PATTERNS: List[Tuple[str, str, str]] = [
+    ("email", "email", r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
+    ("order_code", "order_id", r"(?<![A-Za-z0-9])ORD-[A-Z0-9]{8}(?![A-Za-z0-9])"),
+    ("phone", "phone", r"(?<![\d+])(?:\+?880[\s-]?1|(?:\+?88[\s-]?)?01)[3-9](?:[\s-]?\d){8}(?!\d)"),
+    ("order_number", "order_id",
+     r"(?:(?<![A-Za-z])order(?:\s*(?:no|number|id))?\.?|অর্ডার(?:\s*(?:নং|নম্বর))?)\s*[:#]?\s*#?\s*(\d+)(?![\d.,])"
+     r"|#\s*(\d+)(?![\d.,])"),
+    ("amount", "amount",
+     rf"(?:৳|(?<![A-Za-z])(?:tk|taka|bdt|rs)\.?|টাকা)\s*({_NUMBER})(?:\s*/-)?"
+     rf"|({_NUMBER})\s*(?:৳|/-|(?:tk|taka|bdt)(?![A-Za-z])|টাকা)"),
+    ("iso_date", "date", r"(?<!\d)(\d{4})-(\d{1,2})-(\d{1,2})(?!\d)"),
+    ("numeric_date", "date", r"(?<!\d)(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})(?!\d)"),
+    ("month_date", "date",
+     rf"(?<!\d)(\d{{1,2}})\s*(?:st|nd|rd|th|ই|শে|তারিখ)?\s*({_alternation(MONTHS)}){_BN_SUFFIX}{_E}(?:,?\s*(\d{{4}}))?"),
+    ("relative_date", "date", rf"{_B}({_alternation(RELATIVE_DATES)}){_BN_SUFFIX}{_E}"),
+    ("quantity", "quantity",
+     rf"(?<![\d.,])(\d+)(?:\s*(?:টি|টা|খানা|pcs|pc|pieces|piece|units?|items?|ta|ti)|x){_E}"
+     rf"|{_B}(?:x(\d+)|qty\.?:?\s*(\d+))(?!\d)"),
+    ("payment_method", "payment_method", rf"{_B}({_alternation(PAYMENT_METHODS)}){_BN_SUFFIX}{_E}"),
+]
+
+
+def _groups(match) -> List[str]:
+    return [group for group in match.groups() if group is not None]
+
+
+def _first_group(match) -> Optional[str]:
+    groups = _groups(match)
+    return groups[0] if groups else match.group(0)
+
+
+def _phone(match) -> Optional[str]:
+    digits = re.sub(r"\D", "", match.group(0))
+    return f"+880{digits[-10:]}"
+
+
+def _amount(match) -> Optional[float]:
+    return float(_groups(match)[0].replace(",", ""))
+
+
+def _iso(year: int, month: int, day: int) -> Optional[str]:
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def _iso_date(match) -> Optional[str]:
+    year, month, day = (int(group) for group in match.groups())
+    return _iso(year, month, day)
+
+
+def _numeric_date(match) -> Optional[str]:
+    # Bangladesh writes dates day first
+    day, month, year = match.groups()
+    year_value = int(year) + (2000 if len(year) == 2 else 0)
+    return _iso(year_value, int(month), int(day))
+
+
+def _month_date(match) -> Optional[str]:
+    day, month_name, year = match.groups()
+    month = MONTHS[month_name.lower()]
+    if year:
+        return _iso(int(year), month, int(day))
+    # ISO 8601 date without a year
+    return f"--{month:02d}-{int(day):02d}" if 1 <= int(day) <= 31 else None
+
+
+def _quantity(match) -> Optional[int]:
+    value = int(_groups(match)[0])
+    return value if 0 < value <= 10000 else None
+
+
+VALUE_PARSERS: Dict[str, Callable[[Any], Any]] = {
+    "email": lambda match: match.group(0).lower(),
+    "order_code": lambda match: match.group(0).upper(),
+    "phone": _phone,
+    "order_number": lambda match: _groups(match)[0],
+    "amount": _amount,
+    "iso_date": _iso_date,
+    "numeric_date": _numeric_date,
+    "month_date": _month_date,
+    "relative_date": lambda match: RELATIVE_DATES[match.group(1).lower()],
+    "quantity": _quantity,
+    "payment_method": lambda match: PAYMENT_METHODS[match.group(1).lower()],
+}
+
+
+class EntityExtractor:
+    """
+    Compiled single-scan extractor. Each pattern is also compiled on its own to
+    parse the value of a match found by the combined scan; patterns without a
+    value parser yield their first capture group, else the whole match.
+    """
+
+    def __init__(
+        self,
+        patterns: Optional[List[Tuple[str, str, str]]] = None,
+        parsers: Optional[Dict[str, Callable[[Any], Any]]] = None,
+        flags: int = re.IGNORECASE
+    ):
+        self.patterns = list(ENTITY_PATTERNS if patterns is None else patterns)
+        self.parsers = VALUE_PARSERS if parsers is None else parsers
+        self.fields = {name: field for name, field, _ in self.patterns}
+        self._compiled = {name: re.compile(pattern, flags) for name, _, pattern in self.patterns}
+        self._scanner = re.compile(
+            "|".join(f"(?P<{name}>{pattern})" for name, _, pattern in self.patterns),
+            flags
+        )
+
+    def extract(self, text: Optional[str]) -> List[EntityMatch]:
+        """All entity matches in the text, in order, with spans into the original text"""
+        text = text or ""
+        return self.extract_folded(text, text.translate(DIGIT_FOLD))
+
+    def extract_folded(self, text: str, folded: str) -> List[EntityMatch]:
+        """extract() for a caller that already folded the digits"""
+        if not self.patterns:
+            return []
+        matches: List[EntityMatch] = []
+        for match in self._scanner.finditer(folded):
+            name = match.lastgroup
+            start, end = match.span()
+            # Re-match the winning pattern alone to read its own groups
+            own = self._compiled[name].fullmatch(folded, start, end)
+            parser = self.parsers.get(name, _first_group)
+            value = parser(own) if own else None
+            if value is not None:
+                matches.append(EntityMatch(self.fields[name], value, start, end, text[start:end]))
+        return matches
+
+    def extract_entities(self, text: Optional[str]) -> Dict[str, Any]:
+        """{field: value} with the first match per field, the shape NLU results use"""
+        return to_entities(self.extract(text))
+
+
+def to_entities(matches: List[EntityMatch]) -> Dict[str, Any]:
+    entities: Dict[str, Any] = {}
+    for match in matches:
+        entities.setdefault(match.field, match.value)
+    return entities
+
+
+_TOKEN_RE = re.compile(r"[\wঀ-৿]+")
+# Bangla case endings tried when a token does not match as written ("ঢাকায়" -> "ঢাকা")
+_BN_ENDINGS = ("য়ের", "\u09dfের", "তে", "ের", "কে", "য়", "\u09df", "ে", "র")
+# Named groups in tenant patterns would clash inside the combined alternation
+_NAMED_GROUP_RE = re.compile(r"\(\?P<\w+>")
+# Backreferences (renumbered inside the alternation) and global inline flags
+# ("(?i)", only valid at the start of a whole pattern) keep a tenant pattern
+# out of the combined scan
+_STANDALONE_RE = re.compile(r"\\[1-9]|\\g<|\(\?P=|\(\?[aiLmsux]+\)")
+
+
+def _compiles(pattern: str) -> bool:
+    try:
+        re.compile(pattern)
+        return True
+    except re.error:
+        return False
+
+
+def _token_forms(token: str) -> Tuple[str, ...]:
+    """The token, then the token without a Bangla case ending"""
+    for ending in _BN_ENDINGS:
+        if token.endswith(ending) and len(token) > len(ending):
+            return (token, token[:-len(ending)])
+    return (token,)
+
+
+class DictionaryTrie:
+    """
+    Token trie over dictionary entity terms. Matching walks the trie from each
+    token of the message and keeps the longest term (leftmost-longest, no overlaps).
+    """
+
+    def __init__(self):
+        self.root: Dict[Any, Any] = {}
+        self.terms = 0
+
+    def add(self, term: str, field: str, value: Any):
+        tokens = [token.lower() for token in _TOKEN_RE.findall(term.translate(DIGIT_FOLD))]
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[None] = (field, value)
+        self.terms += 1
+
+    def extract_folded(self, text: str, folded: str) -> List[EntityMatch]:
+        if not self.root:
+            return []
+        tokens = [(_token_forms(m.group(0).lower()), m.start(), m.end()) for m in _TOKEN_RE.finditer(folded)]
+        matches: List[EntityMatch] = []
+        i = 0
+        while i < len(tokens):
+            node, best = self.root, None
+            for j in range(i, len(tokens)):
+                node = next((node[form] for form in tokens[j][0] if form in node), None)
+                if node is None:
+                    break
+                if None in node:
+                    best = (j, node[None])
+            if best is None:
+                i += 1
+                continue
+            j, (field, value) = best
+            start, end = tokens[i][1], tokens[j][2]
+            matches.append(EntityMatch(field, value, start, end, text[start:end]))
+            i = j + 1
+        return matches
+
+
+def parse_dictionary(pattern: Optional[str]) -> Dict[str, List[str]]:
+    """
+    Dictionary entity pattern as {canonical value: [terms]}. Accepts a JSON
+    object {canonical: [synonyms] | synonym}, a JSON list of terms, or a
+    comma/newline separated list.
+    """
+    try:
+        data = json.loads(pattern or "[]")
+    except json.JSONDecodeError:
+        data = [term.strip() for term in re.split(r"[,\n]", pattern or "") if term.strip()]
+
+    if isinstance(data, dict):
+        return {
+            str(canonical): [str(canonical)] + ([str(s) for s in synonyms] if isinstance(synonyms, list) else [str(synonyms)])
+            for canonical, synonyms in data.items()
+        }
+    if isinstance(data, list):
+        return {str(term): [str(term)] for term in data}
+    return {}
+
+
+class TenantEntityExtractor:
+    """
+    A tenant's custom entities: "regex" Entities compiled into one combined
+    alternation (with only their own flags), every "dictionary" Entity loaded
+    into one token trie. A pattern that cannot share the alternation is
+    scanned on its own.
+    """
+
+    def __init__(self, entities: List[Tuple[str, str, Optional[str]]]):
+        patterns: List[Tuple[str, str, str]] = []
+        # (field, compiled pattern) scanned separately
+        self.standalone: List[Tuple[str, re.Pattern]] = []
+        self.trie = DictionaryTrie()
+        for i, (name, entity_type, pattern) in enumerate(entities):
+            if entity_type == "regex" and pattern:
+                try:
+                    compiled = re.compile(pattern)
+                except re.error as e:
+                    print(f"Skipping invalid regex for entity {name}: {e}")
+                    continue
+                combined = _NAMED_GROUP_RE.sub("(", pattern)
+                if _STANDALONE_RE.search(pattern) or not _compiles(f"(?P<tenant_{i}>{combined})"):
+                    self.standalone.append((name, compiled))
+                else:
+                    patterns.append((f"tenant_{i}", name, combined))
+            elif entity_type == "dictionary":
+                for canonical, terms in parse_dictionary(pattern).items():
+                    for term in terms:
+                        self.trie.add(term, name, canonical)
+
+        try:
+            self.regex = EntityExtractor(patterns, parsers={}, flags=0)
+        except re.error as e:
+            # Should not happen after the per-pattern checks; scan them one by one rather than fail
+            print(f"Scanning tenant entity patterns separately: {e}")
+            self.standalone = [(name, re.compile(pattern)) for _, name, pattern in patterns] + self.standalone
+            self.regex = EntityExtractor([], parsers={}, flags=0)
+
+    def extract(self, text: Optional[str]) -> List[EntityMatch]:
+        text = text or ""
+        if not self.regex.patterns and not self.standalone and not self.trie.root:
+            return []
+        folded = text.translate(DIGIT_FOLD)
+        matches = self.regex.extract_folded(text, folded) + self.trie.extract_folded(text, folded)
+        for name, compiled in self.standalone:
+            for match in compiled.finditer(folded):
+                value = _first_group(match)
+                if value is not None:
+                    matches.append(EntityMatch(name, value, match.start(), match.end(), text[match.start():match.end()]))
+        return sorted(matches, key=lambda match: match.start)
+
+    def extract_entities(self, text: Optional[str]) -> Dict[str, Any]:
+        return to_entities(self.extract(text))
+
+
+class TenantEntityExtractorRegistry:
+    """
+    Per-tenant compiled extractors keyed by (max(Entity.version), row count).
+    The entities router invalidates a tenant on every change; other workers
+    notice the new version within settings.entity_version_check_seconds.
+    """
+
+    def __init__(self):
+        self._extractors: Dict[str, Tuple[Optional[Tuple[int, int]], TenantEntityExtractor, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: str) -> TenantEntityExtractor:
+        now = time.monotonic()
+        entry = self._extractors.get(tenant_id)
+        if entry is not None and now - entry[2] < settings.entity_version_check_seconds:
+            return entry[1]
+
+        with self._lock:
+            entry = self._extractors.get(tenant_id)
+            if entry is not None and now - entry[2] < settings.entity_version_check_seconds:
+                return entry[1]
+
+            version = load_tenant_entity_version(tenant_id)
+            if entry is not None and version is not None and entry[0] == version:
+                extractor = entry[1]
+            else:
+                try:
+                    extractor = TenantEntityExtractor(load_tenant_entities(tenant_id))
+                except re.error as e:
+                    # One bad pattern must not take the tenant's NLU down; keep what was loaded before
+                    print(f"Failed to compile entities for tenant {tenant_id}: {e}")
+                    extractor = entry[1] if entry is not None else TenantEntityExtractor([])
+            self._extractors[tenant_id] = (version, extractor, now)
+        return extractor
+
+    def invalidate(self, tenant_id: str):
+        """Drop a tenant's extractor so it is recompiled on next use"""
+        self._extractors.pop(tenant_id, None)
+
+
+def load_tenant_entity_version(tenant_id: str) -> Optional[Tuple[int, int]]:
+    """(max(Entity.version), row count) for a tenant, None if the database is unavailable"""
+    # Imported lazily to keep this module usable without a configured database
+    from sqlalchemy import func
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        max_version, count = db.query(func.max(Entity.version), func.count(Entity.id)).filter(
+            Entity.tenant_id == tenant_id
+        ).one()
+        return (max_version or 0, count)
+    except Exception as e:
+        print(f"Failed to load entity version for tenant {tenant_id}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+def load_tenant_entities(tenant_id: str) -> List[Tuple[str, str, Optional[str]]]:
+    """A tenant's regex and dictionary entities as (name, entity_type, pattern)"""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return [
+            (name, entity_type, pattern)
+            for name, entity_type, pattern in db.query(Entity.name, Entity.entity_type, Entity.pattern).filter(
+                Entity.tenant_id == tenant_id,
+                Entity.entity_type.in_(("regex", "dictionary"))
+            ).order_by(Entity.id).all()
+        ]
+    except Exception as e:
+        print(f"Failed to load entities for tenant {tenant_id}: {e}")
+        return []
+    finally:
+        db.close()
+
+
+# Singleton instances
+entity_extractor = EntityExtractor()
+tenant_entity_extractors = TenantEntityExtractorRegistry()
@@ -0,0 +1,166 @@
+"""
+Few-shot example selection for LLM intent prompts
+A local char n-gram vector index over labelled examples picks the k most similar
+examples and a short list of candidate intents for each message, so prompts stay
+small no matter how many intents a tenant defines
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import threading
+
+import numpy as np
+
+from app.db.models import Intent, IntentStatus
+from app.services.intent_classifier import CharNgramVectorizer, load_tenant_utterances
+
+
+class Shortlist(NamedTuple):
+    intents: List[str]
+    examples: List[Tuple[str, str]]  # (text, intent)
+
+
+class ExampleIndex:
+    """
+    Inverted index (CSC layout: n-gram -> examples) of L2-normalized TF-IDF vectors.
+    A query costs one gather over the postings of its n-grams and one bincount.
+    """
+
+    def __init__(self, examples: Dict[str, List[str]], descriptions: Optional[Dict[str, str]] = None):
+        self.descriptions = dict(descriptions or {})
+        self.intents: List[str] = list(dict.fromkeys(list(self.descriptions) + list(examples)))
+        intent_ids = {intent: i for i, intent in enumerate(self.intents)}
+
+        seen = set()
+        self.texts: List[str] = []
+        example_intents: List[int] = []
+        for intent, texts in examples.items():
+            for text in texts:
+                if text and text.strip() and (text, intent) not in seen:
+                    seen.add((text, intent))
+                    self.texts.append(text)
+                    example_intents.append(intent_ids[intent])
+        self.example_intents = np.array(example_intents, dtype=np.int32)
+        indexed = set(example_intents)
+        self.unindexed_intents = [intent for i, intent in enumerate(self.intents) if i not in indexed]
+
+        self.vectorizer = CharNgramVectorizer().fit(self.texts)
+        rows, cols, vals = [], [], []
+        for row, text in enumerate(self.texts):
+            idx, weights = self.vectorizer.transform_sparse(text)
+            rows.append(np.full(idx.size, row, dtype=np.int32))
+            cols.append(idx)
+            vals.append(weights)
+
+        vocab_size = len(self.vectorizer.vocabulary)
+        if self.texts:
+            rows_arr, cols_arr, vals_arr = np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+            order = np.argsort(cols_arr, kind="stable")
+            self._postings = rows_arr[order]
+            self._weights = vals_arr[order]
+            self._indptr = np.searchsorted(cols_arr[order], np.arange(vocab_size + 1)).astype(np.int64)
+        else:
+            self._postings = np.zeros(0, dtype=np.int32)
+            self._weights = np.zeros(0, dtype=np.float32)
+            self._indptr = np.zeros(vocab_size + 1, dtype=np.int64)
+
+    def similarities(self, text: str) -> np.ndarray:
+        """Cosine similarity of the text against every indexed example"""
+        scores = np.zeros(len(self.texts), dtype=np.float32)
+        q_idx, q_weights = self.vectorizer.transform_sparse(text)
+        if q_idx.size == 0 or not self.texts:
+            return scores
+
+        starts, ends = self._indptr[q_idx], self._indptr[q_idx + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return scores
+
+        # Flat positions of every posting of every query n-gram
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        positions = offsets + np.arange(total)
+        weights = self._weights[positions] * np.repeat(q_weights, lengths)
+        return np.bincount(self._postings[positions], weights=weights, minlength=len(self.texts)).astype(np.float32)
+
+    def shortlist(self, text: str, k_examples: int = 6, n_candidates: int = 5) -> Shortlist:
+        """
+        Top intents by best example similarity, intents with no indexed examples
+        (they cannot be retrieved) and "fallback", plus the k most similar examples
+        among them. All intents are returned when nothing matches.
+        """
+        sims = self.similarities(text)
+        intent_scores = np.zeros(len(self.intents), dtype=np.float32)
+        if sims.size:
+            np.maximum.at(intent_scores, self.example_intents, sims)
+
+        if not intent_scores.size or float(intent_scores.max()) <= 0.0:
+            return Shortlist(list(self.intents), [])
+
+        ranked = np.argsort(-intent_scores, kind="stable")
+        candidates = [self.intents[i] for i in ranked[:n_candidates] if intent_scores[i] > 0]
+        candidates += [intent for intent in self.unindexed_intents if intent not in candidates]
+
+        allowed = {self.intents.index(intent) for intent in candidates}
+        examples: List[Tuple[str, str]] = []
+        for i in np.argsort(-sims, kind="stable"):
+            if sims[i] <= 0 or len(examples) >= k_examples:
+                break
+            if int(self.example_intents[i]) in allowed:
+                examples.append((self.texts[i], self.intents[self.example_intents[i]]))
+        return Shortlist(candidates, examples)
+
+
+class ExampleIndexRegistry:
+    """
+    Per-tenant example indexes over the built-in intent examples plus the
+    tenant's train-split Utterances and active Intent descriptions
+    """
+
+    def __init__(self, base_examples: Dict[str, List[str]], base_descriptions: Dict[str, str]):
+        self.base_examples = base_examples
+        self.base_descriptions = base_descriptions
+        self._indexes: Dict[str, ExampleIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: Optional[str] = None) -> ExampleIndex:
+        key = tenant_id or ""
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                examples = {intent: list(texts) for intent, texts in self.base_examples.items()}
+                descriptions = dict(self.base_descriptions)
+                if tenant_id:
+                    for intent, texts in load_tenant_utterances(tenant_id, split="train").items():
+                        examples.setdefault(intent, []).extend(texts)
+                    descriptions.update(load_tenant_intent_descriptions(tenant_id))
+                index = ExampleIndex(examples, descriptions)
+                self._indexes[key] = index
+        return index
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        """Drop a tenant's index so it is rebuilt on next use"""
+        self._indexes.pop(tenant_id or "", None)
+
+
+def load_tenant_intent_descriptions(tenant_id: str) -> Dict[str, str]:
+    """Active tenant intents as {name: description}"""
+    # Imported lazily to keep this module usable without a configured database
+    from app.db.session import SessionLocal
+
+    descriptions: Dict[str, str] = {}
+    db = SessionLocal()
+    try:
+        rows = db.query(Intent.name, Intent.description).filter(
+            Intent.tenant_id == tenant_id,
+            Intent.status == IntentStatus.active
+        ).all()
+        for name, description in rows:
+            descriptions[name] = description or name.replace("_", " ")
+    except Exception as e:
+        print(f"Failed to load intents for tenant {tenant_id}: {e}")
+    finally:
+        db.close()
+    return descriptions
@@ -0,0 +1,412 @@
+"""
+Local intent classifier for offline, sub-millisecond intent classification
+Character n-gram TF-IDF vectors scored against per-intent centroids with NumPy
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.models import Intent, Utterance
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _prepare(text: str) -> str:
+    """Lowercase, NFC-normalize and collapse whitespace"""
+    text = unicodedata.normalize("NFC", text or "").lower()
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class CharNgramVectorizer:
+    """
+    Character n-gram TF-IDF vectorizer (word-boundary aware, like char_wb)
+    Works for Bangla, Latin, Devanagari and Arabic scripts alike.
+    """
+
+    def __init__(self, ngram_range: Tuple[int, int] = (2, 4), max_features: int = 50000):
+        self.ngram_range = ngram_range
+        self.max_features = max_features
+        self.vocabulary: Dict[str, int] = {}
+        self.idf: np.ndarray = np.zeros(0, dtype=np.float32)
+
+    def _ngrams(self, text: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        low, high = self.ngram_range
+        for word in _prepare(text).split(" "):
+            if not word:
+                continue
+            padded = f" {word} "
+            length = len(padded)
+            for n in range(low, high + 1):
+                if n > length:
+                    break
+                for i in range(length - n + 1):
+                    gram = padded[i:i + n]
+                    counts[gram] = counts.get(gram, 0) + 1
+        return counts
+
+    def fit(self, texts: List[str]) -> "CharNgramVectorizer":
+        doc_freq: Dict[str, int] = {}
+        for text in texts:
+            for gram in self._ngrams(text):
+                doc_freq[gram] = doc_freq.get(gram, 0) + 1
+
+        # Keep the most frequent n-grams if the vocabulary is too large
+        grams = sorted(doc_freq, key=lambda g: (-doc_freq[g], g))[:self.max_features]
+        self.vocabulary = {gram: i for i, gram in enumerate(grams)}
+
+        n_docs = max(len(texts), 1)
+        self.idf = np.array(
+            [math.log((1 + n_docs) / (1 + doc_freq[g])) + 1.0 for g in grams],
+            dtype=np.float32
+        )
+        return self
+
+    def transform_sparse(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (indices, L2-normalized weights) for a single text"""
+        counts = self._ngrams(text)
+        indices = [self.vocabulary[g] for g in counts if g in self.vocabulary]
+        if not indices:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+
+        idx = np.array(indices, dtype=np.int32)
+        tf = np.array([counts[g] for g in counts if g in self.vocabulary], dtype=np.float32)
+        weights = (1.0 + np.log(tf)) * self.idf[idx]
+        norm = float(np.linalg.norm(weights))
+        if norm > 0:
+            weights /= norm
+        return idx, weights
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        """Dense (n_texts, vocab) matrix of L2-normalized TF-IDF rows"""
+        matrix = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            idx, weights = self.transform_sparse(text)
+            matrix[row, idx] = weights
+        return matrix
+
+
+class LocalIntentClassifier:
+    """
+    Nearest-centroid linear classifier over char n-gram TF-IDF vectors.
+    Classification is one sparse dot product against the centroid matrix.
+    """
+
+    def __init__(self, min_similarity: float = 0.15, temperature: float = 12.0):
+        self.vectorizer = CharNgramVectorizer()
+        self.labels: List[str] = []
+        self.centroids: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+        self.min_similarity = min_similarity
+        self.temperature = temperature
+        self.examples_count = 0
+        self.version: str = ""
+
+    @property
+    def is_trained(self) -> bool:
+        return bool(self.labels)
+
+    def fit(self, examples: Dict[str, List[str]]) -> "LocalIntentClassifier":
+        """Train from {intent: [example texts]}"""
+        texts: List[str] = []
+        targets: List[str] = []
+        for intent, intent_texts in examples.items():
+            for text in intent_texts:
+                if text and text.strip():
+                    texts.append(text)
+                    targets.append(intent)
+
+        self.labels = sorted(set(targets))
+        self.examples_count = len(texts)
+        if not texts:
+            self.centroids = np.zeros((0, 0), dtype=np.float32)
+            return self
+
+        self.vectorizer.fit(texts)
+        matrix = self.vectorizer.transform(texts)
+
+        label_index = {label: i for i, label in enumerate(self.labels)}
+        rows = np.array([label_index[t] for t in targets], dtype=np.int32)
+        centroids = np.zeros((len(self.labels), matrix.shape[1]), dtype=np.float32)
+        np.add.at(centroids, rows, matrix)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.centroids = centroids / norms
+        self.version = str(int(time.time()))
+        return self
+
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity of the text against every intent centroid"""
+        idx, weights = self.vectorizer.transform_sparse(text)
+        if idx.size == 0:
+            return np.zeros(len(self.labels), dtype=np.float32)
+        return self.centroids[:, idx] @ weights
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        Returns (intent, confidence)
+        Confidence is a softmax over centroid similarities, so it is comparable across intents.
+        """
+        if not self.is_trained:
+            return "fallback", 0.0
+
+        sims = self.scores(text)
+        best = int(np.argmax(sims))
+        if float(sims[best]) < self.min_similarity:
+            return "fallback", round(float(sims[best]), 4)
+
+        exp = np.exp((sims - sims[best]) * self.temperature)
+        confidence = float(exp[best] / exp.sum())
+        return self.labels[best], round(confidence, 4)
+
+    def save(self, path: str):
+        """
+        Write the model as a compressed .npz: the vocabulary as a fixed-width
+        string array, IDF weights and the centroids in CSR layout (they are
+        mostly zeros). The file is written next to the target and renamed into
+        place, so readers never see a partial artifact.
+        """
+        grams = sorted(self.vectorizer.vocabulary, key=self.vectorizer.vocabulary.get)
+        rows, cols = np.nonzero(self.centroids)
+        indptr = np.searchsorted(rows, np.arange(len(self.labels) + 1)).astype(np.int32)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    grams=np.array(grams, dtype=f"<U{self.vectorizer.ngram_range[1]}"),
+                    idf=self.vectorizer.idf.astype(np.float32),
+                    labels=np.array(self.labels, dtype=str),
+                    indptr=indptr,
+                    indices=cols.astype(np.int32),
+                    data=self.centroids[rows, cols].astype(np.float32),
+                    ngram_range=np.array(self.vectorizer.ngram_range, dtype=np.int32),
+                    params=np.array([self.min_similarity, self.temperature, self.examples_count], dtype=np.float64),
+                    version=np.array(self.version)
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "LocalIntentClassifier":
+        """Read a model written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            min_similarity, temperature, examples_count = data["params"].tolist()
+            classifier = cls(min_similarity=min_similarity, temperature=temperature)
+            classifier.examples_count = int(examples_count)
+            classifier.version = str(data["version"])
+            classifier.labels = data["labels"].tolist()
+
+            low, high = data["ngram_range"].tolist()
+            classifier.vectorizer = CharNgramVectorizer(ngram_range=(low, high))
+            classifier.vectorizer.vocabulary = {gram: i for i, gram in enumerate(data["grams"].tolist())}
+            classifier.vectorizer.idf = data["idf"]
+
+            indptr = data["indptr"]
+            centroids = np.zeros((len(classifier.labels), len(classifier.vectorizer.vocabulary)), dtype=np.float32)
+            rows = np.repeat(np.arange(len(classifier.labels)), np.diff(indptr))
+            centroids[rows, data["indices"]] = data["data"]
+            classifier.centroids = centroids
+        return classifier
+
+
+class LocalIntentClassifierRegistry:
+    """
+    Per-tenant local classifiers trained from the built-in intent examples
+    plus the tenant's Utterance rows with split="train". A tenant with a
+    published model artifact (see the training job runner) loads that instead
+    of training inline.
+    """
+
+    def __init__(self, base_examples: Optional[Dict[str, List[str]]] = None):
+        self.base_examples = base_examples or {}
+        self._classifiers: Dict[str, LocalIntentClassifier] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: Optional[str] = None) -> LocalIntentClassifier:
+        """Get (training on first use) the classifier for a tenant"""
+        key = tenant_id or ""
+        classifier = self._classifiers.get(key)
+        if classifier is not None:
+            return classifier
+
+        with self._lock:
+            classifier = self._classifiers.get(key)
+            if classifier is None:
+                classifier = load_published_model(tenant_id) if tenant_id else None
+                if classifier is None:
+                    classifier = LocalIntentClassifier(
+                        min_similarity=settings.local_intent_min_similarity
+                    ).fit(self._training_examples(tenant_id))
+                self._classifiers[key] = classifier
+        return classifier
+
+    def swap(self, tenant_id: Optional[str], classifier: LocalIntentClassifier):
+        """
+        Replace a tenant's classifier. Requests already holding the old model
+        finish with it; every later get() sees the new one.
+        """
+        with self._lock:
+            self._classifiers[tenant_id or ""] = classifier
+
+    def loaded_versions(self) -> Dict[str, str]:
+        """{tenant_id: model version} of the classifiers currently in memory"""
+        return {key: classifier.version for key, classifier in list(self._classifiers.items()) if key}
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        """Drop a tenant's classifier so it is retrained on next use"""
+        self._classifiers.pop(tenant_id or "", None)
+
+    def _training_examples(self, tenant_id: Optional[str]) -> Dict[str, List[str]]:
+        examples = {intent: list(texts) for intent, texts in self.base_examples.items()}
+        if not tenant_id:
+            return examples
+
+        for intent, texts in load_tenant_utterances(tenant_id, split="train").items():
+            examples.setdefault(intent, []).extend(texts)
+        return examples
+
+
+def model_artifact_path(tenant_id: str, version: str) -> str:
+    return os.path.join(settings.model_artifact_dir, tenant_id, f"{version}.npz")
+
+
+def published_model_version(tenant_id: str) -> Optional[str]:
+    """Version named by a tenant's "current" pointer file, if a model was published"""
+    try:
+        with open(os.path.join(settings.model_artifact_dir, tenant_id, "current"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def publish_model_version(tenant_id: str, version: str):
+    """Point a tenant's "current" file at a saved artifact (atomic rename)"""
+    directory = os.path.join(settings.model_artifact_dir, tenant_id)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(directory, "current"))
+
+
+def load_published_model(tenant_id: str) -> Optional[LocalIntentClassifier]:
+    """Load a tenant's published model artifact, or None if there is none"""
+    version = published_model_version(tenant_id)
+    if not version:
+        return None
+    try:
+        return LocalIntentClassifier.load(model_artifact_path(tenant_id, version))
+    except Exception as e:
+        print(f"Failed to load NLU model {version} for tenant {tenant_id}: {e}")
+        return None
+
+
+def load_tenant_utterances(tenant_id: str, split: str = "train") -> Dict[str, List[str]]:
+    """Load a tenant's labelled utterances for a split as {intent_name: [texts]}"""
+    # Imported lazily to keep this module usable without a configured database
+    from app.db.session import SessionLocal
+
+    examples: Dict[str, List[str]] = {}
+    db = SessionLocal()
+    try:
+        rows = db.query(Utterance.text, Intent.name).join(
+            Intent, Utterance.intent_id == Intent.id
+        ).filter(
+            Utterance.tenant_id == tenant_id,
+            Utterance.split == split
+        ).all()
+        for text, intent_name in rows:
+            examples.setdefault(intent_name, []).append(text)
+    except Exception as e:
+        print(f"Failed to load utterances for tenant {tenant_id}: {e}")
+    finally:
+        db.close()
+    return examples
+
+
+def evaluate_model(classifier: LocalIntentClassifier, examples: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Accuracy and macro F1 of a classifier on {intent: [texts]}"""
+    pairs = [(text, intent) for intent, texts in examples.items() for text in texts if text and text.strip()]
+    if not pairs:
+        return {"dev_examples": 0, "dev_accuracy": None, "dev_macro_f1": None}
+
+    counts: Dict[str, List[int]] = {}  # intent -> [true positives, predicted, actual]
+    correct = 0
+    for text, expected in pairs:
+        predicted, _ = classifier.predict(text)
+        counts.setdefault(expected, [0, 0, 0])[2] += 1
+        counts.setdefault(predicted, [0, 0, 0])[1] += 1
+        if predicted == expected:
+            correct += 1
+            counts[expected][0] += 1
+
+    f1_scores = []
+    for intent in examples:
+        tp, predicted, actual = counts.get(intent, [0, 0, 0])
+        precision = tp / predicted if predicted else 0.0
+        recall = tp / actual if actual else 0.0
+        f1_scores.append(2 * precision * recall / (precision + recall) if precision + recall else 0.0)
+    return {
+        "dev_examples": len(pairs),
+        "dev_accuracy": round(correct / len(pairs), 4),
+        "dev_macro_f1": round(sum(f1_scores) / len(f1_scores), 4),
+    }
+
+
+def train_tenant_model(
+    tenant_id: str,
+    version: str,
+    base_examples: Dict[str, List[str]],
+    config: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Train a tenant's model on its train split, evaluate it on the dev split and
+    save the artifact. Meant for a training pool process, so it takes and
+    returns plain data; publishing the version is left to the caller.
+    """
+    config = config or {}
+    start = time.perf_counter()
+
+    examples = {intent: list(texts) for intent, texts in base_examples.items()} if config.get("include_base_examples", True) else {}
+    for intent, texts in load_tenant_utterances(tenant_id, split="train").items():
+        examples.setdefault(intent, []).extend(texts)
+
+    classifier = LocalIntentClassifier(
+        min_similarity=float(config.get("min_similarity", settings.local_intent_min_similarity))
+    ).fit(examples)
+    if not classifier.is_trained:
+        raise ValueError("No training examples")
+    classifier.version = version
+    train_seconds = time.perf_counter() - start
+
+    metrics = {
+        "examples": classifier.examples_count,
+        "intents": len(classifier.labels),
+        "vocabulary": len(classifier.vectorizer.vocabulary),
+        "train_seconds": round(train_seconds, 3),
+    }
+    metrics.update(evaluate_model(classifier, load_tenant_utterances(tenant_id, split="dev")))
+
+    min_accuracy = config.get("min_dev_accuracy")
+    if min_accuracy is not None and metrics["dev_accuracy"] is not None and metrics["dev_accuracy"] < float(min_accuracy):
+        raise ValueError(f"Dev accuracy {metrics['dev_accuracy']} is below min_dev_accuracy {min_accuracy}")
+
+    path = model_artifact_path(tenant_id, version)
+    classifier.save(path)
+    metrics["artifact_bytes"] = os.path.getsize(path)
+    return {"version": version, "path": path, "metrics": metrics}
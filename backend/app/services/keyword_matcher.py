@@ -0,0 +1,117 @@
+"""
+Multi-pattern keyword matcher (Aho-Corasick)
+Finds every keyword of every label in a single pass over the text,
+instead of one substring scan per keyword
+"""
+from typing import Dict, Iterable, List, Set, Tuple
+from collections import deque
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - falls back to the pure-Python automaton
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over {label: [keywords]}.
+    Matching is substring-based (same semantics as `keyword in text`) and case-insensitive.
+    Uses the pyahocorasick C extension when installed, else a pure-Python automaton.
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]], use_extension: bool = True):
+        self.keywords: List[str] = []
+        # keyword id -> labels it belongs to (with multiplicity, like a keyword listed twice)
+        self.keyword_labels: List[List[str]] = []
+        self.labels: List[str] = list(keywords)
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+
+        keyword_ids: Dict[str, int] = {}
+        for label, words in keywords.items():
+            for word in words:
+                word = word.lower()
+                if not word:
+                    continue
+                if word not in keyword_ids:
+                    keyword_ids[word] = len(self.keywords)
+                    self.keywords.append(word)
+                    self.keyword_labels.append([])
+                    self._insert(word, keyword_ids[word])
+                self.keyword_labels[keyword_ids[word]].append(label)
+
+        self._build_failure_links()
+
+        self._automaton = None
+        if use_extension and ahocorasick is not None and self.keywords:
+            self._automaton = ahocorasick.Automaton(ahocorasick.STORE_INTS)
+            for keyword_id, word in enumerate(self.keywords):
+                self._automaton.add_word(word, keyword_id)
+            self._automaton.make_automaton()
+
+    def _insert(self, word: str, keyword_id: int):
+        node = 0
+        for ch in word:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = next_node
+        self._output[node] = self._output[node] + (keyword_id,)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                # Inherit matches that end here via the failure link
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    @property
+    def backend(self) -> str:
+        return "pyahocorasick" if self._automaton is not None else "python"
+
+    def matched_keywords(self, text: str) -> Set[int]:
+        """Ids of every keyword occurring in the text"""
+        if self._automaton is not None:
+            return {keyword_id for _, keyword_id in self._automaton.iter(text.lower())}
+
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[int] = set()
+        node = 0
+        for ch in text.lower():
+            next_node = goto[node].get(ch)
+            while next_node is None and node:
+                node = fail[node]
+                next_node = goto[node].get(ch)
+            node = next_node or 0
+            if output[node]:
+                found.update(output[node])
+        return found
+
+    def label_counts(self, text: str) -> Dict[str, int]:
+        """{label: number of that label's keywords found in the text}, in label order"""
+        counts: Dict[str, int] = {}
+        for keyword_id in self.matched_keywords(text):
+            for label in self.keyword_labels[keyword_id]:
+                counts[label] = counts.get(label, 0) + 1
+        # Keep label order so ties resolve like the per-label scan did
+        return {label: counts[label] for label in self.labels if label in counts}
+
+    def first_label(self, text: str, priority: Iterable[str]) -> str:
+        """First label in priority order with any keyword in the text, or "" """
+        found = {label for keyword_id in self.matched_keywords(text) for label in self.keyword_labels[keyword_id]}
+        for label in priority:
+            if label in found:
+                return label
+        return ""
@@ -0,0 +1,246 @@
+"""
+Language detection for bn / en / banglish / hi / ur / ar
+One pass over the text builds a script histogram from a precompiled table;
+Latin-script text is split into English vs romanized Bangla (Banglish) with a
+lexicon and an optional char n-gram naive Bayes model trained from stored turns
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import re
+import threading
+
+from app.core.config import settings
+
+LANGUAGES = ("bn", "en", "banglish", "hi", "ur", "ar")
+
+# Script tags written by the translate table
+BANGLA, LATIN, DEVANAGARI, ARABIC, URDU_MARK, ARABIC_MARK = "b", "l", "d", "a", "u", "q"
+
+
+def _build_script_table() -> List[Optional[str]]:
+    """
+    BMP code point -> script tag; None deletes the character (digits, spaces,
+    punctuation, emoji), so str.translate yields only the script tags
+    """
+    table: List[Optional[str]] = [None] * 0x10000
+    ranges = [
+        (0x0980, 0x09FF, BANGLA),
+        (0x0900, 0x097F, DEVANAGARI),
+        (0x0600, 0x06FF, ARABIC), (0x0750, 0x077F, ARABIC),
+        (0xFB50, 0xFDFF, ARABIC), (0xFE70, 0xFEFF, ARABIC),
+        (0x0041, 0x005A, LATIN), (0x0061, 0x007A, LATIN),
+        (0x00C0, 0x024F, LATIN),
+    ]
+    for start, end, tag in ranges:
+        for code in range(start, end + 1):
+            table[code] = tag
+    # Bangla and Devanagari digits are not language evidence
+    for code in list(range(0x09E6, 0x09F0)) + list(range(0x0966, 0x0970)) + list(range(0x0660, 0x066A)) + list(range(0x06F0, 0x06FA)):
+        table[code] = None
+    # Letters used by Urdu but not Arabic (ٹ ڈ ڑ ں ے ہ ھ گ چ پ ژ ک ی)
+    for ch in "ٹڈڑںےہھگچپژکی":
+        table[ord(ch)] = URDU_MARK
+    # Letters used by Arabic but not Urdu (ة ى ك ي أ إ)
+    for ch in "ةىكيأإ":
+        table[ord(ch)] = ARABIC_MARK
+    return table
+
+
+SCRIPT_TABLE = _build_script_table()
+
+# Share of Latin letters in Bangla-script text above which it is treated as mixed Banglish
+MIXED_LATIN_RATIO = 0.4
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Frequent romanized Bangla words that are not English words
+BANGLISH_WORDS = frozenset("""
+    ami amar amake apni apnar apnake tumi tomar tomake amra amader ora oder se tar
+    ki kii keno kemon kothay kothai kobe koto kotodin kokhon kivabe kar kake
+    ache achhe nai nei hobe hbe hoy hoyeche hoise hoyni holo chai chaai chacchi
+    korte korbo korben koren korchi korsi kore kora kori dite diben dilam dibo den
+    nite niben nibo pabo paben pelam pai paini jabe jabo asbe ashbe aseni ashe
+    dam daam taka tk bhai vai apu vaiya bhaiya dada valo bhalo onek ekta ekhon
+    ajke kalke aj kal ar na hae haan ji jodi tahole kintu ta ti er te theke
+    lagbe lagche dorkar bolun bolen janan dekhan pathan ferot bodle
+""".split())
+
+ENGLISH_WORDS = frozenset("""
+    the and or is are was were be been what where when why how who which this that
+    my your our their his her it its you we they i me us them please thanks thank
+    can could would should will shall do does did have has had not no yes with
+    for from to of in on at by about order price delivery product refund return
+""".split())
+
+
+def script_histogram(text: str) -> Dict[str, int]:
+    """Letter counts per script tag, from one translate pass over the text"""
+    tags = (text or "").translate(SCRIPT_TABLE)
+    return {tag: tags.count(tag) for tag in (BANGLA, LATIN, DEVANAGARI, ARABIC, URDU_MARK, ARABIC_MARK)}
+
+
+def _char_ngrams(text: str, low: int = 2, high: int = 4) -> Iterable[str]:
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                yield padded[i:i + n]
+
+
+class BanglishNaiveBayes:
+    """
+    Multinomial naive Bayes over char n-grams for Latin-script text:
+    English ("en") vs romanized Bangla ("banglish")
+    """
+
+    CLASSES = ("en", "banglish")
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.log_prior: Dict[str, float] = {}
+        self.log_likelihood: Dict[str, Dict[str, float]] = {}
+        self.log_unseen: Dict[str, float] = {}
+        self.samples = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return bool(self.log_prior)
+
+    def fit(self, samples: List[Tuple[str, str]]) -> "BanglishNaiveBayes":
+        counts: Dict[str, Dict[str, int]] = {label: {} for label in self.CLASSES}
+        docs = {label: 0 for label in self.CLASSES}
+        for text, label in samples:
+            if label not in counts:
+                continue
+            docs[label] += 1
+            label_counts = counts[label]
+            for gram in _char_ngrams(text):
+                label_counts[gram] = label_counts.get(gram, 0) + 1
+
+        self.samples = sum(docs.values())
+        if not all(docs.values()):
+            # Need examples of both classes
+            return self
+
+        vocabulary = set(counts["en"]) | set(counts["banglish"])
+        for label in self.CLASSES:
+            total = sum(counts[label].values()) + self.alpha * len(vocabulary)
+            self.log_prior[label] = math.log(docs[label] / self.samples)
+            self.log_likelihood[label] = {
+                gram: math.log((count + self.alpha) / total) for gram, count in counts[label].items()
+            }
+            self.log_unseen[label] = math.log(self.alpha / total)
+        return self
+
+    def log_odds(self, text: str) -> float:
+        """log P(banglish | text) - log P(en | text)"""
+        score = self.log_prior["banglish"] - self.log_prior["en"]
+        bl, en = self.log_likelihood["banglish"], self.log_likelihood["en"]
+        bl_unseen, en_unseen = self.log_unseen["banglish"], self.log_unseen["en"]
+        for gram in _char_ngrams(text):
+            score += bl.get(gram, bl_unseen) - en.get(gram, en_unseen)
+        return score
+
+
+class LanguageDetector:
+    def __init__(self):
+        self.naive_bayes: Optional[BanglishNaiveBayes] = None
+        self._training_attempted = False
+        self._lock = threading.Lock()
+
+    def detect(self, text: Optional[str], default: str = "en") -> str:
+        """Detect the language of a message; `default` is returned when it has no letters"""
+        text = text or ""
+        if text.isascii():
+            # O(1) check; pure ASCII text can only be English or romanized Bangla
+            return self.detect_latin(text) if _WORD_RE.search(text.lower()) else default
+
+        counts = script_histogram(text)
+        arabic = counts[ARABIC] + counts[URDU_MARK] + counts[ARABIC_MARK]
+        bangla, latin, devanagari = counts[BANGLA], counts[LATIN], counts[DEVANAGARI]
+        total = bangla + latin + devanagari + arabic
+        if total == 0:
+            return default
+
+        if bangla and bangla >= devanagari and bangla >= arabic:
+            return "banglish" if latin / total >= MIXED_LATIN_RATIO else "bn"
+        if arabic and arabic >= devanagari and arabic >= latin:
+            return "ur" if counts[URDU_MARK] > counts[ARABIC_MARK] else "ar"
+        if devanagari and devanagari >= latin:
+            return "hi"
+        return self.detect_latin(text)
+
+    def detect_latin(self, text: str) -> str:
+        """English vs romanized Bangla for Latin-script text"""
+        words = _WORD_RE.findall(text.lower())
+        banglish_hits = sum(1 for word in words if word in BANGLISH_WORDS)
+        english_hits = sum(1 for word in words if word in ENGLISH_WORDS)
+
+        # A clear lexicon vote wins; otherwise let the n-gram model decide if trained
+        if abs(banglish_hits - english_hits) >= 2:
+            return "banglish" if banglish_hits > english_hits else "en"
+
+        model = self._get_naive_bayes()
+        if model is not None and model.is_trained and words:
+            return "banglish" if model.log_odds(text) > 0 else "en"
+        return "banglish" if banglish_hits > english_hits else "en"
+
+    def _get_naive_bayes(self) -> Optional[BanglishNaiveBayes]:
+        """Explicitly trained model, else one trained lazily from stored turns when enabled"""
+        if self.naive_bayes is None and settings.language_nb_enabled and not self._training_attempted:
+            with self._lock:
+                if not self._training_attempted:
+                    self._training_attempted = True
+                    self.train_from_turns()
+        return self.naive_bayes
+
+    def train(self, samples: List[Tuple[str, str]]) -> BanglishNaiveBayes:
+        """Train the Banglish model from (text, "en" | "banglish") pairs"""
+        self.naive_bayes = BanglishNaiveBayes().fit(samples)
+        return self.naive_bayes
+
+    def train_from_turns(self, limit: Optional[int] = None) -> Optional[BanglishNaiveBayes]:
+        """
+        Train the Banglish model from stored user turns written in Latin script.
+        Turns labelled en/banglish in text_language are used as-is; the rest are
+        weakly labelled by a clear lexicon vote and skipped when ambiguous.
+        """
+        # Imported lazily to keep this module usable without a configured database
+        from app.db.session import SessionLocal
+        from app.db.models import Turn, TurnSpeaker
+
+        samples: List[Tuple[str, str]] = []
+        db = SessionLocal()
+        try:
+            rows = db.query(Turn.text, Turn.text_language).filter(
+                Turn.speaker == TurnSpeaker.user
+            ).order_by(Turn.id.desc()).limit(limit or settings.language_nb_max_turns).all()
+            for text, language in rows:
+                counts = script_histogram(text)
+                if not counts[LATIN] or counts[LATIN] < sum(counts.values()) - counts[LATIN]:
+                    continue
+                if language in BanglishNaiveBayes.CLASSES:
+                    samples.append((text, language))
+                    continue
+                words = _WORD_RE.findall(text.lower())
+                banglish_hits = sum(1 for word in words if word in BANGLISH_WORDS)
+                english_hits = sum(1 for word in words if word in ENGLISH_WORDS)
+                if abs(banglish_hits - english_hits) >= 2:
+                    samples.append((text, "banglish" if banglish_hits > english_hits else "en"))
+        except Exception as e:
+            print(f"Failed to load turns for language model training: {e}")
+        finally:
+            db.close()
+
+        if not samples:
+            return None
+        return self.train(samples)
+
+
+# Singleton instance
+language_detector = LanguageDetector()
+
+
+def detect_language(text: str, default: str = "en") -> str:
+    """Detect bn / en / banglish / hi / ur / ar with the shared detector"""
+    return language_detector.detect(text, default)
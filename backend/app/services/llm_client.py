@@ -0,0 +1,184 @@
+"""
+Shared asynchronous LLM client
+One pooled HTTP connection set for every OpenAI call (NLU, agent replies, TTS)
+with a concurrency limit, per-call timeouts, jittered retries and a circuit breaker
+"""
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+import openai
+
+from app.core.config import settings
+from app.routers.metrics import llm_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the circuit breaker is open and calls are short-circuited"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    closed -> open after `failure_threshold` failures; open -> half-open after
+    `reset_timeout` seconds; one successful trial call closes it again. While
+    the trial is in flight other calls are rejected as if it were open.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.half_open_trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out; in half-open, only the first caller (the trial) is let through"""
+        state = self.state
+        if state == "half_open":
+            if self.half_open_trial:
+                return False
+            self.half_open_trial = True
+            return True
+        return state == "closed"
+
+    def release_trial(self):
+        """End a trial that neither succeeded nor failed (e.g. cancelled or a non-retryable error)"""
+        self.half_open_trial = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.half_open_trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.state == "half_open":
+            self.opened_at = time.monotonic()
+        self.half_open_trial = False
+
+
+class LLMClient:
+    def __init__(self):
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.llm_circuit_failure_threshold,
+            reset_timeout=settings.llm_circuit_reset_seconds
+        )
+        self.in_flight = 0
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        """Lazily build the pooled AsyncOpenAI client"""
+        if self._client is None:
+            if not settings.openai_api_key:
+                raise ValueError("OpenAI API key not configured")
+
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_keepalive_connections
+                ),
+                timeout=httpx.Timeout(settings.llm_timeout_seconds, connect=settings.llm_connect_timeout_seconds)
+            )
+            self._client = openai.AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url or None,
+                http_client=self._http_client,
+                max_retries=0  # retries are handled here, with jitter and the circuit breaker
+            )
+        return self._client
+
+    async def _call(self, func, timeout: Optional[float], **params) -> Any:
+        trial = self.breaker.state == "half_open"
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+        try:
+            attempts = settings.llm_max_retries + 1
+            for attempt in range(attempts):
+                try:
+                    async with self._semaphore:
+                        self.in_flight += 1
+                        try:
+                            result = await func(timeout=timeout or settings.llm_timeout_seconds, **params)
+                        finally:
+                            self.in_flight -= 1
+                    self.breaker.record_success()
+                    self.calls += 1
+                    self._record_usage(getattr(result, "usage", None))
+                    return result
+                except RETRYABLE_ERRORS as e:
+                    self.breaker.record_failure()
+                    if attempt == attempts - 1 or self.breaker.state != "closed":
+                        raise
+                    # Exponential backoff with full jitter
+                    delay = random.uniform(0, settings.llm_retry_base_delay_seconds * (2 ** attempt))
+                    logger.warning(f"LLM call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+        finally:
+            if trial:
+                self.breaker.release_trial()
+
+    def _record_usage(self, usage):
+        if usage is None:
+            return
+        self.prompt_tokens += usage.prompt_tokens or 0
+        self.completion_tokens += usage.completion_tokens or 0
+        llm_tokens.labels(kind="prompt").inc(usage.prompt_tokens or 0)
+        llm_tokens.labels(kind="completion").inc(usage.completion_tokens or 0)
+
+    async def chat_completion(self, timeout: Optional[float] = None, **params) -> Any:
+        """chat.completions.create through the shared pool"""
+        return await self._call(self.client.chat.completions.create, timeout, **params)
+
+    async def speech(self, timeout: Optional[float] = None, **params) -> bytes:
+        """audio.speech.create through the shared pool; returns the audio bytes"""
+        response = await self._call(self.client.audio.speech.create, timeout, **params)
+        return response.content
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": settings.llm_max_concurrency,
+            "circuit_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+        self._client = None
+        self._http_client = None
+
+
+# Singleton instance
+llm_client = LLMClient()
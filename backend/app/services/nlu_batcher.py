@@ -0,0 +1,90 @@
+"""
+Micro-batching for LLM NLU calls
+Concurrent requests are collected for a few milliseconds (or until the batch is
+full) and resolved with one batched structured completion; results are fanned
+back out to the waiting coroutines. Items the batch call did not answer are
+resolved individually.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+
+from app.routers.metrics import nlu_batch_size, nlu_batch_fallbacks
+
+BatchHandler = Callable[[List[str], Optional[str]], Awaitable[List[Optional[Dict[str, Any]]]]]
+SingleHandler = Callable[[str, Optional[str]], Awaitable[Dict[str, Any]]]
+
+
+class NLUBatcher:
+    def __init__(
+        self,
+        batch_handler: BatchHandler,
+        single_handler: SingleHandler,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0
+    ):
+        self.batch_handler = batch_handler
+        self.single_handler = single_handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        # Batches are per tenant, since prompts carry the tenant's intents
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, text: str, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a message for the next batch and wait for its result"""
+        loop = asyncio.get_running_loop()
+        key = tenant_id or ""
+        future = loop.create_future()
+
+        batch = self._pending.setdefault(key, [])
+        batch.append((text, future))
+        if len(batch) >= self.max_batch_size:
+            self._start_flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._start_flush, key)
+
+        return await future
+
+    def _start_flush(self, key: str):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._flush(key or None, batch))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, tenant_id: Optional[str], batch: List[Tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        nlu_batch_size.observe(len(texts))
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        if len(texts) > 1:
+            try:
+                answered = await self.batch_handler(texts, tenant_id)
+                results = (list(answered) + results)[:len(texts)]
+            except Exception as e:
+                print(f"Batched NLU call failed, resolving {len(texts)} items individually: {e}")
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if len(texts) > 1 and missing:
+            nlu_batch_fallbacks.inc(len(missing))
+        singles = await asyncio.gather(
+            *(self.single_handler(texts[i], tenant_id) for i in missing),
+            return_exceptions=True
+        )
+        for i, result in zip(missing, singles):
+            results[i] = result
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
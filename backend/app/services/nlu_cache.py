@@ -0,0 +1,229 @@
+"""
+NLU result cache
+Caches nlu_service.resolve results per tenant on a normalized form of the message,
+with an in-process LRU tier and an optional shared Redis tier
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+
+from app.core.config import settings
+from app.routers.metrics import nlu_cache_requests
+from app.services.entity_extractor import DIGIT_FOLD, entity_extractor
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - redis is optional at runtime
+    aioredis = None
+
+# Redis must never slow down a cache miss; give up quickly and back off
+REDIS_TIMEOUT_SECONDS = 0.2
+REDIS_RETRY_AFTER_SECONDS = 30
+KEY_PREFIX = "nlu:v2"
+
+# Entities that differ between otherwise identical messages; they are masked in
+# the cache key and re-extracted from the message on every hit
+VOLATILE_FIELDS = ("order_id", "phone", "email", "amount", "quantity", "date")
+_PLACEHOLDER = "\ue000"  # private-use char, survives punctuation collapse
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class NormalizedText(NamedTuple):
+    canonical: str
+    volatile: Dict[str, Any]
+
+
+@lru_cache(maxsize=4096)
+def _is_separator(ch: str) -> bool:
+    category = unicodedata.category(ch)
+    return category[0] in "PSZ" or category in ("Cc", "Cf")
+
+
+def _collapse_punctuation(text: str) -> str:
+    """Replace punctuation, symbols, separators and control/format chars with spaces"""
+    return "".join(" " if _is_separator(ch) else ch for ch in text)
+
+
+def normalize_text(text: str) -> NormalizedText:
+    """
+    Canonical cache form of a message: NFC, digit folding, lowercase,
+    volatile tokens masked, punctuation and whitespace collapsed
+    """
+    text = text or ""
+    volatile: Dict[str, Any] = {}
+    parts: List[str] = []
+    last = 0
+    for match in entity_extractor.extract(text):
+        if match.field not in VOLATILE_FIELDS:
+            continue
+        volatile.setdefault(match.field, match.value)
+        parts.append(text[last:match.start])
+        parts.append(f" {_PLACEHOLDER}{match.field} ")
+        last = match.end
+    parts.append(text[last:])
+
+    folded = unicodedata.normalize("NFC", "".join(parts)).translate(DIGIT_FOLD).lower()
+    canonical = _WHITESPACE_RE.sub(" ", _collapse_punctuation(folded)).strip()
+    return NormalizedText(canonical, volatile)
+
+
+class NLUResultCache:
+    """
+    Two-tier TTL cache: LRU dict in process, then Redis (when enabled).
+    Keys are namespaced by tenant and NLU backend.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_down_until = 0.0
+
+    def make_key(self, normalized: NormalizedText, tenant_id: Optional[str], backend: str) -> str:
+        digest = hashlib.sha1(normalized.canonical.encode("utf-8")).hexdigest()
+        return f"{KEY_PREFIX}:{tenant_id or '_'}:{backend}:{digest}"
+
+    async def get(self, normalized: NormalizedText, tenant_id: Optional[str], backend: str) -> Optional[Dict[str, Any]]:
+        """Cached result with volatile entities re-extracted from this message, or None"""
+        key = self.make_key(normalized, tenant_id, backend)
+
+        value = self._get_local(key)
+        nlu_cache_requests.labels(tier="memory", result="hit" if value else "miss").inc()
+
+        if value is None and self._redis_available():
+            value = await self._get_redis(key)
+            nlu_cache_requests.labels(tier="redis", result="hit" if value else "miss").inc()
+            if value is not None:
+                self._set_local(key, value, value["expires_at"])
+
+        if value is None:
+            return None
+
+        result = dict(value["result"])
+        result["entities"] = {**result.get("entities", {}), **normalized.volatile}
+        return result
+
+    async def set(self, normalized: NormalizedText, tenant_id: Optional[str], backend: str, result: Dict[str, Any]):
+        """Cache the tenant-independent parts of a resolve() result"""
+        entities = {k: v for k, v in (result.get("entities") or {}).items() if k not in VOLATILE_FIELDS}
+        value = {
+            "result": {
+                "intent": result["intent"],
+                "confidence": result["confidence"],
+                "language": result["language"],
+                "entities": entities,
+                "model_used": result.get("model_used"),
+                "stage": result.get("stage"),
+            },
+            "expires_at": time.time() + self.ttl_seconds,
+        }
+
+        key = self.make_key(normalized, tenant_id, backend)
+        self._set_local(key, value, value["expires_at"])
+        if self._redis_available():
+            await self._set_redis(key, value)
+
+    async def invalidate_tenant(self, tenant_id: Optional[str]):
+        """Drop every cached result for a tenant (e.g. after its intents are retrained)"""
+        prefix = f"{KEY_PREFIX}:{tenant_id or '_'}:"
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+        if self._redis_available():
+            try:
+                async for key in self._get_redis_client().scan_iter(match=f"{prefix}*"):
+                    await self._redis.delete(key)
+            except Exception as e:
+                self._mark_redis_down(e)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "redis_enabled": settings.nlu_cache_redis_enabled,
+            "redis_available": self._redis_available(),
+        }
+
+    # In-process LRU tier
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: Dict[str, Any], expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Redis tier
+
+    def _redis_available(self) -> bool:
+        return (
+            settings.nlu_cache_redis_enabled
+            and aioredis is not None
+            and time.monotonic() >= self._redis_down_until
+        )
+
+    def _get_redis_client(self):
+        if self._redis is None:
+            self._redis = aioredis.from_url(
+                settings.redis_url,
+                decode_responses=True,
+                socket_timeout=REDIS_TIMEOUT_SECONDS,
+                socket_connect_timeout=REDIS_TIMEOUT_SECONDS
+            )
+        return self._redis
+
+    def _mark_redis_down(self, error: Exception):
+        print(f"NLU cache Redis tier unavailable, retrying in {REDIS_RETRY_AFTER_SECONDS}s: {error}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER_SECONDS
+
+    async def _get_redis(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self._get_redis_client().get(key)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            self._mark_redis_down(e)
+            return None
+
+    async def _set_redis(self, key: str, value: Dict[str, Any]):
+        try:
+            await self._get_redis_client().set(key, json.dumps(value, ensure_ascii=False), ex=self.ttl_seconds)
+        except Exception as e:
+            self._mark_redis_down(e)
+
+    async def aclose(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+# Singleton instance
+nlu_cache = NLUResultCache(
+    max_entries=settings.nlu_cache_max_entries,
+    ttl_seconds=settings.nlu_cache_ttl_seconds
+)
@@ -2,17 +2,217 @@
 NLU Service for Bangla intent classification and entity extraction
 Uses OpenAI GPT models for advanced Bangla language understanding
 """
-from typing import Dict, Any, List, Optional
-import re
+from typing import Dict, Any, List, Optional, Tuple
 import json
-import openai
+import time
 from app.core.config import settings
+from app.core.tenant import TenantContext
+from app.services.intent_classifier import LocalIntentClassifierRegistry
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.entity_extractor import entity_extractor, tenant_entity_extractors
+from app.services.language_detector import detect_language
+from app.services.transliterator import transliterator
+from app.services.example_selector import ExampleIndexRegistry
+from app.services.nlu_batcher import NLUBatcher
+from app.services.llm_client import llm_client
+from app.services.nlu_cache import nlu_cache, normalize_text
+from app.routers.metrics import nlu_stage_results, nlu_escalations
+
+# How long a tenant's NLU backend selection is cached before re-reading Client.ai_model_config
+TENANT_CONFIG_TTL_SECONDS = 60
+NLU_BACKENDS = ("openai", "local", "cascade")
+
+INTENT_DESCRIPTIONS = {
+    "order_status": "Customer wants to know about their order status, delivery updates, or where their order is",
+    "return_request": "Customer wants to return a product, initiate return process, or ask about return policies",
+    "product_inquiry": "Customer is asking about product details, availability, specifications, or pricing",
+    "payment_issue": "Customer has payment problems, payment not processed, refund issues, or money-related concerns",
+    "delivery_tracking": "Customer wants delivery tracking information, courier updates, or shipping status",
+    "complaint": "Customer has a complaint about service, product quality, or general dissatisfaction",
+    "cancel_order": "Customer wants to cancel their order or stop the delivery",
+    "modify_order": "Customer wants to change order details, quantity, address, or other modifications",
+    "refund_status": "Customer wants to know about refund status or refund processing",
+    "customer_support": "Customer needs general help, support, or has questions not covered by other categories",
+    "social_media_post": "Customer wants to create or publish a post on social media platforms like Facebook or Instagram",
+    "social_media_analytics": "Customer wants to view social media analytics, follower counts, or engagement metrics",
+    "social_media_schedule": "Customer wants to schedule a social media post for future publishing",
+    "social_media_connect": "Customer wants to connect or link their social media account",
+    "social_media_disconnect": "Customer wants to disconnect or unlink their social media account",
+    "fallback": "General queries that don't fit other categories"
+}
+
+# Multi-language keyword patterns, compiled once into a KeywordMatcher
+INTENT_KEYWORDS = {
+    "order_status": [
+        # English
+        "order", "status", "where", "when", "arrive", "tracking", "track",
+        # Bangla
+        "অর্ডার", "কোথায়", "কবে", "আসবে", "আছে", "স্ট্যাটাস", "ট্র্যাক",
+        # Hindi
+        "ऑर्डर", "कहाँ", "कब", "आएगा", "है", "स्थिति", "ट्रैक",
+        # Arabic
+        "طلب", "أين", "متى", "سيصل", "موجود", "حالة", "تتبع",
+        # Urdu
+        "آرڈر", "کہاں", "کب", "آئے گا", "ہے", "حیثیت", "ٹریک"
+    ],
+    "return_request": [
+        # English
+        "return", "refund", "back", "exchange", "replace",
+        # Bangla
+        "রিটার্ন", "ফেরত", "ferot", "রিফান্ড", "বদল",
+        # Hindi
+        "वापस", "रिटर्न", "वापसी", "रिफंड", "बदल",
+        # Arabic
+        "إرجاع", "إعادة", "رد", "استبدال", "تبديل",
+        # Urdu
+        "واپس", "ریٹرن", "واپسی", "ریفنڈ", "بدل"
+    ],
+    "product_inquiry": [
+        # English
+        "product", "available", "price", "cost", "details", "info", "information",
+        # Bangla
+        "প্রোডাক্ট", "আছে", "দাম", "ডিটেলস", "তথ্য", "বিস্তারিত",
+        # Hindi
+        "प्रोडक्ट", "उपलब्ध", "कीमत", "विवरण", "जानकारी", "माहिती",
+        # Arabic
+        "منتج", "متوفر", "سعر", "تفاصيل", "معلومات", "معلومة",
+        # Urdu
+        "پروڈکٹ", "دستیاب", "قیمت", "تفصیلات", "معلومات", "معلومہ"
+    ],
+    "payment_issue": [
+        # English
+        "payment", "pay", "money", "taka", "failed", "error", "problem",
+        # Bangla
+        "পেমেন্ট", "টাকা", "কাটেনি", "ফেইলড", "সমস্যা", "ভুল",
+        # Hindi
+        "भुगतान", "पैसे", "नहीं", "विफल", "समस्या", "गलती",
+        # Arabic
+        "دفع", "مال", "لم", "فشل", "مشكلة", "خطأ",
+        # Urdu
+        "ادائیگی", "پیسے", "نہیں", "ناکام", "مسئلہ", "غلطی"
+    ],
+    "delivery_tracking": [
+        # English
+        "delivery", "courier", "tracking", "shipped", "ship", "logistics",
+        # Bangla
+        "ডেলিভারি", "কুরিয়ার", "রোডে", "পাঠানো", "পরিবহন",
+        # Hindi
+        "डिलीवरी", "कूरियर", "ट्रैकिंग", "भेजा", "परिवहन",
+        # Arabic
+        "تسليم", "بريد", "تتبع", "شحن", "نقل",
+        # Urdu
+        "ڈیلیوری", "کورئیر", "ٹریکنگ", "بھیجا", "نقل و حمل"
+    ],
+    "complaint": [
+        # English
+        "complaint", "problem", "issue", "bad", "wrong", "disappointed",
+        # Bangla
+        "অভিযোগ", "সমস্যা", "খারাপ", "ভুল", "নাখোশ",
+        # Hindi
+        "शिकायत", "समस्या", "बुरा", "गलत", "नाखुश",
+        # Arabic
+        "شكوى", "مشكلة", "سيء", "خطأ", "مخيب",
+        # Urdu
+        "شکایت", "مسئلہ", "برا", "غلط", "ناپسندیدہ"
+    ],
+    "purchase_intent": [
+        # English
+        "buy", "purchase", "order", "get", "want", "need",
+        # Bangla
+        "কিনব", "ক্রয়", "অর্ডার", "চাই", "দরকার",
+        # Hindi
+        "खरीदना", "खरीद", "ऑर्डर", "चाहता", "जरूरत",
+        # Arabic
+        "شراء", "طلب", "أريد", "أحتاج", "أشتري",
+        # Urdu
+        "خریدنا", "خرید", "آرڈر", "چاہتا", "ضرورت"
+    ],
+    "social_media_post": [
+        # English
+        "post", "publish", "share", "upload", "facebook", "instagram", "social media",
+        # Bangla
+        "পোস্ট", "পাবলিশ", "শেয়ার", "আপলোড", "ফেসবুক", "ইন্সটাগ্রাম", "সোশ্যাল মিডিয়া",
+        # Hindi
+        "पोस्ट", "प्रकाशित", "शेयर", "अपलोड", "फेसबुक", "इंस्टाग्राम", "सोशल मीडिया",
+        # Arabic
+        "منشور", "نشر", "مشاركة", "رفع", "فيسبوك", "إنستغرام", "وسائل التواصل",
+        # Urdu
+        "پوسٹ", "پبلش", "شیئر", "اپ لوڈ", "فیس بک", "انسٹاگرام", "سوشل میڈیا"
+    ],
+    "social_media_analytics": [
+        # English
+        "analytics", "report", "followers", "engagement", "performance", "stats", "metrics",
+        # Bangla
+        "অ্যানালিটিক্স", "রিপোর্ট", "ফলোয়ার", "এংগেজমেন্ট", "পারফরমেন্স", "পরিসংখ্যান",
+        # Hindi
+        "एनालिटिक्स", "रिपोर्ट", "फॉलोअर्स", "एंगेजमेंट", "परफॉरमेंस", "आंकड़े",
+        # Arabic
+        "تحليلات", "تقرير", "متابعين", "تفاعل", "أداء", "إحصائيات",
+        # Urdu
+        "تجزیات", "رپورٹ", "فالوورز", "انگیجمنٹ", "کارکردگی", "اعداد و شمار"
+    ]
+}
+
+ENTITY_FIELDS = {
+    "order_id": ["string", "null"],
+    "product_name": ["string", "null"],
+    "phone": ["string", "null"],
+    "amount": ["number", "null"],
+    "email": ["string", "null"],
+    "date": ["string", "null"],
+    "address": ["string", "null"],
+    "quantity": ["integer", "null"],
+    "payment_method": ["string", "null"],
+}
+
+def _resolution_item_schema(intents: List[str]) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {
+            "intent": {"type": "string", "enum": intents},
+            "confidence": {"type": "number"},
+            "language": {"type": "string"},
+            "entities": {
+                "type": "object",
+                "properties": {name: {"type": types} for name, types in ENTITY_FIELDS.items()},
+                "required": list(ENTITY_FIELDS),
+                "additionalProperties": False
+            }
+        },
+        "required": ["intent", "confidence", "language", "entities"],
+        "additionalProperties": False
+    }
+
+
+# JSON schema for the single structured resolution call (intent + entities + language),
+# with the intent restricted to the prompt's candidate intents
+def build_resolution_schema(intents: List[str]) -> Dict[str, Any]:
+    return {"name": "nlu_resolution", "strict": True, "schema": _resolution_item_schema(intents)}
+
+
+# JSON schema for a micro-batched resolution call: one indexed result per message
+def build_batch_resolution_schema(intents: List[str]) -> Dict[str, Any]:
+    item = _resolution_item_schema(intents)
+    item["properties"] = {"index": {"type": "integer"}, **item["properties"]}
+    item["required"] = ["index"] + item["required"]
+    return {
+        "name": "nlu_batch_resolution",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"results": {"type": "array", "items": item}},
+            "required": ["results"],
+            "additionalProperties": False
+        }
+    }
+
+
+RESOLUTION_SCHEMA = build_resolution_schema(list(INTENT_DESCRIPTIONS))
 
 
 class NLUService:
     def __init__(self):
-        # Initialize OpenAI client
-        self.client = openai.OpenAI(api_key=settings.openai_api_key)
+        # LLM calls go through the shared pooled async client (app.services.llm_client)
         self.model = settings.openai_model or "gpt-4o-mini"
         self.intent_labels = [
             "order_status",      # অর্ডার স্ট্যাটাস জানতে চাই
@@ -40,6 +240,8 @@ class NLUService:
             "order_status": [
                 # Bangla
                 "আমার অর্ডার কোথায়?", "অর্ডার স্ট্যাটাস কি?", "আমার প্রোডাক্ট কবে আসবে?",
+                # Banglish
+                "amar order kothay?", "order status ki?", "product kobe asbe?",
                 # English
                 "Where is my order?", "Order status check", "When will my product arrive?",
                 # Hindi
@@ -52,6 +254,8 @@ class NLUService:
             "return_request": [
                 # Bangla
                 "প্রোডাক্ট রিটার্ন করব", "ফেরত দিতে চাই", "রিটার্ন প্রসেস কি?",
+                # Banglish
+                "product ta ferot dite chai", "return korte chai", "eta change kore din",
                 # English
                 "I want to return product", "Return process", "How to return?",
                 # Hindi
@@ -64,6 +268,8 @@ class NLUService:
             "product_inquiry": [
                 # Bangla
                 "এই প্রোডাক্ট আছে?", "প্রোডাক্ট ডিটেলস বলুন", "কত দাম?",
+                # Banglish
+                "iPhone 15 er dam koto?", "eta stock e ache?", "ei product er details din",
                 # English
                 "Is this product available?", "Product details", "What is the price?",
                 # Hindi
@@ -76,6 +282,8 @@ class NLUService:
             "payment_issue": [
                 # Bangla
                 "পেমেন্ট হয়নি", "টাকা কাটেনি", "পেমেন্ট ফেইলড",
+                # Banglish
+                "payment hoy nai", "bkash e taka kete nise", "payment failed hoise",
                 # English
                 "Payment not received", "Money not deducted", "Payment failed",
                 # Hindi
@@ -88,6 +296,8 @@ class NLUService:
             "delivery_tracking": [
                 # Bangla
                 "ডেলিভারি কোথায়?", "কুরিয়ার স্ট্যাটাস", "প্রোডাক্ট রোডে আছে?",
+                # Banglish
+                "delivery kobe hobe?", "courier kothay ache?", "parcel track korte chai",
                 # English
                 "Where is delivery?", "Courier status", "Is product on the way?",
                 # Hindi
@@ -100,6 +310,8 @@ class NLUService:
             "complaint": [
                 # Bangla
                 "সমস্যা আছে", "খারাপ সার্ভিস", "অভিযোগ করছি",
+                # Banglish
+                "service khub kharap", "ami complain korte chai", "vul product dise",
                 # English
                 "There is problem", "Bad service", "I want to complain",
                 # Hindi
@@ -150,11 +362,101 @@ class NLUService:
                 "جدولة المنشور", "نشر لاحقاً", "تحديد وقت المنشور",
                 # Urdu
                 "پوسٹ شیڈول کریں", "بعد میں پبلش کریں", "وقت مقرر کریں"
+            ],
+            "cancel_order": [
+                # Bangla
+                "অর্ডার ক্যানসেল করতে চাই", "আমার অর্ডার বাতিল করুন", "অর্ডারটা আর লাগবে না",
+                # Banglish
+                "order cancel korte chai", "amar order ta batil koren",
+                # English
+                "Cancel my order", "I want to cancel the order", "Please stop my delivery",
+                # Hindi
+                "मेरा ऑर्डर कैंसल करें", "ऑर्डर रद्द करना है",
+                # Arabic
+                "ألغِ طلبي", "أريد إلغاء الطلب",
+                # Urdu
+                "میرا آرڈر کینسل کریں", "آرڈر منسوخ کرنا ہے"
+            ],
+            "modify_order": [
+                # Bangla
+                "অর্ডারে ঠিকানা পরিবর্তন করতে চাই", "পরিমাণ বাড়াতে চাই", "অর্ডার চেঞ্জ করুন",
+                # English
+                "Change my delivery address", "Modify my order quantity", "Update the order details",
+                # Hindi
+                "ऑर्डर में पता बदलना है", "ऑर्डर बदलना है",
+                # Arabic
+                "تغيير عنوان التوصيل", "تعديل الطلب",
+                # Urdu
+                "آرڈر میں پتہ تبدیل کریں", "آرڈر تبدیل کرنا ہے"
+            ],
+            "refund_status": [
+                # Bangla
+                "রিফান্ড কবে পাবো?", "আমার টাকা ফেরত এসেছে?", "রিফান্ড স্ট্যাটাস কি?",
+                # Banglish
+                "refund kobe pabo?", "taka ferot ashe nai",
+                # English
+                "When will I get my refund?", "Refund status", "Has my money been refunded?",
+                # Hindi
+                "रिफंड कब मिलेगा?", "रिफंड की स्थिति क्या है?",
+                # Arabic
+                "متى سأسترد أموالي؟", "حالة الاسترداد",
+                # Urdu
+                "ریفنڈ کب ملے گا؟", "ریفنڈ کی حیثیت کیا ہے؟"
+            ],
+            "customer_support": [
+                # Bangla
+                "আমি সাহায্য চাই", "কাস্টমার কেয়ারে কথা বলতে চাই", "একজন এজেন্ট দিন",
+                # English
+                "I need help", "Talk to customer support", "Connect me to an agent",
+                # Hindi
+                "मुझे मदद चाहिए", "कस्टमर केयर से बात करनी है",
+                # Arabic
+                "أحتاج مساعدة", "أريد التحدث مع خدمة العملاء",
+                # Urdu
+                "مجھے مدد چاہیے", "کسٹمر سپورٹ سے بات کرنی ہے"
+            ],
+            "social_media_connect": [
+                # Bangla
+                "ফেসবুক পেজ কানেক্ট করো", "ইন্সটাগ্রাম অ্যাকাউন্ট যুক্ত করুন",
+                # English
+                "connect my facebook page", "link instagram account",
+                # Hindi
+                "फेसबुक पेज कनेक्ट करें",
+                # Arabic
+                "ربط صفحة فيسبوك",
+                # Urdu
+                "فیس بک پیج کنیکٹ کریں"
+            ],
+            "social_media_disconnect": [
+                # Bangla
+                "ফেসবুক পেজ ডিসকানেক্ট করো", "ইন্সটাগ্রাম অ্যাকাউন্ট সরিয়ে দিন",
+                # English
+                "disconnect my facebook page", "unlink instagram account",
+                # Hindi
+                "फेसबुक पेज डिस्कनेक्ट करें",
+                # Arabic
+                "إلغاء ربط صفحة فيسبوك",
+                # Urdu
+                "فیس بک پیج ڈسکنیکٹ کریں"
             ]
         }
-        
+
+        # Local (offline) intent classifiers, trained per tenant on first use
+        self.local_classifiers = LocalIntentClassifierRegistry(self.intent_examples)
+        self.keyword_matcher = KeywordMatcher(INTENT_KEYWORDS)
+        # Few-shot retrieval index for LLM prompts, built per tenant on first use
+        self.example_indexes = ExampleIndexRegistry(self.intent_examples, INTENT_DESCRIPTIONS)
+        # Optional micro-batching of concurrent LLM calls (settings.nlu_batching_enabled)
+        self.batcher = NLUBatcher(
+            self.resolve_llm_batch,
+            self.resolve_llm,
+            max_batch_size=settings.nlu_batch_max_size,
+            max_wait_ms=settings.nlu_batch_max_wait_ms
+        )
+        self._tenant_configs: Dict[str, Tuple[Dict[str, Any], float]] = {}
+
     def load_model(self):
-        """Initialize OpenAI client. No model loading needed."""
+        """No model loading needed; the shared LLM client connects lazily."""
         print(f"NLU service initialized with OpenAI model: {self.model}")
         return True
     
@@ -183,7 +485,7 @@ class NLUService:
             Return only valid JSON with the extracted entities. If no entities found, return empty object {{}}.
             """
 
-            response = await self.client.chat.completions.create(
+            response = await llm_client.chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are an expert at extracting entities from Bangladeshi customer service queries. Always return valid JSON."},
@@ -210,75 +512,23 @@ class NLUService:
 
         except Exception as e:
             print(f"Entity extraction error: {e}")
-            # Fallback to regex-based extraction
-            return self._extract_entities_regex(text)
+            # Fallback to deterministic extraction
+            return entity_extractor.extract_entities(text)
 
-    def _extract_entities_regex(self, text: str) -> Dict[str, Any]:
-        """
-        Fallback regex-based entity extraction
-        """
-        entities = {}
-
-        # Order ID pattern (e.g., #123, order 123, অর্ডার ১২৩)
-        order_pattern = r'(?:order|অর্ডার|#)\s*(\d+)'
-        order_match = re.search(order_pattern, text, re.IGNORECASE)
-        if order_match:
-            entities['order_id'] = order_match.group(1)
-
-        # Phone number pattern (Bangladesh)
-        phone_pattern = r'(?:\+?88)?01[3-9]\d{8}'
-        phone_match = re.search(phone_pattern, text)
-        if phone_match:
-            entities['phone'] = phone_match.group(0)
-
-        # Amount pattern (e.g., ৳500, 500 taka)
-        amount_pattern = r'(?:৳|টাকা|taka|tk)\s*(\d+(?:\.\d{2})?)'
-        amount_match = re.search(amount_pattern, text, re.IGNORECASE)
-        if amount_match:
-            entities['amount'] = float(amount_match.group(1))
-
-        # Email pattern
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        email_match = re.search(email_pattern, text)
-        if email_match:
-            entities['email'] = email_match.group(0)
-
-        return entities
-    
-    async def classify_intent(self, text: str) -> tuple[str, float]:
+    async def classify_intent(self, text: str, tenant_id: Optional[str] = None) -> tuple[str, float]:
         """
         Classify intent using OpenAI GPT for advanced Bangla understanding
         Returns (intent, confidence)
         """
         try:
-            # Create a comprehensive prompt with examples
-            intent_descriptions = {
-                "order_status": "Customer wants to know about their order status, delivery updates, or where their order is",
-                "return_request": "Customer wants to return a product, initiate return process, or ask about return policies",
-                "product_inquiry": "Customer is asking about product details, availability, specifications, or pricing",
-                "payment_issue": "Customer has payment problems, payment not processed, refund issues, or money-related concerns",
-                "delivery_tracking": "Customer wants delivery tracking information, courier updates, or shipping status",
-                "complaint": "Customer has a complaint about service, product quality, or general dissatisfaction",
-                "cancel_order": "Customer wants to cancel their order or stop the delivery",
-                "modify_order": "Customer wants to change order details, quantity, address, or other modifications",
-                "refund_status": "Customer wants to know about refund status or refund processing",
-                "customer_support": "Customer needs general help, support, or has questions not covered by other categories",
-                "social_media_post": "Customer wants to create or publish a post on social media platforms like Facebook or Instagram",
-                "social_media_analytics": "Customer wants to view social media analytics, follower counts, or engagement metrics",
-                "social_media_schedule": "Customer wants to schedule a social media post for future publishing",
-                "social_media_connect": "Customer wants to connect or link their social media account",
-                "social_media_disconnect": "Customer wants to disconnect or unlink their social media account",
-                "fallback": "General queries that don't fit other categories"
-            }
-
+            intents_section, allowed_intents = self._intent_prompt_section([text], tenant_id)
             prompt = f"""
             Classify this customer service query into the most appropriate intent category.
             This is a multi-language customer service system supporting Bangla, English, Hindi, Arabic, Urdu, and other languages.
 
             Query: "{text}"
 
-            Available intents:
-            {chr(10).join([f"- {intent}: {desc}" for intent, desc in intent_descriptions.items()])}
+            {intents_section}
 
             Analyze the query in any language and determine the customer's intent.
             Consider common customer service scenarios across different cultures and languages.
@@ -287,7 +537,7 @@ class NLUService:
             {{"intent": "intent_name", "confidence": 0.95, "language": "detected_language", "reasoning": "brief explanation"}}
             """
 
-            response = await self.client.chat.completions.create(
+            response = await llm_client.chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are an expert multi-language customer service intent classifier supporting Bangla, English, Hindi, Arabic, Urdu, and other languages. Always return valid JSON with intent, confidence (0.0-1.0), language, and reasoning."},
@@ -312,7 +562,7 @@ class NLUService:
                 language = result.get('language', 'unknown')
 
                 # Ensure intent is valid
-                if intent not in self.intent_labels:
+                if intent not in allowed_intents:
                     intent = 'fallback'
                     confidence = 0.3
 
@@ -331,126 +581,9 @@ class NLUService:
         """
         Enhanced keyword-based intent classification with improved language detection
         """
-        text_lower = text.lower()
-        detected_lang = self._detect_language_enhanced(text)
-
-        # Multi-language keyword patterns with improved coverage
-        keywords = {
-            "order_status": [
-                # English
-                "order", "status", "where", "when", "arrive", "tracking", "track",
-                # Bangla
-                "অর্ডার", "কোথায়", "কবে", "আসবে", "আছে", "স্ট্যাটাস", "ট্র্যাক",
-                # Hindi
-                "ऑर्डर", "कहाँ", "कब", "आएगा", "है", "स्थिति", "ट्रैक",
-                # Arabic
-                "طلب", "أين", "متى", "سيصل", "موجود", "حالة", "تتبع",
-                # Urdu
-                "آرڈر", "کہاں", "کب", "آئے گا", "ہے", "حیثیت", "ٹریک"
-            ],
-            "return_request": [
-                # English
-                "return", "refund", "back", "exchange", "replace",
-                # Bangla
-                "রিটার্ন", "ফেরত", "ferot", "রিফান্ড", "বদল",
-                # Hindi
-                "वापस", "रिटर्न", "वापसी", "रिफंड", "बदल",
-                # Arabic
-                "إرجاع", "إعادة", "رد", "استبدال", "تبديل",
-                # Urdu
-                "واپس", "ریٹرن", "واپسی", "ریفنڈ", "بدل"
-            ],
-            "product_inquiry": [
-                # English
-                "product", "available", "price", "cost", "details", "info", "information",
-                # Bangla
-                "প্রোডাক্ট", "আছে", "দাম", "ডিটেলস", "তথ্য", "বিস্তারিত",
-                # Hindi
-                "प्रोडक्ट", "उपलब्ध", "कीमत", "विवरण", "जानकारी", "माहिती",
-                # Arabic
-                "منتج", "متوفر", "سعر", "تفاصيل", "معلومات", "معلومة",
-                # Urdu
-                "پروڈکٹ", "دستیاب", "قیمت", "تفصیلات", "معلومات", "معلومہ"
-            ],
-            "payment_issue": [
-                # English
-                "payment", "pay", "money", "taka", "failed", "error", "problem",
-                # Bangla
-                "পেমেন্ট", "টাকা", "কাটেনি", "ফেইলড", "সমস্যা", "ভুল",
-                # Hindi
-                "भुगतान", "पैसे", "नहीं", "विफल", "समस्या", "गलती",
-                # Arabic
-                "دفع", "مال", "لم", "فشل", "مشكلة", "خطأ",
-                # Urdu
-                "ادائیگی", "پیسے", "نہیں", "ناکام", "مسئلہ", "غلطی"
-            ],
-            "delivery_tracking": [
-                # English
-                "delivery", "courier", "tracking", "shipped", "ship", "logistics",
-                # Bangla
-                "ডেলিভারি", "কুরিয়ার", "রোডে", "পাঠানো", "পরিবহন",
-                # Hindi
-                "डिलीवरी", "कूरियर", "ट्रैकिंग", "भेजा", "परिवहन",
-                # Arabic
-                "تسليم", "بريد", "تتبع", "شحن", "نقل",
-                # Urdu
-                "ڈیلیوری", "کورئیر", "ٹریکنگ", "بھیجا", "نقل و حمل"
-            ],
-            "complaint": [
-                # English
-                "complaint", "problem", "issue", "bad", "wrong", "disappointed",
-                # Bangla
-                "অভিযোগ", "সমস্যা", "খারাপ", "ভুল", "নাখোশ",
-                # Hindi
-                "शिकायत", "समस्या", "बुरा", "गलत", "नाखुश",
-                # Arabic
-                "شكوى", "مشكلة", "سيء", "خطأ", "مخيب",
-                # Urdu
-                "شکایت", "مسئلہ", "برا", "غلط", "ناپسندیدہ"
-            ],
-            "purchase_intent": [
-                # English
-                "buy", "purchase", "order", "get", "want", "need",
-                # Bangla
-                "কিনব", "ক্রয়", "অর্ডার", "চাই", "দরকার",
-                # Hindi
-                "खरीदना", "खरीद", "ऑर्डर", "चाहता", "जरूरत",
-                # Arabic
-                "شراء", "طلب", "أريد", "أحتاج", "أشتري",
-                # Urdu
-                "خریدنا", "خرید", "آرڈر", "چاہتا", "ضرورت"
-            ],
-            "social_media_post": [
-                # English
-                "post", "publish", "share", "upload", "facebook", "instagram", "social media",
-                # Bangla
-                "পোস্ট", "পাবলিশ", "শেয়ার", "আপলোড", "ফেসবুক", "ইন্সটাগ্রাম", "সোশ্যাল মিডিয়া",
-                # Hindi
-                "पोस्ट", "प्रकाशित", "शेयर", "अपलोड", "फेसबुक", "इंस्टाग्राम", "सोशल मीडिया",
-                # Arabic
-                "منشور", "نشر", "مشاركة", "رفع", "فيسبوك", "إنستغرام", "وسائل التواصل",
-                # Urdu
-                "پوسٹ", "پبلش", "شیئر", "اپ لوڈ", "فیس بک", "انسٹاگرام", "سوشل میڈیا"
-            ],
-            "social_media_analytics": [
-                # English
-                "analytics", "report", "followers", "engagement", "performance", "stats", "metrics",
-                # Bangla
-                "অ্যানালিটিক্স", "রিপোর্ট", "ফলোয়ার", "এংগেজমেন্ট", "পারফরমেন্স", "পরিসংখ্যান",
-                # Hindi
-                "एनालिटिक्स", "रिपोर्ट", "फॉलोअर्स", "एंगेजमेंट", "परफॉरमेंस", "आंकड़े",
-                # Arabic
-                "تحليلات", "تقرير", "متابعين", "تفاعل", "أداء", "إحصائيات",
-                # Urdu
-                "تجزیات", "رپورٹ", "فالوورز", "انگیجمنٹ", "کارکردگی", "اعداد و شمار"
-            ]
-        }
+        detected_lang = detect_language(text)
 
-        scores = {}
-        for intent, words in keywords.items():
-            score = sum(1 for word in words if word in text_lower)
-            if score > 0:
-                scores[intent] = score
+        scores = self.keyword_matcher.label_counts(text)
 
         if scores:
             best_intent = max(scores, key=scores.get)
@@ -459,71 +592,297 @@ class NLUService:
 
         return "fallback", 0.3, detected_lang
 
-    def _detect_language_enhanced(self, text: str) -> str:
+    def classify_intent_local(self, text: str, tenant_id: Optional[str] = None) -> tuple[str, float, str]:
         """
-        Enhanced language detection with better script analysis and common words
+        Classify intent with the tenant's local char n-gram classifier (no network call)
+        Returns (intent, confidence, language)
         """
-        text = text.strip()
-
-        # Script-based detection
-        has_bangla = any('\u0980' <= char <= '\u09FF' for char in text)
-        has_arabic = any('\u0600' <= char <= '\u06FF' for char in text)
-        has_devanagari = any('\u0900' <= char <= '\u097F' for char in text)
-
-        # Common word-based detection for ambiguous cases
-        bangla_words = ['আমি', 'আপনি', 'কি', 'কেন', 'কোথায়', 'কখন', 'কত', 'এবং', 'অথবা']
-        hindi_words = ['मैं', 'आप', 'क्या', 'क्यों', 'कहाँ', 'कब', 'कितना', 'और', 'या']
-        urdu_words = ['میں', 'آپ', 'کیا', 'کیوں', 'کہاں', 'کب', 'کتنا', 'اور', 'یا']
-        arabic_words = ['أنا', 'أنت', 'ما', 'لماذا', 'أين', 'متى', 'كم', 'و', 'أو']
-
-        text_lower = text.lower()
-
-        # Count language-specific words
-        bangla_count = sum(1 for word in bangla_words if word in text)
-        hindi_count = sum(1 for word in hindi_words if word in text)
-        urdu_count = sum(1 for word in urdu_words if word in text)
-        arabic_count = sum(1 for word in arabic_words if word in text)
-
-        # Determine language based on script and word analysis
-        if has_bangla:
-            return "bn"
-        elif has_arabic:
-            if urdu_count > arabic_count:
-                return "ur"
-            else:
-                return "ar"
-        elif has_devanagari:
-            if hindi_count >= urdu_count:
-                return "hi"
-            else:
-                return "ur"
-        else:
-            # For Latin script, check for common English patterns
-            english_indicators = ['the', 'and', 'or', 'is', 'are', 'was', 'were', 'what', 'where', 'when', 'how']
-            english_count = sum(1 for word in english_indicators if word in text_lower.split())
+        intent, confidence = self.local_classifiers.get(tenant_id).predict(text)
+        return intent, confidence, detect_language(text)
 
-            if english_count > 2:
-                return "en"
-            else:
-                # Default to English for unrecognized Latin text
-                return "en"
-    
-    async def resolve(self, text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def get_tenant_ai_config(self, tenant_id: Optional[str] = None) -> Dict[str, Any]:
         """
-        Main NLU resolution method
+        Tenant's Client.ai_model_config, cached for TENANT_CONFIG_TTL_SECONDS
+        """
+        if not tenant_id:
+            return {}
+
+        cached = self._tenant_configs.get(tenant_id)
+        if cached and time.monotonic() - cached[1] < TENANT_CONFIG_TTL_SECONDS:
+            return cached[0]
+
+        config: Dict[str, Any] = {}
+        from app.db.session import SessionLocal
+        from app.db.models import Client
+
+        db = SessionLocal()
+        try:
+            client = db.query(Client).filter(Client.tenant_id == tenant_id).first()
+            if client and isinstance(client.ai_model_config, dict):
+                config = client.ai_model_config
+        except Exception as e:
+            print(f"Failed to load AI config for tenant {tenant_id}: {e}")
+        finally:
+            db.close()
+
+        self._tenant_configs[tenant_id] = (config, time.monotonic())
+        return config
+
+    def get_backend(self, tenant_id: Optional[str] = None) -> str:
+        """
+        NLU backend for a tenant: Client.ai_model_config["nlu_backend"], else settings.nlu_backend
+        """
+        backend = self.get_tenant_ai_config(tenant_id).get("nlu_backend")
+        return backend if backend in NLU_BACKENDS else settings.nlu_backend
+
+    def get_cascade_threshold(self, intent: str, tenant_id: Optional[str] = None) -> float:
+        """
+        Minimum local confidence for an intent to skip the LLM stage.
+        Tenant "cascade_thresholds" override the global per-intent map.
+        """
+        tenant_thresholds = self.get_tenant_ai_config(tenant_id).get("cascade_thresholds") or {}
+        if intent in tenant_thresholds:
+            return float(tenant_thresholds[intent])
+        return settings.nlu_cascade_thresholds_map.get(intent, settings.nlu_cascade_default_threshold)
+
+    def _classify_local_stage(
+        self,
+        text: str,
+        tenant_id: Optional[str] = None,
+        canonical: Optional[str] = None
+    ) -> tuple[str, float, str]:
+        """
+        Fast local stage of the cascade: ML classifier checked against keyword matching.
+        Agreement between the two raises confidence; disagreement keeps the stronger vote.
+        Keywords are matched on the transliterated canonical form when given; the
+        classifier keeps the text as written, since it is trained on Banglish examples too.
+        """
+        ml_intent, ml_confidence, language = self.classify_intent_local(text, tenant_id)
+        kw_intent, kw_confidence, _ = self._classify_intent_keywords(canonical or text)
+
+        if kw_intent == ml_intent and ml_intent != "fallback":
+            confidence = min(0.99, max(ml_confidence, kw_confidence) + 0.1)
+            return ml_intent, round(confidence, 4), language
+        if ml_intent == "fallback" or (kw_intent != "fallback" and kw_confidence > ml_confidence):
+            return kw_intent, kw_confidence, language
+        return ml_intent, ml_confidence, language
+
+    def _intent_prompt_section(self, texts: List[str], tenant_id: Optional[str] = None) -> Tuple[str, List[str]]:
+        """
+        Intent list for LLM prompts and the intents the answer may use.
+        With few-shot selection on, only the retrieved candidate intents and the
+        most similar labelled examples are included instead of every intent;
+        for a batch, the union of every message's shortlist.
         """
-        intent, confidence, language = await self.classify_intent(text)
-        entities = await self.extract_entities(text)
+        if not settings.nlu_few_shot_enabled:
+            lines = [f"- {intent}: {desc}" for intent, desc in INTENT_DESCRIPTIONS.items()]
+            return "Available intents:\n" + "\n".join(lines), list(INTENT_DESCRIPTIONS)
+
+        index = self.example_indexes.get(tenant_id)
+        # A batch keeps the two best examples per message so the prompt stays bounded
+        k_examples = settings.nlu_few_shot_examples if len(texts) == 1 else min(2, settings.nlu_few_shot_examples)
+        intents: List[str] = []
+        examples: List[Tuple[str, str]] = []
+        for text in texts:
+            shortlist = index.shortlist(text, k_examples=k_examples, n_candidates=settings.nlu_few_shot_candidates)
+            intents += [intent for intent in shortlist.intents if intent not in intents]
+            examples += [example for example in shortlist.examples if example not in examples]
+
+        lines = [f"- {intent}: {index.descriptions.get(intent, intent.replace('_', ' '))}" for intent in intents]
+        section = "Candidate intents:\n" + "\n".join(lines)
+        if examples:
+            section += "\n\nLabelled examples:\n" + "\n".join(
+                f'- "{example}" -> {intent}' for example, intent in examples
+            )
+        return section, intents
+
+    def _parse_resolution(self, result: Dict[str, Any], allowed_intents: List[str]) -> Dict[str, Any]:
+        intent = result.get("intent", "fallback")
+        confidence = float(result.get("confidence", 0.5))
+        if intent not in allowed_intents:
+            intent, confidence = "fallback", 0.3
 
+        entities = {k: v for k, v in (result.get("entities") or {}).items() if v not in (None, "")}
         return {
+            "intent": intent,
+            "confidence": confidence,
+            "language": result.get("language", "unknown"),
+            "entities": entities
+        }
+
+    async def resolve_llm_combined(self, text: str, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Resolve intent, confidence, language and entities with ONE
+        JSON-schema-constrained completion instead of two separate calls
+        """
+        intents_section, allowed_intents = self._intent_prompt_section([text], tenant_id)
+        prompt = f"""
+        Analyze this customer service message from a multi-language (Bangla, English, Hindi, Arabic, Urdu) e-commerce support channel.
+
+        Message: "{text}"
+
+        {intents_section}
+
+        Return the intent, your confidence (0.0-1.0), the ISO language code of the message,
+        and every entity found (order_id, product_name, phone, amount, email, date, address, quantity, payment_method); use null for missing entities.
+        """
+
+        response = await llm_client.chat_completion(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are an expert multi-language customer service NLU engine. Always answer with the requested JSON schema."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=300,
+            temperature=0.1,
+            response_format={"type": "json_schema", "json_schema": build_resolution_schema(allowed_intents)}
+        )
+
+        return self._parse_resolution(json.loads(response.choices[0].message.content), allowed_intents)
+
+    async def resolve_llm_batch(self, texts: List[str], tenant_id: Optional[str] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Resolve several messages with ONE batched structured completion.
+        Returns one result per message, None where the answer was missing or unparseable.
+        """
+        intents_section, allowed_intents = self._intent_prompt_section(texts, tenant_id)
+        messages_section = "\n".join(f'Message {i}: "{text}"' for i, text in enumerate(texts, 1))
+        prompt = f"""
+        Analyze each customer service message below from a multi-language (Bangla, English, Hindi, Arabic, Urdu) e-commerce support channel.
+
+{messages_section}
+
+        {intents_section}
+
+        Return one result per message with its index (1-based), the intent, your confidence (0.0-1.0), the ISO language code,
+        and every entity found (order_id, product_name, phone, amount, email, date, address, quantity, payment_method); use null for missing entities.
+        """
+
+        response = await llm_client.chat_completion(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are an expert multi-language customer service NLU engine. Always answer with the requested JSON schema."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=150 * len(texts),
+            temperature=0.1,
+            response_format={"type": "json_schema", "json_schema": build_batch_resolution_schema(allowed_intents)}
+        )
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        for item in json.loads(response.choices[0].message.content).get("results", []):
+            try:
+                position = int(item["index"]) - 1
+                if 0 <= position < len(texts) and results[position] is None:
+                    results[position] = self._parse_resolution(item, allowed_intents)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Skipping unparseable batched NLU result {item}: {e}")
+        return results
+
+    async def resolve_llm(self, text: str, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        LLM stage: one combined structured call, falling back to the
+        classify_intent + extract_entities pair if it fails or is disabled
+        """
+        if settings.nlu_llm_mode == "combined":
+            try:
+                return await self.resolve_llm_combined(text, tenant_id)
+            except Exception as e:
+                print(f"Combined NLU resolution failed, falling back to two calls: {e}")
+
+        intent, confidence, language = await self.classify_intent(text, tenant_id)
+        # In "rules" mode the deterministic extractor supplies entities (see _resolve_llm_stage)
+        entities = await self.extract_entities(text) if settings.nlu_entity_mode == "llm" else {}
+        return {"intent": intent, "confidence": confidence, "language": language, "entities": entities}
+
+    async def _resolve_llm_stage(self, text: str, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        LLM stage of resolve(), micro-batched with concurrent requests when enabled.
+        In "rules" entity mode, deterministic matches override the LLM's structured entities.
+        """
+        if settings.nlu_batching_enabled:
+            result = await self.batcher.submit(text, tenant_id)
+        else:
+            result = await self.resolve_llm(text, tenant_id)
+        if settings.nlu_entity_mode == "rules":
+            result = {**result, "entities": {**result["entities"], **entity_extractor.extract_entities(text)}}
+        return result
+
+    def _with_tenant_entities(self, text: str, tenant_id: Optional[str], entities: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the tenant's custom regex/dictionary entities (Entity table) to resolved entities"""
+        if not tenant_id:
+            return entities
+        custom = tenant_entity_extractors.get(tenant_id).extract_entities(text)
+        return {**entities, **custom} if custom else entities
+
+    async def resolve(
+        self,
+        text: str,
+        context: Optional[Dict[str, Any]] = None,
+        backend: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Main NLU resolution method
+        `backend` forces one of NLU_BACKENDS (evaluation); by default the tenant's backend is used
+        """
+        context = context or {}
+        tenant_id = context.get("tenant_id") or TenantContext.get_tenant_id()
+        backend = backend if backend in NLU_BACKENDS else self.get_backend(tenant_id)
+
+        # Banglish words in Bangla script, so cache keys and keyword matching see one spelling
+        canonical = transliterator.canonicalize(text) if settings.nlu_transliteration_enabled else text
+
+        normalized = normalize_text(canonical) if settings.nlu_cache_enabled else None
+        if normalized is not None:
+            cached = await nlu_cache.get(normalized, tenant_id, backend)
+            if cached is not None:
+                entities = self._with_tenant_entities(text, tenant_id, cached["entities"])
+                # Banglish and Bangla-script spellings share the entry, so the
+                # language is that of this message, not of the one cached
+                return {
+                    **cached, "entities": entities, "text": text, "language": detect_language(text),
+                    "cached": True, "context": context
+                }
+
+        if backend == "local":
+            intent, confidence, language = self.classify_intent_local(text, tenant_id)
+            entities = entity_extractor.extract_entities(text)
+            model_used, stage = "local", "local"
+        elif backend == "cascade":
+            intent, confidence, language = self._classify_local_stage(text, tenant_id, canonical)
+            threshold = self.get_cascade_threshold(intent, tenant_id)
+            if confidence >= threshold:
+                entities = entity_extractor.extract_entities(text)
+                model_used, stage = "local", "local"
+            else:
+                nlu_escalations.labels(local_intent=intent).inc()
+                llm = await self._resolve_llm_stage(text, tenant_id)
+                intent, confidence, language, entities = llm["intent"], llm["confidence"], llm["language"], llm["entities"]
+                model_used, stage = self.model, "llm"
+        else:
+            llm = await self._resolve_llm_stage(text, tenant_id)
+            intent, confidence, language, entities = llm["intent"], llm["confidence"], llm["language"], llm["entities"]
+            model_used, stage = self.model, "llm"
+
+        nlu_stage_results.labels(backend=backend, stage=stage).inc()
+
+        result = {
             "intent": intent,
             "confidence": confidence,
             "entities": entities,
             "text": text,
             "language": language,
-            "model_used": self.model,
-            "context": context or {}
+            "model_used": model_used,
+            "stage": stage,
+            "cached": False,
+            "context": context
         }
+        # Fallbacks are often transient (LLM errors), so they are not cached
+        if normalized is not None and intent != "fallback":
+            await nlu_cache.set(normalized, tenant_id, backend, result)
+        # Tenant entities are applied after caching so entity edits take effect immediately
+        result["entities"] = self._with_tenant_entities(text, tenant_id, entities)
+        return result
 
 
 # Singleton instance
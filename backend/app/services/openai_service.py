@@ -1,9 +1,9 @@
-import openai
 from typing import List, Dict, Any, Optional
 import json
 import logging
 
 from app.core.config import settings
+from app.services.llm_client import llm_client
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +14,7 @@ class OpenAIService:
         self.model = settings.openai_model
         self.max_tokens = settings.openai_max_tokens
 
-        if self.api_key:
-            openai.api_key = self.api_key
-        else:
+        if not self.api_key:
             logger.warning("OpenAI API key not configured")
 
     async def generate_response(
@@ -42,7 +40,7 @@ class OpenAIService:
                 params["tools"] = [{"type": "function", "function": func} for func in functions]
                 params["tool_choice"] = "auto"
 
-            response = openai.chat.completions.create(**params)
+            response = await llm_client.chat_completion(**params)
 
             if functions and response.choices[0].message.tool_calls:
                 tool_call = response.choices[0].message.tool_calls[0]
@@ -0,0 +1,103 @@
+"""
+Database full-text product search
+Replaces the leading-wildcard ILIKE filters (name, description, SKU, category,
+brand) with an index the database can use, for deployments where the
+in-process product search index is not shared between nodes. The backend
+follows settings.database_url:
+
+- SQLite: the products_fts FTS5 table (trigram tokenizer), kept in sync with
+  products by triggers. A quoted trigram phrase matches the same substrings
+  ILIKE '%...%' does, Bangla included.
+- PostgreSQL: pg_trgm GIN indexes serve the ILIKE filters themselves, and the
+  products.search_vector tsvector also matches the query's words in any
+  order or column.
+
+Both are created by the add_product_fulltext_search migration. Until it has
+run (or for other databases, queries shorter than a trigram, or
+BANG_PRODUCT_FULLTEXT_BACKEND=off) the ILIKE filter is used.
+"""
+from typing import Optional, Sequence
+import threading
+
+from sqlalchemy import column, inspect, or_, select, table, text
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import settings
+from app.db.models import Product
+
+SEARCH_COLUMNS = ("name", "description", "sku", "category", "brand")
+FTS_TABLE = "products_fts"
+# The trigram tokenizer cannot match anything shorter
+FTS_MIN_QUERY_LENGTH = 3
+
+
+def ilike_filter(query: str, columns: Sequence[str] = SEARCH_COLUMNS) -> ColumnElement:
+    search_term = f"%{query}%"
+    return or_(*(getattr(Product, name).ilike(search_term) for name in columns))
+
+
+def fts5_match_expression(query: str, columns: Sequence[str] = SEARCH_COLUMNS) -> str:
+    """FTS5 query matching `query` as a substring of any of `columns`"""
+    phrase = '"' + query.replace('"', '""') + '"'
+    if tuple(columns) == SEARCH_COLUMNS:
+        return phrase
+    return "{" + " ".join(columns) + "} : " + phrase
+
+
+class ProductFullTextSearch:
+    def __init__(self):
+        self._backend: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> str:
+        """"fts5", "postgresql" or "ilike", resolved once per process"""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._detect_backend()
+        return self._backend
+
+    def refresh(self):
+        """Re-detect the backend, e.g. after running the migration"""
+        self._backend = None
+
+    def search_filter(self, query: str, columns: Sequence[str] = SEARCH_COLUMNS) -> ColumnElement:
+        """Filter for products whose `columns` contain `query`"""
+        query = " ".join(query.split())
+        backend = self.backend
+        if backend == "fts5" and len(query) >= FTS_MIN_QUERY_LENGTH:
+            matches = select(column("rowid")).select_from(table(FTS_TABLE)).where(
+                text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=fts5_match_expression(query, columns))
+            )
+            return Product.id.in_(matches)
+        if backend == "postgresql" and tuple(columns) == SEARCH_COLUMNS:
+            # ILIKE is answered from the trigram indexes; the tsvector adds reordered words
+            return or_(
+                ilike_filter(query, columns),
+                text("products.search_vector @@ plainto_tsquery('simple', :ts_query)").bindparams(ts_query=query)
+            )
+        return ilike_filter(query, columns)
+
+    def _detect_backend(self) -> str:
+        if settings.product_fulltext_backend == "off":
+            return "ilike"
+
+        # Imported lazily to keep this module usable without a configured database
+        from app.db.session import engine
+
+        try:
+            inspector = inspect(engine)
+            if engine.dialect.name == "sqlite" and inspector.has_table(FTS_TABLE):
+                return "fts5"
+            if engine.dialect.name == "postgresql" and any(
+                col["name"] == "search_vector" for col in inspector.get_columns(Product.__tablename__)
+            ):
+                return "postgresql"
+        except Exception as e:
+            print(f"Failed to detect product full-text search backend: {e}")
+        return "ilike"
+
+
+# Singleton instance
+product_fulltext = ProductFullTextSearch()
@@ -1,23 +1,65 @@
 """
 Product Inquiry Service - Handles customer queries about products, prices, and inventory
 """
-from typing import Dict, Any, List, Optional, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import and_
 from fuzzywuzzy import fuzz
 from fuzzywuzzy.process import extractOne
+import asyncio
+import functools
 import re
 
-from app.db.base import get_db
+from app.core.config import settings
+from app.core.tenant import TenantContext
 from app.db.models import Product, Customer, Order
+from app.db.session import get_read_db_context
+from app.services.catalog_facets import catalog_facets
+from app.services.catalog_snapshot import CatalogSnapshot, ProductRecord, catalog_snapshots
+from app.services.copurchase import copurchase_models
 from app.services.openai_service import openai_service
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.product_fulltext import product_fulltext
+from app.services.product_search_index import product_search_indexes
+from app.services.reply_cards import tenant_reply_cards
+from app.services.transliterator import transliterator
+
+# Query routes in priority order (price queries win over everything else)
+PRODUCT_QUERY_KEYWORDS = {
+    "price": ['price', 'dam', 'koto', 'rate', 'cost', 'মূল্য', 'দাম', 'কত'],
+    "availability": ['available', 'stock', 'have', 'ache', 'স্টক', 'আছে'],
+    "info": ['about', 'details', 'info', 'বর্ণনা', 'তথ্য'],
+    "category": ['category', 'type', 'ধরন', 'ক্যাটাগরি'],
+    "recommendation": ['recommend', 'suggest', 'ভালো', 'রেকমেন্ড'],
+    "purchase": ['order', 'buy', 'purchase', 'অর্ডার', 'কিনতে'],
+}
+PRODUCT_QUERY_ROUTES = tuple(PRODUCT_QUERY_KEYWORDS)
+PRODUCT_QUERY_MATCHER = KeywordMatcher(PRODUCT_QUERY_KEYWORDS)
 
 
 class ProductInquiryService:
-    def __init__(self):
-        self.db: Session = next(get_db())
+    def __init__(self, lookup_workers: int = 8):
+        # Lookups hold no Session between calls: handlers answer from the tenant's
+        # read-only CatalogSnapshot, and anything else opens a short-lived session
+        # pinned to the tenant the call was made for
+        self.lookup_executor = ThreadPoolExecutor(max_workers=lookup_workers, thread_name_prefix="product-lookup")
 
-    def handle_product_query(self, query: str, entities: Dict[str, Any], customer_id: Optional[str] = None) -> Dict[str, Any]:
+    async def run_lookup(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run blocking catalog work (queries, fuzzy matching) on lookup_executor
+        so the event loop keeps serving other conversations meanwhile
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.lookup_executor, functools.partial(func, *args))
+
+    def handle_product_query(
+        self,
+        query: str,
+        entities: Dict[str, Any],
+        customer_id: Optional[str] = None,
+        tenant_id: Optional[str] = None,
+        language: str = "bn"
+    ) -> Dict[str, Any]:
         """
         Handle various product-related queries and return instant responses
 
@@ -25,41 +67,38 @@ class ProductInquiryService:
             query: The customer's message/query
             entities: Extracted entities from NLU
             customer_id: Customer identifier for personalization
+            tenant_id: Tenant whose catalog to answer from (default: the current TenantContext)
+            language: Detected language; product cards are rendered in it when the card has a translation
 
         Returns:
             Dict with response text and metadata
         """
-        query_lower = query.lower()
-
-        # Price queries - highest priority
-        if any(word in query_lower for word in ['price', 'dam', 'koto', 'rate', 'cost', 'মূল্য', 'দাম', 'কত']):
-            return self._handle_price_query(query, entities)
-
-        # Product availability/stock queries
-        elif any(word in query_lower for word in ['available', 'stock', 'have', 'ache', 'available', 'স্টক', 'আছে']):
-            return self._handle_availability_query(query, entities)
-
-        # Product information queries
-        elif any(word in query_lower for word in ['about', 'details', 'info', 'বর্ণনা', 'তথ্য']):
-            return self._handle_product_info_query(query, entities)
-
-        # Category queries
-        elif any(word in query_lower for word in ['category', 'type', 'ধরন', 'ক্যাটাগরি']):
-            return self._handle_category_query(query, entities)
-
-        # Recommendation queries
-        elif any(word in query_lower for word in ['recommend', 'suggest', 'ভালো', 'রেকমেন্ড']):
-            return self._handle_recommendation_query(query, entities, customer_id)
-
-        # Order/product status queries
-        elif any(word in query_lower for word in ['order', 'buy', 'purchase', 'অর্ডার', 'কিনতে']):
-            return self._handle_purchase_query(query, entities)
+        catalog = catalog_snapshots.get(tenant_id or TenantContext.get_tenant_id())
+        # Banglish words in Bangla script ("Samsung A54 er dam koto" -> "Samsung A54 এর দাম কত");
+        # product names stay as written
+        if settings.nlu_transliteration_enabled:
+            query = transliterator.canonicalize(query)
+        route = PRODUCT_QUERY_MATCHER.first_label(query, PRODUCT_QUERY_ROUTES)
+
+        if route == "price":
+            return self._handle_price_query(catalog, query, entities, language)
+        elif route == "availability":
+            return self._handle_availability_query(catalog, query, entities, language)
+        elif route == "info":
+            return self._handle_product_info_query(catalog, query, entities, language)
+        elif route == "category":
+            return self._handle_category_query(catalog, query, entities)
+        elif route == "recommendation":
+            return self._handle_recommendation_query(catalog, query, entities, customer_id)
+        elif route == "purchase":
+            return self._handle_purchase_query(catalog, query, entities)
 
         # General product search
-        else:
-            return self._handle_general_product_query(query, entities)
+        return self._handle_general_product_query(catalog, query, entities)
 
-    def _handle_price_query(self, query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_price_query(
+        self, catalog: CatalogSnapshot, query: str, entities: Dict[str, Any], language: str = "bn"
+    ) -> Dict[str, Any]:
         """Handle price-related queries"""
         product_name = self._extract_product_name(query, entities)
 
@@ -70,7 +109,7 @@ class ProductInquiryService:
                 "metadata": {"missing": "product_name"}
             }
 
-        products = self._find_products(product_name)
+        products = self._find_products(catalog, product_name)
 
         if not products:
             return {
@@ -88,26 +127,7 @@ class ProductInquiryService:
                 "metadata": {"product_inactive": product.name}
             }
 
-        response = f"**{product.name}**\n"
-        response += f"💰 দাম: {product.currency} {product.price:,.2f}\n"
-
-        if product.category:
-            response += f"📂 ক্যাটাগরি: {product.category}\n"
-
-        if product.brand:
-            response += f"🏷️ ব্র্যান্ড: {product.brand}\n"
-
-        if product.stock_quantity > 0:
-            stock_status = "✅ স্টকে আছে" if product.stock_quantity > product.min_stock_level else "⚠️ স্টকে কম"
-            response += f"📦 {stock_status} ({product.stock_quantity} পিস)\n"
-        else:
-            response += "❌ স্টকে নেই\n"
-
-        response += "\n\n💳 **ক্রয়ের জন্য:**\n"
-        response += f"• ক্যাশ অন ডেলিভারি সুবিধা আছে\n"
-        response += f"• বিকাশ/নগদ/রকেট পেমেন্ট অপশন\n"
-        response += f"• ঢাকায় ফ্রি ডেলিভারি\n\n"
-        response += f"অর্ডার করতে বলুন: 'আমি এই প্রোডাক্ট কিনতে চাই'"
+        response = tenant_reply_cards.get(catalog.tenant_id).render("price", product, language)
 
         return {
             "response_text": response,
@@ -120,7 +140,9 @@ class ProductInquiryService:
             }
         }
 
-    def _handle_availability_query(self, query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_availability_query(
+        self, catalog: CatalogSnapshot, query: str, entities: Dict[str, Any], language: str = "bn"
+    ) -> Dict[str, Any]:
         """Handle product availability queries"""
         product_name = self._extract_product_name(query, entities)
 
@@ -131,7 +153,7 @@ class ProductInquiryService:
                 "metadata": {"missing": "product_name"}
             }
 
-        products = self._find_products(product_name)
+        products = self._find_products(catalog, product_name)
 
         if not products:
             return {
@@ -148,24 +170,8 @@ class ProductInquiryService:
                 "action": "respond"
             }
 
-        if product.stock_quantity > 0:
-            response = f"✅ **{product.name}** স্টকে আছে!\n\n"
-            response += f"📦 পরিমাণ: {product.stock_quantity} পিস\n"
-            response += f"💰 দাম: {product.currency} {product.price:,.2f}\n\n"
-
-            if product.stock_quantity > 10:
-                response += "🟢 পর্যাপ্ত স্টক আছে\n"
-            elif product.stock_quantity > 5:
-                response += "🟡 স্টক সীমিত\n"
-            else:
-                response += "🟠 শেষ হয়ে যাচ্ছে - দ্রুত অর্ডার করুন!\n"
-
-            response += f"\nঅর্ডার করতে বলুন: '{product.name} অর্ডার করব'"
-        else:
-            response = f"❌ **{product.name}** বর্তমানে স্টকে নেই।\n\n"
-            response += "🔄 কখন আসবে: ৩-৫ কার্যদিবসের মধ্যে\n"
-            response += "📧 নোটিফিকেশন চান? আপনাকে জানিয়ে দেব যখন স্টকে আসবে।\n\n"
-            response += "এই প্রোডাক্টের সাথে মিলে যায় এমন অন্য প্রোডাক্ট দেখবেন?"
+        card = "availability" if product.stock_quantity > 0 else "unavailable"
+        response = tenant_reply_cards.get(catalog.tenant_id).render(card, product, language)
 
         return {
             "response_text": response,
@@ -177,7 +183,9 @@ class ProductInquiryService:
             }
         }
 
-    def _handle_product_info_query(self, query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_product_info_query(
+        self, catalog: CatalogSnapshot, query: str, entities: Dict[str, Any], language: str = "bn"
+    ) -> Dict[str, Any]:
         """Handle product information queries"""
         product_name = self._extract_product_name(query, entities)
 
@@ -187,38 +195,18 @@ class ProductInquiryService:
                 "action": "clarify"
             }
 
-        products = self._find_products(product_name)
+        products = self._find_products(catalog, product_name)
 
         if not products:
             return {
                 "response_text": f"'{product_name}' এর তথ্য খুঁজে পেলাম না।",
-                "action": "respond"
+                "action": "respond",
+                "metadata": {"product_not_found": product_name}
             }
 
         product = products[0]
 
-        response = f"📋 **{product.name}**\n\n"
-
-        if product.description:
-            response += f"📝 {product.description}\n\n"
-
-        response += f"💰 দাম: {product.currency} {product.price:,.2f}\n"
-
-        if product.category:
-            response += f"📂 ক্যাটাগরি: {product.category}\n"
-
-        if product.brand:
-            response += f"🏷️ ব্র্যান্ড: {product.brand}\n"
-
-        if product.stock_quantity > 0:
-            response += f"📦 স্টক: {product.stock_quantity} পিস\n"
-        else:
-            response += "❌ স্টকে নেই\n"
-
-        if product.tags:
-            response += f"🏷️ ট্যাগ: {', '.join(product.tags)}\n"
-
-        response += "\nকোন তথ্য আর চান?"
+        response = tenant_reply_cards.get(catalog.tenant_id).render("info", product, language)
 
         return {
             "response_text": response,
@@ -226,14 +214,9 @@ class ProductInquiryService:
             "metadata": {"product_info": product.name}
         }
 
-    def _handle_category_query(self, query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_category_query(self, catalog: CatalogSnapshot, query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
         """Handle category-based queries"""
-        # Extract category from query
-        categories = self.db.query(Product.category).filter(
-            and_(Product.category.isnot(None), Product.category != "", Product.is_active == True)
-        ).distinct().all()
-
-        category_names = [cat[0] for cat in categories]
+        category_names = catalog_facets.get(catalog.tenant_id).values("category")
 
         if not category_names:
             return {
@@ -256,18 +239,27 @@ class ProductInquiryService:
             "metadata": {"categories_shown": len(category_names)}
         }
 
-    def _handle_recommendation_query(self, query: str, entities: Dict[str, Any], customer_id: Optional[str] = None) -> Dict[str, Any]:
+    def _handle_recommendation_query(
+        self,
+        catalog: CatalogSnapshot,
+        query: str,
+        entities: Dict[str, Any],
+        customer_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """Handle product recommendation queries"""
-        # Get featured products or bestsellers
-        featured_products = self.db.query(Product).filter(
-            and_(Product.is_active == True, Product.is_featured == True)
-        ).limit(5).all()
-
-        if not featured_products:
-            # Fallback to any active products
-            featured_products = self.db.query(Product).filter(
-                Product.is_active == True
-            ).limit(5).all()
+        # What customers who bought the same products also bought, from the precomputed co-purchase matrix
+        personalized: List[ProductRecord] = []
+        if settings.copurchase_enabled and customer_id:
+            # Extra candidates make up for products that have since been deactivated
+            product_ids = copurchase_models.get(catalog.tenant_id).for_customer(str(customer_id), 10)
+            personalized = catalog.products(product_ids)[:5]
+
+        # Otherwise featured products, falling back to any active products
+        if personalized:
+            featured_products = personalized
+        else:
+            featured_ids = catalog_facets.get(catalog.tenant_id).featured_ids(5)
+            featured_products = catalog.products(featured_ids) or catalog.active(5)
 
         if not featured_products:
             return {
@@ -275,7 +267,10 @@ class ProductInquiryService:
                 "action": "respond"
             }
 
-        response = "🌟 **রেকমেন্ডেড প্রোডাক্টস:**\n\n"
+        if personalized:
+            response = "🛒 **আপনার কেনা প্রোডাক্টের সাথে অন্যরা যা কিনেছেন:**\n\n"
+        else:
+            response = "🌟 **রেকমেন্ডেড প্রোডাক্টস:**\n\n"
 
         for product in featured_products:
             response += f"🛍️ **{product.name}**\n"
@@ -286,20 +281,25 @@ class ProductInquiryService:
 
         response += "কোনটা কিনতে চান?"
 
+        metadata: Dict[str, Any] = {"recommendations_count": len(featured_products)}
+        if personalized:
+            # Per-customer, so the reply cache must not share it
+            metadata["personalized"] = True
+
         return {
             "response_text": response,
             "action": "respond",
-            "metadata": {"recommendations_count": len(featured_products)}
+            "metadata": metadata
         }
 
-    def _handle_purchase_query(self, query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_purchase_query(self, catalog: CatalogSnapshot, query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
         """Handle purchase/order intent"""
         product_name = self._extract_product_name(query, entities)
 
         response = "🛒 **অর্ডার করতে:**\n\n"
 
         if product_name:
-            products = self._find_products(product_name)
+            products = self._find_products(catalog, product_name)
             if products:
                 product = products[0]
                 response += f"প্রোডাক্ট: **{product.name}**\n"
@@ -314,15 +314,16 @@ class ProductInquiryService:
             "metadata": {"intent": "purchase", "product": product_name}
         }
 
-    def _handle_general_product_query(self, query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_general_product_query(self, catalog: CatalogSnapshot, query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
         """Handle general product search queries"""
         # Try to find products matching the query
-        products = self._search_products(query)
+        products = self._search_products(catalog, query)
 
         if not products:
             return {
                 "response_text": f"'{query}' এর সাথে মিলে যায় এমন কোন প্রোডাক্ট খুঁজে পেলাম না। অন্যভাবে বলুন।",
-                "action": "respond"
+                "action": "respond",
+                "metadata": {"product_not_found": query}
             }
 
         if len(products) == 1:
@@ -380,18 +381,22 @@ class ProductInquiryService:
 
         return None
 
-    def _find_products(self, product_name: str, limit: int = 5) -> List[Product]:
+    def _find_products(self, catalog: CatalogSnapshot, product_name: str, limit: int = 5) -> List[ProductRecord]:
         """Find products by name using fuzzy matching"""
-        # Exact match first
-        exact_matches = self.db.query(Product).filter(
-            and_(Product.name.ilike(f"%{product_name}%"), Product.is_active == True)
-        ).all()
+        if settings.product_search_index_enabled:
+            return self._indexed_products(catalog, product_name, limit)
 
-        if exact_matches:
-            return exact_matches[:limit]
+        with get_read_db_context(catalog.tenant_id) as db:
+            # Exact match first
+            exact_matches = db.query(Product.id).filter(
+                and_(product_fulltext.search_filter(product_name, columns=("name",)), Product.is_active == True)
+            ).limit(limit).all()
 
-        # Fuzzy matching on all active products
-        all_products = self.db.query(Product).filter(Product.is_active == True).all()
+            if exact_matches:
+                return catalog.products([row.id for row in exact_matches])
+
+            # Fuzzy matching on all active products
+            all_products = db.query(Product.id, Product.name).filter(Product.is_active == True).all()
 
         if not all_products:
             return []
@@ -401,57 +406,64 @@ class ProductInquiryService:
         best_match, score = extractOne(product_name, product_names, scorer=fuzz.ratio)
 
         if score >= 60:  # Confidence threshold
-            matching_products = [p for p in all_products if p.name == best_match]
-            return matching_products[:limit]
+            matching_ids = [p.id for p in all_products if p.name == best_match]
+            return catalog.products(matching_ids[:limit])
 
         return []
 
-    def _search_products(self, query: str, limit: int = 10) -> List[Product]:
+    def _search_products(self, catalog: CatalogSnapshot, query: str, limit: int = 10) -> List[ProductRecord]:
         """Search products using various criteria"""
-        search_term = f"%{query}%"
-
-        products = self.db.query(Product).filter(
-            and_(
-                Product.is_active == True,
-                or_(
-                    Product.name.ilike(search_term),
-                    Product.description.ilike(search_term),
-                    Product.category.ilike(search_term),
-                    Product.brand.ilike(search_term),
-                    Product.sku.ilike(search_term)
-                )
-            )
-        ).limit(limit).all()
-
-        return products
-
-    def get_product_by_id(self, product_id: int) -> Optional[Product]:
+        if settings.product_search_index_enabled:
+            return self._indexed_products(catalog, query, limit)
+
+        with get_read_db_context(catalog.tenant_id) as db:
+            rows = db.query(Product.id).filter(
+                and_(Product.is_active == True, product_fulltext.search_filter(query))
+            ).limit(limit).all()
+
+        return catalog.products([row.id for row in rows])
+
+    def _indexed_products(self, catalog: CatalogSnapshot, query: str, limit: int) -> List[ProductRecord]:
+        """Best matches from the tenant's search index, in rank order"""
+        product_ids = product_search_indexes.get(catalog.tenant_id).search(query, limit)
+        if not product_ids:
+            return []
+        return catalog.products(product_ids)
+
+    def get_product_by_id(self, product_id: int, tenant_id: Optional[str] = None) -> Optional[ProductRecord]:
         """Get product by ID"""
-        return self.db.query(Product).filter(
-            and_(Product.id == product_id, Product.is_active == True)
-        ).first()
+        products = catalog_snapshots.get(tenant_id or TenantContext.get_tenant_id()).products([product_id])
+        return products[0] if products else None
 
-    def get_products_by_category(self, category: str, limit: int = 20) -> List[Product]:
+    def get_products_by_category(self, category: str, limit: int = 20, tenant_id: Optional[str] = None) -> List[ProductRecord]:
         """Get products by category"""
-        return self.db.query(Product).filter(
-            and_(Product.category.ilike(f"%{category}%"), Product.is_active == True)
-        ).limit(limit).all()
-
-    def get_featured_products(self, limit: int = 10) -> List[Product]:
+        catalog = catalog_snapshots.get(tenant_id or TenantContext.get_tenant_id())
+        with get_read_db_context(catalog.tenant_id) as db:
+            rows = db.query(Product.id).filter(
+                and_(Product.category.ilike(f"%{category}%"), Product.is_active == True)
+            ).limit(limit).all()
+        return catalog.products([row.id for row in rows])
+
+    def get_featured_products(self, limit: int = 10, tenant_id: Optional[str] = None) -> List[ProductRecord]:
         """Get featured products"""
-        return self.db.query(Product).filter(
-            and_(Product.is_active == True, Product.is_featured == True)
-        ).limit(limit).all()
+        catalog = catalog_snapshots.get(tenant_id or TenantContext.get_tenant_id())
+        return catalog.products(catalog_facets.get(catalog.tenant_id).featured_ids(limit))
 
-    async def search_products(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    async def search_products(self, query: str, limit: int = 5, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Search for products and return them as dictionaries (for API use)
         """
-        products = self._search_products(query, limit)
+        # Resolve the tenant here: TenantContext may change before the lookup thread runs
+        tenant_id = tenant_id or TenantContext.get_tenant_id()
+        return await self.run_lookup(self._search_product_dicts, query, limit, tenant_id)
+
+    def _search_product_dicts(self, query: str, limit: int, tenant_id: Optional[str]) -> List[Dict[str, Any]]:
+        catalog = catalog_snapshots.get(tenant_id)
+        products = self._search_products(catalog, query, limit)
         
         if not products:
             # Try fuzzy matching
-            products = self._find_products(query, limit)
+            products = self._find_products(catalog, query, limit)
         
         # Convert to dict format
         result = []
@@ -468,11 +480,11 @@ class ProductInquiryService:
                 "stock": product.stock_quantity,
                 "is_active": product.is_active,
                 "is_featured": product.is_featured,
-                "tags": product.tags
+                "tags": list(product.tags) if product.tags else product.tags
             })
         
         return result
 
 
 # Singleton instance
-product_inquiry_service = ProductInquiryService()
+product_inquiry_service = ProductInquiryService(lookup_workers=settings.dialogue_lookup_workers)
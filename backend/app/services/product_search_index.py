@@ -0,0 +1,465 @@
+"""
+Product search index
+Per-tenant in-memory inverted index over product name, SKU, brand, category,
+tags and description, replacing ILIKE scans and fuzzy matching over the whole
+catalog. Text is split into Latin word, number and Bangla word tokens
+("iPhone15 এর দাম" -> iphone, 15, এর, দাম). A query token that is not in the
+catalog vocabulary falls back to the closest vocabulary tokens by character
+trigrams ("samsng" -> samsung). The products router applies creates, updates
+and deletes incrementally; other workers rebuild when the tenant's catalog
+version changes.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from collections import Counter
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.models import Product
+from app.services.entity_extractor import DIGIT_FOLD
+
+# Fields a product must match a query in; description words only add to the score
+KEY_FIELD_WEIGHTS = {"name": 3.0, "sku": 3.0, "brand": 2.0, "category": 1.5, "tags": 1.5}
+DESCRIPTION_WEIGHT = 0.5
+FUZZY_MIN_SIMILARITY = 0.6
+FUZZY_MAX_EXPANSIONS = 3
+
+# Question words around a product name; they never narrow a product search
+QUERY_STOPWORDS = frozenset([
+    "er", "dam", "koto", "ache", "ase", "ki", "ta", "ti", "ar", "bhai", "apu", "plz", "please",
+    "price", "cost", "rate", "stock", "available", "have", "buy", "order", "about", "details", "info",
+    "the", "an", "of", "is", "for", "what", "how", "much",
+    "এর", "দাম", "কত", "আছে", "কি", "কী", "টা", "টি", "মূল্য", "স্টক", "ভাই", "অর্ডার",
+])
+
+_TOKEN_RE = re.compile(r"[a-z]+|[0-9]+|[\u0980-\u09ff]+|[^\W\d_]+")
+# Model names written together ("a54", "iphone15") are also kept whole
+_MODEL_RE = re.compile(r"\b(?=[a-z]*[0-9])(?=[0-9]*[a-z])[a-z0-9]+\b")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Latin words, numbers, model names and Bangla words of a text, lowercased with digits folded"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFC", text).translate(DIGIT_FOLD).lower()
+    return _TOKEN_RE.findall(text) + _MODEL_RE.findall(text)
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"#{token}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def product_fields(product: Any) -> Dict[str, Any]:
+    """Searchable fields of a Product row (or any object with the same attributes)"""
+    return {
+        "name": product.name,
+        "sku": product.sku,
+        "brand": product.brand,
+        "category": product.category,
+        "tags": product.tags,
+        "description": product.description,
+    }
+
+
+class PostingArrays(NamedTuple):
+    """Snapshot of one token's postings for vectorized intersection and ranking"""
+    ids: np.ndarray  # product ids, ascending
+    weights: np.ndarray
+    name_lengths: np.ndarray
+    ranked: np.ndarray  # positions, best first: higher weight, then shorter name, then lower id
+
+
+def _lookup(sorted_ids: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(positions in sorted_ids, found mask) for ids"""
+    positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return positions, sorted_ids[positions] == ids
+
+
+def _top_ids(ids: np.ndarray, scores: np.ndarray, name_lengths: np.ndarray, limit: int) -> List[int]:
+    """The `limit` best ids: highest score (to 1e-3), then shortest name, then lowest id"""
+    # One int64 sort key, so a partial sort finds the top without a full lexsort
+    keys = (
+        (np.round(scores * 1000).astype(np.int64) << 40)
+        | ((255 - np.minimum(name_lengths, 255)) << 32)
+        | (0xFFFFFFFF - ids)
+    )
+    if len(keys) > limit:
+        keys = keys[np.argpartition(-keys, limit)[:limit]]
+    keys = np.sort(keys)[::-1]
+    return (0xFFFFFFFF - (keys & 0xFFFFFFFF)).tolist()
+
+
+def _best_per_id(ids: np.ndarray, scores: np.ndarray, name_lengths: np.ndarray):
+    """Ascending unique ids, each with its highest score"""
+    order = np.lexsort((-scores, ids))
+    ids, scores, name_lengths = ids[order], scores[order], name_lengths[order]
+    first = np.ones(len(ids), dtype=bool)
+    first[1:] = ids[1:] != ids[:-1]
+    return ids[first], scores[first], name_lengths[first]
+
+
+class ProductSearchIndex:
+    """
+    Inverted index for one tenant's active products. Key-field postings map a
+    token to {product id: best field weight}; description postings are kept
+    apart so words that only appear in descriptions rank but do not filter.
+    Searches run on numpy snapshots of the postings they touch, rebuilt
+    lazily after a token's postings change.
+    """
+
+    def __init__(self):
+        self._key_postings: Dict[str, Dict[int, float]] = {}
+        self._text_postings: Dict[str, Dict[int, float]] = {}
+        # Key-field vocabulary by trigram, for fuzzy fallback
+        self._trigram_tokens: Dict[str, Set[str]] = {}
+        self._doc_tokens: Dict[int, Tuple[Dict[str, float], Dict[str, float]]] = {}
+        self._name_lengths: Dict[int, int] = {}
+        # (key field?, token) -> snapshot
+        self._arrays: Dict[Tuple[bool, str], PostingArrays] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def add(self, product_id: int, fields: Dict[str, Any]):
+        """Index (or re-index) a product"""
+        key_tokens: Dict[str, float] = {}
+        for field, weight in KEY_FIELD_WEIGHTS.items():
+            value = fields.get(field)
+            text = " ".join(str(v) for v in value) if isinstance(value, (list, tuple)) else value
+            for token in tokenize(text):
+                if key_tokens.get(token, 0.0) < weight:
+                    key_tokens[token] = weight
+        text_tokens = {
+            token: DESCRIPTION_WEIGHT for token in tokenize(fields.get("description")) if token not in key_tokens
+        }
+
+        with self._lock:
+            self.remove(product_id)
+            self._name_lengths[product_id] = len(tokenize(fields.get("name")))
+            for token, weight in key_tokens.items():
+                postings = self._key_postings.setdefault(token, {})
+                if not postings:
+                    for gram in trigrams(token):
+                        self._trigram_tokens.setdefault(gram, set()).add(token)
+                postings[product_id] = weight
+                self._arrays.pop((True, token), None)
+            for token, weight in text_tokens.items():
+                self._text_postings.setdefault(token, {})[product_id] = weight
+                self._arrays.pop((False, token), None)
+            self._doc_tokens[product_id] = (key_tokens, text_tokens)
+
+    def remove(self, product_id: int):
+        with self._lock:
+            entry = self._doc_tokens.pop(product_id, None)
+            if entry is None:
+                return
+            self._name_lengths.pop(product_id, None)
+            key_tokens, text_tokens = entry
+            for token in key_tokens:
+                self._arrays.pop((True, token), None)
+                postings = self._key_postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._key_postings[token]
+                    for gram in trigrams(token):
+                        vocabulary = self._trigram_tokens.get(gram)
+                        if vocabulary is not None:
+                            vocabulary.discard(token)
+                            if not vocabulary:
+                                del self._trigram_tokens[gram]
+            for token in text_tokens:
+                self._arrays.pop((False, token), None)
+                postings = self._text_postings.get(token)
+                if postings is not None:
+                    postings.pop(product_id, None)
+                    if not postings:
+                        del self._text_postings[token]
+
+    def search(self, query: str, limit: int = 10) -> List[int]:
+        """
+        Ids of the best-matching products, best first. A product must match
+        every query word found in the catalog's key fields (exactly or by
+        fuzzy fallback); other words only add to its score.
+        """
+        tokens = [t for t in dict.fromkeys(tokenize(query)) if t not in QUERY_STOPWORDS]
+        if not tokens:
+            return []
+
+        with self._lock:
+            # A known model name ("a54") already implies its parts ("a", "54")
+            implied = {
+                part for token in tokens
+                if token in self._key_postings and _MODEL_RE.fullmatch(token)
+                for part in _TOKEN_RE.findall(token)
+            }
+            tokens = [token for token in tokens if token not in implied]
+            total = len(self._doc_tokens) or 1
+            # Per required word, its (snapshot, score factor) alternatives
+            required: List[List[Tuple[PostingArrays, float]]] = []
+            optional: List[Tuple[PostingArrays, float]] = []
+            for token in tokens:
+                if token not in self._key_postings and token in self._text_postings:
+                    optional.append(self._weighted(False, token, 1.0, total))
+                    continue
+                expansions = self._expand(token)
+                if expansions:
+                    required.append([self._weighted(True, match, similarity, total) for match, similarity in expansions])
+
+            if not required:
+                # Only description words: they have to match after all
+                required, optional = [[alternative] for alternative in optional], []
+            if not required:
+                return []
+            if len(required) == 1 and not optional:
+                return self._top_of(required[0], limit)
+
+            # Intersect the required words, smallest first
+            groups = sorted((self._combine(alternatives) for alternatives in required), key=lambda group: len(group[0]))
+            ids, scores, name_lengths = groups[0]
+            for other_ids, other_scores, _ in groups[1:]:
+                positions, found = _lookup(other_ids, ids)
+                ids, name_lengths = ids[found], name_lengths[found]
+                scores = scores[found] + other_scores[positions[found]]
+                if not len(ids):
+                    return []
+            for arrays, factor in optional:
+                positions, found = _lookup(arrays.ids, ids)
+                scores = scores + np.where(found, arrays.weights[positions] * factor, 0.0)
+
+            return _top_ids(ids, scores, name_lengths, limit)
+
+    def _weighted(self, key_field: bool, token: str, similarity: float, total: int) -> Tuple[PostingArrays, float]:
+        arrays = self._posting_arrays(key_field, token)
+        return arrays, similarity * math.log(1 + total / len(arrays.ids))
+
+    def _posting_arrays(self, key_field: bool, token: str) -> PostingArrays:
+        arrays = self._arrays.get((key_field, token))
+        if arrays is None:
+            postings = (self._key_postings if key_field else self._text_postings)[token]
+            ids = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            weights = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            order = np.argsort(ids)
+            ids, weights = ids[order], weights[order]
+            name_lengths = np.fromiter(
+                (self._name_lengths.get(product_id, 0) for product_id in ids.tolist()), dtype=np.int64, count=len(ids)
+            )
+            ranked = np.lexsort((ids, name_lengths, -weights))
+            arrays = self._arrays[(key_field, token)] = PostingArrays(ids, weights, name_lengths, ranked)
+        return arrays
+
+    @staticmethod
+    def _combine(alternatives: List[Tuple[PostingArrays, float]]):
+        """(ids, scores, name lengths) of a word matched by any of its alternatives"""
+        if len(alternatives) == 1:
+            arrays, factor = alternatives[0]
+            return arrays.ids, arrays.weights * factor, arrays.name_lengths
+        return _best_per_id(
+            np.concatenate([arrays.ids for arrays, _ in alternatives]),
+            np.concatenate([arrays.weights * factor for arrays, factor in alternatives]),
+            np.concatenate([arrays.name_lengths for arrays, _ in alternatives])
+        )
+
+    @staticmethod
+    def _top_of(alternatives: List[Tuple[PostingArrays, float]], limit: int) -> List[int]:
+        """
+        Best products for a single word without touching its whole posting
+        list: a product in the overall top `limit` is in the top `limit` of
+        the alternative that scores it best.
+        """
+        heads = [(arrays, factor, arrays.ranked[:limit]) for arrays, factor in alternatives]
+        if len(heads) == 1:
+            arrays, _, head = heads[0]
+            return arrays.ids[head].tolist()
+        ids, scores, name_lengths = _best_per_id(
+            np.concatenate([arrays.ids[head] for arrays, _, head in heads]),
+            np.concatenate([arrays.weights[head] * factor for arrays, factor, head in heads]),
+            np.concatenate([arrays.name_lengths[head] for arrays, _, head in heads])
+        )
+        return _top_ids(ids, scores, name_lengths, limit)
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """(vocabulary token, similarity) pairs a query token stands for"""
+        if token in self._key_postings:
+            return [(token, 1.0)]
+        # Numbers, model names and short words must match exactly
+        if len(token) < 3 or any(ch.isdigit() for ch in token):
+            return []
+        grams = trigrams(token)
+        overlap: Counter = Counter()
+        for gram in grams:
+            overlap.update(self._trigram_tokens.get(gram, ()))
+        matches = []
+        for candidate, shared in overlap.items():
+            similarity = 2.0 * shared / (len(grams) + len(candidate))  # Dice; a token has ~len(token) trigrams
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                matches.append((candidate, similarity))
+        return heapq.nlargest(FUZZY_MAX_EXPANSIONS, matches, key=lambda match: match[1])
+
+
+class ProductSearchIndexRegistry:
+    """
+    Per-tenant indexes keyed by the tenant's catalog version and re-checked
+    every settings.product_index_check_seconds. Rows another worker created or
+    updated are applied as a delta; deletions force a rebuild. The "" index
+    (no tenant context) covers every tenant's products.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[str, Tuple[Optional[Tuple[int, int, Any]], ProductSearchIndex, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: Optional[str] = None) -> ProductSearchIndex:
+        key = tenant_id or ""
+        now = time.monotonic()
+        entry = self._indexes.get(key)
+        if entry is not None and now - entry[2] < settings.product_index_check_seconds:
+            return entry[1]
+
+        with self._lock:
+            entry = self._indexes.get(key)
+            if entry is not None and now - entry[2] < settings.product_index_check_seconds:
+                return entry[1]
+
+            version = load_catalog_version(tenant_id)
+            if entry is not None and version is not None and entry[0] == version:
+                index = entry[1]
+            elif entry is not None and version is not None and self._refresh(entry[1], tenant_id, entry[0], version):
+                index = entry[1]
+            else:
+                index = ProductSearchIndex()
+                for product_id, fields in load_catalog(tenant_id):
+                    index.add(product_id, fields)
+            self._indexes[key] = (version, index, now)
+        return index
+
+    def _refresh(self, index: ProductSearchIndex, tenant_id: Optional[str],
+                 old: Optional[Tuple[int, int, Any]], new: Tuple[int, int, Any]) -> bool:
+        """
+        Catch up with rows another worker created or updated since `old`.
+        Returns False (rebuild instead) when rows were deleted, which a delta
+        cannot see.
+        """
+        if old is None:
+            return False
+        changes = load_catalog_changes(tenant_id, old[1], old[2])
+        if changes is None or new[0] - old[0] != sum(1 for product_id, _ in changes if product_id > old[1]):
+            return False
+        for product_id, fields in changes:
+            if fields is None:
+                index.remove(product_id)
+            else:
+                index.add(product_id, fields)
+        return True
+
+    def upsert(self, product: Product):
+        """Apply a created or updated product to the loaded indexes that cover it"""
+        self._apply(product.tenant_id, product.id, product_fields(product) if product.is_active else None)
+
+    def remove(self, tenant_id: Optional[str], product_id: int):
+        self._apply(tenant_id, product_id, None)
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        """Drop a tenant's index so it is rebuilt on next use"""
+        self._indexes.pop(tenant_id or "", None)
+
+    def _apply(self, tenant_id: Optional[str], product_id: int, fields: Optional[Dict[str, Any]]):
+        """
+        Apply a local write right away. The stored version is left as it was:
+        the current one would also cover other workers' changes this index has
+        not seen, so the next check's delta picks them up (and re-applies this
+        write, which is idempotent).
+        """
+        for key in {tenant_id or "", ""}:
+            entry = self._indexes.get(key)
+            if entry is None:
+                continue
+            if fields is None:
+                entry[1].remove(product_id)
+            else:
+                entry[1].add(product_id, fields)
+
+
+def _catalog_query(db, tenant_id: Optional[str], *columns):
+    query = db.query(*columns)
+    if tenant_id:
+        query = query.filter(Product.tenant_id == tenant_id)
+    return query
+
+
+def load_catalog_version(tenant_id: Optional[str]) -> Optional[Tuple[int, int, Any]]:
+    """(product count, max id, latest updated_at) for a tenant, None if the database is unavailable"""
+    # Imported lazily to keep this module usable without a configured database
+    from sqlalchemy import func
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count, max_id, updated_at = _catalog_query(
+            db, tenant_id, func.count(Product.id), func.max(Product.id), func.max(Product.updated_at)
+        ).one()
+        return (count, max_id or 0, updated_at)
+    except Exception as e:
+        print(f"Failed to load catalog version for tenant {tenant_id}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+def load_catalog(tenant_id: Optional[str]) -> List[Tuple[int, Dict[str, Any]]]:
+    """A tenant's active products as (id, searchable fields)"""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rows = _catalog_query(
+            db, tenant_id, Product.id, Product.name, Product.sku, Product.brand,
+            Product.category, Product.tags, Product.description
+        ).filter(Product.is_active == True).all()
+        return [(row.id, product_fields(row)) for row in rows]
+    except Exception as e:
+        print(f"Failed to load catalog for tenant {tenant_id}: {e}")
+        return []
+    finally:
+        db.close()
+
+
+def load_catalog_changes(tenant_id: Optional[str], since_id: int,
+                         since_updated_at: Any) -> Optional[List[Tuple[int, Optional[Dict[str, Any]]]]]:
+    """
+    Products created after `since_id` or updated at/after `since_updated_at`
+    as (id, searchable fields), fields None for deactivated ones. None if the
+    database is unavailable.
+    """
+    from sqlalchemy import or_
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        changed = Product.id > since_id
+        if since_updated_at is not None:
+            # >= : rows written in the same second as the last check are re-applied, harmlessly
+            changed = or_(changed, Product.updated_at >= since_updated_at)
+        rows = _catalog_query(
+            db, tenant_id, Product.id, Product.name, Product.sku, Product.brand,
+            Product.category, Product.tags, Product.description, Product.is_active
+        ).filter(changed).all()
+        return [(row.id, product_fields(row) if row.is_active else None) for row in rows]
+    except Exception as e:
+        print(f"Failed to load catalog changes for tenant {tenant_id}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+# Singleton instance
+product_search_indexes = ProductSearchIndexRegistry()
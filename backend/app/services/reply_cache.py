@@ -0,0 +1,205 @@
+"""
+Near-duplicate reply cache for bot responses
+Stateless replies (product answers) are cached per tenant, intent and language
+under a 64-bit SimHash of the message's compact canonical form, so spelling,
+spacing and filler-word variants ("iphone 15 er dam koto?" / "iPhone15 dam koto")
+reuse one rendered reply. Numbers, model names and entities must match exactly;
+only the rest of the wording is compared approximately. Entries live for a short
+TTL and are dropped when the tenant's products or templates change.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import re
+import threading
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.routers.metrics import reply_cache_requests
+from app.services.nlu_cache import normalize_text
+from app.services.transliterator import transliterator
+
+SIGNATURE_BITS = 64
+SHINGLE_SIZE = 3
+
+# Words that do not change the answer; dropped before hashing (Banglish is transliterated first)
+FILLER_WORDS = frozenset([
+    "এর", "er", "ভাই", "ভাইয়া", "আপু", "দাদা", "জি", "একটু", "প্লিজ",
+    "please", "plz", "pls", "bro", "hi", "hello", "the", "a", "an", "of", "is",
+])
+# Latin letters and digits: model names and numbers, which must match exactly
+_ANCHOR_RE = re.compile(r"[a-z0-9]+")
+_BIT_SHIFTS = np.arange(SIGNATURE_BITS, dtype=np.uint64)
+
+
+class ReplyKey(NamedTuple):
+    scope: Tuple[str, str, str, str]  # (tenant, intent, language, exact-match guard)
+    signature: int
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over character shingles"""
+    if len(text) <= SHINGLE_SIZE:
+        shingles = [text]
+    else:
+        shingles = [text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64
+    )
+    votes = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).sum(axis=0)
+    bits = votes * 2 > len(shingles)
+    return int(np.packbits(bits, bitorder="little").view("<u8")[0])
+
+
+def compact_form(text: str) -> Tuple[str, Dict[str, Any]]:
+    """(compact canonical text, masked volatile entities) of a message"""
+    if settings.nlu_transliteration_enabled:
+        text = transliterator.canonicalize(text)
+    normalized = normalize_text(text)
+    words = [word for word in normalized.canonical.split(" ") if word and word not in FILLER_WORDS]
+    return "".join(words), normalized.volatile
+
+
+class ReplyCache:
+    """
+    In-process LRU of rendered replies. Each scope keeps its signatures in
+    banded lookup tables (max_distance + 1 bands), so a query only compares
+    against signatures that share at least one band exactly; by the pigeonhole
+    principle that finds every stored signature within max_distance bits.
+    """
+
+    def __init__(self, max_entries: int = 20000, ttl_seconds: int = 120, max_distance: int = 3):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self.band_bits = SIGNATURE_BITS // self.band_count
+        # scope -> list of {band value: set(signatures)}
+        self._bands: Dict[Tuple[str, str, str, str], List[Dict[int, set]]] = {}
+        # (scope, signature) -> (reply, expires_at), in LRU order
+        self._entries: "OrderedDict[Tuple[Tuple[str, str, str, str], int], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(
+        self,
+        message: str,
+        tenant_id: Optional[str],
+        intent: str,
+        language: str,
+        entities: Optional[Dict[str, Any]] = None
+    ) -> ReplyKey:
+        compact, volatile = compact_form(message)
+        guard = json.dumps(
+            [_ANCHOR_RE.findall(compact), volatile, entities or {}],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return ReplyKey((tenant_id or "", intent, language, guard), simhash(compact))
+
+    def get(self, key: ReplyKey) -> Optional[Dict[str, Any]]:
+        """Copy of the cached reply for a near-duplicate message, or None"""
+        now = time.time()
+        with self._lock:
+            match = self._find(key)
+            entry = self._entries.get((key.scope, match)) if match is not None else None
+            if entry is not None and entry[1] <= now:
+                self._remove(key.scope, match)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                reply_cache_requests.labels(result="miss").inc()
+                return None
+            self._entries.move_to_end((key.scope, match))
+            self.hits += 1
+        reply_cache_requests.labels(result="hit").inc()
+        reply = copy.deepcopy(entry[0])
+        reply.setdefault("metadata", {})["reply_cache"] = "hit"
+        return reply
+
+    def set(self, key: ReplyKey, reply: Dict[str, Any]):
+        value = (copy.deepcopy(reply), time.time() + self.ttl_seconds)
+        with self._lock:
+            entry_key = (key.scope, key.signature)
+            if entry_key not in self._entries:
+                bands = self._bands.setdefault(key.scope, [{} for _ in range(self.band_count)])
+                for table, band in zip(bands, self._band_values(key.signature)):
+                    table.setdefault(band, set()).add(key.signature)
+            self._entries[entry_key] = value
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                (scope, signature), _ = next(iter(self._entries.items()))
+                self._remove(scope, signature)
+
+    def invalidate_tenant(self, tenant_id: Optional[str]):
+        """
+        Drop a tenant's replies. Replies cached without a tenant are answered
+        from the shared catalog, so they are dropped on every invalidation.
+        """
+        tenants = {tenant_id or "", ""}
+        with self._lock:
+            for scope in [scope for scope in self._bands if scope[0] in tenants]:
+                del self._bands[scope]
+            for entry_key in [k for k in self._entries if k[0][0] in tenants]:
+                del self._entries[entry_key]
+
+    def clear(self):
+        with self._lock:
+            self._bands.clear()
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def _band_values(self, signature: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        # The last band takes the leftover high bits
+        values = [(signature >> (i * self.band_bits)) & mask for i in range(self.band_count - 1)]
+        values.append(signature >> ((self.band_count - 1) * self.band_bits))
+        return values
+
+    def _find(self, key: ReplyKey) -> Optional[int]:
+        """Closest stored signature within max_distance bits (caller holds the lock)"""
+        bands = self._bands.get(key.scope)
+        if not bands:
+            return None
+        best, best_distance = None, self.max_distance + 1
+        for table, band in zip(bands, self._band_values(key.signature)):
+            for signature in table.get(band, ()):
+                distance = bin(signature ^ key.signature).count("1")
+                if distance < best_distance:
+                    best, best_distance = signature, distance
+        return best
+
+    def _remove(self, scope: Tuple[str, str, str, str], signature: int):
+        self._entries.pop((scope, signature), None)
+        bands = self._bands.get(scope)
+        if not bands:
+            return
+        for table, band in zip(bands, self._band_values(signature)):
+            bucket = table.get(band)
+            if bucket is not None:
+                bucket.discard(signature)
+                if not bucket:
+                    del table[band]
+        if not any(bands):
+            del self._bands[scope]
+
+
+# Singleton instance
+reply_cache = ReplyCache(
+    max_entries=settings.reply_cache_max_entries,
+    ttl_seconds=settings.reply_cache_ttl_seconds,
+    max_distance=settings.reply_cache_max_distance
+)
@@ -0,0 +1,353 @@
+"""
+Product reply cards
+The price, availability and product-info answers are cards rendered from
+templates ("product_card.<card>" keys, overridable per tenant and language by
+Template rows). Each template is compiled once into lines of literal text and
+{field} slots. Binding a product fills in its descriptive fields (name,
+description, category, brand, sku, tags) and drops lines whose field is empty.
+What is left is literal segments around the volatile slots (price, stock). A
+bound card is cached per (product, language, card), together with the text last
+spliced from it, so:
+
+- Asking about the same product again is a dictionary lookup.
+- A price or stock change re-splices the segments.
+- Only an edit to the product's descriptive fields binds the card again.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from collections import OrderedDict
+import re
+import threading
+import time
+
+from app.core.config import settings
+from app.services.catalog_snapshot import ProductRecord
+from app.services.response_localizer import load_tenant_template_version, load_tenant_templates, template_language
+
+CARD_PREFIX = "product_card."
+DEFAULT_LANGUAGE = "bn"
+
+# Card (or phrase) name -> {language: template}. {field} or {field|default}; a line
+# whose descriptive field is empty (and has no default) is left out of the card,
+# along with the blank line after it.
+CARD_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "price": {
+        "bn": (
+            "**{name}**\n"
+            "💰 দাম: {price}\n"
+            "📂 ক্যাটাগরি: {category}\n"
+            "🏷️ ব্র্যান্ড: {brand}\n"
+            "{stock_status}\n"
+            "\n\n💳 **ক্রয়ের জন্য:**\n"
+            "• ক্যাশ অন ডেলিভারি সুবিধা আছে\n"
+            "• বিকাশ/নগদ/রকেট পেমেন্ট অপশন\n"
+            "• ঢাকায় ফ্রি ডেলিভারি\n\n"
+            "অর্ডার করতে বলুন: 'আমি এই প্রোডাক্ট কিনতে চাই'"
+        ),
+        "en": (
+            "**{name}**\n"
+            "💰 Price: {price}\n"
+            "📂 Category: {category}\n"
+            "🏷️ Brand: {brand}\n"
+            "{stock_status}\n"
+            "\n\n💳 **To buy:**\n"
+            "• Cash on delivery available\n"
+            "• bKash/Nagad/Rocket payment options\n"
+            "• Free delivery in Dhaka\n\n"
+            "To order, say: 'I want to buy this product'"
+        ),
+    },
+    "availability": {
+        "bn": (
+            "✅ **{name}** স্টকে আছে!\n\n"
+            "📦 পরিমাণ: {stock_quantity} পিস\n"
+            "💰 দাম: {price}\n\n"
+            "{stock_level}\n"
+            "\nঅর্ডার করতে বলুন: '{name} অর্ডার করব'"
+        ),
+        "en": (
+            "✅ **{name}** is in stock!\n\n"
+            "📦 Quantity: {stock_quantity} pcs\n"
+            "💰 Price: {price}\n\n"
+            "{stock_level}\n"
+            "\nTo order, say: 'order {name}'"
+        ),
+    },
+    "unavailable": {
+        "bn": (
+            "❌ **{name}** বর্তমানে স্টকে নেই।\n\n"
+            "🔄 কখন আসবে: ৩-৫ কার্যদিবসের মধ্যে\n"
+            "📧 নোটিফিকেশন চান? আপনাকে জানিয়ে দেব যখন স্টকে আসবে।\n\n"
+            "এই প্রোডাক্টের সাথে মিলে যায় এমন অন্য প্রোডাক্ট দেখবেন?"
+        ),
+        "en": (
+            "❌ **{name}** is currently out of stock.\n\n"
+            "🔄 Expected: within 3-5 working days\n"
+            "📧 Want a notification? We will let you know when it is back in stock.\n\n"
+            "Would you like to see similar products?"
+        ),
+    },
+    "info": {
+        "bn": (
+            "📋 **{name}**\n\n"
+            "📝 {description}\n\n"
+            "💰 দাম: {price}\n"
+            "📂 ক্যাটাগরি: {category}\n"
+            "🏷️ ব্র্যান্ড: {brand}\n"
+            "{stock_status}\n"
+            "🏷️ ট্যাগ: {tags}\n"
+            "\nকোন তথ্য আর চান?"
+        ),
+        "en": (
+            "📋 **{name}**\n\n"
+            "📝 {description}\n\n"
+            "💰 Price: {price}\n"
+            "📂 Category: {category}\n"
+            "🏷️ Brand: {brand}\n"
+            "{stock_status}\n"
+            "🏷️ Tags: {tags}\n"
+            "\nAnything else you would like to know?"
+        ),
+    },
+    # Stock phrases spliced into {stock_status} and {stock_level}
+    "stock.in": {"bn": "📦 ✅ স্টকে আছে ({stock_quantity} পিস)", "en": "📦 ✅ In stock ({stock_quantity} pcs)"},
+    "stock.low": {"bn": "📦 ⚠️ স্টকে কম ({stock_quantity} পিস)", "en": "📦 ⚠️ Low stock ({stock_quantity} pcs)"},
+    "stock.out": {"bn": "❌ স্টকে নেই", "en": "❌ Out of stock"},
+    "level.plenty": {"bn": "🟢 পর্যাপ্ত স্টক আছে", "en": "🟢 Plenty in stock"},
+    "level.limited": {"bn": "🟡 স্টক সীমিত", "en": "🟡 Limited stock"},
+    "level.last": {"bn": "🟠 শেষ হয়ে যাচ্ছে - দ্রুত অর্ডার করুন!", "en": "🟠 Running out - order soon!"},
+}
+
+# Fields that change with every price or stock update; everything else is bound into the card
+VOLATILE_FIELDS = ("price", "currency", "stock_quantity", "stock_status", "stock_level")
+# Stock phrases are the stock_status/stock_level values, so they cannot contain them:
+# in a phrase those are plain fields with no value (their default, or the line is dropped)
+PHRASE_VOLATILE_FIELDS = ("price", "currency", "stock_quantity")
+FIELD_PATTERN = re.compile(r"\{([^{}|]+)(?:\|([^{}]*))?\}")
+
+
+def descriptive_fields(product: ProductRecord) -> Dict[str, str]:
+    return {
+        "name": product.name or "",
+        "description": product.description or "",
+        "category": product.category or "",
+        "brand": product.brand or "",
+        "sku": product.sku or "",
+        "tags": ", ".join(product.tags) if product.tags else "",
+    }
+
+
+def volatile_state(product: ProductRecord) -> Tuple[Any, ...]:
+    """What the volatile slots of a product's cards are spliced from"""
+    return (product.price, product.currency, product.stock_quantity, product.min_stock_level)
+
+
+class CardTemplate:
+    """A template body compiled to lines of literal text and (field, default) slots"""
+
+    def __init__(self, body: str):
+        self.lines: List[List[Any]] = []
+        for line in body.split("\n"):
+            parts: List[Any] = []
+            position = 0
+            for match in FIELD_PATTERN.finditer(line):
+                parts.append(line[position:match.start()])
+                parts.append((match.group(1).strip(), match.group(2)))
+                position = match.end()
+            parts.append(line[position:])
+            self.lines.append(parts)
+
+    def bind(self, fields: Dict[str, str], volatile: Tuple[str, ...] = VOLATILE_FIELDS) -> "BoundCard":
+        """Fill in descriptive fields, leaving the volatile ones as slots"""
+        segments: List[str] = [""]
+        slots: List[str] = []
+        first = True
+        dropped = False
+        for parts in self.lines:
+            if dropped and parts == [""]:
+                dropped = False
+                continue
+            line_segments: List[str] = [""]
+            line_slots: List[str] = []
+            keep = True
+            for part in parts:
+                if isinstance(part, str):
+                    line_segments[-1] += part
+                    continue
+                name, default = part
+                if name in volatile:
+                    line_slots.append(name)
+                    line_segments.append("")
+                    continue
+                value = fields.get(name) or (default.strip() if default is not None else "")
+                if not value and default is None:
+                    keep = False
+                    break
+                line_segments[-1] += value
+            dropped = not keep
+            if not keep:
+                continue
+            if not first:
+                segments[-1] += "\n"
+            first = False
+            segments[-1] += line_segments[0]
+            segments.extend(line_segments[1:])
+            slots.extend(line_slots)
+        return BoundCard(tuple(segments), tuple(slots))
+
+
+class BoundCard(NamedTuple):
+    """One product's card: its text is the segments interleaved with the slots' values"""
+    segments: Tuple[str, ...]
+    slots: Tuple[str, ...]
+
+    def splice(self, values: Dict[str, str]) -> str:
+        segments, slots = self
+        if not slots:
+            return segments[0]
+        parts = [segments[0]]
+        for slot, segment in zip(slots, segments[1:]):
+            parts.append(values[slot])
+            parts.append(segment)
+        return "".join(parts)
+
+
+class ReplyCardRenderer:
+    """
+    Cards for one set of templates (the built-in ones, or a tenant's overrides
+    layered over them), with a bounded cache of rendered cards. Cards bound
+    longest ago are dropped first.
+    """
+
+    def __init__(self, templates: Dict[str, Dict[str, str]], max_cards: int = 20000):
+        self.templates = templates
+        self.max_cards = max_cards
+        self._compiled: Dict[Tuple[str, str], CardTemplate] = {}
+        self._phrases: Dict[Tuple[str, str], BoundCard] = {}
+        # (product id, language, card) -> (record, descriptive fields, bound card, volatile state, text)
+        self._cards: "OrderedDict[Tuple[int, str, str], Tuple[ProductRecord, Dict[str, str], BoundCard, Tuple[Any, ...], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, card: str, product: ProductRecord, language: str = DEFAULT_LANGUAGE) -> str:
+        """A product's card in the language (Bangla when the card has no translation for it)"""
+        language = self._language(card, language)
+        key = (product.id, language, card)
+        entry = self._cards.get(key)
+        # The catalog snapshot hands out the same record until the product changes
+        if entry is not None and entry[0] is product:
+            return entry[4]
+
+        fields = descriptive_fields(product)
+        state = volatile_state(product)
+        if entry is not None and entry[1] == fields:
+            if entry[3] == state:
+                text = entry[4]
+            else:
+                text = entry[2].splice(self._volatile_values(product, language))
+            bound = entry[2]
+        else:
+            bound = self._template(card, language).bind(fields)
+            text = bound.splice(self._volatile_values(product, language))
+
+        with self._lock:
+            self._cards.pop(key, None)
+            self._cards[key] = (product, fields, bound, state, text)
+            while len(self._cards) > self.max_cards:
+                self._cards.popitem(last=False)
+        return text
+
+    def with_templates(self, rows: List[Tuple[str, str, str]]) -> "ReplyCardRenderer":
+        """A renderer with (key, lang, body) "product_card.*" rows layered over these templates"""
+        templates = {card: dict(translations) for card, translations in self.templates.items()}
+        for key, lang, body in rows:
+            if body and key.startswith(CARD_PREFIX):
+                templates.setdefault(key[len(CARD_PREFIX):], {})[template_language(lang)] = body
+        return ReplyCardRenderer(templates, self.max_cards)
+
+    def _language(self, card: str, language: str) -> str:
+        translations = self.templates.get(card, {})
+        return language if language in translations else DEFAULT_LANGUAGE
+
+    def _template(self, card: str, language: str) -> CardTemplate:
+        template = self._compiled.get((card, language))
+        if template is None:
+            translations = self.templates.get(card, {})
+            body = translations.get(language, translations.get(DEFAULT_LANGUAGE, ""))
+            template = self._compiled[(card, language)] = CardTemplate(body)
+        return template
+
+    def _phrase(self, name: str, language: str, values: Dict[str, str]) -> str:
+        phrase = self._phrases.get((name, language))
+        if phrase is None:
+            template = self._template(name, self._language(name, language))
+            phrase = self._phrases[(name, language)] = template.bind({}, PHRASE_VOLATILE_FIELDS)
+        return phrase.splice(values)
+
+    def _volatile_values(self, product: ProductRecord, language: str) -> Dict[str, str]:
+        values = {
+            "price": f"{product.currency} {product.price:,.2f}",
+            "currency": f"{product.currency}",
+            "stock_quantity": str(product.stock_quantity),
+        }
+        if product.stock_quantity <= 0:
+            status = "stock.out"
+        else:
+            status = "stock.in" if product.stock_quantity > product.min_stock_level else "stock.low"
+        if product.stock_quantity > 10:
+            level = "level.plenty"
+        else:
+            level = "level.limited" if product.stock_quantity > 5 else "level.last"
+        values["stock_status"] = self._phrase(status, language, values)
+        values["stock_level"] = self._phrase(level, language, values)
+        return values
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+
+class TenantReplyCardRegistry:
+    """
+    Per-tenant renderers (built-in cards plus the tenant's "product_card.*"
+    Template rows) keyed by the tenant's template version, like
+    TenantResponseLocalizerRegistry. A renderer, and with it the tenant's
+    rendered cards, is replaced only when the tenant's templates change. The
+    templates router invalidates a tenant on every change, and other workers
+    notice within settings.template_version_check_seconds.
+    """
+
+    def __init__(self, base: ReplyCardRenderer):
+        self.base = base
+        self._renderers: Dict[str, Tuple[Optional[Tuple[int, int, int]], ReplyCardRenderer, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: Optional[str] = None) -> ReplyCardRenderer:
+        if not tenant_id:
+            return self.base
+
+        now = time.monotonic()
+        entry = self._renderers.get(tenant_id)
+        if entry is not None and now - entry[2] < settings.template_version_check_seconds:
+            return entry[1]
+
+        with self._lock:
+            entry = self._renderers.get(tenant_id)
+            if entry is not None and now - entry[2] < settings.template_version_check_seconds:
+                return entry[1]
+
+            version = load_tenant_template_version(tenant_id)
+            if entry is not None and version is not None and entry[0] == version:
+                renderer = entry[1]
+            else:
+                rows = [row for row in load_tenant_templates(tenant_id) if row[0].startswith(CARD_PREFIX)]
+                # Tenants without card overrides get their own cache over the built-in cards
+                renderer = self.base.with_templates(rows)
+            self._renderers[tenant_id] = (version, renderer, now)
+        return renderer
+
+    def invalidate(self, tenant_id: str):
+        """Drop a tenant's renderer so it is rebuilt on next use"""
+        self._renderers.pop(tenant_id, None)
+
+
+# Singleton instances
+reply_card_renderer = ReplyCardRenderer(CARD_TEMPLATES, max_cards=settings.reply_card_max_cards)
+tenant_reply_cards = TenantReplyCardRegistry(reply_card_renderer)
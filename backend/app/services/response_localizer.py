@@ -0,0 +1,200 @@
+"""
+Response localization for dialogue manager replies
+Handlers reply with one canonical text per situation; the localizer maps that
+text to its template key through a reverse index and returns the translation
+for the detected language. Both tables are built once (at import for the
+built-in templates, on first use for a tenant's Template rows), so a lookup is
+two dict probes regardless of how many templates exist.
+"""
+from typing import Dict, List, Optional, Tuple
+import threading
+import time
+
+from app.core.config import settings
+from app.db.models import Template
+
+# Template key -> {language: text}; any translation identifies the key
+RESPONSE_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "order_status_missing": {
+        "bn": "আপনার অর্ডার স্ট্যাটাস জানার জন্য অনুগ্রহ করে অর্ডার নম্বর প্রদান করুন।",
+        "en": "Please provide your order number to check the status.",
+        "hi": "अपना ऑर्डर नंबर प्रदान करें ताकि स्थिति जांच सके।",
+        "ur": "اپنی آرڈر کی حیثیت چیک کرنے کے لیے آرڈر نمبر فراہم کریں۔",
+        "ar": "يرجى تقديم رقم الطلب للتحقق من الحالة."
+    },
+    "order_status_checking": {
+        "bn": "আপনার অর্ডার স্ট্যাটাস চেক করছি, অনুগ্রহ করে অপেক্ষা করুন...",
+        "en": "Checking your order status, please wait...",
+        "hi": "आपका ऑर्डर स्टेटस चेक कर रहा हूं, कृपया प्रतीक्षा करें...",
+        "ur": "آپ کی آرڈر کی حیثیت چیک کر رہا ہوں، براہ مہربانی انتظار کریں...",
+        "ar": "جاري فحص حالة الطلب، يرجى الانتظار..."
+    },
+    "return_request_missing": {
+        "bn": "রিটার্নের জন্য অনুগ্রহ করে অর্ডার নম্বর প্রদান করুন।",
+        "en": "Please provide your order number for return request.",
+        "hi": "वापसी के लिए कृपया अपना ऑर्डर नंबर प्रदान करें।",
+        "ur": "واپسی کے لیے براہ مہربانی اپنا آرڈر نمبر فراہم کریں۔",
+        "ar": "يرجى تقديم رقم الطلب للإرجاع."
+    },
+    "return_processing": {
+        "bn": "আপনার রিটার্ন রিকোয়েস্ট প্রসেস করছি...",
+        "en": "Processing your return request...",
+        "hi": "आपका वापसी अनुरोध संसाधित कर रहा हूं...",
+        "ur": "آپ کی واپسی کی درخواست پر عمل کر رہا ہوں...",
+        "ar": "جاري معالجة طلب الإرجاع..."
+    },
+    "payment_issue_handoff": {
+        "bn": "পেমেন্ট সমস্যার জন্য আমি আপনাকে আমাদের পেমেন্ট টিমের সাথে কানেক্ট করছি। অনুগ্রহ করে অপেক্ষা করুন।",
+        "en": "For payment issues, I'm connecting you with our payment team. Please wait.",
+        "hi": "भुगतान समस्याओं के लिए, मैं आपको हमारी भुगतान टीम से कनेक्ट कर रहा हूं। कृपया प्रतीक्षा करें।",
+        "ur": "ادائیگی کے مسائل کے لیے، میں آپ کو ہماری ادائیگی ٹیم سے جوڑ رہا ہوں۔ براہ مہربانی انتظار کریں۔",
+        "ar": "للمشاكل المتعلقة بالدفع، أنا أتصل بك مع فريق الدفع لدينا. يرجى الانتظار."
+    },
+    "delivery_missing_order": {
+        "bn": "ডেলিভারি ট্র্যাক করার জন্য অর্ডার নম্বর লাগবে। অনুগ্রহ করে বলুন।",
+        "en": "Order number is required to track delivery. Please provide it.",
+        "hi": "डिलीवरी ट्रैक करने के लिए ऑर्डर नंबर की आवश्यकता है। कृपया प्रदान करें।",
+        "ur": "ڈیلیوری کو ٹریک کرنے کے لیے آرڈر نمبر درکار ہے۔ براہ مہربانی فراہم کریں۔",
+        "ar": "رقم الطلب مطلوبة لتتبع التسليم. يرجى تقديمها."
+    },
+    "complaint_handoff": {
+        "bn": "আপনার অভিযোগের জন্য আমি আপনাকে আমাদের কাস্টমার সার্ভিস এজেন্টের সাথে কানেক্ট করছি। অনুগ্রহ করে অপেক্ষা করুন।",
+        "en": "For your complaint, I'm connecting you with our customer service agent. Please wait.",
+        "hi": "आपकी शिकायत के लिए, मैं आपको हमारे ग्राहक सेवा एजेंट से कनेक्ट कर रहा हूं। कृपया प्रतीक्षा करें।",
+        "ur": "آپ کی شکایت کے لیے، میں آپ کو ہمارے کسٹمر سروس ایجنٹ سے جوڑ رہا ہوں۔ براہ مہربانی انتظار کریں۔",
+        "ar": "لشكواك، أنا أتصل بك مع وكيل خدمة العملاء لدينا. يرجى الانتظار."
+    },
+    "fallback_handoff": {
+        "bn": "আমি আপনার প্রশ্নটি ঠিক বুঝতে পারছি না। আমি আপনাকে আমাদের এজেন্টের সাথে কানেক্ট করছি।",
+        "en": "I cannot understand your question clearly. I'm connecting you with our agent.",
+        "hi": "मैं आपका प्रश्न सही ढंग से समझ नहीं पा रहा हूं। मैं आपको हमारे एजेंट से कनेक्ट कर रहा हूं।",
+        "ur": "میں آپ کا سوال صحیح طور پر سمجھ نہیں پا رہا۔ میں آپ کو ہمارے ایجنٹ سے جوڑ رہا ہوں۔",
+        "ar": "لا أستطيع فهم سؤالك بوضوح. أنا أتصل بك مع وكيلنا."
+    }
+}
+
+
+def template_language(lang: Optional[str]) -> str:
+    """Template.lang ("bn-BD") -> detector language code ("bn")"""
+    return (lang or "bn").split("-")[0].lower()
+
+
+class ResponseLocalizer:
+    def __init__(self, templates: Dict[str, Dict[str, str]], aliases: Optional[Dict[str, str]] = None):
+        self.templates = templates
+        # Every translation of every key -> key (first key wins, like a scan in order).
+        # Aliases keep texts that were overridden mapped to their key, since handlers still emit them.
+        self._reverse: Dict[str, str] = dict(aliases or {})
+        for key, translations in templates.items():
+            for text in translations.values():
+                self._reverse.setdefault(text, key)
+
+    def localize(self, text: str, language: str) -> str:
+        """Translation of a template text into the language, or the text unchanged"""
+        key = self._reverse.get(text)
+        if key is None:
+            return text
+        translations = self.templates[key]
+        return translations.get(language, translations.get("en", text))
+
+    def with_templates(self, rows: List[Tuple[str, str, str]]) -> "ResponseLocalizer":
+        """
+        A localizer with (key, lang, body) rows layered over these templates.
+        Rows override a key's translation for their language or add new keys.
+        """
+        templates = {key: dict(translations) for key, translations in self.templates.items()}
+        for key, lang, body in rows:
+            if body:
+                templates.setdefault(key, {})[template_language(lang)] = body
+        return ResponseLocalizer(templates, aliases=self._reverse)
+
+
+class TenantResponseLocalizerRegistry:
+    """
+    Per-tenant localizers (built-in templates plus the tenant's Template rows)
+    keyed by the tenant's template version. The templates router invalidates a
+    tenant on every change; other workers notice the new version within
+    settings.template_version_check_seconds.
+    """
+
+    def __init__(self, base: ResponseLocalizer):
+        self.base = base
+        self._localizers: Dict[str, Tuple[Optional[Tuple[int, int, int]], ResponseLocalizer, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: Optional[str] = None) -> ResponseLocalizer:
+        if not tenant_id:
+            return self.base
+
+        now = time.monotonic()
+        entry = self._localizers.get(tenant_id)
+        if entry is not None and now - entry[2] < settings.template_version_check_seconds:
+            return entry[1]
+
+        with self._lock:
+            entry = self._localizers.get(tenant_id)
+            if entry is not None and now - entry[2] < settings.template_version_check_seconds:
+                return entry[1]
+
+            version = load_tenant_template_version(tenant_id)
+            if entry is not None and version is not None and entry[0] == version:
+                localizer = entry[1]
+            else:
+                rows = load_tenant_templates(tenant_id)
+                localizer = self.base.with_templates(rows) if rows else self.base
+            self._localizers[tenant_id] = (version, localizer, now)
+        return localizer
+
+    def due(self, tenant_id: Optional[str] = None) -> bool:
+        """Whether get() would check the tenant's template version (a database query)"""
+        if not tenant_id:
+            return False
+        entry = self._localizers.get(tenant_id)
+        return entry is None or time.monotonic() - entry[2] >= settings.template_version_check_seconds
+
+    def invalidate(self, tenant_id: str):
+        """Drop a tenant's localizer so it is rebuilt on next use"""
+        self._localizers.pop(tenant_id, None)
+
+
+def load_tenant_template_version(tenant_id: str) -> Optional[Tuple[int, int, int]]:
+    """(sum(Template.version), row count, max id) for a tenant, None if the database is unavailable"""
+    # Imported lazily to keep this module usable without a configured database
+    from sqlalchemy import func
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        version_sum, count, max_id = db.query(
+            func.sum(Template.version), func.count(Template.id), func.max(Template.id)
+        ).filter(Template.tenant_id == tenant_id).one()
+        return (int(version_sum or 0), count, max_id or 0)
+    except Exception as e:
+        print(f"Failed to load template version for tenant {tenant_id}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+def load_tenant_templates(tenant_id: str) -> List[Tuple[str, str, str]]:
+    """A tenant's templates as (key, lang, body), oldest first so later rows win"""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return [
+            (key, lang, body)
+            for key, lang, body in db.query(Template.key, Template.lang, Template.body).filter(
+                Template.tenant_id == tenant_id
+            ).order_by(Template.id).all()
+        ]
+    except Exception as e:
+        print(f"Failed to load templates for tenant {tenant_id}: {e}")
+        return []
+    finally:
+        db.close()
+
+
+# Singleton instances
+response_localizer = ResponseLocalizer(RESPONSE_TEMPLATES)
+tenant_response_localizers = TenantResponseLocalizerRegistry(response_localizer)
@@ -0,0 +1,240 @@
+"""
+Local NLU model training jobs
+Pending TrainingJob(job_type="nlu") rows are claimed by a background loop and
+trained in a process pool, so fitting a tenant's model never blocks the event
+loop. The model is saved as a compressed NumPy artifact, published through the
+tenant's "current" pointer and hot-swapped into the in-memory registry; other
+workers pick up the new version on their next poll.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import multiprocessing
+import time
+
+from app.core.config import settings
+from app.db.models import TrainingJob
+from app.routers.metrics import nlu_training_jobs, nlu_training_duration, nlu_model_swaps
+from app.services.intent_classifier import (
+    LocalIntentClassifier,
+    LocalIntentClassifierRegistry,
+    model_artifact_path,
+    publish_model_version,
+    published_model_version,
+    train_tenant_model,
+)
+from app.services.nlu_cache import nlu_cache
+from app.services.nlu_service import nlu_service
+
+
+def claim_pending_jobs(limit: int, skip_tenants: Set[str]) -> List[Tuple[int, str, Dict[str, Any]]]:
+    """
+    Move up to `limit` pending NLU jobs to running and return (id, tenant_id, config).
+    The conditional update makes the claim safe when several workers poll.
+    """
+    from app.db.session import SessionLocal
+
+    claimed: List[Tuple[int, str, Dict[str, Any]]] = []
+    db = SessionLocal()
+    try:
+        rows = db.query(TrainingJob.id, TrainingJob.tenant_id, TrainingJob.config).filter(
+            TrainingJob.job_type == "nlu",
+            TrainingJob.status == "pending"
+        ).order_by(TrainingJob.id).all()
+        for job_id, tenant_id, config in rows:
+            if len(claimed) >= limit:
+                break
+            # One job per tenant at a time; later jobs wait for the next poll
+            if tenant_id in skip_tenants or any(tenant_id == t for _, t, _ in claimed):
+                continue
+            updated = db.query(TrainingJob).filter(
+                TrainingJob.id == job_id,
+                TrainingJob.status == "pending"
+            ).update({"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+            if updated:
+                claimed.append((job_id, tenant_id, config or {}))
+    except Exception as e:
+        db.rollback()
+        print(f"Failed to claim training jobs: {e}")
+    finally:
+        db.close()
+    return claimed
+
+
+def fail_stale_jobs(timeout_seconds: float, own_job_ids: Set[int]) -> int:
+    """
+    Fail running NLU jobs started more than `timeout_seconds` ago. Their worker
+    died mid-fit, so nothing else would ever finish them; they are not put back
+    to pending, since a job that kills its worker would otherwise be retried forever.
+    Jobs in `own_job_ids` are still training in this worker and are left alone.
+    """
+    from app.db.session import SessionLocal
+
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        query = db.query(TrainingJob).filter(
+            TrainingJob.job_type == "nlu",
+            TrainingJob.status == "running",
+            TrainingJob.started_at < now - timedelta(seconds=timeout_seconds)
+        )
+        if own_job_ids:
+            query = query.filter(TrainingJob.id.notin_(own_job_ids))
+        failed = query.update({
+            "status": "failed",
+            "completed_at": now,
+            "error_message": f"No result {timeout_seconds:g}s after it started; the training worker stopped"
+        }, synchronize_session=False)
+        db.commit()
+        return failed
+    except Exception as e:
+        db.rollback()
+        print(f"Failed to expire stale training jobs: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+def finish_job(job_id: int, status: str, model_version: Optional[str] = None,
+               metrics: Optional[Dict[str, Any]] = None, error_message: Optional[str] = None):
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+        if job is None:
+            return
+        job.status = status
+        job.completed_at = datetime.utcnow()
+        if model_version is not None:
+            job.model_version = model_version
+        if metrics is not None:
+            job.metrics = metrics
+        job.error_message = error_message
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Failed to update training job {job_id}: {e}")
+    finally:
+        db.close()
+
+
+class TrainingJobRunner:
+    def __init__(self, registry: LocalIntentClassifierRegistry, base_examples: Dict[str, List[str]]):
+        self.registry = registry
+        self.base_examples = base_examples
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._jobs: Set[asyncio.Task] = set()
+        self._active_tenants: Set[str] = set()
+        self._active_job_ids: Set[int] = set()
+
+    def start(self):
+        """Start the poll loop on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._poll_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        jobs = list(self._jobs)
+        for job in jobs:
+            job.cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned (not forked) so children do not inherit the event loop or pooled DB connections
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.training_max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                if settings.training_runner_enabled:
+                    await self.run_pending()
+                await self.refresh_models()
+            except Exception as e:
+                print(f"Training runner poll failed: {e}")
+            await asyncio.sleep(settings.training_poll_seconds)
+
+    async def run_pending(self) -> int:
+        """Fail stale running jobs, then claim pending jobs up to the free pool capacity and start them"""
+        stale = await asyncio.to_thread(
+            fail_stale_jobs, settings.training_job_timeout_seconds, set(self._active_job_ids)
+        )
+        if stale:
+            nlu_training_jobs.labels(status="failed").inc(stale)
+            print(f"Failed {stale} NLU training job(s) left running by a stopped worker")
+        capacity = settings.training_max_workers - len(self._jobs)
+        if capacity <= 0:
+            return 0
+        claimed = await asyncio.to_thread(claim_pending_jobs, capacity, set(self._active_tenants))
+        for job_id, tenant_id, config in claimed:
+            self._active_tenants.add(tenant_id)
+            self._active_job_ids.add(job_id)
+            task = asyncio.ensure_future(self.run_job(job_id, tenant_id, config))
+            self._jobs.add(task)
+            task.add_done_callback(self._jobs.discard)
+        return len(claimed)
+
+    async def run_job(self, job_id: int, tenant_id: str, config: Dict[str, Any]):
+        version = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{job_id}"
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(
+                self._get_pool(), train_tenant_model, tenant_id, version, self.base_examples, config
+            )
+            classifier = await asyncio.to_thread(LocalIntentClassifier.load, result["path"])
+            await asyncio.to_thread(publish_model_version, tenant_id, version)
+            await self.swap(tenant_id, classifier)
+            await asyncio.to_thread(finish_job, job_id, "completed", version, result["metrics"])
+            nlu_training_jobs.labels(status="completed").inc()
+            print(f"Trained NLU model {version} for tenant {tenant_id}: {result['metrics']}")
+        except asyncio.CancelledError:
+            await asyncio.to_thread(finish_job, job_id, "failed", error_message="Cancelled at shutdown")
+            raise
+        except Exception as e:
+            await asyncio.to_thread(finish_job, job_id, "failed", error_message=str(e))
+            nlu_training_jobs.labels(status="failed").inc()
+            print(f"NLU training job {job_id} for tenant {tenant_id} failed: {e}")
+        finally:
+            nlu_training_duration.observe(time.perf_counter() - start)
+            self._active_tenants.discard(tenant_id)
+            self._active_job_ids.discard(job_id)
+
+    async def refresh_models(self):
+        """Load models another worker published for tenants this worker has in memory"""
+        for tenant_id, loaded in self.registry.loaded_versions().items():
+            version = await asyncio.to_thread(published_model_version, tenant_id)
+            if not version or version == loaded:
+                continue
+            try:
+                classifier = await asyncio.to_thread(
+                    LocalIntentClassifier.load, model_artifact_path(tenant_id, version)
+                )
+            except Exception as e:
+                print(f"Failed to load NLU model {version} for tenant {tenant_id}: {e}")
+                continue
+            await self.swap(tenant_id, classifier)
+
+    async def swap(self, tenant_id: str, classifier: LocalIntentClassifier):
+        self.registry.swap(tenant_id, classifier)
+        # Training data changed, so retrieval indexes and cached results are stale too
+        nlu_service.example_indexes.invalidate(tenant_id)
+        await nlu_cache.invalidate_tenant(tenant_id)
+        nlu_model_swaps.inc()
+
+
+# Singleton instance
+training_runner = TrainingJobRunner(nlu_service.local_classifiers, nlu_service.intent_examples)
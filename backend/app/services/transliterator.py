@@ -0,0 +1,155 @@
+"""
+Banglish (romanized Bangla) -> Bangla script normalization
+Messages the language detector tags as Banglish get a canonical form in which
+romanized Bangla words are written in Bangla script ("amar order kothay" ->
+"আমার অর্ডার কোথায়"), so cache keys, keyword lists and product lookups see one
+spelling. Known words come from a lexicon that also folds spelling variants;
+other romanized Bangla words go through a longest-match phonetic rule table.
+English words, brand names and model numbers are left as written.
+"""
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+import re
+
+from app.services.language_detector import BANGLISH_WORDS, ENGLISH_WORDS, detect_language
+
+# Romanized word (and common spelling variants) -> Bangla script
+WORD_TABLE: Dict[str, str] = {
+    # Pronouns
+    "ami": "আমি", "amar": "আমার", "amake": "আমাকে", "amra": "আমরা", "amader": "আমাদের",
+    "apni": "আপনি", "apnar": "আপনার", "apnake": "আপনাকে", "apnara": "আপনারা", "apnader": "আপনাদের",
+    "tumi": "তুমি", "tomar": "তোমার", "tomake": "তোমাকে",
+    # Question words
+    "ki": "কি", "kii": "কি", "keno": "কেন", "kano": "কেন", "kemon": "কেমন",
+    "kothay": "কোথায়", "kothai": "কোথায়", "kothae": "কোথায়", "kobe": "কবে", "kokhon": "কখন",
+    "koto": "কত", "kotodin": "কতদিন", "kivabe": "কিভাবে", "kibhabe": "কিভাবে",
+    "kon": "কোন", "konta": "কোনটা", "kar": "কার",
+    # Verbs
+    "ache": "আছে", "achhe": "আছে", "achee": "আছে", "nai": "নাই", "nei": "নেই",
+    "hobe": "হবে", "hbe": "হবে", "hoy": "হয়", "hoyeche": "হয়েছে", "hoise": "হইছে", "hoyni": "হয়নি",
+    "holo": "হলো", "hocche": "হচ্ছে",
+    "chai": "চাই", "chaai": "চাই", "chacchi": "চাচ্ছি",
+    "korte": "করতে", "korbo": "করবো", "korben": "করবেন", "koren": "করেন", "kore": "করে",
+    "kora": "করা", "kori": "করি", "korchi": "করছি", "korsi": "করছি",
+    "dite": "দিতে", "diben": "দিবেন", "dilam": "দিলাম", "dibo": "দিবো", "den": "দেন", "dao": "দাও",
+    "nite": "নিতে", "niben": "নিবেন", "nibo": "নিবো", "nilam": "নিলাম",
+    "pabo": "পাবো", "paben": "পাবেন", "pelam": "পেলাম", "pai": "পাই", "paini": "পাইনি",
+    "jabe": "যাবে", "jabo": "যাবো", "asbe": "আসবে", "ashbe": "আসবে", "aseni": "আসেনি", "ashe": "আসে",
+    "ashche": "আসছে", "lagbe": "লাগবে", "lagche": "লাগছে",
+    "bolun": "বলুন", "bolen": "বলেন", "janan": "জানান", "janaben": "জানাবেন",
+    "dekhan": "দেখান", "dekhte": "দেখতে", "pathan": "পাঠান", "pathaben": "পাঠাবেন",
+    "kinte": "কিনতে", "kinbo": "কিনবো", "kinchi": "কিনছি",
+    "kete": "কেটে", "katse": "কাটছে", "nise": "নিছে", "nisi": "নিছি", "dise": "দিছে", "disi": "দিছি",
+    "bolse": "বলছে", "dekhi": "দেখি", "ashse": "আসছে", "pathiye": "পাঠিয়ে", "pathaisi": "পাঠাইছি",
+    # Nouns and commerce words
+    "dam": "দাম", "daam": "দাম", "taka": "টাকা", "tk": "টাকা",
+    "ferot": "ফেরত", "ferat": "ফেরত", "bodle": "বদলে", "dorkar": "দরকার",
+    "deliveri": "ডেলিভারি", "bkash": "বিকাশ", "bikash": "বিকাশ", "nagad": "নগদ",
+    "din": "দিন", "mash": "মাস", "shob": "সব", "sob": "সব", "baki": "বাকি",
+    # Address, particles and fillers
+    "bhai": "ভাই", "vai": "ভাই", "bhaiya": "ভাইয়া", "vaiya": "ভাইয়া", "apu": "আপু", "dada": "দাদা",
+    "valo": "ভালো", "bhalo": "ভালো", "kharap": "খারাপ", "kharaap": "খারাপ", "khub": "খুব", "onek": "অনেক",
+    "ekta": "একটা", "ekti": "একটি", "ekhon": "এখন", "ekhono": "এখনো",
+    "aj": "আজ", "ajke": "আজকে", "kal": "কাল", "kalke": "কালকে",
+    "ar": "আর", "na": "না", "ha": "হ্যাঁ", "hae": "হ্যাঁ", "haan": "হ্যাঁ", "ji": "জি",
+    "jodi": "যদি", "tahole": "তাহলে", "kintu": "কিন্তু", "ta": "টা", "ti": "টি",
+    "e": "এ", "er": "এর", "te": "তে", "theke": "থেকে", "jonno": "জন্য", "sathe": "সাথে", "shathe": "সাথে",
+}
+
+# English words Bangla speakers write in Bangla script; transliterated only inside Banglish messages
+LOANWORDS: Dict[str, str] = {
+    "order": "অর্ডার", "delivery": "ডেলিভারি", "parcel": "পার্সেল", "courier": "কুরিয়ার",
+    "payment": "পেমেন্ট", "refund": "রিফান্ড", "cancel": "ক্যানসেল", "stock": "স্টক",
+    "product": "প্রোডাক্ট", "service": "সার্ভিস", "return": "রিটার্ন", "size": "সাইজ",
+}
+
+# Romanized grapheme -> (independent form, dependent form) for vowels
+_VOWELS: Dict[str, Tuple[str, str]] = {
+    "a": ("আ", "া"), "aa": ("আ", "া"),
+    "i": ("ই", "ি"), "ee": ("ঈ", "ী"),
+    "u": ("উ", "ু"), "oo": ("উ", "ু"),
+    "e": ("এ", "ে"), "oi": ("ঐ", "ৈ"), "ou": ("ঔ", "ৌ"),
+    # Bare "o" after a consonant is the inherent vowel
+    "o": ("অ", ""),
+}
+
+_CONSONANTS: Dict[str, str] = {
+    "kh": "খ", "gh": "ঘ", "ng": "ং", "chh": "ছ", "ch": "চ", "jh": "ঝ",
+    "th": "থ", "dh": "ধ", "ph": "ফ", "bh": "ভ", "sh": "শ", "rr": "ড়",
+    "k": "ক", "g": "গ", "c": "চ", "j": "জ", "t": "ত", "d": "দ", "n": "ন",
+    "p": "প", "f": "ফ", "b": "ব", "v": "ভ", "m": "ম", "y": "য়", "z": "য",
+    "r": "র", "l": "ল", "s": "স", "h": "হ", "q": "ক", "x": "ক্স", "w": "ও",
+}
+
+_HASANTA = "্"
+_MAX_GRAPHEME = max(len(key) for key in list(_VOWELS) + list(_CONSONANTS))
+# Latin words not glued to digits ("A54" and "15" stay as written)
+_LATIN_WORD_RE = re.compile(r"(?<![A-Za-z0-9])[A-Za-z]+(?![A-Za-z0-9])")
+
+
+@lru_cache(maxsize=65536)
+def transliterate_word(word: str) -> str:
+    """Romanized Bangla word -> Bangla script (lexicon first, then phonetic rules)"""
+    word = word.lower()
+    known = WORD_TABLE.get(word) or LOANWORDS.get(word)
+    if known is not None:
+        return known
+
+    out = []
+    i = 0
+    previous_consonant = False
+    while i < len(word):
+        for size in range(min(_MAX_GRAPHEME, len(word) - i), 0, -1):
+            chunk = word[i:i + size]
+            if chunk in _VOWELS:
+                independent, dependent = _VOWELS[chunk]
+                out.append(dependent if previous_consonant else independent)
+                previous_consonant = False
+                break
+            if chunk in _CONSONANTS:
+                # Consonant clusters are joined with a hasanta
+                if previous_consonant and chunk not in ("y", "ng"):
+                    out.append(_HASANTA)
+                out.append(_CONSONANTS[chunk])
+                previous_consonant = chunk not in ("ng", "w")
+                break
+        else:
+            out.append(word[i])
+            previous_consonant = False
+            size = 1
+        i += size
+    return "".join(out)
+
+
+class BanglishTransliterator:
+    def should_transliterate(self, word: str) -> bool:
+        """Only known romanized Bangla words and loanwords; unknown Latin words may be English or product names"""
+        lowered = word.lower()
+        return lowered in WORD_TABLE or lowered in LOANWORDS or lowered in BANGLISH_WORDS
+
+    def is_banglish(self, text: str, language: Optional[str] = None) -> bool:
+        """Detector verdict, plus the fuller lexicon here for text the detector calls English"""
+        language = language or detect_language(text)
+        if language != "en":
+            return language == "banglish"
+        words = [m.group(0).lower() for m in _LATIN_WORD_RE.finditer(text)]
+        lexicon_hits = sum(1 for word in words if word in WORD_TABLE)
+        return lexicon_hits > 0 and lexicon_hits > sum(1 for word in words if word in ENGLISH_WORDS)
+
+    def canonicalize(self, text: Optional[str], language: Optional[str] = None) -> str:
+        """
+        Canonical form of a message: Banglish words in Bangla script, everything
+        else unchanged. Text that is not Banglish is returned as is.
+        """
+        text = text or ""
+        if not self.is_banglish(text, language):
+            return text
+
+        return _LATIN_WORD_RE.sub(
+            lambda m: transliterate_word(m.group(0)) if self.should_transliterate(m.group(0)) else m.group(0),
+            text
+        )
+
+
+# Singleton instance
+transliterator = BanglishTransliterator()
@@ -3,11 +3,23 @@ TTS Service for multilingual text-to-speech
 Supports OpenAI TTS, Google Cloud TTS, Azure, and Coqui TTS
 """
 from typing import Optional, Dict, Any
+import asyncio
 import io
 import base64
 import requests
 
 from app.core.config import settings
+from app.services.llm_client import llm_client
+
+# OpenAI TTS voices: alloy, echo, fable, onyx, nova, shimmer
+OPENAI_VOICES = {
+    "alloy": "alloy",    # Neutral, clear
+    "echo": "echo",      # Male voice
+    "fable": "fable",    # British accent, storytelling
+    "onyx": "onyx",      # Deep male voice
+    "nova": "nova",      # Young female voice
+    "shimmer": "shimmer" # Warm female voice
+}
 
 
 class TTSService:
@@ -103,22 +115,7 @@ class TTSService:
     def _synthesize_openai(self, text: str, language: str, voice: Optional[str]) -> Dict[str, Any]:
         """Synthesize using OpenAI TTS API"""
         try:
-            # OpenAI TTS voices: alloy, echo, fable, onyx, nova, shimmer
-            # These voices work well with multiple languages
-            voice_name = voice or self.openai_voice  # Use configured voice
-
-            # Map language codes to OpenAI's supported formats
-            # OpenAI TTS handles language detection automatically, but we can specify voice preferences
-            voice_map = {
-                "alloy": "alloy",    # Neutral, clear
-                "echo": "echo",      # Male voice
-                "fable": "fable",    # British accent, storytelling
-                "onyx": "onyx",      # Deep male voice
-                "nova": "nova",      # Young female voice
-                "shimmer": "shimmer" # Warm female voice
-            }
-
-            selected_voice = voice_map.get(voice_name.lower(), "alloy")
+            selected_voice = self._openai_voice(voice)
 
             url = "https://api.openai.com/v1/audio/speech"
             headers = {
@@ -167,6 +164,58 @@ class TTSService:
                 "language": language
             }
 
+    def _openai_voice(self, voice: Optional[str]) -> str:
+        """Map a requested voice to a supported OpenAI voice (configured voice by default)"""
+        voice_name = voice or self.openai_voice
+        return OPENAI_VOICES.get(voice_name.lower(), "alloy")
+
+    async def synthesize_async(
+        self,
+        text: str,
+        language: str = "en",
+        voice: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Non-blocking synthesis for async handlers.
+        OpenAI goes through the shared LLM client; other providers run in a worker thread.
+        """
+        self.load_client()
+
+        if self.provider == "openai" and self.client == "openai":
+            return await self._synthesize_openai_async(text, language, voice)
+
+        return await asyncio.to_thread(self.synthesize, text, language, voice)
+
+    async def _synthesize_openai_async(self, text: str, language: str, voice: Optional[str]) -> Dict[str, Any]:
+        """Synthesize using OpenAI TTS through the pooled async client"""
+        selected_voice = self._openai_voice(voice)
+        try:
+            audio_content = await llm_client.speech(
+                model=self.openai_model,
+                input=text,
+                voice=selected_voice,
+                response_format="mp3",
+                speed=1.0
+            )
+            return {
+                "audio_content": audio_content,
+                "text": text,
+                "provider": "openai",
+                "sample_rate": 24000,  # OpenAI TTS outputs 24kHz
+                "language": language,
+                "voice": selected_voice
+            }
+        except Exception as e:
+            print(f"OpenAI TTS synthesis error: {e}")
+            return {
+                "audio_content": b"",
+                "text": text,
+                "provider": "openai",
+                "error": str(e),
+                "sample_rate": 24000,
+                "language": language
+            }
+
     def _synthesize_google(self, text: str, language: str, voice: Optional[str]) -> Dict[str, Any]:
         """Synthesize using Google Cloud TTS"""
         from google.cloud import texttospeech
@@ -0,0 +1,155 @@
+"""
+Benchmark: co-purchase recommendations, precomputed CSR matrix vs SQL aggregation
+
+Seeds a throwaway SQLite database with customers and orders over a catalog
+with skewed (Zipf-like) product popularity. It then times:
+- the offline build;
+- saving and loading the .npz artifact;
+- top-k "also bought" for a product and personalized top-k for a customer,
+  served from the model;
+- the per-request SQL self-join over order_items that computes the same
+  also-bought list;
+- incremental add_order for new orders.
+For sampled products it checks that the model's co-purchase counts match
+the SQL ones.
+
+Usage:
+    python scripts/benchmark_copurchase.py --orders 200000 --products 20000 --customers 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(engine, args, rng: random.Random):
+    from app.db.models import Customer, Order, OrderItem
+
+    customers = [
+        {"id": i + 1, "tenant_id": "bench", "customer_id": f"psid-{i}", "channel": "messenger"}
+        for i in range(args.customers)
+    ]
+    orders, items = [], []
+    for order_id in range(1, args.orders + 1):
+        orders.append({
+            "id": order_id, "tenant_id": "bench", "order_number": f"ORD-{order_id:08d}",
+            "customer_id": rng.randint(1, args.customers), "subtotal": 0.0, "total_amount": 0.0,
+        })
+        for product_id in {popular_product(rng, args.products) for _ in range(rng.choice((1, 1, 2, 2, 3, 4, 6)))}:
+            items.append({
+                "tenant_id": "bench", "order_id": order_id, "product_id": product_id, "product_name": f"P{product_id}",
+                "product_sku": f"SKU-{product_id}", "quantity": 1, "unit_price": 0.0, "total_price": 0.0,
+            })
+    with engine.begin() as conn:
+        for table, rows in ((Customer.__table__, customers), (Order.__table__, orders), (OrderItem.__table__, items)):
+            for start in range(0, len(rows), 20000):
+                conn.execute(table.insert(), rows[start:start + 20000])
+    return len(items)
+
+
+def popular_product(rng: random.Random, products: int) -> int:
+    return min(products, int(rng.paretovariate(1.1))) if rng.random() < 0.5 else rng.randint(1, products)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def sql_also_bought(db, product_id: int, k: int):
+    from sqlalchemy import func
+    from sqlalchemy.orm import aliased
+    from app.db.models import OrderItem
+
+    other = aliased(OrderItem)
+    return db.query(other.product_id, func.count(func.distinct(other.order_id)).label("n")) \
+        .join(OrderItem, OrderItem.order_id == other.order_id) \
+        .filter(OrderItem.product_id == product_id, other.product_id != product_id) \
+        .group_by(other.product_id).order_by(func.count(func.distinct(other.order_id)).desc()).limit(k).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200000, help="Orders in the throwaway database")
+    parser.add_argument("--products", type=int, default=20000, help="Products in the catalog")
+    parser.add_argument("--customers", type=int, default=50000, help="Customers placing the orders")
+    parser.add_argument("--queries", type=int, default=2000, help="Recommendation lookups timed per kind")
+    parser.add_argument("--sql-queries", type=int, default=50, help="SQL aggregation lookups timed")
+    parser.add_argument("-k", type=int, default=10, help="Recommendations per lookup")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["BANG_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'copurchase_bench.db')}"
+    os.environ["BANG_COPURCHASE_ARTIFACT_DIR"] = os.path.join(tmp_dir, "copurchase")
+    os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+    from sqlalchemy import Index
+    from app.db.models import Base, Customer, Order, OrderItem
+    from app.db.session import SessionLocal, engine
+    from app.services.copurchase import CoPurchaseModel, build_model, load_order_version, model_artifact_path
+
+    Base.metadata.create_all(engine, tables=[Customer.__table__, Order.__table__, OrderItem.__table__])
+    Index("ix_bench_order_items_product_order", OrderItem.product_id, OrderItem.order_id).create(engine)
+    rng = random.Random(7)
+    start = time.perf_counter()
+    lines = seed(engine, args, rng)
+    print(f"   seeded {args.orders} orders ({lines} lines) in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    model = build_model("bench", load_order_version("bench"))
+    print(f"build (load + matrix)   {time.perf_counter() - start:>8.2f} s   "
+          f"{len(model)} products, {model.pairs} pairs, {len(model.recent)} customers")
+    path = model_artifact_path("bench")
+    start = time.perf_counter()
+    model.save(path)
+    saved = time.perf_counter() - start
+    start = time.perf_counter()
+    model = CoPurchaseModel.load("bench", path)
+    print(f"artifact save / load    {saved:>8.2f} s / {time.perf_counter() - start:.2f} s   "
+          f"{os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+    product_ids = [popular_product(rng, args.products) for _ in range(args.queries)]
+    customers = [f"psid-{rng.randrange(args.customers)}" for _ in range(args.queries)]
+    print(f"{'lookup':<24} {'p50 us':>9} {'p99 us':>9}")
+    for name, run, keys in (
+        ("also bought (model)", lambda key: model.also_bought(key, args.k), product_ids),
+        ("for customer (model)", lambda key: model.for_customer(key, args.k), customers),
+    ):
+        timings = []
+        for key in keys:
+            start = time.perf_counter()
+            run(key)
+            timings.append((time.perf_counter() - start) * 1e6)
+        print(f"{name:<24} {percentile(timings, 50):>9.1f} {percentile(timings, 99):>9.1f}")
+
+    db = SessionLocal()
+    timings, mismatched = [], 0
+    try:
+        for product_id in product_ids[:args.sql_queries]:
+            start = time.perf_counter()
+            rows = sql_also_bought(db, product_id, args.k)
+            timings.append((time.perf_counter() - start) * 1e6)
+            # Ties may be ordered differently; the count sequences must agree
+            expected = [count for _, count in rows]
+            row = model.index.get(product_id)
+            indptr, indices, data = model._csr
+            got = data[indptr[row]:indptr[row + 1]][:args.k].astype(int).tolist() if row is not None else []
+            mismatched += expected != got
+    finally:
+        db.close()
+    print(f"{'also bought (SQL)':<24} {percentile(timings, 50):>9.1f} {percentile(timings, 99):>9.1f}")
+    print(f"   top-{args.k} counts {'identical' if not mismatched else f'differ for {mismatched}'} "
+          f"for {len(timings)} sampled products")
+
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        model.add_order(rng.randint(1, args.customers), None, [popular_product(rng, args.products) for _ in range(3)])
+    print(f"add_order (incremental) {(time.perf_counter() - start) / args.queries * 1e6:>8.1f} us per order")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark: compiled entity extractor vs the regex fallback it replaced
+
+Scores NLUService._extract_entities_regex (copied here verbatim) and
+app.services.entity_extractor on a labelled corpus of customer messages
+(Bangla digits, BD phone formats, ৳/টাকা/tk amounts, ORD-XXXXXXXX ids,
+quantities, dates) and reports per-field recall, exact-match rate and
+µs/message. Also times a synthetic tenant extractor (Entity rows compiled into
+one regex alternation plus a dictionary token trie).
+
+Usage:
+    python scripts/benchmark_entity_extractor.py --iterations 2000 --tenant-regexes 20 --tenant-terms 500
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.entity_extractor import EntityExtractor, TenantEntityExtractor
+
+# (message, expected entities)
+CORPUS = [
+    ("অর্ডার ১২৩ এর স্ট্যাটাস জানতে চাই", {"order_id": "123"}),
+    ("Where is my order #4521?", {"order_id": "4521"}),
+    ("ORD-7F3A9C21 kothay ache?", {"order_id": "ORD-7F3A9C21"}),
+    ("আমার অর্ডার ORD-AB12CD34 এখনো আসেনি", {"order_id": "ORD-AB12CD34"}),
+    ("call me on 01712345678", {"phone": "+8801712345678"}),
+    ("আমার নম্বর ০১৮১২৩৪৫৬৭৮", {"phone": "+8801812345678"}),
+    ("+880 1912-345678 e phone den", {"phone": "+8801912345678"}),
+    ("৳১,৫০০ কেটে নিয়েছে কিন্তু অর্ডার হয়নি", {"amount": 1500.0}),
+    ("500 taka refund chai", {"amount": 500.0}),
+    ("Tk. 2,450/- paid via bkash", {"amount": 2450.0, "payment_method": "bkash"}),
+    ("১২০০ টাকা বিকাশে পাঠিয়েছি", {"amount": 1200.0, "payment_method": "bkash"}),
+    ("email me at rahim.k@example.com", {"email": "rahim.k@example.com"}),
+    ("2 pcs Samsung A54 lagbe", {"quantity": 2}),
+    ("৩টা শার্ট অর্ডার করতে চাই", {"quantity": 3}),
+    ("amar 2ta lagbe cash on delivery", {"quantity": 2, "payment_method": "cash_on_delivery"}),
+    ("deliver by 15/01/2025 please", {"date": "2025-01-15"}),
+    ("১৫ জানুয়ারি ২০২৫ এর মধ্যে দিবেন", {"date": "2025-01-15"}),
+    ("আগামীকাল ডেলিভারি হবে?", {"date": "tomorrow"}),
+    ("order 88 er jonno 01612345678 e call korun", {"order_id": "88", "phone": "+8801612345678"}),
+    ("refund 750 tk to nadia@mail.com by 2025-03-04", {"amount": 750.0, "email": "nadia@mail.com", "date": "2025-03-04"}),
+    ("iPhone 15 er dam koto?", {}),
+    ("হ্যালো, কেমন আছেন?", {}),
+]
+
+
+def legacy_regex_extract(text: str):
+    entities = {}
+    order_match = re.search(r'(?:order|অর্ডার|#)\s*(\d+)', text, re.IGNORECASE)
+    if order_match:
+        entities['order_id'] = order_match.group(1)
+    phone_match = re.search(r'(?:\+?88)?01[3-9]\d{8}', text)
+    if phone_match:
+        entities['phone'] = phone_match.group(0)
+    amount_match = re.search(r'(?:৳|টাকা|taka|tk)\s*(\d+(?:\.\d{2})?)', text, re.IGNORECASE)
+    if amount_match:
+        entities['amount'] = float(amount_match.group(1))
+    email_match = re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
+    if email_match:
+        entities['email'] = email_match.group(0)
+    return entities
+
+
+def _same(actual, expected) -> bool:
+    if actual is None:
+        return False
+    if isinstance(expected, str) and isinstance(actual, str):
+        # The legacy extractor leaves phones un-normalized
+        return re.sub(r"\D", "", actual)[-11:] == re.sub(r"\D", "", expected)[-11:] if expected.startswith("+88") else actual.lower() == expected.lower()
+    return actual == expected
+
+
+def evaluate(extract, iterations: int):
+    expected_total = found = exact = 0
+    for text, expected in CORPUS:
+        entities = extract(text)
+        expected_total += len(expected)
+        found += sum(1 for field, value in expected.items() if _same(entities.get(field), value))
+        exact += 1 if all(_same(entities.get(field), value) for field, value in expected.items()) and not (set(entities) - set(expected)) else 0
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text, _ in CORPUS:
+            extract(text)
+    per_call_us = (time.perf_counter() - start) / (iterations * len(CORPUS)) * 1e6
+    return found / expected_total, exact / len(CORPUS), per_call_us
+
+
+def synthetic_tenant_entities(regexes: int, terms: int):
+    entities = [(f"code_{i}", "regex", rf"\bC{i}-\d{{4}}\b") for i in range(regexes)]
+    entities.append(("district", "dictionary", json.dumps({
+        "Dhaka": ["ঢাকা", "dhaka city"], "Chattogram": ["chittagong", "চট্টগ্রাম"], "Sylhet": ["সিলেট"]
+    }, ensure_ascii=False)))
+    entities.append(("catalog_term", "dictionary", json.dumps([f"model {i} pro" for i in range(terms)])))
+    return entities
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="Timing passes over the corpus")
+    parser.add_argument("--tenant-regexes", type=int, default=20, help="Synthetic tenant regex entities")
+    parser.add_argument("--tenant-terms", type=int, default=500, help="Synthetic tenant dictionary terms")
+    args = parser.parse_args()
+
+    extractor = EntityExtractor()
+    candidates = [
+        ("nlu._extract_entities_regex", legacy_regex_extract),
+        ("entity_extractor", extractor.extract_entities),
+    ]
+
+    print(f"📚 Corpus: {len(CORPUS)} labelled messages")
+    print(f"{'implementation':<30} {'recall':>8} {'exact':>8} {'µs/msg':>9}")
+    for name, extract in candidates:
+        recall, exact, per_call_us = evaluate(extract, args.iterations)
+        print(f"{name:<30} {recall:>7.1%} {exact:>7.1%} {per_call_us:>9.2f}")
+
+    spans = sum(len(extractor.extract(text)) for text, _ in CORPUS)
+    print(f"\n🔎 {spans} spans extracted across the corpus (all matches, not just the first per field)")
+
+    start = time.perf_counter()
+    tenant = TenantEntityExtractor(synthetic_tenant_entities(args.tenant_regexes, args.tenant_terms))
+    build_ms = (time.perf_counter() - start) * 1000
+    texts = [text for text, _ in CORPUS] + ["C7-1234 model 42 pro ঢাকায় পাঠান", "chittagong e model 7 pro ache?"]
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for text in texts:
+            tenant.extract_entities(text)
+    per_call_us = (time.perf_counter() - start) / (args.iterations * len(texts)) * 1e6
+    print(f"🏷️  Tenant extractor ({args.tenant_regexes} regexes, {tenant.trie.terms} dictionary terms): "
+          f"built in {build_ms:.1f} ms, {per_call_us:.2f} µs/msg")
+
+
+if __name__ == "__main__":
+    main()
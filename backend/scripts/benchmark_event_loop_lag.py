@@ -0,0 +1,138 @@
+"""
+Benchmark: event-loop lag while the dialogue manager answers product questions
+
+Runs concurrent conversations of product questions against a throwaway SQLite
+catalog, once calling the synchronous dialogue_manager.decide() from the
+coroutines (what the channel adapters did) and once awaiting decide_async().
+Misspelled product names miss the ILIKE lookup and fall through to fuzzy
+matching over the whole catalog, the slow path. A monitor task sleeps in short
+ticks and records how late each tick wakes up: that lateness is how long any
+other request (a webhook, a websocket frame, a health check) would have waited.
+
+The reply cache is turned off so every message reaches the catalog.
+
+Usage:
+    python scripts/benchmark_event_loop_lag.py --products 5000 --conversations 20 --messages 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MESSAGES = [
+    ("price_inquiry", "iphon 15 er dam koto?"),
+    ("price_inquiry", "samsng a54 er dam koto"),
+    ("availability_inquiry", "xiomi redmi note 13 stock ache?"),
+    ("product_info", "about iphone 15"),
+    ("recommendation", "kono phone suggest korun"),
+    ("category_browse", "ki ki category ache?"),
+]
+BRANDS = ["Samsung Galaxy", "Xiaomi Redmi", "Realme", "Oppo", "Vivo", "Nokia", "Tecno", "Infinix"]
+
+
+def seed_catalog(session_factory, n_products: int):
+    from app.db.models import Product
+
+    rng = random.Random(7)
+    rows = [
+        Product(tenant_id="bench", name=name, sku=f"SKU-{i}", price=price, category="Smartphones", brand=name.split()[0],
+                stock_quantity=12, is_active=True, is_featured=i < 3)
+        for i, (name, price) in enumerate([
+            ("iPhone 15", 139999.0), ("Samsung A54", 45999.0), ("Xiaomi Redmi Note 13", 24999.0),
+        ])
+    ]
+    for i in range(len(rows), n_products):
+        name = f"{rng.choice(BRANDS)} {rng.choice('ACMXYZ')}{rng.randint(10, 99)} {rng.choice(['Pro', 'Lite', 'Max', ''])}".strip()
+        rows.append(Product(tenant_id="bench", name=name, sku=f"SKU-{i}", price=float(rng.randint(5, 200) * 1000),
+                            category=rng.choice(["Smartphones", "Tablets", "Accessories"]), brand=name.split()[0],
+                            stock_quantity=rng.randint(0, 40), is_active=True))
+    db = session_factory()
+    db.add_all(rows)
+    db.commit()
+    db.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def monitor_lag(interval: float, lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def conversation(dialogue_manager, use_async: bool, index: int, messages: int, latencies: list):
+    for turn in range(messages):
+        intent, text = MESSAGES[(index + turn) % len(MESSAGES)]
+        context = {"channel": "benchmark", "customer_id": f"c{index}", "message": text, "language": "bn"}
+        start = time.perf_counter()
+        if use_async:
+            await dialogue_manager.decide_async(intent, {}, context)
+        else:
+            dialogue_manager.decide(intent, {}, context)
+        latencies.append((time.perf_counter() - start) * 1000)
+        # Other awaits a real turn makes (NLU, state store, sending the reply)
+        await asyncio.sleep(0)
+
+
+async def run(dialogue_manager, use_async: bool, args):
+    lags, latencies = [], []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(args.tick_ms / 1000, lags, stop))
+    await asyncio.sleep(args.tick_ms / 1000 * 2)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        conversation(dialogue_manager, use_async, i, args.messages, latencies)
+        for i in range(args.conversations)
+    ))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await monitor
+    return lags, latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000, help="Products in the throwaway catalog")
+    parser.add_argument("--conversations", type=int, default=20, help="Concurrent conversations")
+    parser.add_argument("--messages", type=int, default=10, help="Messages per conversation")
+    parser.add_argument("--tick-ms", type=float, default=5.0, help="Lag monitor sleep interval")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "event_loop_lag_bench.db")
+    os.environ["BANG_DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+    from app.core.config import settings
+    from app.db.models import Base, Product
+    from app.db.session import SessionLocal, engine
+
+    Base.metadata.create_all(engine, tables=[Product.__table__])
+    seed_catalog(SessionLocal, args.products)
+    settings.reply_cache_enabled = False
+
+    from app.services.dialogue_manager import dialogue_manager
+
+    total = args.conversations * args.messages
+    print(f"💬 {args.conversations} conversations x {args.messages} messages, {args.products} products, "
+          f"{settings.dialogue_lookup_workers} lookup threads")
+    print(f"{'decide':<8} {'lag p50':>8} {'lag p99':>8} {'lag max':>8} {'turn p50':>9} {'turn p99':>9} {'msg/s':>7}")
+    for name, use_async in (("sync", False), ("async", True)):
+        lags, latencies, elapsed = asyncio.run(run(dialogue_manager, use_async, args))
+        print(f"{name:<8} {percentile(lags, 50):>8.1f} {percentile(lags, 99):>8.1f} {max(lags):>8.1f} "
+              f"{percentile(latencies, 50):>9.1f} {percentile(latencies, 99):>9.1f} {total / elapsed:>7.0f}")
+    print("(milliseconds; lag = how late a 'tick' coroutine woke up)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Microbenchmark: Aho-Corasick KeywordMatcher vs per-keyword substring scans
+
+Compares the old `_classify_intent_keywords` scoring (rebuild the keyword dict,
+then `word in text` for every keyword of every intent) and the old product query
+routing (`any(word in query ...)` chains) with a single automaton pass.
+Also checks that both produce identical results on every message.
+
+Usage:
+    python scripts/benchmark_keyword_matcher.py --iterations 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.nlu_service import INTENT_KEYWORDS
+from app.services.product_inquiry_service import PRODUCT_QUERY_KEYWORDS, PRODUCT_QUERY_ROUTES
+
+SAMPLE_MESSAGES = [
+    "আমার অর্ডার কোথায়? অনেক দিন হয়ে গেল",
+    "iPhone 15 er dam koto?",
+    "Samsung S24 stock e ache?",
+    "পেমেন্ট ফেইলড, টাকা কেটে নিয়েছে কিন্তু অর্ডার কনফার্ম হয়নি",
+    "ami product ta ferot dite chai, size ta bhul",
+    "ডেলিভারি কবে হবে? কুরিয়ার থেকে কেউ ফোন দেয়নি",
+    "amar order kothay bhai, 3 din hoye gelo",
+    "খারাপ সার্ভিস, অভিযোগ করতে চাই",
+    "Where is my order #4521? It was supposed to arrive yesterday",
+    "ভালো একটা ফোন রেকমেন্ড করেন ২০ হাজারের মধ্যে",
+    "এই শার্টের বিস্তারিত তথ্য দিন",
+    "Can you post this on facebook and instagram?",
+]
+
+
+def legacy_intent_scores(text: str):
+    # The old implementation rebuilt the keyword dict on every call
+    keywords = {intent: list(words) for intent, words in INTENT_KEYWORDS.items()}
+    text_lower = text.lower()
+    scores = {}
+    for intent, words in keywords.items():
+        score = sum(1 for word in words if word in text_lower)
+        if score > 0:
+            scores[intent] = score
+    return scores
+
+
+def legacy_product_route(query: str) -> str:
+    query_lower = query.lower()
+    for route in PRODUCT_QUERY_ROUTES:
+        if any(word in query_lower for word in PRODUCT_QUERY_KEYWORDS[route]):
+            return route
+    return ""
+
+
+def time_per_call(func, messages, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in messages:
+            func(text)
+    return (time.perf_counter() - start) / (iterations * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="Passes over the sample messages")
+    args = parser.parse_args()
+
+    print(f"{'task':<18} {'backend':<14} {'legacy µs':>10} {'matcher µs':>11} {'speedup':>8}")
+    for use_extension in (True, False):
+        build_start = time.perf_counter()
+        intent_matcher = KeywordMatcher(INTENT_KEYWORDS, use_extension=use_extension)
+        route_matcher = KeywordMatcher(PRODUCT_QUERY_KEYWORDS, use_extension=use_extension)
+        build_ms = (time.perf_counter() - build_start) * 1000
+        if use_extension and intent_matcher.backend == "python":
+            print("(pyahocorasick not installed; only the pure-Python automaton is measured)")
+            continue
+
+        for text in SAMPLE_MESSAGES:
+            assert intent_matcher.label_counts(text) == legacy_intent_scores(text), text
+            assert route_matcher.first_label(text, PRODUCT_QUERY_ROUTES) == legacy_product_route(text), text
+
+        cases = [
+            ("intent scoring", legacy_intent_scores, intent_matcher.label_counts),
+            ("product routing", legacy_product_route, lambda q: route_matcher.first_label(q, PRODUCT_QUERY_ROUTES)),
+        ]
+        for name, legacy, fast in cases:
+            legacy_us = time_per_call(legacy, SAMPLE_MESSAGES, args.iterations)
+            fast_us = time_per_call(fast, SAMPLE_MESSAGES, args.iterations)
+            print(f"{name:<18} {intent_matcher.backend:<14} {legacy_us:>10.2f} {fast_us:>11.2f} {legacy_us / fast_us:>7.2f}x")
+        print(f"{'':<18} {'':<14} automata built in {build_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
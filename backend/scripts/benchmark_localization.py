@@ -0,0 +1,76 @@
+"""
+Microbenchmark: reply localization lookup cost vs number of templates
+
+Compares the previous DialogueManager._localize_response (rebuild the nested
+template dict on every call, then scan every key's translations) with the
+precomputed ResponseLocalizer (reverse index text -> key, then key -> language)
+as the template table grows with synthetic tenant Template rows. Three lookups
+are timed: the first built-in template, the last template, and a reply that is
+not a template (product answers, the common case).
+
+Usage:
+    python scripts/benchmark_localization.py --iterations 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+LANGUAGES = ("bn", "en", "hi", "ur", "ar")
+
+
+def legacy_localize(templates, text, language):
+    # What _localize_response did: a fresh nested dict per call, then a linear scan
+    templates = {key: dict(translations) for key, translations in templates.items()}
+    for key, translations in templates.items():
+        if text in translations.values():
+            return translations.get(language, translations.get("en", text))
+    return text
+
+
+def with_synthetic_templates(base, count):
+    templates = {key: dict(translations) for key, translations in base.items()}
+    for i in range(count - len(templates)):
+        templates[f"tenant_template_{i}"] = {lang: f"{lang} reply text number {i}" for lang in LANGUAGES}
+    return templates
+
+
+def time_per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000, help="Lookups per measurement (scaled down for legacy at large sizes)")
+    args = parser.parse_args()
+
+    from app.services.response_localizer import RESPONSE_TEMPLATES, ResponseLocalizer
+
+    print(f"{'templates':>9} {'lookup':<10} {'legacy ns':>12} {'indexed ns':>11} {'speedup':>9}")
+    for count in (len(RESPONSE_TEMPLATES), 100, 1000, 10000):
+        templates = with_synthetic_templates(RESPONSE_TEMPLATES, count)
+        localizer = ResponseLocalizer(templates)
+        last_key = list(templates)[-1]
+        lookups = {
+            "first": templates[next(iter(templates))]["bn"],
+            "last": templates[last_key]["bn"],
+            "miss": "**iPhone 15** দাম: BDT 139,999.00",
+        }
+        legacy_iterations = max(50, args.iterations * len(RESPONSE_TEMPLATES) // count)
+        for name, text in lookups.items():
+            expected = legacy_localize(templates, text, "en")
+            assert localizer.localize(text, "en") == expected, (count, name)
+            legacy = time_per_call(lambda: legacy_localize(templates, text, "en"), legacy_iterations)
+            indexed = time_per_call(lambda: localizer.localize(text, "en"), args.iterations)
+            print(f"{count:>9} {name:<10} {legacy:>12,.0f} {indexed:>11,.0f} {legacy / indexed:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: micro-batched vs one-call-per-message LLM NLU resolution
+
+Fires bursts of concurrent nlu_service.resolve() calls against the local stub
+model server (NLU cache disabled, backend "openai") with batching off and on,
+and reports wall time, throughput, LLM calls and tokens per message.
+
+Usage:
+    python scripts/benchmark_nlu_batching.py --burst 64 --rounds 5
+    python scripts/benchmark_nlu_batching.py --max-batch-size 32 --max-wait-ms 20
+    python scripts/benchmark_nlu_batching.py --max-concurrency 8   # provider concurrency cap
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.stub_llm_server import start_stub_server
+
+MESSAGES = [
+    "আমার অর্ডার কোথায়?",
+    "Where is my order #4521?",
+    "Samsung A54 er dam koto bhai?",
+    "পেমেন্ট ফেইলড, টাকা কেটে নিয়েছে",
+    "I want to return this product",
+    "ডেলিভারি কবে হবে?",
+    "অর্ডার ক্যানসেল করতে চাই",
+    "রিফান্ড কবে পাবো?",
+    "courier ekhono ashe nai",
+    "খারাপ সার্ভিস, অভিযোগ করতে চাই",
+    "Samsung S24 stock e ache?",
+    "show me instagram analytics",
+]
+
+
+async def burst(nlu_service, size: int, offset: int):
+    # Suffix keeps messages distinct, as they would be across real customers
+    texts = [f"{MESSAGES[(offset + i) % len(MESSAGES)]} ({offset + i})" for i in range(size)]
+    return await asyncio.gather(*(nlu_service.resolve(text) for text in texts))
+
+
+async def run_modes(nlu_service, llm_client, settings, burst_size: int, rounds: int):
+    # One event loop for every run so the pooled LLM connections stay valid
+    runs = {}
+    for mode, enabled in (("per_message", False), ("batched", True)):
+        settings.nlu_batching_enabled = enabled
+        calls, tokens = llm_client.calls, llm_client.prompt_tokens + llm_client.completion_tokens
+        walls, intents = [], []
+        for r in range(rounds):
+            start = time.perf_counter()
+            results = await burst(nlu_service, burst_size, r * burst_size)
+            walls.append(time.perf_counter() - start)
+            intents.extend(result["intent"] for result in results)
+        runs[mode] = {
+            "wall": walls,
+            "calls": llm_client.calls - calls,
+            "tokens": llm_client.prompt_tokens + llm_client.completion_tokens - tokens,
+            "intents": intents,
+        }
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=64, help="Concurrent messages per burst")
+    parser.add_argument("--rounds", type=int, default=5, help="Bursts per mode")
+    parser.add_argument("--max-batch-size", type=int, default=16, help="Messages per batched call")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="Batch fill window")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="LLM calls in flight (models a provider rate limit)")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Stub base latency per completion")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency_ms=args.latency_ms)
+    os.environ["BANG_OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+    os.environ["BANG_NLU_CACHE_ENABLED"] = "false"
+    os.environ["BANG_NLU_BACKEND"] = "openai"
+    os.environ["BANG_NLU_BATCH_MAX_SIZE"] = str(args.max_batch_size)
+    os.environ["BANG_NLU_BATCH_MAX_WAIT_MS"] = str(args.max_wait_ms)
+    if args.max_concurrency:
+        os.environ["BANG_LLM_MAX_CONCURRENCY"] = str(args.max_concurrency)
+
+    from app.core.config import settings
+    from app.services.llm_client import llm_client
+    from app.services.nlu_service import nlu_service
+
+    total = args.burst * args.rounds
+    print(f"⚡ {args.rounds} bursts of {args.burst} concurrent messages against {base_url}")
+    print(f"{'mode':<12} {'wall/burst ms':>14} {'msg/s':>8} {'LLM calls':>10} {'tokens/msg':>11}")
+    runs = asyncio.run(run_modes(nlu_service, llm_client, settings, args.burst, args.rounds))
+    for mode, run in runs.items():
+        wall = statistics.mean(run["wall"])
+        print(f"{mode:<12} {wall * 1000:>14.1f} {total / sum(run['wall']):>8.1f} {run['calls']:>10} {run['tokens'] / total:>11.1f}")
+
+    agreement = statistics.mean(
+        1.0 if a == b else 0.0 for a, b in zip(runs["per_message"]["intents"], runs["batched"]["intents"])
+    )
+    print(f"\n🎯 Intent agreement batched vs per-message: {agreement:.1%}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Latency benchmark: combined single-call NLU resolution vs the old two-call mode
+
+Runs NLUService.resolve (openai backend) against the local stub model server
+in both LLM modes and reports p50/p95 latency and token usage per message.
+
+Usage:
+    python scripts/benchmark_nlu_modes.py --messages 50 --latency-ms 300
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.stub_llm_server import start_stub_server
+
+SAMPLE_MESSAGES = [
+    "আমার অর্ডার কোথায়?",
+    "অর্ডার ১২৩ কোথায়",
+    "iPhone 15 er dam koto?",
+    "Where is my order #4521?",
+    "পেমেন্ট ফেইলড, টাকা কেটে নিয়েছে",
+    "I want to return this product",
+    "ডেলিভারি কবে হবে? 01712345678",
+    "amar order kothay",
+    "Samsung S24 stock e ache?",
+    "খারাপ সার্ভিস, অভিযোগ করতে চাই",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+async def run_mode(nlu_service, settings, mode: str, messages):
+    settings.nlu_llm_mode = mode
+    latencies = []
+    for text in messages:
+        start = time.perf_counter()
+        await nlu_service.resolve(text, {"tenant_id": None})
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def run_modes(nlu_service, settings, messages):
+    # One event loop for both modes so the pooled LLM connections stay valid
+    return {mode: await run_mode(nlu_service, settings, mode, messages) for mode in ("two_call", "combined")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=30, help="Messages per mode")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Stub base latency per completion")
+    parser.add_argument("--per-token-ms", type=float, default=2.0, help="Stub latency per completion token")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency_ms=args.latency_ms, per_token_ms=args.per_token_ms)
+    os.environ["BANG_OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+    os.environ["BANG_NLU_BACKEND"] = "openai"
+    # Measure the model calls, not the NLU result cache
+    os.environ["BANG_NLU_CACHE_ENABLED"] = "false"
+
+    from app.core.config import settings
+    from app.services.nlu_service import nlu_service
+
+    messages = [SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)] for i in range(args.messages)]
+
+    print(f"🧪 Stub model server: {base_url} (base latency {args.latency_ms:.0f} ms)")
+    print(f"{'mode':<10} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}")
+    results = asyncio.run(run_modes(nlu_service, settings, messages))
+    for mode, latencies in results.items():
+        print(f"{mode:<10} {percentile(latencies, 50):>10.1f} {percentile(latencies, 95):>10.1f} {statistics.mean(latencies):>10.1f}")
+
+    speedup = statistics.mean(results["two_call"]) / statistics.mean(results["combined"])
+    print(f"\n⚡ Combined mode is {speedup:.2f}x faster per message")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
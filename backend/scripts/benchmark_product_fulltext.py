@@ -0,0 +1,159 @@
+"""
+Benchmark: product search filter latency, SQLite FTS5 vs ILIKE
+
+Grows a throwaway SQLite catalog through the requested sizes and, at each
+size, times the two queries that filter products by a search string: the
+products API listing (newest first, 100 rows) and the inquiry search (active
+products, 10 rows). Each runs once with the leading-wildcard ILIKE filter and
+once with product_fulltext's FTS5 filter. The add_product_fulltext_search
+migration is applied to the first catalog, so its triggers index every later
+insert; the seeding rate with triggers is reported too. Match counts are
+compared to show both filters return the same products.
+
+The PostgreSQL backend (pg_trgm + tsvector) needs a server and is not covered.
+
+Usage:
+    python scripts/benchmark_product_fulltext.py --sizes 10000,100000,1000000
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+MIGRATION = os.path.join(BACKEND_DIR, "alembic", "versions", "c7d41e9a2b58_add_product_fulltext_search.py")
+BRANDS = ["Samsung", "Xiaomi", "Realme", "Oppo", "Vivo", "Nokia", "Tecno", "Infinix", "Walton", "Symphony"]
+LINES = ["Galaxy", "Redmi", "Note", "Narzo", "Reno", "Spark", "Hot", "Primo", "Pro", "Lite"]
+CATEGORIES = ["Smartphones", "Tablets", "Accessories", "Chargers", "Earbuds", "Smartwatches"]
+FEATURES = ["5G", "AMOLED display", "fast charging", "dual SIM", "waterproof body", "long battery"]
+QUERIES = ["iPhone 15", "samsung", "Xiaomi Redmi", "A54", "স্যামসাং", "waterproof", "SKU-004217", "no such phone"]
+
+
+def product_rows(start: int, stop: int, rng: random.Random):
+    for i in range(start, stop):
+        if i == 0:
+            name, brand = "iPhone 15", "Apple"
+        elif i == 1:
+            name, brand = "স্যামসাং ফোন", "Samsung"
+        else:
+            brand = rng.choice(BRANDS)
+            name = f"{brand} {rng.choice(LINES)} {rng.choice('ACMXYZ')}{rng.randint(1, 99)}"
+        yield {
+            "tenant_id": "bench", "name": name, "sku": f"SKU-{i:06d}", "price": float(rng.randint(5, 200) * 1000),
+            "category": rng.choice(CATEGORIES), "brand": brand, "stock_quantity": rng.randint(0, 40),
+            "is_active": rng.random() > 0.1, "description": f"{name} with {rng.choice(FEATURES)}",
+        }
+
+
+def seed(engine, start: int, stop: int, rng: random.Random):
+    from app.db.models import Product
+
+    rows = product_rows(start, stop, rng)
+    with engine.begin() as conn:
+        while True:
+            batch = [row for _, row in zip(range(20000), rows)]
+            if not batch:
+                break
+            conn.execute(Product.__table__.insert(), batch)
+
+
+def apply_migration(engine):
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    spec = importlib.util.spec_from_file_location("add_product_fulltext_search", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def run_queries(backend: str, repeat: int):
+    from sqlalchemy import and_
+    from app.core.config import settings
+    from app.db.base import get_db
+    from app.db.models import Product
+    from app.services.product_fulltext import product_fulltext
+
+    settings.product_fulltext_backend = "auto" if backend == "fts5" else "off"
+    product_fulltext.refresh()
+    assert product_fulltext.backend == backend, product_fulltext.backend
+
+    db = next(get_db())
+    timings = {"list": [], "inquiry": []}
+    counts = {}
+    try:
+        for query in QUERIES:
+            counts[query] = db.query(Product).filter(product_fulltext.search_filter(query)).count()
+            for _ in range(repeat):
+                start = time.perf_counter()
+                db.query(Product).filter(product_fulltext.search_filter(query)) \
+                    .order_by(Product.created_at.desc()).limit(100).all()
+                timings["list"].append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                db.query(Product).filter(and_(Product.is_active == True, product_fulltext.search_filter(query))) \
+                    .limit(10).all()
+                timings["inquiry"].append((time.perf_counter() - start) * 1000)
+    finally:
+        db.close()
+    return timings, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated catalog sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the query mix per size and filter")
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    db_path = os.path.join(tempfile.mkdtemp(), "product_fulltext_bench.db")
+    os.environ["BANG_DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+    from app.core.tenant import TenantContext
+    from app.db.models import Base, Product
+    from app.db.session import engine
+
+    Base.metadata.create_all(engine, tables=[Product.__table__])
+    TenantContext.set_tenant("bench")
+    rng = random.Random(7)
+
+    seeded = 0
+    print(f"{'products':>9} {'query':<8} {'filter':<7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for size in sizes:
+        start = time.perf_counter()
+        seed(engine, seeded, size, rng)
+        elapsed = time.perf_counter() - start
+        if seeded == 0:
+            start = time.perf_counter()
+            apply_migration(engine)
+            print(f"   seeded {size} in {elapsed:.1f}s, migration (FTS backfill) {time.perf_counter() - start:.1f}s")
+        else:
+            print(f"   seeded {size - seeded} more with FTS triggers: {(size - seeded) / elapsed:,.0f} rows/s")
+        seeded = size
+
+        results = {backend: run_queries(backend, args.repeat) for backend in ("ilike", "fts5")}
+        for kind in ("list", "inquiry"):
+            for backend in ("ilike", "fts5"):
+                values = results[backend][0][kind]
+                print(f"{size:>9} {kind:<8} {backend:<7} {percentile(values, 50):>9.2f} "
+                      f"{percentile(values, 99):>9.2f} {max(values):>9.2f}")
+        mismatched = [q for q in QUERIES if results["ilike"][1][q] != results["fts5"][1][q]]
+        print(f"   match counts {'identical' if not mismatched else 'differ for ' + repr(mismatched)}: "
+              f"{results['fts5'][1]}")
+
+
+if __name__ == "__main__":
+    main()
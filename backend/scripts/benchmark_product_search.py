@@ -0,0 +1,132 @@
+"""
+Benchmark: product lookup latency, in-memory search index vs ILIKE + fuzzy scan
+
+Seeds a throwaway SQLite catalog with one tenant's SKUs, then times the
+product lookups ProductInquiryService makes: exact names, misspellings, model
+numbers, SKUs, Bangla names and broad brand words. The index is timed on its
+own (search only) and through _find_products (search plus the catalog
+snapshot's records, fetched by primary key on a miss); the previous path
+(ILIKE, then fuzzywuzzy.extractOne over every active product name) is timed
+on a few queries since it takes seconds at this size. Also reports build
+time and the cost of an incremental update.
+
+Usage:
+    python scripts/benchmark_product_search.py --products 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BRANDS = ["Samsung", "Xiaomi", "Realme", "Oppo", "Vivo", "Nokia", "Tecno", "Infinix", "Walton", "Symphony"]
+LINES = ["Galaxy", "Redmi", "Note", "Narzo", "Reno", "Spark", "Hot", "Primo", "Pro", "Lite"]
+CATEGORIES = ["Smartphones", "Tablets", "Accessories", "Chargers", "Earbuds", "Smartwatches"]
+TAGS = ["5g", "amoled", "fast-charging", "budget", "flagship", "dual-sim", "waterproof"]
+QUERIES = [
+    "iPhone 15", "iphone 15 er dam koto", "iPhon 15", "Samsung A54", "samsng a54", "Galaxy A54",
+    "SKU-004217", "স্যামসাং ফোন", "Walton Primo", "Xiaomi Redmi Note 13", "earbuds", "waterproof",
+]
+
+
+def seed_catalog(session_factory, n_products: int):
+    from app.db.models import Product
+
+    rng = random.Random(7)
+    rows = [
+        Product(tenant_id="bench", name=name, sku=f"SKU-{i:06d}", price=price, category="Smartphones",
+                brand=name.split()[0], stock_quantity=10, is_active=True)
+        for i, (name, price) in enumerate([
+            ("iPhone 15", 139999.0), ("Samsung A54", 45999.0), ("Xiaomi Redmi Note 13", 24999.0),
+            ("স্যামসাং ফোন", 19999.0),
+        ])
+    ]
+    for i in range(len(rows), n_products):
+        brand = rng.choice(BRANDS)
+        name = f"{brand} {rng.choice(LINES)} {rng.choice('ACMXYZ')}{rng.randint(1, 99)} {rng.choice(['Pro', 'Lite', 'Max', ''])}".strip()
+        rows.append(Product(
+            tenant_id="bench", name=name, sku=f"SKU-{i:06d}", price=float(rng.randint(5, 200) * 1000),
+            category=rng.choice(CATEGORIES), brand=brand, stock_quantity=rng.randint(0, 40), is_active=True,
+            tags=rng.sample(TAGS, 2), description=f"{name} with {rng.choice(TAGS)} support"
+        ))
+    db = session_factory()
+    for start in range(0, len(rows), 10000):
+        db.add_all(rows[start:start + 10000])
+        db.commit()
+    db.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def time_calls(func, queries, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            func(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100000, help="SKUs in the tenant's catalog")
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the query mix for the index")
+    parser.add_argument("--legacy-queries", type=int, default=3, help="Queries timed on the ILIKE + fuzzy path")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "product_search_bench.db")
+    os.environ["BANG_DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+    from app.core.config import settings
+    from app.core.tenant import TenantContext
+    from app.db.models import Base, Product
+    from app.db.session import SessionLocal, engine
+
+    Base.metadata.create_all(engine, tables=[Product.__table__])
+    print(f"🌱 Seeding {args.products} products...")
+    seed_catalog(SessionLocal, args.products)
+    TenantContext.set_tenant("bench")
+
+    from app.services.catalog_snapshot import catalog_snapshots
+    from app.services.product_inquiry_service import product_inquiry_service
+    from app.services.product_search_index import product_search_indexes
+
+    start = time.perf_counter()
+    index = product_search_indexes.get("bench")
+    print(f"🏗️  Index build: {time.perf_counter() - start:.2f}s for {len(index)} products")
+
+    catalog = catalog_snapshots.get("bench")
+    for query in QUERIES:
+        names = [p.name for p in product_inquiry_service._find_products(catalog, query, 3)]
+        print(f"   {query!r:<28} -> {names}")
+
+    search = time_calls(lambda q: index.search(q, 5), QUERIES, args.repeat)
+    settings.product_search_index_enabled = True
+    lookup = time_calls(lambda q: product_inquiry_service._find_products(catalog, q, 5), QUERIES, max(1, args.repeat // 10))
+    settings.product_search_index_enabled = False
+    legacy_queries = [q for q in QUERIES if q != "iPhone 15"][:args.legacy_queries]
+    legacy = time_calls(lambda q: product_inquiry_service._find_products(catalog, q, 5), legacy_queries, 1)
+    settings.product_search_index_enabled = True
+
+    print(f"\n{'path':<24} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, values in (("index search", search), ("index + snapshot", lookup), ("ILIKE + fuzzy scan", legacy)):
+        print(f"{name:<24} {percentile(values, 50):>9.3f} {percentile(values, 99):>9.3f} {max(values):>9.3f}")
+
+    product = SessionLocal().query(Product).filter(Product.tenant_id == "bench").first()
+    start = time.perf_counter()
+    for i in range(1000):
+        product.name = f"Renamed Phone {i}"
+        index.add(product.id, {"name": product.name, "sku": product.sku, "brand": product.brand})
+    print(f"\n✏️  Incremental update: {(time.perf_counter() - start) / 1000 * 1000:.3f} ms per product")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: near-duplicate reply cache in front of the dialogue manager
+
+Replays a stream of FAQ-style product questions, where every question arrives
+in several spellings ("iphone 15 er dam koto?", "iPhone15 dam koto", ...),
+through dialogue_manager.decide() against a throwaway SQLite catalog. It runs
+once with the reply cache off and once with it on, and reports per-message
+latency, the hit rate and wrong replies: a cached reply that differs from the
+product answer the same message gets without the cache. Spellings the product
+lookup alone cannot answer (it asks which product is meant) but that hit a
+cached answer for another spelling are counted separately.
+
+Usage:
+    python scripts/benchmark_reply_cache.py --products 2000 --replays 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (intent, spellings of one question); neighbouring groups differ only in the model
+CORPUS = [
+    ("price_inquiry", ["iphone 15 er dam koto?", "iPhone15 dam koto", "iphone 15 er daam koto bhai", "IPHONE 15 dam koto?"]),
+    ("price_inquiry", ["iphone 14 er dam koto?", "iPhone14 dam koto", "iphone 14 er daam koto"]),
+    ("price_inquiry", ["samsung a54 er dam koto", "Samsung A54 dam koto?", "samsung a54 er dam koto plz"]),
+    ("price_inquiry", ["samsung a34 er dam koto", "Samsung A34 dam koto?"]),
+    ("price_inquiry", ["Xiaomi Redmi Note 13 er dam koto", "xiaomi redmi note 13 dam koto?"]),
+    ("price_inquiry", ["iPhone 15 এর দাম কত?", "iphone 15 এর দাম কত"]),
+    ("availability_inquiry", ["iphone 15 stock ache?", "iPhone15 stock e ache", "iphone 15 stock ache bhai?"]),
+    ("availability_inquiry", ["samsung a54 stock ache?", "Samsung A54 stock ache"]),
+    ("recommendation", ["kono phone suggest korun", "kono phone suggest korun please"]),
+    ("category_browse", ["ki ki category ache?", "ki ki category ache"]),
+]
+BRANDS = ["Samsung Galaxy", "Xiaomi Redmi", "Realme", "Oppo", "Vivo", "Nokia", "Tecno", "Infinix"]
+
+
+def seed_catalog(session_factory, n_products: int):
+    from app.db.models import Product
+
+    rng = random.Random(7)
+    db = session_factory()
+    rows = [
+        Product(tenant_id="bench", name=name, sku=f"SKU-{i}", price=price, category="Smartphones",
+                brand=name.split()[0], stock_quantity=stock, is_active=True, is_featured=i < 3)
+        for i, (name, price, stock) in enumerate([
+            ("iPhone 15", 139999.0, 12), ("iPhone 14", 109999.0, 0), ("Samsung A54", 45999.0, 30),
+            ("Samsung A34", 35999.0, 8), ("Xiaomi Redmi Note 13", 24999.0, 50),
+        ])
+    ]
+    for i in range(len(rows), n_products):
+        name = f"{rng.choice(BRANDS)} {rng.choice('ACMXYZ')}{rng.randint(10, 99)} {rng.choice(['Pro', 'Lite', 'Max', ''])}".strip()
+        rows.append(Product(tenant_id="bench", name=name, sku=f"SKU-{i}", price=float(rng.randint(5, 200) * 1000),
+                            category=rng.choice(["Smartphones", "Tablets", "Accessories"]), brand=name.split()[0],
+                            stock_quantity=rng.randint(0, 40), is_active=True))
+    db.add_all(rows)
+    db.commit()
+    db.close()
+
+
+def run(dialogue_manager, stream):
+    from app.services.dialogue_manager import UNCACHEABLE_REPLY_METADATA
+
+    latencies, replies, answered = [], [], []
+    for intent, text in stream:
+        start = time.perf_counter()
+        result = dialogue_manager.decide(
+            intent=intent,
+            entities={},
+            context={"channel": "benchmark", "message": text, "language": "bn"}
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        replies.append(result["response_text"])
+        answered.append(not any(key in result.get("metadata", {}) for key in UNCACHEABLE_REPLY_METADATA))
+    return latencies, replies, answered
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=2000, help="Products in the throwaway catalog")
+    parser.add_argument("--replays", type=int, default=20, help="Times each spelling appears in the stream")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "reply_cache_bench.db")
+    os.environ["BANG_DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+    from app.core.config import settings
+    from app.db.models import Base, Product
+    from app.db.session import SessionLocal, engine
+
+    Base.metadata.create_all(engine, tables=[Product.__table__])
+    seed_catalog(SessionLocal, args.products)
+
+    from app.services.dialogue_manager import dialogue_manager
+    from app.services.reply_cache import reply_cache
+
+    stream = [(intent, text) for intent, texts in CORPUS for text in texts] * args.replays
+    random.Random(11).shuffle(stream)
+    print(f"💬 {len(stream)} messages ({sum(len(t) for _, t in CORPUS)} spellings of {len(CORPUS)} questions), "
+          f"{args.products} products")
+
+    settings.reply_cache_enabled = False
+    base_latencies, reference, reference_answered = run(dialogue_manager, stream)
+
+    settings.reply_cache_enabled = True
+    reply_cache.clear()
+    cached_latencies, replies, _ = run(dialogue_manager, stream)
+    stats = reply_cache.stats()
+    differs = [a != b for a, b in zip(reference, replies)]
+    wrong = sum(1 for d, ok in zip(differs, reference_answered) if d and ok)
+    upgraded = sum(1 for d, ok in zip(differs, reference_answered) if d and not ok)
+
+    print(f"{'reply cache':<12} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for name, latencies in (("off", base_latencies), ("on", cached_latencies)):
+        print(f"{name:<12} {percentile(latencies, 50):>8.3f} {percentile(latencies, 95):>8.3f} {statistics.mean(latencies):>8.3f}")
+    print(f"\n🎯 Hit rate: {stats['hit_rate']:.1%} ({stats['entries']} cached replies for {len(stream)} messages)")
+    print(f"⚠️  Wrong replies from the cache: {wrong}")
+    print(f"🔁 Unanswered spellings served another spelling's answer: {upgraded}")
+    print(f"⚡ Mean speedup: {statistics.mean(base_latencies) / statistics.mean(cached_latencies):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: product reply card rendering, string concatenation vs cached cards
+
+Renders the price card for a set of products the way _handle_price_query used
+to (concatenating the reply from the record's fields on every answer), and
+through reply_cards: the common case, where the product has not changed since
+its card was last rendered; a price or stock change, which re-splices the bound
+card; and a first render, which binds the card from its compiled template.
+Outputs are compared to show the card reproduces the concatenated reply.
+
+No database is needed: products are ProductRecord tuples built in memory.
+
+Usage:
+    python scripts/benchmark_reply_cards.py --products 1000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BRANDS = ["Samsung", "Xiaomi", "Realme", "Oppo", "Vivo", "Nokia", "Tecno", "Infinix"]
+
+
+def concatenated_price_reply(product) -> str:
+    """The price reply as _handle_price_query built it before reply cards"""
+    response = f"**{product.name}**\n"
+    response += f"💰 দাম: {product.currency} {product.price:,.2f}\n"
+    if product.category:
+        response += f"📂 ক্যাটাগরি: {product.category}\n"
+    if product.brand:
+        response += f"🏷️ ব্র্যান্ড: {product.brand}\n"
+    if product.stock_quantity > 0:
+        stock_status = "✅ স্টকে আছে" if product.stock_quantity > product.min_stock_level else "⚠️ স্টকে কম"
+        response += f"📦 {stock_status} ({product.stock_quantity} পিস)\n"
+    else:
+        response += "❌ স্টকে নেই\n"
+    response += "\n\n💳 **ক্রয়ের জন্য:**\n"
+    response += "• ক্যাশ অন ডেলিভারি সুবিধা আছে\n"
+    response += "• বিকাশ/নগদ/রকেট পেমেন্ট অপশন\n"
+    response += "• ঢাকায় ফ্রি ডেলিভারি\n\n"
+    response += "অর্ডার করতে বলুন: 'আমি এই প্রোডাক্ট কিনতে চাই'"
+    return response
+
+
+def time_per_render(render, products, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for product in products:
+            render(product)
+    return (time.perf_counter() - start) / (repeat * len(products)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1000, help="Distinct products rendered")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the products per measurement")
+    args = parser.parse_args()
+    os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+    from app.services.catalog_snapshot import ProductRecord
+    from app.services.reply_cards import CARD_TEMPLATES, ReplyCardRenderer
+
+    rng = random.Random(7)
+    products = [
+        ProductRecord(
+            id=i, tenant_id="bench", name=f"{rng.choice(BRANDS)} A{i % 97}", description=None, sku=f"SKU-{i:06d}",
+            price=float(rng.randint(5, 200) * 1000), currency="BDT", category=rng.choice(["Smartphones", "Tablets", None]),
+            brand=rng.choice(BRANDS), stock_quantity=rng.randint(0, 40), min_stock_level=3,
+            is_active=True, is_featured=False, tags=None
+        )
+        for i in range(args.products)
+    ]
+    renderer = ReplyCardRenderer(CARD_TEMPLATES, max_cards=args.products * 2)
+
+    mismatched = sum(1 for product in products if renderer.render("price", product) != concatenated_price_reply(product))
+    restocked = [product._replace(stock_quantity=product.stock_quantity + 1) for product in products]
+
+    results = [
+        ("concatenation", time_per_render(concatenated_price_reply, products, args.repeat)),
+        ("card, unchanged", time_per_render(lambda product: renderer.render("price", product), products, args.repeat)),
+    ]
+    start = time.perf_counter()
+    for product in restocked:
+        renderer.render("price", product)
+    results.append(("card, stock changed", (time.perf_counter() - start) / len(restocked) * 1e6))
+    fresh = ReplyCardRenderer(CARD_TEMPLATES, max_cards=args.products * 2)
+    start = time.perf_counter()
+    for product in products:
+        fresh.render("price", product)
+    results.append(("card, first render", (time.perf_counter() - start) / len(products) * 1e6))
+
+    print(f"{'render':<22} {'us/card':>9}")
+    for name, micros in results:
+        print(f"{name:<22} {micros:>9.2f}")
+    print(f"   {args.products} products, cards {'identical to' if not mismatched else f'differ from ({mismatched})'} "
+          f"the concatenated replies")
+
+
+if __name__ == "__main__":
+    main()
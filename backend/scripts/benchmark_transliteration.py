@@ -0,0 +1,108 @@
+"""
+Benchmark: Banglish -> Bangla transliteration stage in front of NLU
+
+Measures the per-message cost of transliterator.canonicalize() and what it
+buys on a labelled corpus of Bangla messages and their romanized (Banglish)
+variants:
+  - NLU cache: distinct cache keys and the hit rate of a replayed stream
+  - keyword matching, the local classifier and the cascade local stage:
+    intent accuracy on the Banglish messages, as written vs canonicalized
+
+Usage:
+    python scripts/benchmark_transliteration.py --iterations 2000 --replays 5
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+# (intent, Bangla message, romanized variants customers actually send)
+CORPUS = [
+    ("order_status", "আমার অর্ডার কোথায়", ["amar order kothay", "amar order kothai", "Amar order kothay?"]),
+    ("order_status", "অর্ডার এখনো আসে নাই", ["order ekhono ashe nai", "order ekhono ase nai"]),
+    ("product_inquiry", "দাম কত", ["dam koto", "daam koto?", "dam koto bhai"]),
+    ("product_inquiry", "স্টক আছে", ["stock ache?", "stock achhe"]),
+    ("payment_issue", "টাকা কেটে নিছে কিন্তু অর্ডার হয় নাই", ["taka kete nise kintu order hoy nai", "vai taka kete nise kintu order hoy nai"]),
+    ("return_request", "আমি প্রোডাক্ট টা ফেরত দিতে চাই", ["ami product ta ferot dite chai", "ami product ta ferat dite chai"]),
+    ("delivery_tracking", "ডেলিভারি কবে হবে", ["delivery kobe hobe", "deliveri kobe hbe?"]),
+    ("delivery_tracking", "কুরিয়ার এখনো আসে নাই", ["courier ekhono ashe nai"]),
+    ("refund_status", "রিফান্ড কবে পাবো", ["refund kobe pabo", "refund kobe pabo vai"]),
+    ("cancel_order", "অর্ডার ক্যানসেল করতে চাই", ["order cancel korte chai", "order ta cancel korte chai"]),
+    ("complaint", "খুব খারাপ সার্ভিস", ["khub kharap service", "onek kharap service"]),
+]
+
+
+def replay_hit_rate(keys, replays: int) -> float:
+    # A stream where every message is sent `replays` times in random-ish order;
+    # each key misses once and hits afterwards
+    total = len(keys) * replays
+    return 1 - len(set(keys)) / total
+
+
+def time_per_call(func, texts, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - start) / (iterations * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="Timing passes over the corpus")
+    parser.add_argument("--replays", type=int, default=5, help="Times each message is replayed for the cache hit rate")
+    args = parser.parse_args()
+
+    from app.services.nlu_cache import normalize_text
+    from app.services.nlu_service import nlu_service
+    from app.services.transliterator import transliterator, transliterate_word
+
+    messages = [text for _, bangla, variants in CORPUS for text in [bangla] + variants]
+    banglish = [(intent, text) for intent, _, variants in CORPUS for text in variants]
+    english = ["Where is my order #4521?", "What is the price of the blue shirt?", "I want a refund"]
+
+    # Cold cost includes filling the memoized word table; warm is the steady state
+    transliterate_word.cache_clear()
+    start = time.perf_counter()
+    for text in messages:
+        transliterator.canonicalize(text)
+    cold_us = (time.perf_counter() - start) / len(messages) * 1e6
+    warm_us = time_per_call(transliterator.canonicalize, messages, args.iterations)
+    english_us = time_per_call(transliterator.canonicalize, english, args.iterations)
+    key_us = time_per_call(normalize_text, messages, args.iterations)
+
+    print(f"📚 Corpus: {len(CORPUS)} Bangla messages, {len(banglish)} Banglish variants")
+    print(f"⏱️  canonicalize: {cold_us:.2f} µs/msg cold, {warm_us:.2f} µs/msg warm "
+          f"({english_us:.2f} µs/msg for English); cache key alone {key_us:.2f} µs/msg")
+
+    plain_keys = [normalize_text(text).canonical for text in messages]
+    canonical_keys = [normalize_text(transliterator.canonicalize(text)).canonical for text in messages]
+    print(f"\n🗝️  cache keys: {len(set(plain_keys))} -> {len(set(canonical_keys))} distinct for {len(messages)} messages")
+    print(f"   replayed hit rate ({args.replays}x): {replay_hit_rate(plain_keys, args.replays):.1%} -> "
+          f"{replay_hit_rate(canonical_keys, args.replays):.1%}")
+
+    print(f"\n{'stage':<22} {'as written':>11} {'canonical':>10}")
+    stages = [
+        ("keyword matching", lambda text: nlu_service._classify_intent_keywords(text)[0]),
+        ("local classifier", lambda text: nlu_service.classify_intent_local(text)[0]),
+    ]
+    for name, classify in stages:
+        plain = sum(1 for intent, text in banglish if classify(text) == intent) / len(banglish)
+        canonical = sum(1 for intent, text in banglish if classify(transliterator.canonicalize(text)) == intent) / len(banglish)
+        print(f"{name:<22} {plain:>10.1%} {canonical:>10.1%}")
+
+    # As wired in resolve(): classifier on the text as written, keywords on the canonical form
+    plain = sum(1 for intent, text in banglish if nlu_service._classify_local_stage(text)[0] == intent) / len(banglish)
+    wired = sum(
+        1 for intent, text in banglish
+        if nlu_service._classify_local_stage(text, None, transliterator.canonicalize(text))[0] == intent
+    ) / len(banglish)
+    print(f"{'cascade local stage':<22} {plain:>10.1%} {wired:>10.1%}  (keywords on canonical)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+NLU evaluation harness: accuracy and latency of each NLU backend on labelled utterances
+
+Replays Utterance rows of a split (dev/test) through the selected backends and
+reports per-intent precision/recall/F1, accuracy, p50/p95/p99 latency,
+throughput and LLM token usage, as a table and as JSON.
+
+Backends:
+    keyword  keyword matching only
+    local    the tenant's local char n-gram classifier (NLU backend "local")
+    cascade  local stage with LLM escalation (NLU backend "cascade")
+    llm      LLM resolution (NLU backend "openai")
+
+The LLM runs against the local deterministic stub model server unless --live
+is given, so the harness works offline and in CI. The NLU result cache is
+disabled. Without stored utterances a built-in labelled sample is replayed.
+
+Usage:
+    python scripts/evaluate_nlu.py --split test --backends keyword local cascade llm
+    python scripts/evaluate_nlu.py --tenant <tenant_id> --split dev --json report.json
+    python scripts/evaluate_nlu.py --live --backends llm --limit 200
+    python scripts/evaluate_nlu.py --backends local cascade --min-accuracy 0.85   # CI gate
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.replay_few_shot import SAMPLE_TURNS
+from scripts.stub_llm_server import start_stub_server
+
+BACKENDS = ("keyword", "local", "cascade", "llm")
+# Harness backend name -> NLUService.resolve backend
+RESOLVE_BACKENDS = {"local": "local", "cascade": "cascade", "llm": "openai"}
+
+
+def load_utterances(split: str, tenant_id: Optional[str], limit: int) -> List[Tuple[str, str]]:
+    """(text, intent name) pairs of a split, optionally for one tenant"""
+    from app.db.session import SessionLocal
+    from app.db.models import Intent, Utterance
+
+    db = SessionLocal()
+    try:
+        query = db.query(Utterance.text, Intent.name).join(
+            Intent, Utterance.intent_id == Intent.id
+        ).filter(Utterance.split == split)
+        if tenant_id:
+            query = query.filter(Utterance.tenant_id == tenant_id)
+        return [(text, intent) for text, intent in query.order_by(Utterance.id).limit(limit).all() if text]
+    except Exception as e:
+        print(f"Could not load {split} utterances ({e}); using the built-in sample")
+        return []
+    finally:
+        db.close()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def classification_report(pairs: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Per-intent precision/recall/F1 plus accuracy and macro F1 from (expected, predicted) pairs"""
+    labels = sorted({expected for expected, _ in pairs} | {predicted for _, predicted in pairs})
+    per_intent = {}
+    for label in labels:
+        tp = sum(1 for expected, predicted in pairs if expected == label and predicted == label)
+        fp = sum(1 for expected, predicted in pairs if expected != label and predicted == label)
+        fn = sum(1 for expected, predicted in pairs if expected == label and predicted != label)
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_intent[label] = {
+            "precision": round(precision, 4),
+            "recall": round(recall, 4),
+            "f1": round(f1, 4),
+            "support": tp + fn,
+        }
+
+    supported = [metrics for metrics in per_intent.values() if metrics["support"]]
+    return {
+        "accuracy": round(sum(1 for expected, predicted in pairs if expected == predicted) / len(pairs), 4),
+        "macro_f1": round(sum(m["f1"] for m in supported) / len(supported), 4) if supported else 0.0,
+        "per_intent": per_intent,
+    }
+
+
+async def evaluate_backend(nlu_service, llm_client, backend: str, samples, tenant_id, concurrency: int) -> Dict[str, Any]:
+    from app.core.config import settings
+    from app.services.transliterator import transliterator
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    predictions: List[Optional[str]] = [None] * len(samples)
+    escalations = 0
+    calls, prompt_tokens, completion_tokens = llm_client.calls, llm_client.prompt_tokens, llm_client.completion_tokens
+
+    async def run(i: int, text: str):
+        nonlocal escalations
+        async with semaphore:
+            start = time.perf_counter()
+            if backend == "keyword":
+                # Same input the cascade's keyword vote sees
+                canonical = transliterator.canonicalize(text) if settings.nlu_transliteration_enabled else text
+                intent = nlu_service._classify_intent_keywords(canonical)[0]
+            else:
+                result = await nlu_service.resolve(text, {"tenant_id": tenant_id}, backend=RESOLVE_BACKENDS[backend])
+                intent = result["intent"]
+                escalations += 1 if result.get("stage") == "llm" else 0
+            latencies.append((time.perf_counter() - start) * 1000)
+            predictions[i] = intent
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(i, text) for i, (text, _) in enumerate(samples)))
+    wall = time.perf_counter() - start
+
+    report = classification_report([(expected, predictions[i]) for i, (_, expected) in enumerate(samples)])
+    report.update({
+        "backend": backend,
+        "messages": len(samples),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+        },
+        "throughput_per_s": round(len(samples) / wall, 2) if wall else None,
+        "llm": {
+            "calls": llm_client.calls - calls,
+            "prompt_tokens": llm_client.prompt_tokens - prompt_tokens,
+            "completion_tokens": llm_client.completion_tokens - completion_tokens,
+            "escalation_rate": round(escalations / len(samples), 4),
+        },
+    })
+    return report
+
+
+async def evaluate_all(nlu_service, llm_client, backends, samples, tenant_id, concurrency):
+    # Build the tenant's per-tenant models up front so first-use training is not timed
+    nlu_service.local_classifiers.get(tenant_id)
+    nlu_service.example_indexes.get(tenant_id)
+    # One event loop for every backend so the pooled LLM connections stay valid
+    return [await evaluate_backend(nlu_service, llm_client, backend, samples, tenant_id, concurrency) for backend in backends]
+
+
+def print_tables(reports: List[Dict[str, Any]]):
+    print(f"\n{'backend':<9} {'acc':>7} {'macroF1':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'msg/s':>9} {'LLM calls':>10} {'tokens':>8}")
+    for report in reports:
+        latency, llm = report["latency_ms"], report["llm"]
+        tokens = llm["prompt_tokens"] + llm["completion_tokens"]
+        print(f"{report['backend']:<9} {report['accuracy']:>7.1%} {report['macro_f1']:>8.3f} {latency['p50']:>9.2f} "
+              f"{latency['p95']:>9.2f} {latency['p99']:>9.2f} {report['throughput_per_s']:>9.1f} {llm['calls']:>10} {tokens:>8}")
+
+    intents = sorted({intent for report in reports for intent, m in report["per_intent"].items() if m["support"]})
+    header = " ".join(f"{report['backend'] + ' P/R':>15}" for report in reports)
+    print(f"\n{'intent':<24} {'n':>4} {header}")
+    for intent in intents:
+        support = reports[0]["per_intent"].get(intent, {}).get("support", 0)
+        cells = []
+        for report in reports:
+            m = report["per_intent"].get(intent, {"precision": 0.0, "recall": 0.0})
+            cells.append(f"{m['precision']:>7.2f}/{m['recall']:<7.2f}")
+        print(f"{intent:<24} {support:>4} {' '.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--split", default="test", choices=("dev", "test", "train"), help="Utterance split to replay")
+    parser.add_argument("--tenant", default=None, help="Evaluate one tenant's utterances and models")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--limit", type=int, default=1000, help="Max utterances")
+    parser.add_argument("--concurrency", type=int, default=8, help="Messages in flight")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the JSON report here ('-' for stdout)")
+    parser.add_argument("--min-accuracy", type=float, default=None, help="Exit non-zero if any backend scores below this (CI gate)")
+    parser.add_argument("--live", action="store_true", help="Use the configured LLM instead of the stub")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Stub base latency per completion")
+    args = parser.parse_args()
+
+    server = None
+    if not args.live:
+        server, base_url = start_stub_server(latency_ms=args.latency_ms)
+        os.environ["BANG_OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+    # Measure the backends, not the NLU result cache
+    os.environ["BANG_NLU_CACHE_ENABLED"] = "false"
+
+    from app.services.llm_client import llm_client
+    from app.services.nlu_service import nlu_service
+
+    samples = load_utterances(args.split, args.tenant, args.limit) or list(SAMPLE_TURNS)
+    print(f"🧪 Evaluating {len(samples)} {args.split} utterances on {', '.join(args.backends)} "
+          f"({'live LLM' if args.live else 'stub LLM'})")
+
+    reports = asyncio.run(evaluate_all(nlu_service, llm_client, args.backends, samples, args.tenant, args.concurrency))
+    print_tables(reports)
+
+    document = {"split": args.split, "tenant_id": args.tenant, "stub": not args.live, "reports": reports}
+    if args.json_path == "-":
+        print(json.dumps(document, ensure_ascii=False, indent=2))
+    elif args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+        print(f"\n📝 JSON report written to {args.json_path}")
+
+    if server is not None:
+        server.shutdown()
+
+    if args.min_accuracy is not None:
+        failing = [report["backend"] for report in reports if report["accuracy"] < args.min_accuracy]
+        if failing:
+            print(f"\n❌ Accuracy below {args.min_accuracy:.0%}: {', '.join(failing)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Load test: dialogue state store read/write latency per turn
+
+Simulates concurrent customers holding multi-turn conversations. Every turn
+loads the customer's DialogueState, fills a slot, appends the user and bot
+turns and saves it back, as the channel adapters do. Reports load and save
+latency percentiles, the serialized state size, and whether a second store
+instance (another worker) continues each conversation with its slots intact.
+
+The in-process tier is always measured; pass --redis to also measure the
+Redis tier on BANG_REDIS_URL (or --redis-url).
+
+Usage:
+    python scripts/load_test_dialogue_state.py --customers 500 --turns 20 --redis
+"""
+import argparse
+import asyncio
+import os
+import pickle
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+MESSAGES = [
+    ("order_status", "amar order kothay?", {}),
+    ("order_status", "order number ORD-4F2A91BC", {"order_id": "ORD-4F2A91BC"}),
+    ("delivery_tracking", "delivery kobe hobe?", {}),
+    ("price_inquiry", "Samsung A54 er dam koto?", {"product": "Samsung A54"}),
+    ("return_request", "ami product ta ferot dite chai", {}),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def customer(store, tenant_id, customer_id, turns, load_ms, save_ms):
+    for turn in range(turns):
+        intent, text, entities = MESSAGES[turn % len(MESSAGES)]
+
+        start = time.perf_counter()
+        state = await store.load(tenant_id, "loadtest", customer_id)
+        load_ms.append((time.perf_counter() - start) * 1000)
+
+        for key, value in entities.items():
+            state.update_slot(key, value)
+        state.add_turn("user", text, intent)
+        state.add_turn("bot", f"reply to {intent}")
+
+        start = time.perf_counter()
+        await store.save(tenant_id, "loadtest", customer_id, state)
+        save_ms.append((time.perf_counter() - start) * 1000)
+
+
+async def run_tier(store, args):
+    load_ms, save_ms = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        customer(store, "tenant-load", f"customer-{i}", args.turns, load_ms, save_ms)
+        for i in range(args.customers)
+    ))
+    elapsed = time.perf_counter() - start
+    return load_ms, save_ms, elapsed
+
+
+async def check_continuation(store, args):
+    """Share of conversations another store instance sees with order_id filled"""
+    continued = 0
+    for i in range(args.customers):
+        state = await store.load("tenant-load", "loadtest", f"customer-{i}")
+        if state.get_slot("order_id") and len(state.history) == state.max_history:
+            continued += 1
+    return continued / args.customers
+
+
+async def main_async(args):
+    from app.core.config import settings
+    from app.services.dialogue_state_store import DialogueStateStore, serialize_state
+
+    tiers = [("memory", False)]
+    if args.redis:
+        tiers.append(("redis", True))
+
+    print(f"👥 {args.customers} customers x {args.turns} turns")
+    print(f"{'tier':<8} {'op':<5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'turns/s':>9}")
+    for name, use_redis in tiers:
+        settings.dialogue_state_redis_enabled = use_redis
+        store = DialogueStateStore(max_entries=args.customers * 2, ttl_seconds=settings.dialogue_state_ttl_seconds)
+        if use_redis:
+            try:
+                await store._get_redis_client().ping()
+            except Exception as e:
+                print(f"{name:<8} skipped: Redis unreachable at {settings.redis_url} ({e})")
+                continue
+
+        load_ms, save_ms, elapsed = await run_tier(store, args)
+        throughput = args.customers * args.turns / elapsed
+        for op, values in (("load", load_ms), ("save", save_ms)):
+            print(f"{name:<8} {op:<5} {percentile(values, 50):>8.3f} {percentile(values, 95):>8.3f} "
+                  f"{percentile(values, 99):>8.3f} {throughput:>9.0f}")
+
+        state = await store.load("tenant-load", "loadtest", "customer-0")
+        if name == "memory":
+            print(f"{'':<8} state size: {len(serialize_state(state).encode('utf-8'))} bytes JSON "
+                  f"({len(pickle.dumps(state))} bytes pickled), {len(state.history)} turns kept")
+        if use_redis:
+            # A second instance has an empty local tier, like another worker or node
+            other = DialogueStateStore(max_entries=args.customers * 2)
+            continued = await check_continuation(other, args)
+            print(f"{'':<8} conversations continued by another worker: {continued:.1%}")
+            await other.aclose()
+            for i in range(args.customers):
+                await store.delete("tenant-load", "loadtest", f"customer-{i}")
+        await store.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=500, help="Concurrent conversations")
+    parser.add_argument("--turns", type=int, default=20, help="Turns per conversation")
+    parser.add_argument("--redis", action="store_true", help="Also measure the Redis tier")
+    parser.add_argument("--redis-url", default=None, help="Redis URL (defaults to BANG_REDIS_URL)")
+    args = parser.parse_args()
+    if args.redis_url:
+        os.environ["BANG_REDIS_URL"] = args.redis_url
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
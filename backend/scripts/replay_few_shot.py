@@ -0,0 +1,137 @@
+"""
+Replay stored turns through the LLM intent prompts with and without few-shot selection
+
+For each user turn (Turn.text with a labelled Turn.intent) runs classify_intent
+and the combined resolution call against the local stub model server, once with
+every intent description in the prompt and once with the retrieved shortlist.
+Reports prompt tokens, latency and shortlist recall (labelled intent among the
+candidates). Without stored turns a built-in labelled sample is replayed.
+
+Usage:
+    python scripts/replay_few_shot.py --limit 500 --tenant <tenant_id>
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.stub_llm_server import start_stub_server
+
+SAMPLE_TURNS = [
+    ("আমার অর্ডার কোথায়?", "order_status"),
+    ("অর্ডার ১২৩ এর স্ট্যাটাস", "order_status"),
+    ("amar parcel er order ta kothay", "order_status"),
+    ("Where is my order #4521?", "order_status"),
+    ("Samsung A54 er dam koto bhai?", "product_inquiry"),
+    ("এই শার্টের দাম কত?", "product_inquiry"),
+    ("Samsung S24 stock e ache?", "product_inquiry"),
+    ("পেমেন্ট ফেইলড, টাকা কেটে নিয়েছে", "payment_issue"),
+    ("Payment failed but money was deducted", "payment_issue"),
+    ("I want to return this product", "return_request"),
+    ("প্রোডাক্ট ফেরত দিতে চাই", "return_request"),
+    ("ডেলিভারি কবে হবে?", "delivery_tracking"),
+    ("courier ekhono ashe nai", "delivery_tracking"),
+    ("খারাপ সার্ভিস, অভিযোগ করতে চাই", "complaint"),
+    ("অর্ডার ক্যানসেল করতে চাই", "cancel_order"),
+    ("Please cancel my order", "cancel_order"),
+    ("রিফান্ড কবে পাবো?", "refund_status"),
+    ("ফেসবুকে পোস্ট করো নতুন অফার", "social_media_post"),
+    ("show me instagram analytics", "social_media_analytics"),
+]
+
+
+def load_turns(limit: int, tenant_id):
+    from app.db.session import SessionLocal
+    from app.db.models import Turn, TurnSpeaker
+
+    db = SessionLocal()
+    try:
+        query = db.query(Turn.text, Turn.intent).filter(
+            Turn.speaker == TurnSpeaker.user,
+            Turn.intent.isnot(None)
+        )
+        if tenant_id:
+            query = query.filter(Turn.tenant_id == tenant_id)
+        return [(text, intent) for text, intent in query.order_by(Turn.id.desc()).limit(limit).all() if text]
+    except Exception as e:
+        print(f"Could not load stored turns ({e}); replaying the built-in sample")
+        return []
+    finally:
+        db.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def replay(nlu_service, llm_client, turns, tenant_id, call):
+    tokens, latencies = [], []
+    for text, _ in turns:
+        before = llm_client.prompt_tokens
+        start = time.perf_counter()
+        if call == "classify_intent":
+            await nlu_service.classify_intent(text, tenant_id)
+        else:
+            await nlu_service.resolve_llm_combined(text, tenant_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+        tokens.append(llm_client.prompt_tokens - before)
+    return tokens, latencies
+
+
+async def replay_all(nlu_service, llm_client, settings, turns, tenant_id):
+    # One event loop for every run so the pooled LLM connections stay valid
+    runs = {}
+    for call in ("classify_intent", "combined"):
+        for mode, enabled in (("full", False), ("few_shot", True)):
+            settings.nlu_few_shot_enabled = enabled
+            runs[(call, mode)] = await replay(nlu_service, llm_client, turns, tenant_id, call)
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=500, help="Max stored turns to replay")
+    parser.add_argument("--tenant", default=None, help="Replay one tenant's turns with its own index")
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Stub base latency per completion")
+    parser.add_argument("--per-prompt-token-ms", type=float, default=0.2, help="Stub latency per prompt token")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency_ms=args.latency_ms, per_prompt_token_ms=args.per_prompt_token_ms)
+    os.environ["BANG_OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+    from app.core.config import settings
+    from app.services.llm_client import llm_client
+    from app.services.nlu_service import nlu_service
+
+    turns = load_turns(args.limit, args.tenant) or SAMPLE_TURNS
+    index = nlu_service.example_indexes.get(args.tenant)
+    recall = statistics.mean(
+        1.0 if intent in index.shortlist(text, settings.nlu_few_shot_examples, settings.nlu_few_shot_candidates).intents else 0.0
+        for text, intent in turns
+    )
+
+    print(f"🔁 Replaying {len(turns)} turns against {base_url}")
+    print(f"{'prompt':<16} {'mode':<10} {'tokens/msg':>11} {'p50 ms':>8} {'p95 ms':>8}")
+    runs = asyncio.run(replay_all(nlu_service, llm_client, settings, turns, args.tenant))
+    for call in ("classify_intent", "combined"):
+        results = {}
+        for mode in ("full", "few_shot"):
+            tokens, latencies = runs[(call, mode)]
+            results[mode] = (statistics.mean(tokens), statistics.mean(latencies))
+            print(f"{call:<16} {mode:<10} {statistics.mean(tokens):>11.1f} {percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f}")
+        token_cut = 1 - results["few_shot"][0] / results["full"][0]
+        latency_cut = 1 - results["few_shot"][1] / results["full"][1]
+        print(f"{'':<16} {'change':<10} {-token_cut:>+11.1%} {-latency_cut:>+8.1%} (mean latency)")
+
+    print(f"\n🎯 Shortlist recall (labelled intent among candidates): {recall:.1%}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Soak test: memory, sessions and pool checkouts of product inquiries under sustained load
+
+Seeds a throwaway SQLite catalog for several tenants, then keeps concurrent
+conversations asking product questions through dialogue_manager.decide_async()
+for --duration seconds, with TenantContext switching between requests the way
+interleaved webhooks switch it. A writer renames products now and then, as
+the products API would. Every --sample-seconds it prints process RSS, pool
+connections checked out (now and peak), live Session objects, cached catalog
+snapshots and throughput. A flat RSS after warm-up, no sessions left open
+between lookups and no reply naming another tenant's product are the pass
+criteria.
+
+The reply cache is turned off so every message reaches the catalog.
+
+Usage:
+    python scripts/soak_product_inquiry.py --tenants 20 --products 2000 --conversations 50 --duration 120
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BRANDS = ["Samsung", "Xiaomi", "Realme", "Oppo", "Vivo", "Nokia", "Tecno", "Infinix"]
+MESSAGES = [
+    ("price_inquiry", "{product} er dam koto?"),
+    ("availability_inquiry", "{product} stock ache?"),
+    ("product_info", "about {product}"),
+    ("recommendation", "kono phone suggest korun"),
+    ("category_browse", "ki ki category ache?"),
+    ("price_inquiry", "{typo} er dam koto"),
+]
+TENANT_MARK = re.compile(r"\((t\d+)\)")
+
+
+def tenant_name(index: int) -> str:
+    return f"t{index:02d}"
+
+
+def seed_catalog(engine, tenants: int, products: int):
+    from app.db.models import Product
+
+    rng = random.Random(7)
+    rows = []
+    for t in range(tenants):
+        tenant = tenant_name(t)
+        for i in range(products):
+            brand = rng.choice(BRANDS)
+            rows.append({
+                "tenant_id": tenant, "name": f"{brand} A{i % 97} ({tenant})", "sku": f"{tenant}-{i:06d}",
+                "price": float(rng.randint(5, 200) * 1000), "category": rng.choice(["Smartphones", "Tablets"]),
+                "brand": brand, "stock_quantity": rng.randint(0, 40), "min_stock_level": 3,
+                "is_active": True, "is_featured": i < 5, "description": f"{brand} phone for {tenant}",
+            })
+    with engine.begin() as conn:
+        for start in range(0, len(rows), 20000):
+            conn.execute(Product.__table__.insert(), rows[start:start + 20000])
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        # Peak rather than current RSS where /proc is unavailable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def live_sessions() -> int:
+    from sqlalchemy.orm import Session
+
+    gc.collect()
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, Session))
+
+
+class PoolStats:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.checkouts = 0
+        self.checked_out = 0
+        self.peak = 0
+        event.listen(engine, "checkout", self._checkout)
+        event.listen(engine, "checkin", self._checkin)
+
+    def _checkout(self, *args):
+        self.checkouts += 1
+        self.checked_out += 1
+        self.peak = max(self.peak, self.checked_out)
+
+    def _checkin(self, *args):
+        self.checked_out -= 1
+
+
+async def conversation(index: int, args, stats: dict, stop: asyncio.Event):
+    from app.core.tenant import TenantContext
+    from app.services.dialogue_manager import dialogue_manager
+
+    rng = random.Random(index)
+    while not stop.is_set():
+        tenant = tenant_name(rng.randrange(args.tenants))
+        brand, model = rng.choice(BRANDS), f"A{rng.randrange(97)}"
+        intent, template = rng.choice(MESSAGES)
+        text = template.format(product=f"{brand} {model}", typo=f"{brand[:-1]} {model}")
+        # Another request's tenant may be current by the time the lookup thread runs
+        TenantContext.set_tenant(tenant)
+        context = {"channel": "soak", "customer_id": f"c{index}", "message": text, "language": "bn", "tenant_id": tenant}
+        result = await dialogue_manager.decide_async(intent, {}, context)
+        TenantContext.set_tenant(tenant_name(rng.randrange(args.tenants)))
+
+        stats["turns"] += 1
+        if any(mark != tenant for mark in TENANT_MARK.findall(result["response_text"])):
+            stats["foreign"] += 1
+        await asyncio.sleep(0)
+
+
+async def writer(args, stats: dict, stop: asyncio.Event):
+    """Rename a product every --write-seconds, through the same hooks as the products API"""
+    from app.db.models import Product
+    from app.db.session import SessionLocal
+    from app.services.catalog_snapshot import catalog_snapshots
+    from app.services.product_search_index import product_search_indexes
+
+    rng = random.Random(99)
+
+    def rename():
+        db = SessionLocal()
+        try:
+            tenant = tenant_name(rng.randrange(args.tenants))
+            product = db.query(Product).filter(Product.tenant_id == tenant).offset(rng.randrange(args.products)).first()
+            product.description = f"{product.brand} phone for {tenant}, revision {stats['writes']}"
+            db.commit()
+            product_search_indexes.upsert(product)
+            catalog_snapshots.invalidate(tenant)
+        finally:
+            db.close()
+
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=args.write_seconds)
+        except asyncio.TimeoutError:
+            await asyncio.to_thread(rename)
+            stats["writes"] += 1
+
+
+async def soak(args, engine):
+    from app.services.catalog_snapshot import catalog_snapshots
+
+    pool = PoolStats(engine)
+    stats = {"turns": 0, "foreign": 0, "writes": 0}
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(conversation(i, args, stats, stop)) for i in range(args.conversations)]
+    tasks.append(asyncio.create_task(writer(args, stats, stop)))
+
+    samples = []
+    start = last = time.perf_counter()
+    last_turns = 0
+    print(f"{'t s':>6} {'rss MB':>8} {'pool out':>9} {'peak':>5} {'checkouts':>10} "
+          f"{'sessions':>9} {'snapshots':>10} {'turns/s':>8}")
+    while time.perf_counter() - start < args.duration:
+        await asyncio.sleep(args.sample_seconds)
+        now = time.perf_counter()
+        sample = (now - start, rss_mb(), pool.checked_out, pool.peak, pool.checkouts,
+                  live_sessions(), len(catalog_snapshots), (stats["turns"] - last_turns) / (now - last))
+        last, last_turns = now, stats["turns"]
+        samples.append(sample)
+        print(f"{sample[0]:>6.0f} {sample[1]:>8.1f} {sample[2]:>9} {sample[3]:>5} {sample[4]:>10} "
+              f"{sample[5]:>9} {sample[6]:>10} {sample[7]:>8.0f}")
+
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    warm = samples[min(len(samples) - 1, max(1, len(samples) // 4))]
+    print(f"\n{stats['turns']} turns, {stats['writes']} catalog writes, "
+          f"{stats['foreign']} replies naming another tenant's product")
+    print(f"RSS after warm-up {warm[1]:.1f} MB -> end {samples[-1][1]:.1f} MB "
+          f"({samples[-1][1] - warm[1]:+.1f} MB); peak pool checkouts {pool.peak}; "
+          f"sessions alive at rest {live_sessions()}; connections still checked out {pool.checked_out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=20, help="Tenants in the throwaway catalog")
+    parser.add_argument("--products", type=int, default=2000, help="Products per tenant")
+    parser.add_argument("--conversations", type=int, default=50, help="Concurrent conversations")
+    parser.add_argument("--duration", type=float, default=120, help="Seconds of sustained load")
+    parser.add_argument("--sample-seconds", type=float, default=10, help="Sampling interval")
+    parser.add_argument("--write-seconds", type=float, default=0.5, help="Interval between catalog writes")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "product_inquiry_soak.db")
+    os.environ["BANG_DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("BANG_OPENAI_API_KEY", "stub")
+
+    from app.core.config import settings
+    from app.db.models import Base, Product, Template
+    from app.db.session import engine
+
+    Base.metadata.create_all(engine, tables=[Product.__table__, Template.__table__])
+    seed_catalog(engine, args.tenants, args.products)
+    settings.reply_cache_enabled = False
+
+    print(f"🔁 {args.conversations} conversations over {args.tenants} tenants x {args.products} products "
+          f"for {args.duration:.0f}s, {settings.dialogue_lookup_workers} lookup threads")
+    asyncio.run(soak(args, engine))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Deterministic OpenAI-compatible stub server for offline NLU benchmarks and CI
+
+Serves POST /v1/chat/completions with canned, rule-based answers and a
+configurable latency model, so the real OpenAI client code paths can be
+exercised without network access or API keys.
+
+Usage:
+    python scripts/stub_llm_server.py --port 8765 --latency-ms 300
+    BANG_OPENAI_BASE_URL=http://127.0.0.1:8765/v1 BANG_OPENAI_API_KEY=stub uvicorn app.main:app
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Ordered (substring, intent) rules; first match wins
+STUB_RULES: List[Tuple[str, str]] = [
+    ("cancel", "cancel_order"), ("ক্যানসেল", "cancel_order"), ("বাতিল", "cancel_order"),
+    ("refund", "refund_status"), ("রিফান্ড", "refund_status"),
+    ("return", "return_request"), ("ফেরত", "return_request"), ("রিটার্ন", "return_request"), ("ferot", "return_request"),
+    ("payment", "payment_issue"), ("পেমেন্ট", "payment_issue"), ("টাকা কাটে", "payment_issue"), ("bkash", "payment_issue"),
+    ("delivery", "delivery_tracking"), ("courier", "delivery_tracking"), ("ডেলিভারি", "delivery_tracking"), ("কুরিয়ার", "delivery_tracking"),
+    ("complain", "complaint"), ("অভিযোগ", "complaint"), ("খারাপ", "complaint"), ("bad", "complaint"),
+    ("order", "order_status"), ("অর্ডার", "order_status"), ("kothay", "order_status"),
+    ("price", "product_inquiry"), ("dam", "product_inquiry"), ("দাম", "product_inquiry"), ("stock", "product_inquiry"),
+    ("available", "product_inquiry"), ("আছে", "product_inquiry"), ("koto", "product_inquiry"),
+    ("facebook", "social_media_post"), ("instagram", "social_media_post"), ("ফেসবুক", "social_media_post"),
+    ("analytics", "social_media_analytics"), ("follower", "social_media_analytics"),
+    ("schedule", "social_media_schedule"), ("শিডিউল", "social_media_schedule"),
+]
+
+_QUERY_RE = re.compile(r'(?:Query|Message)(?: \d+)?: "(.*)"')
+_ORDER_RE = re.compile(r'(?:ORD-[A-Z0-9]{8}|#\s*\d+|(?:order|অর্ডার)\s*([\d০-৯]+))', re.IGNORECASE)
+_PHONE_RE = re.compile(r'(?:\+?88)?01[3-9]\d{8}')
+
+
+def stub_intent(text: str) -> Tuple[str, float]:
+    lowered = text.lower()
+    for needle, intent in STUB_RULES:
+        if needle in lowered:
+            return intent, 0.92
+    return "fallback", 0.4
+
+
+def stub_language(text: str) -> str:
+    if any('ঀ' <= ch <= '৿' for ch in text):
+        return "bn"
+    if any('ऀ' <= ch <= 'ॿ' for ch in text):
+        return "hi"
+    if any('؀' <= ch <= 'ۿ' for ch in text):
+        return "ar"
+    return "en"
+
+
+def stub_entities(text: str) -> Dict[str, Any]:
+    entities: Dict[str, Any] = {}
+    order = _ORDER_RE.search(text)
+    if order:
+        entities["order_id"] = order.group(1) or order.group(0).lstrip("#").strip()
+    phone = _PHONE_RE.search(text)
+    if phone:
+        entities["phone"] = phone.group(0)
+    return entities
+
+
+def _extract_queries(prompt: str) -> List[str]:
+    return [m.group(1) for m in _QUERY_RE.finditer(prompt)]
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def build_completion(payload: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+    """Build a deterministic assistant message for a chat completion request"""
+    messages = payload.get("messages", [])
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    prompt = "\n".join(m.get("content", "") for m in messages if m.get("role") != "system")
+    queries = _extract_queries(prompt) or [messages[-1].get("content", "") if messages else ""]
+    text = queries[0]
+
+    response_format = payload.get("response_format") or {}
+    schema_name = (response_format.get("json_schema") or {}).get("name")
+
+    if schema_name == "nlu_batch_resolution":
+        results = []
+        for index, query in enumerate(queries, 1):
+            intent, confidence = stub_intent(query)
+            results.append({
+                "index": index,
+                "intent": intent,
+                "confidence": confidence,
+                "language": stub_language(query),
+                "entities": stub_entities(query)
+            })
+        content = json.dumps({"results": results}, ensure_ascii=False)
+    elif schema_name == "nlu_resolution":
+        intent, confidence = stub_intent(text)
+        content = json.dumps({
+            "intent": intent,
+            "confidence": confidence,
+            "language": stub_language(text),
+            "entities": stub_entities(text)
+        }, ensure_ascii=False)
+    elif "intent classifier" in system:
+        intent, confidence = stub_intent(text)
+        content = json.dumps({
+            "intent": intent,
+            "confidence": confidence,
+            "language": stub_language(text),
+            "reasoning": "stub"
+        })
+    elif "extracting entities" in system:
+        content = json.dumps(stub_entities(text), ensure_ascii=False)
+    else:
+        content = f"[stub reply] {text[:80]}"
+
+    prompt_tokens = _estimate_tokens(system + prompt)
+    completion_tokens = _estimate_tokens(content)
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+    return content, usage
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    latency_ms: float = 300.0
+    per_token_ms: float = 2.0
+    per_prompt_token_ms: float = 0.05
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        content, usage = build_completion(payload)
+
+        delay = self.latency_ms + usage["completion_tokens"] * self.per_token_ms + usage["prompt_tokens"] * self.per_prompt_token_ms
+        time.sleep(delay / 1000.0)
+
+        body = json.dumps({
+            "id": f"chatcmpl-stub-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }, ensure_ascii=False).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    latency_ms: float = 300.0,
+    per_token_ms: float = 2.0,
+    per_prompt_token_ms: float = 0.05
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub in a daemon thread; returns (server, base_url)"""
+    handler = type("ConfiguredStubLLMHandler", (StubLLMHandler,), {
+        "latency_ms": latency_ms,
+        "per_token_ms": per_token_ms,
+        "per_prompt_token_ms": per_prompt_token_ms,
+    })
+    server_class = type("StubHTTPServer", (ThreadingHTTPServer,), {"request_queue_size": 1024})
+    server = server_class((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--per-token-ms", type=float, default=2.0)
+    parser.add_argument("--per-prompt-token-ms", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    server, base_url = start_stub_server(args.host, args.port, args.latency_ms, args.per_token_ms, args.per_prompt_token_ms)
+    print(f"🧪 Stub LLM server listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()